@@ -0,0 +1,5 @@
+"""
+Reproducible benchmarks of throughput and peak memory for libspn-keras.
+
+Run ``python -m benchmarks.run --help`` from the root of the repository for usage.
+"""
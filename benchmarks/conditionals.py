@@ -0,0 +1,105 @@
+import argparse
+import json
+import sys
+import time
+from typing import List, Optional, Sequence
+
+import numpy as np
+import tensorflow as tf
+from tensorflow import keras
+
+from benchmarks.models import build_rat_spn, rat_spn_batch
+from benchmarks.quantization import _median_latency
+from libspn_keras.sum_ops import SumOpGradBackprop
+
+
+def benchmark_conditionals(
+    num_sums: Sequence[int],
+    num_decomps: int = 8,
+    batch_size: int = 256,
+    num_steps: int = 10,
+) -> List[dict]:
+    """
+    Compare the latency of all single-variable conditionals with that of a forward pass.
+
+    Args:
+        num_sums: Numbers of sums per scope and of leaf components per variable to measure.
+        num_decomps: Number of decompositions.
+        batch_size: Number of samples per call.
+        num_steps: Number of timed calls, after a single untimed call.
+
+    Returns:
+        A list of dicts holding the median latency of a forward pass and of computing all
+        conditionals per number of sums.
+    """
+    results = []
+    for sums in num_sums:
+        keras.backend.clear_session()
+        spn = build_rat_spn(sums, num_decomps, SumOpGradBackprop())
+        (x,) = rat_spn_batch(batch_size)
+        spn(x)
+        fn = tf.function(
+            lambda x: spn.all_conditionals(x, training=False),
+            input_signature=[tf.TensorSpec(x.shape, x.dtype)],
+        )
+        fn(x)
+        latencies = []
+        for _ in range(num_steps):
+            start = time.perf_counter()
+            fn(x).numpy()
+            latencies.append(time.perf_counter() - start)
+        results.append(
+            dict(
+                num_sums=sums,
+                num_decomps=num_decomps,
+                batch_size=batch_size,
+                latency=_median_latency(spn, x, num_steps),
+                conditionals_latency=float(np.median(latencies)),
+            )
+        )
+    return results
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    Benchmark all single-variable conditionals from the command line.
+
+    Args:
+        argv: Command line arguments. If ``None``, uses ``sys.argv``.
+
+    Returns:
+        Exit status.
+    """
+    parser = argparse.ArgumentParser(
+        description="Compare all single-variable conditionals to a forward pass of RAT-SPNs."
+    )
+    parser.add_argument("--num-sums", nargs="+", type=int, default=[8, 16])
+    parser.add_argument("--num-decomps", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--num-steps", type=int, default=10)
+    parser.add_argument("--output", help="Path of the JSON file to write results to")
+    args = parser.parse_args(argv)
+
+    results = benchmark_conditionals(
+        args.num_sums,
+        num_decomps=args.num_decomps,
+        batch_size=args.batch_size,
+        num_steps=args.num_steps,
+    )
+    for result in results:
+        print(
+            "{:>6} sums{:>10.2f} ms -> {:>8.2f} ms".format(
+                result["num_sums"],
+                result["latency"] * 1e3,
+                result["conditionals_latency"] * 1e3,
+            )
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
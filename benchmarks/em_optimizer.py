@@ -0,0 +1,100 @@
+import argparse
+import json
+import sys
+import time
+from typing import List, Optional, Sequence
+
+import numpy as np
+import tensorflow as tf
+from tensorflow import keras
+
+from benchmarks.models import build_rat_spn, RAT_NUM_VARS
+from libspn_keras.optimizers import OnlineExpectationMaximization
+from libspn_keras.sum_ops import SumOpHardEMBackprop
+
+
+def benchmark_em_optimizer(
+    num_sums: Sequence[int], num_decomps: int = 4, num_steps: int = 20
+) -> List[dict]:
+    """
+    Compare the latency of fused and unfused EM updates of the accumulators of a RAT-SPN.
+
+    Only the update of the optimizer is timed, with fixed counts as gradients, since the
+    forward and backward passes of a training step are the same for both.
+
+    Args:
+        num_sums: Numbers of sums per scope and of leaf components per variable to measure.
+        num_decomps: Number of decompositions.
+        num_steps: Number of timed updates, after a single untimed update.
+
+    Returns:
+        A list of dicts holding the number of accumulators and the median latency of an update
+        with and without fusing constraints per number of sums.
+    """
+    results = []
+    for sums in num_sums:
+        result = dict(num_sums=sums, num_decomps=num_decomps)
+        for fused in (False, True):
+            keras.backend.clear_session()
+            spn = build_rat_spn(sums, num_decomps, SumOpHardEMBackprop())
+            spn.build((None, RAT_NUM_VARS))
+            optimizer = OnlineExpectationMaximization(fused=fused)
+            variables = spn.trainable_variables
+            counts = [tf.random.uniform(v.shape) for v in variables]
+            update = tf.function(
+                lambda: optimizer.apply_gradients(zip(counts, variables))
+            )
+            update()
+            latencies = []
+            for _ in range(num_steps):
+                start = time.perf_counter()
+                update().numpy()
+                latencies.append(time.perf_counter() - start)
+            result["fused_latency" if fused else "latency"] = float(
+                np.median(latencies)
+            )
+            result["num_accumulators"] = int(sum(np.prod(v.shape) for v in variables))
+        results.append(result)
+    return results
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    Benchmark fused EM updates from the command line.
+
+    Args:
+        argv: Command line arguments. If ``None``, uses ``sys.argv``.
+
+    Returns:
+        Exit status.
+    """
+    parser = argparse.ArgumentParser(
+        description="Compare fused and unfused EM updates of RAT-SPN accumulators."
+    )
+    parser.add_argument("--num-sums", nargs="+", type=int, default=[8, 16, 32])
+    parser.add_argument("--num-decomps", type=int, default=4)
+    parser.add_argument("--num-steps", type=int, default=20)
+    parser.add_argument("--output", help="Path of the JSON file to write results to")
+    args = parser.parse_args(argv)
+
+    results = benchmark_em_optimizer(
+        args.num_sums, num_decomps=args.num_decomps, num_steps=args.num_steps
+    )
+    for result in results:
+        print(
+            "{:>6} sums{:>12} accumulators{:>10.2f} ms -> {:>8.2f} ms".format(
+                result["num_sums"],
+                result["num_accumulators"],
+                result["latency"] * 1e3,
+                result["fused_latency"] * 1e3,
+            )
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+import argparse
+import json
+import sys
+from typing import List, Optional, Sequence
+
+import numpy as np
+import tensorflow as tf
+from tensorflow import keras
+
+from benchmarks.models import build_rat_spn, RAT_NUM_VARS, rat_spn_batch
+from benchmarks.quantization import _median_latency
+import libspn_keras as spnk
+from libspn_keras.folding import fold_normalization
+from libspn_keras.sum_ops import SumOpGradBackprop
+
+
+def benchmark_fold_normalization(
+    num_sums: Sequence[int],
+    num_decomps: int = 8,
+    batch_size: int = 256,
+    num_steps: int = 20,
+) -> List[dict]:
+    """
+    Compare the latency of RAT-SPNs with normalized inputs before and after folding.
+
+    The RAT-SPNs normalize their inputs with ``NormalizeStandardScore`` layers with dataset
+    statistics, which ``fold_normalization`` folds into the parameters of their leaves.
+
+    Args:
+        num_sums: Numbers of sums per scope and of leaf components per variable to measure.
+        num_decomps: Number of decompositions.
+        batch_size: Number of samples per call.
+        num_steps: Number of timed calls, after a single untimed call.
+
+    Returns:
+        A list of dicts holding the error of the log-likelihood and the median latency of both
+        models per number of sums.
+    """
+    results = []
+    for sums in num_sums:
+        keras.backend.clear_session()
+        (x,) = rat_spn_batch(batch_size)
+        x = x * 4.0 + 2.0
+        normalize = spnk.layers.NormalizeStandardScore(
+            dataset_statistics=True, input_shape=(RAT_NUM_VARS,)
+        )
+        normalize.adapt(x)
+        spn = spnk.models.SequentialSumProductNetwork(
+            [normalize] + build_rat_spn(sums, num_decomps, SumOpGradBackprop()).layers
+        )
+        spn(x)
+        folded_spn = fold_normalization(spn)
+        errors = np.abs(
+            tf.reduce_logsumexp(folded_spn(x), axis=-1)
+            - tf.reduce_logsumexp(spn(x), axis=-1)
+        )
+        results.append(
+            dict(
+                num_sums=sums,
+                num_decomps=num_decomps,
+                batch_size=batch_size,
+                max_abs_error=float(np.max(errors)),
+                latency=_median_latency(spn, x, num_steps),
+                folded_latency=_median_latency(folded_spn, x, num_steps),
+            )
+        )
+    return results
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    Benchmark folding of normalization into leaves from the command line.
+
+    Args:
+        argv: Command line arguments. If ``None``, uses ``sys.argv``.
+
+    Returns:
+        Exit status.
+    """
+    parser = argparse.ArgumentParser(
+        description="Compare RAT-SPNs with normalized inputs before and after folding."
+    )
+    parser.add_argument("--num-sums", nargs="+", type=int, default=[2, 4, 8])
+    parser.add_argument("--num-decomps", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--num-steps", type=int, default=20)
+    parser.add_argument("--output", help="Path of the JSON file to write results to")
+    args = parser.parse_args(argv)
+
+    results = benchmark_fold_normalization(
+        args.num_sums,
+        num_decomps=args.num_decomps,
+        batch_size=args.batch_size,
+        num_steps=args.num_steps,
+    )
+    for result in results:
+        print(
+            "{:>6} sums  max |dLL| {:.2e}  {:>8.2f} ms -> {:>8.2f} ms".format(
+                result["num_sums"],
+                result["max_abs_error"],
+                result["latency"] * 1e3,
+                result["folded_latency"] * 1e3,
+            )
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+import argparse
+import json
+import subprocess  # noqa: S404
+import sys
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Modules that are expensive to import and should only be loaded when they are needed
+HEAVY_MODULES = ("tensorflow", "tensorflow_probability", "plotly", "colorlover")
+
+SCENARIOS: Dict[str, str] = {
+    "import": "import libspn_keras",
+    "scoring": (
+        "import libspn_keras as spnk; "
+        "spnk.models.SequentialSumProductNetwork; spnk.layers.DenseSum"
+    ),
+    "kmeans": "import libspn_keras as spnk; spnk.initializers.KMeans",
+    "visualize": "import libspn_keras as spnk; spnk.visualize_dense_spn",
+}
+
+_TIMED_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(json.dumps(dict(
+    time=elapsed, loaded=[m for m in {heavy_modules!r} if m in sys.modules]
+)))
+"""
+
+
+def time_import(statement: str, num_runs: int = 5) -> dict:
+    """
+    Measure the cold start time of a statement in fresh interpreters.
+
+    Args:
+        statement: Python statement to time, e.g. ``"import libspn_keras"``.
+        num_runs: Number of fresh interpreters to time the statement in.
+
+    Returns:
+        A dict with the median time in seconds and the heavy modules that were loaded.
+    """
+    script = _TIMED_SCRIPT.format(statement=statement, heavy_modules=HEAVY_MODULES)
+    runs = []
+    for _ in range(num_runs):
+        out = subprocess.run(  # noqa: S603
+            [sys.executable, "-c", script],
+            check=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            universal_newlines=True,
+        ).stdout
+        runs.append(json.loads(out.strip().splitlines()[-1]))
+    return dict(
+        time=float(np.median([run["time"] for run in runs])), loaded=runs[-1]["loaded"]
+    )
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    Time the cold start of the import scenarios from the command line.
+
+    Args:
+        argv: Command line arguments. If ``None``, uses ``sys.argv``.
+
+    Returns:
+        Exit status.
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmark the cold start time of importing libspn-keras."
+    )
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS))
+    parser.add_argument("--num-runs", type=int, default=5)
+    parser.add_argument("--output", help="Path of the JSON file to write results to")
+    args = parser.parse_args(argv)
+
+    results: List[dict] = []
+    for name in args.scenarios or list(SCENARIOS):
+        result = dict(
+            scenario=name, **time_import(SCENARIOS[name], num_runs=args.num_runs)
+        )
+        print(
+            "{:<12}{:>10.3f} s   loaded: {}".format(
+                name, result["time"], ", ".join(result["loaded"]) or "-"
+            )
+        )
+        results.append(result)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+import argparse
+import json
+import sys
+import time
+from typing import List, Optional, Sequence
+
+import numpy as np
+from tensorflow import keras
+
+from benchmarks.models import build_rat_spn, rat_spn_batch
+from benchmarks.quantization import _median_latency
+from libspn_keras.incremental import IncrementalEvaluator
+from libspn_keras.sum_ops import SumOpGradBackprop
+
+
+def benchmark_incremental(
+    num_sums: Sequence[int],
+    num_decomps: int = 16,
+    num_changed: int = 1,
+    batch_size: int = 1,
+    num_steps: int = 20,
+) -> List[dict]:
+    """
+    Compare the latency of re-scoring RAT-SPNs incrementally and from scratch.
+
+    Args:
+        num_sums: Numbers of sums per scope and of leaf components per variable to measure.
+        num_decomps: Number of decompositions.
+        num_changed: Number of variables that change between calls.
+        batch_size: Number of samples per call.
+        num_steps: Number of timed calls, after a single untimed call.
+
+    Returns:
+        A list of dicts holding the median latency of a full evaluation and of an incremental
+        evaluation per number of sums.
+    """
+    results = []
+    rng = np.random.RandomState(0)
+    for sums in num_sums:
+        keras.backend.clear_session()
+        spn = build_rat_spn(sums, num_decomps, SumOpGradBackprop())
+        (x,) = rat_spn_batch(batch_size)
+        spn(x)
+        evaluator = IncrementalEvaluator(spn, x)
+        variables = rng.choice(x.shape[1], size=num_changed, replace=False)
+        values = rng.randn(batch_size, num_changed).astype(np.float32)
+        evaluator.evaluate(variables, values)
+        latencies = []
+        for _ in range(num_steps):
+            start = time.perf_counter()
+            evaluator.evaluate(variables, values).numpy()
+            latencies.append(time.perf_counter() - start)
+        results.append(
+            dict(
+                num_sums=sums,
+                num_decomps=num_decomps,
+                num_changed=num_changed,
+                batch_size=batch_size,
+                latency=_median_latency(spn, x, num_steps),
+                incremental_latency=float(np.median(latencies)),
+            )
+        )
+    return results
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    Benchmark incremental re-evaluation from the command line.
+
+    Args:
+        argv: Command line arguments. If ``None``, uses ``sys.argv``.
+
+    Returns:
+        Exit status.
+    """
+    parser = argparse.ArgumentParser(
+        description="Compare incremental and full re-evaluation of RAT-SPNs."
+    )
+    parser.add_argument("--num-sums", nargs="+", type=int, default=[8, 16, 32])
+    parser.add_argument("--num-decomps", type=int, default=16)
+    parser.add_argument("--num-changed", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--num-steps", type=int, default=20)
+    parser.add_argument("--output", help="Path of the JSON file to write results to")
+    args = parser.parse_args(argv)
+
+    results = benchmark_incremental(
+        args.num_sums,
+        num_decomps=args.num_decomps,
+        num_changed=args.num_changed,
+        batch_size=args.batch_size,
+        num_steps=args.num_steps,
+    )
+    for result in results:
+        print(
+            "{:>6} sums{:>10.2f} ms -> {:>8.2f} ms".format(
+                result["num_sums"],
+                result["latency"] * 1e3,
+                result["incremental_latency"] * 1e3,
+            )
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
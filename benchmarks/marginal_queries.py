@@ -0,0 +1,127 @@
+import argparse
+import json
+import sys
+import time
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+import tensorflow as tf
+from tensorflow import keras
+
+from benchmarks.models import build_rat_spn, rat_spn_batch
+from libspn_keras.sum_ops import SumOpGradBackprop
+
+
+def _median_latency_of(fn: Callable[[], tf.Tensor], num_steps: int) -> float:
+    fn()
+    latencies = []
+    for _ in range(num_steps):
+        start = time.perf_counter()
+        fn().numpy()
+        latencies.append(time.perf_counter() - start)
+    return float(np.median(latencies))
+
+
+def benchmark_marginal_queries(
+    num_queries: Sequence[int],
+    num_sums: int = 16,
+    num_decomps: int = 8,
+    batch_size: int = 1,
+    num_steps: int = 10,
+) -> List[dict]:
+    """
+    Compare the latency of many marginal queries per call with that of one call per query.
+
+    Args:
+        num_queries: Numbers of evidence masks per call to measure.
+        num_sums: Number of sums per scope and of leaf components per variable.
+        num_decomps: Number of decompositions.
+        batch_size: Number of samples that every query is asked about.
+        num_steps: Number of timed calls, after a single untimed call.
+
+    Returns:
+        A list of dicts holding the median latency of answering all queries one by one and at
+        once per number of queries.
+    """
+    keras.backend.clear_session()
+    spn = build_rat_spn(num_sums, num_decomps, SumOpGradBackprop())
+    (x,) = rat_spn_batch(batch_size)
+    spn(x)
+    marginal = tf.function(
+        lambda x, evidence_mask: spn.marginal(x, evidence_mask, training=False)
+    )
+    marginal_queries = tf.function(
+        lambda x, evidence_masks: spn.marginal_queries(
+            x, evidence_masks, training=False
+        )
+    )
+    results = []
+    rng = np.random.RandomState(0)
+    for queries in num_queries:
+        evidence_masks = rng.rand(queries, x.shape[1]) > 0.5
+        per_query_masks = [
+            np.broadcast_to(evidence_mask, x.shape) for evidence_mask in evidence_masks
+        ]
+        results.append(
+            dict(
+                num_queries=queries,
+                num_sums=num_sums,
+                num_decomps=num_decomps,
+                batch_size=batch_size,
+                latency=_median_latency_of(
+                    lambda: tf.stack([marginal(x, mask) for mask in per_query_masks]),
+                    num_steps,
+                ),
+                fused_latency=_median_latency_of(
+                    lambda: marginal_queries(x, evidence_masks), num_steps
+                ),
+            )
+        )
+    return results
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    Benchmark many marginal queries about the same samples from the command line.
+
+    Args:
+        argv: Command line arguments. If ``None``, uses ``sys.argv``.
+
+    Returns:
+        Exit status.
+    """
+    parser = argparse.ArgumentParser(
+        description="Compare fused and per-query marginal queries of RAT-SPNs."
+    )
+    parser.add_argument("--num-queries", nargs="+", type=int, default=[8, 32, 128])
+    parser.add_argument("--num-sums", type=int, default=16)
+    parser.add_argument("--num-decomps", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--num-steps", type=int, default=10)
+    parser.add_argument("--output", help="Path of the JSON file to write results to")
+    args = parser.parse_args(argv)
+
+    results = benchmark_marginal_queries(
+        args.num_queries,
+        num_sums=args.num_sums,
+        num_decomps=args.num_decomps,
+        batch_size=args.batch_size,
+        num_steps=args.num_steps,
+    )
+    for result in results:
+        print(
+            "{:>6} queries{:>10.2f} ms -> {:>8.2f} ms".format(
+                result["num_queries"],
+                result["latency"] * 1e3,
+                result["fused_latency"] * 1e3,
+            )
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,233 @@
+from typing import Callable, Dict, Tuple
+
+import numpy as np
+import tensorflow as tf
+from tensorflow import keras
+
+import libspn_keras as spnk
+from libspn_keras.sum_ops import SumOpBase
+
+# Number of variables of a RAT-SPN and of a single time step of a dynamic SPN
+RAT_NUM_VARS = 64
+DYNAMIC_NUM_VARS = 4
+DYNAMIC_SEQUENCE_LEN = 8
+# Height and width of the images fed to a DGC-SPN
+DGC_IMAGE_SIZE = 16
+
+
+def build_rat_spn(
+    num_sums: int, num_decomps: int, sum_op: SumOpBase
+) -> keras.Sequential:
+    """
+    Build a RAT-SPN with random region structure over ``RAT_NUM_VARS`` continuous variables.
+
+    Args:
+        num_sums: Number of sums per scope and of leaf components per variable.
+        num_decomps: Number of decompositions.
+        sum_op: Sum op to use for all sum layers.
+
+    Returns:
+        An unbuilt sequential SPN.
+    """
+    sum_product_stack = []
+    for _ in range(int(np.log2(RAT_NUM_VARS)) - 1):
+        sum_product_stack.extend(
+            [
+                spnk.layers.DenseProduct(num_factors=2),
+                spnk.layers.DenseSum(num_sums=num_sums, sum_op=sum_op),
+            ]
+        )
+    sum_product_stack.extend(
+        [
+            spnk.layers.DenseProduct(num_factors=2),
+            spnk.layers.RootSum(return_weighted_child_logits=False, sum_op=sum_op),
+        ]
+    )
+    return spnk.models.SequentialSumProductNetwork(
+        [
+            spnk.layers.FlatToRegions(
+                num_decomps=num_decomps, input_shape=(RAT_NUM_VARS,)
+            ),
+            spnk.layers.NormalLeaf(num_components=num_sums),
+            spnk.layers.PermuteAndPadScopesRandom(),
+        ]
+        + sum_product_stack
+    )
+
+
+def build_dgc_spn(
+    num_sums: int, num_decomps: int, sum_op: SumOpBase
+) -> keras.Sequential:
+    """
+    Build a DGC-SPN on single channel images of ``DGC_IMAGE_SIZE`` by ``DGC_IMAGE_SIZE`` pixels.
+
+    Uses both non-overlapping and overlapping products, local sums and convolutional sums.
+
+    Args:
+        num_sums: Number of sums per scope and of leaf components per pixel.
+        num_decomps: Ignored, since DGC-SPNs have no decompositions.
+        sum_op: Sum op to use for all sum layers.
+
+    Returns:
+        An unbuilt sequential SPN.
+    """
+    return spnk.models.SequentialSumProductNetwork(
+        [
+            spnk.layers.NormalLeaf(
+                num_components=num_sums,
+                input_shape=(DGC_IMAGE_SIZE, DGC_IMAGE_SIZE, 1),
+            ),
+            spnk.layers.Conv2DProduct(
+                depthwise=True, strides=[2, 2], dilations=[1, 1], kernel_size=[2, 2]
+            ),
+            spnk.layers.Local2DSum(num_sums=num_sums, sum_op=sum_op),
+            spnk.layers.Conv2DProduct(
+                depthwise=True, strides=[2, 2], dilations=[1, 1], kernel_size=[2, 2]
+            ),
+            spnk.layers.Conv2DSum(num_sums=num_sums, sum_op=sum_op),
+            spnk.layers.Conv2DProduct(
+                depthwise=True,
+                strides=[1, 1],
+                dilations=[1, 1],
+                kernel_size=[2, 2],
+                padding="full",
+            ),
+            spnk.layers.Local2DSum(num_sums=num_sums, sum_op=sum_op),
+            spnk.layers.Conv2DProduct(
+                depthwise=True,
+                strides=[1, 1],
+                dilations=[2, 2],
+                kernel_size=[2, 2],
+                padding="full",
+            ),
+            spnk.layers.Local2DSum(num_sums=num_sums, sum_op=sum_op),
+            spnk.layers.Conv2DProduct(
+                depthwise=True,
+                strides=[1, 1],
+                dilations=[4, 4],
+                kernel_size=[2, 2],
+                padding="final",
+            ),
+            spnk.layers.SpatialToRegions(),
+            spnk.layers.RootSum(return_weighted_child_logits=False, sum_op=sum_op),
+        ]
+    )
+
+
+def build_dynamic_spn(
+    num_sums: int, num_decomps: int, sum_op: SumOpBase
+) -> keras.Model:
+    """
+    Build a dynamic SPN over sequences with ``DYNAMIC_NUM_VARS`` continuous variables per step.
+
+    Args:
+        num_sums: Number of sums per scope and of leaf components per variable.
+        num_decomps: Ignored, since the template network has a single decomposition.
+        sum_op: Sum op to use for all sum layers.
+
+    Returns:
+        An unbuilt dynamic SPN.
+    """
+    num_products = num_sums ** 2
+    template = keras.Sequential(
+        [
+            spnk.layers.FlatToRegions(num_decomps=1, input_shape=(DYNAMIC_NUM_VARS,)),
+            spnk.layers.NormalLeaf(num_components=num_sums),
+            spnk.layers.PermuteAndPadScopes([list(range(DYNAMIC_NUM_VARS))]),
+            spnk.layers.DenseProduct(num_factors=2),
+            spnk.layers.DenseSum(num_sums=num_sums, sum_op=sum_op),
+            spnk.layers.DenseProduct(num_factors=2),
+        ]
+    )
+    top_net = keras.Sequential(
+        [
+            spnk.layers.RootSum(
+                input_shape=[1, 1, num_products],
+                return_weighted_child_logits=False,
+                sum_op=sum_op,
+            )
+        ]
+    )
+    interface_t_minus_1 = keras.Sequential(
+        [
+            spnk.layers.DenseSum(
+                num_sums=num_sums, input_shape=[1, 1, num_products], sum_op=sum_op
+            )
+        ]
+    )
+    interface_t0 = keras.Sequential(
+        [
+            spnk.layers.DenseSum(
+                num_sums=num_sums, input_shape=[1, 1, num_products], sum_op=sum_op
+            )
+        ]
+    )
+    return spnk.models.DynamicSumProductNetwork(
+        template_network=template,
+        interface_network_t0=interface_t0,
+        interface_network_t_minus_1=interface_t_minus_1,
+        top_network=top_net,
+    )
+
+
+def rat_spn_batch(batch_size: int, seed: int = 0) -> Tuple[tf.Tensor, ...]:
+    """
+    Generate a batch of data for a RAT-SPN.
+
+    Args:
+        batch_size: Number of samples.
+        seed: Seed for the random number generator.
+
+    Returns:
+        A tuple holding the data.
+    """
+    rng = np.random.RandomState(seed)
+    return (tf.constant(rng.randn(batch_size, RAT_NUM_VARS).astype(np.float32)),)
+
+
+def dgc_spn_batch(batch_size: int, seed: int = 0) -> Tuple[tf.Tensor, ...]:
+    """
+    Generate a batch of images for a DGC-SPN.
+
+    Args:
+        batch_size: Number of samples.
+        seed: Seed for the random number generator.
+
+    Returns:
+        A tuple holding the data.
+    """
+    rng = np.random.RandomState(seed)
+    shape = (batch_size, DGC_IMAGE_SIZE, DGC_IMAGE_SIZE, 1)
+    return (tf.constant(rng.randn(*shape).astype(np.float32)),)
+
+
+def dynamic_spn_batch(batch_size: int, seed: int = 0) -> Tuple[tf.Tensor, ...]:
+    """
+    Generate a batch of padded sequences and their lengths for a dynamic SPN.
+
+    Args:
+        batch_size: Number of samples.
+        seed: Seed for the random number generator.
+
+    Returns:
+        A tuple holding the sequences and their lengths.
+    """
+    rng = np.random.RandomState(seed)
+    shape = (batch_size, DYNAMIC_SEQUENCE_LEN, DYNAMIC_NUM_VARS)
+    sequence_lens = rng.randint(1, DYNAMIC_SEQUENCE_LEN + 1, size=batch_size)
+    return (
+        tf.constant(rng.randn(*shape).astype(np.float32)),
+        tf.constant(sequence_lens.astype(np.int32)),
+    )
+
+
+MODEL_BUILDERS: Dict[str, Callable[[int, int, SumOpBase], keras.Model]] = {
+    "rat": build_rat_spn,
+    "dgc": build_dgc_spn,
+    "dynamic": build_dynamic_spn,
+}
+BATCH_GENERATORS: Dict[str, Callable[[int, int], Tuple[tf.Tensor, ...]]] = {
+    "rat": rat_spn_batch,
+    "dgc": dgc_spn_batch,
+    "dynamic": dynamic_spn_batch,
+}
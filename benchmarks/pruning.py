@@ -0,0 +1,135 @@
+import argparse
+import json
+import sys
+from typing import List, Optional, Sequence
+
+import numpy as np
+import tensorflow as tf
+from tensorflow import keras
+
+from benchmarks.models import build_rat_spn, rat_spn_batch
+from benchmarks.quantization import _median_latency
+from libspn_keras.layers.dense_sum import DenseSum
+from libspn_keras.models.sequential_spn import SequentialSumProductNetwork
+from libspn_keras.pruning import prune_model, sparsity
+from libspn_keras.sum_ops import SumOpGradBackprop
+
+
+def _concentrate_sum_weights(
+    spn: SequentialSumProductNetwork, support_fraction: float, seed: int = 0
+) -> None:
+    # Mimics weights after EM training, where the sums of a scope and decomposition share a
+    # small support of children and all other weights sit at the epsilon floor
+    rng = np.random.RandomState(seed)
+    for layer in spn.layers:
+        if type(layer) is not DenseSum:
+            continue
+        num_scopes, num_decomps, num_children, num_sums = layer._accumulators.shape
+        logits = np.full(layer._accumulators.shape, -20.0, dtype=np.float32)
+        support_size = max(int(support_fraction * num_children), 1)
+        for scope in range(num_scopes):
+            for decomp in range(num_decomps):
+                support = rng.choice(num_children, size=support_size, replace=False)
+                logits[scope, decomp, support] = rng.randn(support_size, num_sums)
+        layer._accumulators.assign(tf.nn.log_softmax(logits, axis=2))
+
+
+def benchmark_pruning(
+    num_sums: Sequence[int],
+    num_decomps: int = 8,
+    support_fraction: float = 0.15,
+    threshold: float = 1e-4,
+    batch_size: int = 256,
+    num_steps: int = 20,
+) -> List[dict]:
+    """
+    Compare log-likelihood, sparsity and latency of RAT-SPNs before and after pruning.
+
+    Args:
+        num_sums: Numbers of sums per scope and of leaf components per variable to measure.
+        num_decomps: Number of decompositions.
+        support_fraction: Fraction of the children of a scope and decomposition that keep
+            weights above the epsilon floor.
+        threshold: Edges with a weight below this value are pruned.
+        batch_size: Number of samples per call.
+        num_steps: Number of timed calls, after a single untimed call.
+
+    Returns:
+        A list of dicts holding the sparsity, the error of the log-likelihood and the median
+        latency of both models per number of sums.
+    """
+    results = []
+    for sums in num_sums:
+        keras.backend.clear_session()
+        spn = build_rat_spn(sums, num_decomps, SumOpGradBackprop())
+        (x,) = rat_spn_batch(batch_size)
+        spn(x)
+        _concentrate_sum_weights(spn, support_fraction)
+        pruned_spn = prune_model(spn, threshold)
+        errors = np.abs(
+            tf.reduce_logsumexp(pruned_spn(x), axis=-1)
+            - tf.reduce_logsumexp(spn(x), axis=-1)
+        )
+        results.append(
+            dict(
+                num_sums=sums,
+                num_decomps=num_decomps,
+                batch_size=batch_size,
+                sparsity=sparsity(spn, pruned_spn),
+                max_abs_error=float(np.max(errors)),
+                latency=_median_latency(spn, x, num_steps),
+                pruned_latency=_median_latency(pruned_spn, x, num_steps),
+            )
+        )
+    return results
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    Benchmark weight pruning from the command line.
+
+    Args:
+        argv: Command line arguments. If ``None``, uses ``sys.argv``.
+
+    Returns:
+        Exit status.
+    """
+    parser = argparse.ArgumentParser(
+        description="Compare RAT-SPNs before and after pruning of sum weights."
+    )
+    parser.add_argument("--num-sums", nargs="+", type=int, default=[8, 16, 32])
+    parser.add_argument("--num-decomps", type=int, default=8)
+    parser.add_argument("--support-fraction", type=float, default=0.15)
+    parser.add_argument("--threshold", type=float, default=1e-4)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--num-steps", type=int, default=20)
+    parser.add_argument("--output", help="Path of the JSON file to write results to")
+    args = parser.parse_args(argv)
+
+    results = benchmark_pruning(
+        args.num_sums,
+        num_decomps=args.num_decomps,
+        support_fraction=args.support_fraction,
+        threshold=args.threshold,
+        batch_size=args.batch_size,
+        num_steps=args.num_steps,
+    )
+    for result in results:
+        print(
+            "{:>6} sums{:>8.1%} sparse  max |dLL| {:.2e}  {:>8.2f} ms -> {:>8.2f} ms".format(
+                result["num_sums"],
+                result["sparsity"],
+                result["max_abs_error"],
+                result["latency"] * 1e3,
+                result["pruned_latency"] * 1e3,
+            )
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
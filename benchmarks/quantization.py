@@ -0,0 +1,110 @@
+import argparse
+import json
+import sys
+import time
+from typing import List, Optional, Sequence
+
+import numpy as np
+import tensorflow as tf
+from tensorflow import keras
+
+from benchmarks.models import build_dgc_spn, dgc_spn_batch
+from libspn_keras.quantization import quantization_report, quantize_model
+from libspn_keras.sum_ops import SumOpGradBackprop
+
+
+def _median_latency(model: keras.Model, x: tf.Tensor, num_steps: int) -> float:
+    fn = tf.function(
+        lambda x: model(x, training=False),
+        input_signature=[tf.TensorSpec(x.shape, x.dtype)],
+    )
+    fn(x)
+    latencies = []
+    for _ in range(num_steps):
+        start = time.perf_counter()
+        fn(x).numpy()
+        latencies.append(time.perf_counter() - start)
+    return float(np.median(latencies))
+
+
+def benchmark_quantization(
+    num_sums: Sequence[int],
+    dtype: str = "int8",
+    batch_size: int = 32,
+    num_steps: int = 20,
+) -> List[dict]:
+    """
+    Compare log-likelihood, size and latency of DGC-SPNs before and after quantization.
+
+    Args:
+        num_sums: Numbers of sums per scope and of leaf components per pixel to measure.
+        dtype: Either ``'int8'`` or ``'uint8'``.
+        batch_size: Number of images per call.
+        num_steps: Number of timed calls, after a single untimed call.
+
+    Returns:
+        A list of dicts holding the ``quantization_report`` and the median latency of both
+        models per number of sums.
+    """
+    results = []
+    for sums in num_sums:
+        keras.backend.clear_session()
+        spn = build_dgc_spn(sums, 1, SumOpGradBackprop())
+        (x,) = dgc_spn_batch(batch_size)
+        spn(x)
+        quantized_spn = quantize_model(spn, dtype=dtype)
+        result = dict(num_sums=sums, dtype=dtype, batch_size=batch_size)
+        result.update(quantization_report(spn, quantized_spn, x.numpy()))
+        result.update(
+            latency=_median_latency(spn, x, num_steps),
+            quantized_latency=_median_latency(quantized_spn, x, num_steps),
+        )
+        results.append(result)
+    return results
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    Benchmark post-training quantization from the command line.
+
+    Args:
+        argv: Command line arguments. If ``None``, uses ``sys.argv``.
+
+    Returns:
+        Exit status.
+    """
+    parser = argparse.ArgumentParser(
+        description="Compare DGC-SPNs before and after 8 bit quantization of sum weights."
+    )
+    parser.add_argument("--num-sums", nargs="+", type=int, default=[16, 32, 64])
+    parser.add_argument("--dtype", choices=["int8", "uint8"], default="int8")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--num-steps", type=int, default=20)
+    parser.add_argument("--output", help="Path of the JSON file to write results to")
+    args = parser.parse_args(argv)
+
+    results = benchmark_quantization(
+        args.num_sums,
+        dtype=args.dtype,
+        batch_size=args.batch_size,
+        num_steps=args.num_steps,
+    )
+    for result in results:
+        print(
+            "{:>6} sums{:>8.2f}x smaller  mean |dLL| {:.2e}  {:>8.2f} ms -> {:>8.2f} ms".format(
+                result["num_sums"],
+                result["compression"],
+                result["mean_abs_error"],
+                result["latency"] * 1e3,
+                result["quantized_latency"] * 1e3,
+            )
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+import argparse
+import functools
+import json
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from libspn_keras.region import (
+    _region_graph_to_permutations_and_prods_per_depth,
+    Region,
+    RegionNode,
+    RegionVariable,
+)
+
+
+def balanced_region_graph(
+    num_vars: int, seed: int = 0, num_children: int = 2
+) -> RegionNode:
+    """
+    Build a region graph over randomly ordered variables, merging neighbours level by level.
+
+    If the number of regions at a level is not a multiple of ``num_children``, the last group is
+    smaller, and a single remaining region is carried over to the next level as is. Variables
+    therefore end up at different depths unless ``num_vars`` is a power of ``num_children``.
+
+    Args:
+        num_vars: Number of variables.
+        seed: Seed for the order of the variables.
+        num_children: Number of children per region.
+
+    Returns:
+        The root of the region graph.
+    """
+    order = np.random.RandomState(seed).permutation(num_vars)
+    nodes: List[Region] = [RegionVariable(int(i)) for i in order]
+    while len(nodes) > 1:
+        nodes = [
+            RegionNode(nodes[i : i + num_children]) if i + 1 < len(nodes) else nodes[i]
+            for i in range(0, len(nodes), num_children)
+        ]
+    return nodes[0]
+
+
+GRAPH_BUILDERS: Dict[str, Callable[[int, int], Region]] = {
+    "binary": functools.partial(balanced_region_graph, num_children=2),
+    "quaternary": functools.partial(balanced_region_graph, num_children=4),
+}
+
+
+def benchmark_region_graph(graph: str, num_vars: int, seed: int = 0) -> dict:
+    """
+    Time building a region graph, including scope checks, and compiling it to permutations.
+
+    Args:
+        graph: Name of the graph, one of ``GRAPH_BUILDERS``.
+        num_vars: Number of variables.
+        seed: Seed for the graph.
+
+    Returns:
+        A dict holding the timings and the size of the compiled SPN input.
+    """
+    start = time.perf_counter()
+    root = GRAPH_BUILDERS[graph](num_vars, seed)
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    permutation, num_factors = _region_graph_to_permutations_and_prods_per_depth(root)
+    compile_time = time.perf_counter() - start
+    return dict(
+        graph=graph,
+        num_vars=num_vars,
+        build_time=build_time,
+        compile_time=compile_time,
+        num_slots=len(permutation),
+        depth=len(num_factors),
+    )
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    Benchmark region graph compilation from the command line.
+
+    Args:
+        argv: Command line arguments. If ``None``, uses ``sys.argv``.
+
+    Returns:
+        Exit status.
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmark compiling large region graphs to dense SPNs."
+    )
+    parser.add_argument("--graphs", nargs="+", choices=list(GRAPH_BUILDERS))
+    parser.add_argument(
+        "--num-vars", nargs="+", type=int, default=[1000, 10000, 100000]
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Path of the JSON file to write results to")
+    args = parser.parse_args(argv)
+
+    results = []
+    for graph in args.graphs or list(GRAPH_BUILDERS):
+        for num_vars in args.num_vars:
+            result = benchmark_region_graph(graph, num_vars, seed=args.seed)
+            print(
+                "{:<10}{:>10} vars{:>10.3f} s build{:>10.3f} s compile"
+                "{:>12} slots{:>6} deep".format(
+                    graph,
+                    num_vars,
+                    result["build_time"],
+                    result["compile_time"],
+                    result["num_slots"],
+                    result["depth"],
+                )
+            )
+            results.append(result)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
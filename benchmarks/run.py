@@ -0,0 +1,405 @@
+import argparse
+import itertools
+import json
+import platform
+import sys
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import tensorflow as tf
+from tensorflow import keras
+
+from benchmarks.models import BATCH_GENERATORS, DYNAMIC_SEQUENCE_LEN, MODEL_BUILDERS
+import libspn_keras as spnk
+from libspn_keras.cost_model import estimate_cost
+from libspn_keras.losses import NegativeLogLikelihood
+from libspn_keras.optimizers import OnlineExpectationMaximization
+from libspn_keras.profiling import _default_device, _peak_memory, _reset_peak_memory
+from libspn_keras.sum_ops import (
+    SumOpBase,
+    SumOpEMBackprop,
+    SumOpGradBackprop,
+    SumOpHardEMBackprop,
+    SumOpUnweightedHardEMBackprop,
+)
+
+SUM_OPS: Dict[str, Callable[[], SumOpBase]] = {
+    "grad": SumOpGradBackprop,
+    "em": SumOpEMBackprop,
+    "hard_em": SumOpHardEMBackprop,
+    "unweighted_hard_em": SumOpUnweightedHardEMBackprop,
+}
+MODES = ("forward", "train")
+
+FULL_MATRIX = dict(
+    models=list(MODEL_BUILDERS),
+    sum_ops=list(SUM_OPS),
+    modes=list(MODES),
+    batch_sizes=[32, 256],
+    num_sums=[4, 16],
+    num_decomps=[1, 4],
+)
+QUICK_MATRIX = dict(
+    models=list(MODEL_BUILDERS),
+    sum_ops=list(SUM_OPS),
+    modes=list(MODES),
+    batch_sizes=[64],
+    num_sums=[8],
+    num_decomps=[2],
+)
+# Models whose structure does not depend on the number of decompositions
+_MODELS_WITHOUT_DECOMPS = ("dgc", "dynamic")
+
+
+class BenchmarkConfig(NamedTuple):
+    """
+    A single configuration of the benchmark matrix.
+
+    Args:
+        model: Name of the model, one of ``MODEL_BUILDERS``.
+        sum_op: Name of the sum op, one of ``SUM_OPS``.
+        mode: Either ``"forward"`` or ``"train"``.
+        batch_size: Number of samples per step.
+        num_sums: Number of sums per scope.
+        num_decomps: Number of decompositions.
+    """
+
+    model: str
+    sum_op: str
+    mode: str
+    batch_size: int
+    num_sums: int
+    num_decomps: int
+
+    @property
+    def id(self) -> str:
+        """
+        Obtain a unique identifier of the config, used to match results against a baseline.
+
+        Returns:
+            The identifier.
+        """
+        return "{}-{}-{}-b{}-s{}-d{}".format(*self)
+
+
+class Regression(NamedTuple):
+    """
+    A metric of a benchmark config that got worse compared to the baseline.
+
+    Args:
+        id: Identifier of the config.
+        metric: Name of the metric.
+        baseline: Value of the metric in the baseline.
+        current: Current value of the metric.
+        relative_change: Relative change w.r.t. the baseline.
+    """
+
+    id: str
+    metric: str
+    baseline: float
+    current: float
+    relative_change: float
+
+
+def benchmark_matrix(
+    models: Sequence[str],
+    sum_ops: Sequence[str],
+    modes: Sequence[str],
+    batch_sizes: Sequence[int],
+    num_sums: Sequence[int],
+    num_decomps: Sequence[int],
+) -> List[BenchmarkConfig]:
+    """
+    Enumerate all configs of the benchmark matrix.
+
+    Args:
+        models: Names of models.
+        sum_ops: Names of sum ops.
+        modes: Modes to benchmark.
+        batch_sizes: Batch sizes.
+        num_sums: Numbers of sums per scope.
+        num_decomps: Numbers of decompositions. Only varied for models that have decompositions.
+
+    Returns:
+        A list of configs.
+    """
+    configs = []
+    for model, sum_op, mode, batch_size, sums in itertools.product(
+        models, sum_ops, modes, batch_sizes, num_sums
+    ):
+        decomps = num_decomps[:1] if model in _MODELS_WITHOUT_DECOMPS else num_decomps
+        for d in decomps:
+            configs.append(
+                BenchmarkConfig(
+                    model,
+                    sum_op,
+                    mode,
+                    batch_size,
+                    sums,
+                    1 if model in _MODELS_WITHOUT_DECOMPS else d,
+                )
+            )
+    return configs
+
+
+def run_benchmark(
+    config: BenchmarkConfig,
+    num_steps: int = 10,
+    num_warmup_steps: int = 2,
+    seed: int = 0,
+) -> dict:
+    """
+    Measure the throughput and peak memory of a single config.
+
+    Steps are compiled with ``tf.function``. Warmup steps, which include tracing, are not timed.
+
+    Args:
+        config: The config to benchmark.
+        num_steps: Number of timed steps. The median step time is reported.
+        num_warmup_steps: Number of untimed steps before timing.
+        seed: Seed for weights and data.
+
+    Returns:
+        A dict holding the config and its measurements.
+    """
+    keras.backend.clear_session()
+    tf.random.set_seed(seed)
+    np.random.seed(seed)
+
+    sum_op = SUM_OPS[config.sum_op]()
+    model = MODEL_BUILDERS[config.model](config.num_sums, config.num_decomps, sum_op)
+    batch = BATCH_GENERATORS[config.model](config.batch_size, seed)
+
+    step_fn = _make_step_fn(model, config, sum_op)
+    device = _default_device()
+    for _ in range(num_warmup_steps):
+        _sync(step_fn(batch))
+    _reset_peak_memory(device)
+
+    step_times = []
+    for _ in range(num_steps):
+        start = time.perf_counter()
+        _sync(step_fn(batch))
+        step_times.append(time.perf_counter() - start)
+
+    peak_memory_bytes = _peak_memory(device)
+    peak_memory_source = "allocator"
+    if not peak_memory_bytes:
+        peak_memory_bytes = _estimate_peak_memory(model, config, sum_op)
+        peak_memory_source = "estimate"
+
+    step_time = float(np.median(step_times))
+    return dict(
+        id=config.id,
+        **config._asdict(),
+        step_time=step_time,
+        throughput=config.batch_size / step_time,
+        peak_memory_bytes=int(peak_memory_bytes),
+        peak_memory_source=peak_memory_source,
+    )
+
+
+def _make_step_fn(
+    model: keras.Model, config: BenchmarkConfig, sum_op: SumOpBase
+) -> Callable[[Tuple[tf.Tensor, ...]], tf.Tensor]:
+    if config.mode == "forward":
+
+        @tf.function
+        def forward_step(batch: Tuple[tf.Tensor, ...]) -> tf.Tensor:
+            return model(batch if config.model == "dynamic" else batch[0])
+
+        return forward_step
+
+    optimizer = (
+        keras.optimizers.Adam()
+        if isinstance(sum_op, SumOpGradBackprop)
+        else OnlineExpectationMaximization()
+    )
+    model.compile(optimizer=optimizer, loss=NegativeLogLikelihood())
+
+    @tf.function
+    def train_step(batch: Tuple[tf.Tensor, ...]) -> tf.Tensor:
+        return model.train_step(batch)["loss"]
+
+    return train_step
+
+
+def _sync(tensor: tf.Tensor) -> None:
+    # Fetching the result forces the device to finish the kernels producing it
+    tf.convert_to_tensor(tensor).numpy()
+
+
+def _estimate_peak_memory(
+    model: keras.Model, config: BenchmarkConfig, sum_op: SumOpBase
+) -> int:
+    if isinstance(model, keras.Sequential):
+        estimate = estimate_cost(model.layers, batch_size=config.batch_size)
+        if config.mode == "train":
+            return estimate.peak_training_memory(sum_op)
+        return estimate.peak_inference_memory
+
+    # Dynamic SPNs evaluate their sub-networks once per time step
+    estimates = [
+        estimate_cost(network.layers, batch_size=config.batch_size)
+        for network in (
+            model.template_network,
+            model.interface_network_t0,
+            model.interface_network_t_minus_1,
+            model.top_network,
+        )
+    ]
+    if config.mode == "train":
+        return sum(
+            e.peak_training_memory(sum_op)
+            + (DYNAMIC_SEQUENCE_LEN - 1) * e.activation_bytes
+            for e in estimates
+        )
+    return sum(e.peak_inference_memory for e in estimates)
+
+
+def compare_to_baseline(
+    results: List[dict], baseline: List[dict], threshold: float = 0.2
+) -> List[Regression]:
+    """
+    Compare results against a baseline.
+
+    Configs that are missing from either the results or the baseline are ignored, as well as
+    peak memory that was obtained from a different source than in the baseline.
+
+    Args:
+        results: Results of ``run_benchmark``.
+        baseline: Results of an earlier run.
+        threshold: Relative change above which a metric is considered to have regressed.
+
+    Returns:
+        A list of regressions, which is empty if nothing regressed.
+    """
+    baseline_by_id = {result["id"]: result for result in baseline}
+    regressions = []
+    for result in results:
+        base = baseline_by_id.get(result["id"])
+        if base is None:
+            continue
+        # Throughput should not decrease, memory should not increase
+        for metric, sign in [("throughput", -1.0), ("peak_memory_bytes", 1.0)]:
+            if not base[metric]:
+                continue
+            if (
+                metric == "peak_memory_bytes"
+                and result["peak_memory_source"] != base["peak_memory_source"]
+            ):
+                continue
+            relative_change = (result[metric] - base[metric]) / base[metric]
+            if sign * relative_change > threshold:
+                regressions.append(
+                    Regression(
+                        id=result["id"],
+                        metric=metric,
+                        baseline=base[metric],
+                        current=result[metric],
+                        relative_change=relative_change,
+                    )
+                )
+    return regressions
+
+
+def _metadata(args: argparse.Namespace) -> dict:
+    return dict(
+        libspn_keras=spnk.__version__,
+        tensorflow=tf.__version__,
+        python=platform.python_version(),
+        platform=platform.platform(),
+        device=_default_device(),
+        num_steps=args.num_steps,
+        num_warmup_steps=args.num_warmup_steps,
+        seed=args.seed,
+    )
+
+
+def _parse_args(argv: Optional[Sequence[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Benchmark throughput and peak memory of SPNs in libspn-keras."
+    )
+    parser.add_argument(
+        "--quick", action="store_true", help="Run the small matrix of the baseline"
+    )
+    parser.add_argument("--models", nargs="+", choices=list(MODEL_BUILDERS))
+    parser.add_argument("--sum-ops", nargs="+", choices=list(SUM_OPS))
+    parser.add_argument("--modes", nargs="+", choices=list(MODES))
+    parser.add_argument("--batch-sizes", nargs="+", type=int)
+    parser.add_argument("--num-sums", nargs="+", type=int)
+    parser.add_argument("--num-decomps", nargs="+", type=int)
+    parser.add_argument("--num-steps", type=int, default=10)
+    parser.add_argument("--num-warmup-steps", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Path of the JSON file to write results to")
+    parser.add_argument("--baseline", help="Path of a JSON file with baseline results")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Relative change w.r.t. the baseline that is flagged as a regression",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    Run the benchmarks from the command line.
+
+    Args:
+        argv: Command line arguments. If ``None``, uses ``sys.argv``.
+
+    Returns:
+        Exit status, which is 1 if any regressions were found and 0 otherwise.
+    """
+    args = _parse_args(argv)
+    matrix = dict(QUICK_MATRIX if args.quick else FULL_MATRIX)
+    for key in matrix:
+        value = getattr(args, key)
+        if value is not None:
+            matrix[key] = value
+
+    results = []
+    for config in benchmark_matrix(**matrix):
+        result = run_benchmark(
+            config,
+            num_steps=args.num_steps,
+            num_warmup_steps=args.num_warmup_steps,
+            seed=args.seed,
+        )
+        print(
+            "{:<48}{:>14.1f} samples/s{:>12.2f} MB ({})".format(
+                result["id"],
+                result["throughput"],
+                result["peak_memory_bytes"] / 2 ** 20,
+                result["peak_memory_source"],
+            )
+        )
+        results.append(result)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(dict(metadata=_metadata(args), results=results), f, indent=2)
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+    regressions = compare_to_baseline(results, baseline, threshold=args.threshold)
+    for regression in regressions:
+        print(
+            "REGRESSION {}: {} changed by {:+.1%} ({:.4g} -> {:.4g})".format(
+                regression.id,
+                regression.metric,
+                regression.relative_change,
+                regression.baseline,
+                regression.current,
+            )
+        )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
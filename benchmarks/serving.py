@@ -0,0 +1,125 @@
+import argparse
+import json
+import sys
+from typing import List, Optional, Sequence
+
+import numpy as np
+from tensorflow import keras
+
+from benchmarks.models import build_rat_spn, RAT_NUM_VARS
+from libspn_keras.serving import generate_load, InferenceServer
+from libspn_keras.sum_ops import SumOpGradBackprop
+
+
+def benchmark_serving(
+    query_type: str,
+    max_batch_size: int,
+    max_latency: float,
+    num_clients: int = 16,
+    num_requests: int = 500,
+    num_sums: int = 8,
+    num_decomps: int = 4,
+) -> dict:
+    """
+    Measure throughput and latency of a local inference server for a RAT-SPN under load.
+
+    Args:
+        query_type: Name of the query, one of ``joint``, ``marginal`` and ``mpe``.
+        max_batch_size: Maximum number of rows in a batch. ``1`` disables batching.
+        max_latency: Maximum time in seconds that a request waits for its batch to fill up.
+        num_clients: Number of concurrent clients.
+        num_requests: Total number of single-row requests.
+        num_sums: Number of sums per scope and of leaf components per variable.
+        num_decomps: Number of decompositions.
+
+    Returns:
+        A dict holding the client-side throughput and latency quantiles and the mean batch size
+        reported by the server.
+    """
+    keras.backend.clear_session()
+    spn = build_rat_spn(num_sums, num_decomps, SumOpGradBackprop())
+    rng = np.random.RandomState(0)
+    instances = rng.randn(256, RAT_NUM_VARS).astype(np.float32)
+    evidence = None if query_type == "joint" else rng.rand(256, RAT_NUM_VARS) > 0.5
+
+    with InferenceServer(
+        spn, max_batch_size=max_batch_size, max_latency=max_latency
+    ) as server:
+        # Warm up the server, so that one-off costs are not part of the measurement
+        generate_load(
+            server.url, query_type, instances, evidence, num_clients=1, num_requests=4
+        )
+        server.metrics.reset()
+        result = generate_load(
+            server.url,
+            query_type,
+            instances,
+            evidence,
+            num_clients=num_clients,
+            num_requests=num_requests,
+        )
+        stats = server.metrics.to_dict()[query_type]
+    return dict(
+        result,
+        query_type=query_type,
+        max_batch_size=max_batch_size,
+        max_latency=max_latency,
+        num_clients=num_clients,
+        mean_batch_size=stats["batch_size"]["mean"],
+    )
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    Benchmark the inference server with and without dynamic batching from the command line.
+
+    Args:
+        argv: Command line arguments. If ``None``, uses ``sys.argv``.
+
+    Returns:
+        Exit status.
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmark dynamic batching of the SPN inference server."
+    )
+    parser.add_argument(
+        "--query-types", nargs="+", default=["joint", "marginal", "mpe"]
+    )
+    parser.add_argument("--max-batch-sizes", nargs="+", type=int, default=[1, 64])
+    parser.add_argument("--max-latency", type=float, default=0.005)
+    parser.add_argument("--num-clients", type=int, default=16)
+    parser.add_argument("--num-requests", type=int, default=500)
+    parser.add_argument("--output", help="Path of the JSON file to write results to")
+    args = parser.parse_args(argv)
+
+    results: List[dict] = []
+    for query_type in args.query_types:
+        for max_batch_size in args.max_batch_sizes:
+            result = benchmark_serving(
+                query_type,
+                max_batch_size,
+                args.max_latency,
+                num_clients=args.num_clients,
+                num_requests=args.num_requests,
+            )
+            print(
+                "{:<10}{:>6} max batch{:>10.1f} req/s{:>8.1f} ms p50{:>8.1f} ms p99"
+                "{:>8.1f} mean batch".format(
+                    query_type,
+                    max_batch_size,
+                    result["throughput"],
+                    result["latency_p50"] * 1e3,
+                    result["latency_p99"] * 1e3,
+                    result["mean_batch_size"],
+                )
+            )
+            results.append(result)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
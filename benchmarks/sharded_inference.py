@@ -0,0 +1,131 @@
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+import tensorflow as tf
+from tensorflow import keras
+
+from benchmarks.models import build_rat_spn, rat_spn_batch
+from libspn_keras.parallel import DecompositionShardedExecutor
+from libspn_keras.sum_ops import SumOpGradBackprop
+
+
+def _median_latency(
+    fn: Callable[[tf.Tensor], tf.Tensor], x: tf.Tensor, num_steps: int
+) -> float:
+    fn(x)
+    latencies = []
+    for _ in range(num_steps):
+        start = time.perf_counter()
+        fn(x).numpy()
+        latencies.append(time.perf_counter() - start)
+    return float(np.median(latencies))
+
+
+def benchmark_sharded_inference(
+    num_workers: Sequence[int],
+    num_decomps: int = 32,
+    num_sums: int = 16,
+    batch_size: int = 1,
+    num_steps: int = 50,
+) -> List[dict]:
+    """
+    Measure the latency of a RAT-SPN with and without sharding its decompositions over threads.
+
+    Args:
+        num_workers: Numbers of worker threads to measure.
+        num_decomps: Number of decompositions of the RAT-SPN.
+        num_sums: Number of sums per scope and of leaf components per variable.
+        batch_size: Number of rows per call.
+        num_steps: Number of timed calls, after a single untimed call.
+
+    Returns:
+        A list of dicts holding the median latency per number of workers, including the
+        unsharded model under ``num_workers`` 0.
+    """
+    keras.backend.clear_session()
+    spn = build_rat_spn(num_sums, num_decomps, SumOpGradBackprop())
+    (x,) = rat_spn_batch(batch_size)
+    spn(x)
+
+    model_fn = tf.function(
+        lambda x: spn(x, training=False),
+        input_signature=[tf.TensorSpec(x.shape, x.dtype)],
+    )
+    results = [
+        dict(
+            num_workers=0,
+            num_decomps=num_decomps,
+            batch_size=batch_size,
+            latency=_median_latency(model_fn, x, num_steps),
+        )
+    ]
+    for workers in num_workers:
+        with DecompositionShardedExecutor(spn, num_workers=workers) as executor:
+            results.append(
+                dict(
+                    num_workers=workers,
+                    num_decomps=num_decomps,
+                    batch_size=batch_size,
+                    latency=_median_latency(executor, x, num_steps),
+                )
+            )
+    return results
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    Benchmark decomposition-sharded inference from the command line.
+
+    Args:
+        argv: Command line arguments. If ``None``, uses ``sys.argv``.
+
+    Returns:
+        Exit status.
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmark single-row latency of RAT-SPNs sharded over decompositions."
+    )
+    num_cpus = os.cpu_count() or 1
+    parser.add_argument(
+        "--num-workers",
+        nargs="+",
+        type=int,
+        default=sorted({1, 2, 4, 8, 16, 32, num_cpus}),
+    )
+    parser.add_argument("--num-decomps", type=int, default=32)
+    parser.add_argument("--num-sums", type=int, default=16)
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--num-steps", type=int, default=50)
+    parser.add_argument("--output", help="Path of the JSON file to write results to")
+    args = parser.parse_args(argv)
+
+    results = benchmark_sharded_inference(
+        [workers for workers in args.num_workers if workers <= args.num_decomps],
+        num_decomps=args.num_decomps,
+        num_sums=args.num_sums,
+        batch_size=args.batch_size,
+        num_steps=args.num_steps,
+    )
+    baseline = results[0]["latency"]
+    for result in results:
+        print(
+            "{:>10}{:>10.2f} ms{:>8.2f}x".format(
+                result["num_workers"] or "unsharded",
+                result["latency"] * 1e3,
+                baseline / result["latency"],
+            )
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+import argparse
+import json
+import sys
+import time
+from typing import List, Optional, Sequence
+
+import numpy as np
+import tensorflow as tf
+from tensorflow import keras
+
+import libspn_keras as spnk
+from libspn_keras.optimizers import OnlineExpectationMaximization
+from libspn_keras.sum_ops import SumOpHardEMBackprop, SumOpUnweightedHardEMBackprop
+
+_SUM_OPS = dict(
+    hard_em=SumOpHardEMBackprop, unweighted_hard_em=SumOpUnweightedHardEMBackprop
+)
+
+
+def benchmark_sparse_counts(
+    num_inputs: Sequence[int],
+    sum_op: str = "unweighted_hard_em",
+    num_sums: int = 16,
+    num_scopes: int = 8,
+    batch_size: int = 32,
+    num_steps: int = 10,
+) -> List[dict]:
+    """
+    Compare the latency of EM updates of a wide sum layer with dense and with sparse counts.
+
+    The accumulators are constrained by ``GreaterEqualEpsilon`` and normalized in the forward
+    pass, so that sparse counts are scattered into them. Only the update of the optimizer is
+    timed, since it is the only part whose cost depends on the representation of the counts.
+
+    Args:
+        num_inputs: Numbers of inputs per sum to measure.
+        sum_op: Name of the hard EM sum op, either ``'hard_em'`` or ``'unweighted_hard_em'``.
+        num_sums: Number of sums per scope.
+        num_scopes: Number of scopes.
+        batch_size: Number of samples the counts are computed from.
+        num_steps: Number of timed updates, after a single untimed update.
+
+    Returns:
+        A list of dicts holding the number of accumulators and the median latency of an update
+        with dense and with sparse counts per number of inputs.
+    """
+    results = []
+    for num_in in num_inputs:
+        result = dict(num_inputs=num_in, num_sums=num_sums, batch_size=batch_size)
+        x = tf.random.normal((batch_size, num_scopes, 1, num_in))
+        for sparse_counts in (False, True):
+            keras.backend.clear_session()
+            layer = spnk.layers.DenseSum(
+                num_sums=num_sums,
+                sum_op=_SUM_OPS[sum_op](sparse_counts=sparse_counts),
+                linear_accumulator_constraint=spnk.constraints.GreaterEqualEpsilon(),
+            )
+            layer.build(x.shape)
+            with tf.GradientTape() as tape:
+                loss = -tf.reduce_mean(layer(x))
+            counts = tape.gradient(loss, layer.trainable_variables)
+            optimizer = OnlineExpectationMaximization()
+            update = tf.function(
+                lambda: optimizer.apply_gradients(
+                    zip(counts, layer.trainable_variables)
+                )
+            )
+            update()
+            latencies = []
+            for _ in range(num_steps):
+                start = time.perf_counter()
+                update().numpy()
+                latencies.append(time.perf_counter() - start)
+            result["sparse_latency" if sparse_counts else "latency"] = float(
+                np.median(latencies)
+            )
+            result["num_accumulators"] = int(
+                np.prod(layer.trainable_variables[0].shape)
+            )
+        results.append(result)
+    return results
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    Benchmark sparse hard EM counts from the command line.
+
+    Args:
+        argv: Command line arguments. If ``None``, uses ``sys.argv``.
+
+    Returns:
+        Exit status.
+    """
+    parser = argparse.ArgumentParser(
+        description="Compare EM updates of wide sum layers with dense and sparse counts."
+    )
+    parser.add_argument("--num-inputs", nargs="+", type=int, default=[256, 1024, 4096])
+    parser.add_argument(
+        "--sum-op", choices=sorted(_SUM_OPS), default="unweighted_hard_em"
+    )
+    parser.add_argument("--num-sums", type=int, default=16)
+    parser.add_argument("--num-scopes", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--num-steps", type=int, default=10)
+    parser.add_argument("--output", help="Path of the JSON file to write results to")
+    args = parser.parse_args(argv)
+
+    results = benchmark_sparse_counts(
+        args.num_inputs,
+        sum_op=args.sum_op,
+        num_sums=args.num_sums,
+        num_scopes=args.num_scopes,
+        batch_size=args.batch_size,
+        num_steps=args.num_steps,
+    )
+    for result in results:
+        print(
+            "{:>8} inputs{:>12} accumulators{:>10.2f} ms -> {:>8.2f} ms".format(
+                result["num_inputs"],
+                result["num_accumulators"],
+                result["latency"] * 1e3,
+                result["sparse_latency"] * 1e3,
+            )
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
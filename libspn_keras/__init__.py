@@ -3,47 +3,74 @@ try:
 except ImportError:  # pragma: no cover
     from importlib_metadata import version, PackageNotFoundError  # type: ignore
 
+from libspn_keras.lazy_loader import lazy_attributes
+
 try:
     __version__ = version(__name__)
 except PackageNotFoundError:  # pragma: no cover
     __version__ = "unknown"
 
-from libspn_keras import config
-from libspn_keras import constraints
-from libspn_keras import initializers
-from libspn_keras import layers
-from libspn_keras import losses
-from libspn_keras import metrics
-from libspn_keras import models
-from libspn_keras import optimizers
-from libspn_keras.config.accumulator_initializer import (
-    get_default_accumulator_initializer,
-    set_default_accumulator_initializer,
-)
-from libspn_keras.config.linear_accumulator_constraint import (
-    get_default_linear_accumulators_constraint,
-    set_default_linear_accumulators_constraint,
-)
-from libspn_keras.config.logspace_accumulator_constraint import (
-    get_default_logspace_accumulators_constraint,
-    set_default_logspace_accumulators_constraint,
-)
-from libspn_keras.config.sum_op import get_default_sum_op, set_default_sum_op
-from libspn_keras.logspace import logspace_wrapper_initializer
-from libspn_keras.region import region_graph_to_dense_spn
-from libspn_keras.region import RegionNode
-from libspn_keras.region import RegionVariable
-from libspn_keras.sum_ops import (
-    SumOpEMBackprop,
-    SumOpGradBackprop,
-    SumOpHardEMBackprop,
-    SumOpUnweightedHardEMBackprop,
-)
-from libspn_keras.visualize import visualize_dense_spn
+# Attributes are imported on first access, so that importing libspn_keras does not import
+# e.g. plotting libraries or TensorFlow Probability until they are needed.
+_LAZY_ATTRIBUTES = {
+    "callbacks": "libspn_keras.callbacks",
+    "config": "libspn_keras.config",
+    "constraints": "libspn_keras.constraints",
+    "data": "libspn_keras.data",
+    "initializers": "libspn_keras.initializers",
+    "layers": "libspn_keras.layers",
+    "losses": "libspn_keras.losses",
+    "metrics": "libspn_keras.metrics",
+    "models": "libspn_keras.models",
+    "optimizers": "libspn_keras.optimizers",
+    "serving": "libspn_keras.serving",
+    "get_default_accumulator_initializer": "libspn_keras.config.accumulator_initializer",
+    "set_default_accumulator_initializer": "libspn_keras.config.accumulator_initializer",
+    "get_default_linear_accumulators_constraint": (
+        "libspn_keras.config.linear_accumulator_constraint"
+    ),
+    "set_default_linear_accumulators_constraint": (
+        "libspn_keras.config.linear_accumulator_constraint"
+    ),
+    "get_default_logspace_accumulators_constraint": (
+        "libspn_keras.config.logspace_accumulator_constraint"
+    ),
+    "set_default_logspace_accumulators_constraint": (
+        "libspn_keras.config.logspace_accumulator_constraint"
+    ),
+    "get_default_sum_op": "libspn_keras.config.sum_op",
+    "set_default_sum_op": "libspn_keras.config.sum_op",
+    "estimate_cost": "libspn_keras.cost_model",
+    "estimate_region_graph_cost": "libspn_keras.cost_model",
+    "export_saved_model": "libspn_keras.export",
+    "export_tflite": "libspn_keras.export",
+    "fold_normalization": "libspn_keras.folding",
+    "InferenceModule": "libspn_keras.export",
+    "IncrementalEvaluator": "libspn_keras.incremental",
+    "LeafLogProbCache": "libspn_keras.leaf_cache",
+    "logspace_wrapper_initializer": "libspn_keras.logspace",
+    "DecompositionShardedExecutor": "libspn_keras.parallel",
+    "profile": "libspn_keras.profiling",
+    "prune_model": "libspn_keras.pruning",
+    "quantization_report": "libspn_keras.quantization",
+    "quantize_model": "libspn_keras.quantization",
+    "region_graph_to_dense_spn": "libspn_keras.region",
+    "RegionNode": "libspn_keras.region",
+    "RegionVariable": "libspn_keras.region",
+    "SumOpEMBackprop": "libspn_keras.sum_ops",
+    "SumOpGradBackprop": "libspn_keras.sum_ops",
+    "SumOpHardEMBackprop": "libspn_keras.sum_ops",
+    "SumOpUnweightedHardEMBackprop": "libspn_keras.sum_ops",
+    "TiledEvaluator": "libspn_keras.tiling",
+    "visualize_dense_spn": "libspn_keras.visualize",
+}
 
+__getattr__, __dir__ = lazy_attributes(__name__, _LAZY_ATTRIBUTES)
 
 __all__ = [
+    "callbacks",
     "config",
+    "data",
     "get_default_accumulator_initializer",
     "set_default_accumulator_initializer",
     "set_default_logspace_accumulators_constraint",
@@ -53,6 +80,19 @@ __all__ = [
     "get_default_sum_op",
     "set_default_sum_op",
     "logspace_wrapper_initializer",
+    "estimate_cost",
+    "estimate_region_graph_cost",
+    "export_saved_model",
+    "export_tflite",
+    "fold_normalization",
+    "InferenceModule",
+    "IncrementalEvaluator",
+    "LeafLogProbCache",
+    "profile",
+    "prune_model",
+    "quantization_report",
+    "quantize_model",
+    "DecompositionShardedExecutor",
     "optimizers",
     "metrics",
     "losses",
@@ -64,8 +104,10 @@ __all__ = [
     "visualize_dense_spn",
     "initializers",
     "models",
+    "serving",
     "SumOpUnweightedHardEMBackprop",
     "SumOpEMBackprop",
     "SumOpGradBackprop",
     "SumOpHardEMBackprop",
+    "TiledEvaluator",
 ]
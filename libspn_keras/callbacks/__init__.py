@@ -0,0 +1,3 @@
+from libspn_keras.callbacks.layer_profiler import LayerProfiler
+
+__all__ = ["LayerProfiler"]
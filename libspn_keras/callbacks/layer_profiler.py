@@ -0,0 +1,112 @@
+import time
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import tensorflow as tf
+from tensorflow import keras
+
+from libspn_keras.profiling import (
+    _default_device,
+    _peak_memory,
+    _reset_peak_memory,
+    profile,
+    ProfileReport,
+)
+
+
+class LayerProfiler(keras.callbacks.Callback):
+    """
+    Profiles the layers of a sequential SPN while it is trained.
+
+    At the end of every ``profile_every_n_epochs`` epochs, the per-layer forward and backward wall
+    times, FLOPs and activation sizes are computed with :func:`libspn_keras.profile` on the given
+    ``batch``. In addition, the wall time and peak memory of every training step are recorded.
+
+    Args:
+        batch: Batch of inputs to profile the layers with.
+        profile_every_n_epochs: Number of epochs between two layer profiles.
+        num_runs: Number of timed runs per layer.
+        backward: Whether to profile the backward pass of each layer.
+        verbose: If ``1``, prints the summary of each profile.
+        device: Name of the device on which memory statistics are tracked. If ``None``, the first
+            GPU is used if available, otherwise the CPU.
+
+    Attributes:
+        reports: The ``ProfileReport`` instances gathered so far, one per profiled epoch.
+        step_stats: Per step a dict with the wall time in seconds (``"step_time"``) and the
+            peak memory in bytes (``"peak_memory_bytes"``) as reported by the TensorFlow
+            allocator, which is ``0`` for devices that don't track memory.
+    """
+
+    def __init__(
+        self,
+        batch: Union[tf.Tensor, np.ndarray, Tuple[tf.Tensor, ...]],
+        profile_every_n_epochs: int = 1,
+        num_runs: int = 5,
+        backward: bool = True,
+        verbose: int = 1,
+        device: Optional[str] = None,
+    ):
+        super(LayerProfiler, self).__init__()
+        self.batch = batch
+        self.profile_every_n_epochs = profile_every_n_epochs
+        self.num_runs = num_runs
+        self.backward = backward
+        self.verbose = verbose
+        self.device = device or _default_device()
+        self.reports: List[ProfileReport] = []
+        self.step_stats: List[Dict[str, float]] = []
+        self._step_start: Optional[float] = None
+
+    def on_train_batch_begin(self, batch: int, logs: Optional[dict] = None) -> None:
+        """
+        Reset memory statistics and start timing the step.
+
+        Args:
+            batch: Index of the batch within the current epoch.
+            logs: Dict with metric results.
+        """
+        _reset_peak_memory(self.device)
+        self._step_start = time.perf_counter()
+
+    def on_train_batch_end(self, batch: int, logs: Optional[dict] = None) -> None:
+        """
+        Record the wall time and peak memory of the step.
+
+        Args:
+            batch: Index of the batch within the current epoch.
+            logs: Dict with metric results.
+        """
+        if self._step_start is None:
+            return
+        self.step_stats.append(
+            dict(
+                step_time=time.perf_counter() - self._step_start,
+                peak_memory_bytes=_peak_memory(self.device),
+            )
+        )
+
+    def on_epoch_end(self, epoch: int, logs: Optional[dict] = None) -> None:
+        """
+        Profile the layers of the model.
+
+        Args:
+            epoch: Index of the epoch.
+            logs: Dict with metric results.
+        """
+        if (epoch + 1) % self.profile_every_n_epochs != 0:
+            return
+        report = profile(
+            self.model,
+            self.batch,
+            num_runs=self.num_runs,
+            backward=self.backward,
+            device=self.device,
+        )
+        self.reports.append(report)
+        if self.verbose:
+            print(
+                "\nLayer profile after epoch {}:\n{}".format(
+                    epoch + 1, report.summary()
+                )
+            )
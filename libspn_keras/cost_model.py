@@ -0,0 +1,655 @@
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import tensorflow as tf
+
+from libspn_keras.layers.base_leaf import BaseLeaf
+from libspn_keras.layers.conv2d_product import Conv2DProduct
+from libspn_keras.layers.conv2d_sum import Conv2DSum
+from libspn_keras.layers.dense_product import DenseProduct
+from libspn_keras.layers.dense_sum import DenseSum
+from libspn_keras.layers.indicator_leaf import IndicatorLeaf
+from libspn_keras.layers.local2d_sum import Local2DSum
+from libspn_keras.layers.location_scale_leaf import (
+    CauchyLeaf,
+    LaplaceLeaf,
+    LocationScaleLeafBase,
+    NormalLeaf,
+)
+from libspn_keras.layers.normalize_standard_score import NormalizeStandardScore
+from libspn_keras.layers.permute_and_pad_scopes_random import PermuteAndPadScopesRandom
+from libspn_keras.layers.reduce_product import ReduceProduct
+from libspn_keras.layers.root_sum import RootSum
+from libspn_keras.layers.sparse_dense_sum import SparseDenseSum
+from libspn_keras.layers.temporal_dense_product import TemporalDenseProduct
+from libspn_keras.region import region_graph_to_dense_spn_layers, RegionNode
+from libspn_keras.sum_ops import (
+    SumOpBase,
+    SumOpEMBackprop,
+    SumOpGradBackprop,
+    SumOpHardEMBackprop,
+    SumOpUnweightedHardEMBackprop,
+)
+
+# Approximate number of floating point operations needed to evaluate the log probability of
+# a single (univariate) input value under a single leaf component
+_LEAF_LOG_PROB_FLOPS = {
+    NormalLeaf: 6,
+    LaplaceLeaf: 5,
+    CauchyLeaf: 6,
+    IndicatorLeaf: 1,
+}
+_DEFAULT_LEAF_LOG_PROB_FLOPS = 8
+
+_SUM_OPS = (
+    SumOpGradBackprop,
+    SumOpEMBackprop,
+    SumOpHardEMBackprop,
+    SumOpUnweightedHardEMBackprop,
+)
+
+
+def num_elements(shape: Sequence[Optional[int]], batch_size: int = 1) -> int:
+    """
+    Compute the number of elements of a tensor with the given shape.
+
+    Args:
+        shape: Shape of the tensor, including the batch axis. Unknown dimensions (``None``) are
+            replaced by ``batch_size``.
+        batch_size: Size to use for unknown dimensions.
+
+    Returns:
+        Number of elements in the tensor.
+    """
+    return int(np.prod([batch_size if dim is None else dim for dim in shape]))
+
+
+def activation_bytes(
+    shape: Sequence[Optional[int]], dtype: tf.DType = tf.float32, batch_size: int = 1
+) -> int:
+    """
+    Compute the number of bytes of an activation tensor with the given shape.
+
+    Args:
+        shape: Shape of the tensor, including the batch axis.
+        dtype: DType of the tensor.
+        batch_size: Size to use for unknown dimensions.
+
+    Returns:
+        Number of bytes needed to hold the tensor.
+    """
+    return num_elements(shape, batch_size=batch_size) * tf.as_dtype(dtype).size
+
+
+def count_flops(  # noqa: C901
+    layer: tf.keras.layers.Layer,
+    input_shape: Sequence[Optional[int]],
+    output_shape: Sequence[Optional[int]],
+    batch_size: int = 1,
+) -> int:
+    """
+    Analytically count the floating point operations of a forward pass through an SPN layer.
+
+    The counts are based on the way the layers are implemented in ``libspn_keras``, e.g. a
+    ``DenseSum`` computes its log-space matrix product through exponentiation of the inputs,
+    a matrix multiplication and a logarithm of the result. Pure data movement such as the
+    reordering of scopes by a ``PermuteAndPadScopes`` layer does not count as floating point
+    operations.
+
+    Args:
+        layer: The layer to count floating point operations for.
+        input_shape: Shape of the input of the layer, including the batch axis.
+        output_shape: Shape of the output of the layer, including the batch axis.
+        batch_size: Size to use for unknown dimensions.
+
+    Returns:
+        Number of floating point operations.
+    """
+    num_in = num_elements(input_shape, batch_size=batch_size)
+    num_out = num_elements(output_shape, batch_size=batch_size)
+
+    if isinstance(layer, RootSum):
+        num_nodes_in = num_in // num_elements(input_shape[:1], batch_size=batch_size)
+        if layer.return_weighted_child_logits:
+            return num_in
+        # Exponentiation of inputs, dot product per root and logarithm of the output
+        return num_in + 2 * num_nodes_in * num_out + num_out
+
+    if isinstance(layer, (Conv2DSum, Local2DSum, DenseSum)):
+        num_nodes_in = input_shape[-1]
+        # Exponentiation of inputs, matrix multiplication and logarithm of the output
+        return num_in + 2 * num_nodes_in * num_out + num_out
+
+    if isinstance(layer, SparseDenseSum):
+        num_batch = num_elements(input_shape[:1], batch_size=batch_size)
+        # Exponentiation of inputs, sparse matrix product and logarithm of the output
+        return num_in + 2 * len(layer.child_indices) * num_batch + num_out
+
+    if isinstance(layer, DenseProduct):
+        return (layer.num_factors - 1) * num_out
+
+    if isinstance(layer, ReduceProduct):
+        return num_in - num_out
+
+    if isinstance(layer, TemporalDenseProduct):
+        return num_out
+
+    if isinstance(layer, Conv2DProduct):
+        kernel_surface = int(np.prod(layer.kernel_size))
+        if layer.depthwise:
+            return kernel_surface * num_out
+        # The products are computed as convolutions with one-hot kernels
+        return 2 * kernel_surface * input_shape[-1] * num_out
+
+    if isinstance(layer, BaseLeaf):
+        *_, multivariate_size = input_shape
+        log_prob_flops = _LEAF_LOG_PROB_FLOPS.get(
+            type(layer), _DEFAULT_LEAF_LOG_PROB_FLOPS
+        )
+        return num_out * multivariate_size * log_prob_flops
+
+    if isinstance(layer, NormalizeStandardScore):
+        if layer.dataset_statistics:
+            # Only the normalization itself, the statistics are precomputed
+            return 2 * num_in
+        # Mean, standard deviation and the normalization itself
+        return 6 * num_in
+
+    return 0
+
+
+def count_params(layer: tf.keras.layers.Layer) -> int:
+    """
+    Count the number of parameters of a built layer.
+
+    Args:
+        layer: A built layer.
+
+    Returns:
+        Total number of elements over all weights of the layer, including non-trainable ones.
+    """
+    return int(sum(np.prod(w.shape) for w in layer.weights))
+
+
+def count_params_static(  # noqa: C901
+    layer: tf.keras.layers.Layer, input_shape: Sequence[Optional[int]]
+) -> Tuple[int, int]:
+    """
+    Count the number of parameters of a layer from its config and input shape, without building it.
+
+    Args:
+        layer: The layer to count parameters for. Does not need to be built.
+        input_shape: Shape of the input of the layer, including the batch axis.
+
+    Returns:
+        A tuple with the total number of parameters (including non-trainable ones such as
+        the one-hot kernels of a ``Conv2DProduct``) and the number of trainable parameters.
+    """
+    if isinstance(layer, RootSum):
+        _, _, num_decomps, num_nodes_in = input_shape
+        num_params = num_decomps * num_nodes_in * layer.num_sums
+        return num_params, num_params if layer.trainable else 0
+
+    if isinstance(layer, Conv2DSum):
+        num_params = input_shape[-1] * layer.num_sums
+        return num_params, num_params if layer.trainable else 0
+
+    if isinstance(layer, (Local2DSum, DenseSum)):
+        num_params = num_elements(input_shape[1:]) * layer.num_sums
+        return num_params, num_params if layer.trainable else 0
+
+    if isinstance(layer, SparseDenseSum):
+        return len(layer.child_indices), 0
+
+    if isinstance(layer, Conv2DProduct):
+        kernel_surface = int(np.prod(layer.kernel_size))
+        if layer.depthwise:
+            return kernel_surface, 0
+        num_channels_in = input_shape[-1]
+        return (
+            kernel_surface
+            * num_channels_in
+            * layer._compute_num_channels_out(num_channels_in),
+            0,
+        )
+
+    if isinstance(layer, PermuteAndPadScopesRandom):
+        if not layer.factors:
+            return 0, 0
+        return input_shape[2] * int(np.prod(layer.factors)), 0
+
+    if isinstance(layer, LocationScaleLeafBase):
+        _, *scope_dims, multivariate_size = input_shape
+        num_per_weight = (
+            num_elements(scope_dims) * layer.num_components * multivariate_size
+        )
+        if layer.use_accumulators:
+            num_location = 2 * num_per_weight if layer.location_trainable else 0
+            num_scale = 2 * num_per_weight if layer.scale_trainable else 0
+            return (
+                (4 if layer.scale_trainable else 3) * num_per_weight,
+                num_location + num_scale if layer.trainable else 0,
+            )
+        num_trainable = num_per_weight * (
+            int(layer.location_trainable) + int(layer.scale_trainable)
+        )
+        return 2 * num_per_weight, num_trainable if layer.trainable else 0
+
+    if layer.built:
+        return (
+            count_params(layer),
+            int(sum(np.prod(w.shape) for w in layer.trainable_weights)),
+        )
+    return 0, 0
+
+
+def _backward_workspace_elements(
+    layer: tf.keras.layers.Layer,
+    input_shape: Sequence[Optional[int]],
+    output_shape: Sequence[Optional[int]],
+    sum_op: SumOpBase,
+    batch_size: int,
+) -> int:
+    # Number of elements of the temporary tensors that are alive at the peak of the backward pass
+    # of a single layer, on top of the activations that are kept for the backward pass
+    num_in = num_elements(input_shape, batch_size=batch_size)
+    num_out = num_elements(output_shape, batch_size=batch_size)
+    if not isinstance(layer, DenseSum):
+        # Gradient w.r.t. the input and the incoming gradient
+        return num_in + num_out
+    num_children = (
+        num_in // num_elements(input_shape[:1], batch_size=batch_size)
+        if isinstance(layer, RootSum)
+        else input_shape[-1]
+    )
+    if isinstance(sum_op, SumOpHardEMBackprop):
+        # Pairwise weighted children of shape [..., num_children, num_sums] are kept for the
+        # backward pass, where they are compared to their maximum, one-hot encoded by the winning
+        # child and multiplied with the incoming counts
+        return 3 * num_out * num_children + num_in + num_out
+    if isinstance(sum_op, SumOpUnweightedHardEMBackprop):
+        # Winning children are determined per input, which requires a mask, a one-hot
+        # encoding and the child counts, all of the size of the input
+        return 3 * num_in + 2 * num_out
+    # Exponentiated inputs and outputs of the log-space matrix product are kept for the backward
+    # pass, which then computes the gradient w.r.t. the input
+    return 2 * num_in + 2 * num_out
+
+
+class LayerCost(NamedTuple):
+    """
+    Statically estimated cost of a single layer of an SPN.
+
+    Args:
+        name: Name of the layer.
+        class_name: Class name of the layer.
+        input_shape: Shape of the input of the layer, with the batch axis set to the batch size.
+        output_shape: Shape of the output of the layer, with the batch axis set to the batch size.
+        num_params: Number of parameters of the layer, including non-trainable ones.
+        num_trainable_params: Number of trainable parameters of the layer.
+        flops: Analytic number of floating point operations of the forward pass.
+        activation_bytes: Number of bytes of the output of the layer.
+        backward_workspace_bytes: Number of bytes of the temporary tensors needed to compute the
+            backward pass of the layer, per sum op class name.
+    """
+
+    name: str
+    class_name: str
+    input_shape: Tuple[int, ...]
+    output_shape: Tuple[int, ...]
+    num_params: int
+    num_trainable_params: int
+    flops: int
+    activation_bytes: int
+    backward_workspace_bytes: Dict[str, int]
+
+
+class CostEstimate:
+    """
+    Static cost estimate of an SPN, obtained without building any of its layers.
+
+    Args:
+        layers: Estimated costs of the individual layers, from input to output.
+        batch_size: Batch size used for the estimate.
+        input_bytes: Number of bytes of the input of the SPN.
+        dtype: DType of parameters and activations.
+        sum_ops: Class names of the sum ops of the sum layers in the SPN as configured.
+    """
+
+    def __init__(
+        self,
+        layers: List[LayerCost],
+        batch_size: int,
+        input_bytes: int,
+        dtype: tf.DType,
+        sum_ops: List[str],
+    ):
+        self.layers = layers
+        self.batch_size = batch_size
+        self.input_bytes = input_bytes
+        self.dtype = tf.as_dtype(dtype)
+        self.sum_ops = sum_ops
+
+    @property
+    def num_params(self) -> int:
+        """
+        Obtain the total number of parameters.
+
+        Returns:
+            Number of parameters, including non-trainable ones.
+        """
+        return sum(layer.num_params for layer in self.layers)
+
+    @property
+    def num_trainable_params(self) -> int:
+        """
+        Obtain the total number of trainable parameters.
+
+        Returns:
+            Number of trainable parameters.
+        """
+        return sum(layer.num_trainable_params for layer in self.layers)
+
+    @property
+    def flops(self) -> int:
+        """
+        Obtain the total number of floating point operations of the forward pass.
+
+        Returns:
+            Number of floating point operations.
+        """
+        return sum(layer.flops for layer in self.layers)
+
+    @property
+    def activation_bytes(self) -> int:
+        """
+        Obtain the total number of bytes of all activations, including the input.
+
+        Returns:
+            Number of bytes.
+        """
+        return self.input_bytes + sum(layer.activation_bytes for layer in self.layers)
+
+    @property
+    def param_bytes(self) -> int:
+        """
+        Obtain the number of bytes of all parameters.
+
+        Returns:
+            Number of bytes.
+        """
+        return self.num_params * self.dtype.size
+
+    @property
+    def peak_inference_memory(self) -> int:
+        """
+        Estimate the peak memory of a forward pass.
+
+        Only the input and output of the layer that is currently evaluated need to be alive.
+
+        Returns:
+            Number of bytes.
+        """
+        in_bytes = [self.input_bytes] + [
+            layer.activation_bytes for layer in self.layers[:-1]
+        ]
+        return self.param_bytes + max(
+            in_b + layer.activation_bytes for in_b, layer in zip(in_bytes, self.layers)
+        )
+
+    def peak_training_memory(
+        self,
+        sum_op: Optional[Union[str, SumOpBase]] = None,
+        num_optimizer_slots: int = 2,
+    ) -> int:
+        """
+        Estimate the peak memory of a training step.
+
+        The estimate consists of the parameters, their gradients and optimizer slots, all
+        activations that are kept for the backward pass and the largest temporary workspace of
+        any layer's backward pass.
+
+        Args:
+            sum_op: Sum op to estimate the memory for, either as a ``SumOpBase`` instance or a class
+                name. If ``None``, uses the sum ops of the sum layers as they are configured. If the
+                SPN has sum layers with different sum ops, the largest estimate is returned.
+            num_optimizer_slots: Number of slots per trainable parameter held by the optimizer,
+                e.g. 2 for Adam and 0 for plain SGD or EM.
+
+        Returns:
+            Number of bytes.
+
+        Raises:
+            ValueError: If the sum op is unknown.
+        """
+        if sum_op is None:
+            if not self.sum_ops:
+                return self.peak_training_memory(
+                    SumOpGradBackprop.__name__, num_optimizer_slots
+                )
+            return max(
+                self.peak_training_memory(name, num_optimizer_slots)
+                for name in set(self.sum_ops)
+            )
+        if isinstance(sum_op, SumOpBase):
+            sum_op = sum_op.__class__.__name__
+        if sum_op not in self.layers[0].backward_workspace_bytes:
+            raise ValueError(
+                "Unknown sum op {}, expected one of {}".format(
+                    sum_op, list(self.layers[0].backward_workspace_bytes.keys())
+                )
+            )
+        trainable_param_bytes = self.num_trainable_params * self.dtype.size
+        return (
+            self.param_bytes
+            + (1 + num_optimizer_slots) * trainable_param_bytes
+            + self.activation_bytes
+            + max(layer.backward_workspace_bytes[sum_op] for layer in self.layers)
+        )
+
+    @property
+    def peak_training_memory_per_sum_op(self) -> Dict[str, int]:
+        """
+        Estimate the peak memory of a training step for each of the sum ops.
+
+        Returns:
+            A dict mapping sum op class names to numbers of bytes.
+        """
+        return {
+            name: self.peak_training_memory(name)
+            for name in self.layers[0].backward_workspace_bytes
+        }
+
+    def fits(
+        self,
+        memory_budget_bytes: int,
+        training: bool = True,
+        sum_op: Optional[Union[str, SumOpBase]] = None,
+        num_optimizer_slots: int = 2,
+    ) -> bool:
+        """
+        Predict whether the SPN fits in the given memory budget.
+
+        Args:
+            memory_budget_bytes: Available memory in bytes.
+            training: Whether to check the peak memory of training rather than inference.
+            sum_op: Sum op to check the training memory for. See ``peak_training_memory``.
+            num_optimizer_slots: Number of optimizer slots per trainable parameter.
+
+        Returns:
+            ``True`` if the estimated peak memory does not exceed the budget.
+        """
+        if training:
+            return (
+                self.peak_training_memory(sum_op, num_optimizer_slots)
+                <= memory_budget_bytes
+            )
+        return self.peak_inference_memory <= memory_budget_bytes
+
+    def to_dict(self) -> dict:
+        """
+        Obtain a key-value representation of the estimate, e.g. for serializing it to JSON.
+
+        Returns:
+            A dict holding the estimate.
+        """
+        return dict(
+            batch_size=self.batch_size,
+            dtype=self.dtype.name,
+            num_params=self.num_params,
+            num_trainable_params=self.num_trainable_params,
+            flops=self.flops,
+            activation_bytes=self.activation_bytes,
+            peak_inference_memory=self.peak_inference_memory,
+            peak_training_memory=self.peak_training_memory_per_sum_op,
+            layers=[layer._asdict() for layer in self.layers],
+        )
+
+    def summary(self) -> str:
+        """
+        Format the estimate as a table with a row per layer.
+
+        Returns:
+            A string holding the table.
+        """
+        header = "{:<28}{:<24}{:>12}{:>14}{:>14}".format(
+            "Layer (type)", "Output shape", "Params", "MFLOPs", "Act. (MB)"
+        )
+        lines = [header, "=" * len(header)]
+        for layer in self.layers:
+            lines.append(
+                "{:<28}{:<24}{:>12}{:>14.3f}{:>14.3f}".format(
+                    "{} ({})".format(layer.name, layer.class_name)[:27],
+                    str(layer.output_shape)[:23],
+                    layer.num_params,
+                    layer.flops / 1e6,
+                    layer.activation_bytes / 2 ** 20,
+                )
+            )
+        lines.append("=" * len(header))
+        lines.append(
+            "Total params: {}, total MFLOPs: {:.3f}, peak inference memory: {:.3f} MB".format(
+                self.num_params, self.flops / 1e6, self.peak_inference_memory / 2 ** 20
+            )
+        )
+        for name, num_bytes in self.peak_training_memory_per_sum_op.items():
+            lines.append(
+                "Peak training memory with {}: {:.3f} MB".format(
+                    name, num_bytes / 2 ** 20
+                )
+            )
+        return "\n".join(lines)
+
+    def __repr__(self):
+        return self.summary()
+
+
+def estimate_cost(
+    layers: Union[tf.keras.Sequential, Sequence[tf.keras.layers.Layer]],
+    input_shape: Optional[Sequence[Optional[int]]] = None,
+    batch_size: int = 1,
+    dtype: tf.DType = tf.float32,
+) -> CostEstimate:
+    """
+    Estimate the cost of a sequential SPN without building any of its layers.
+
+    Output shapes are inferred from the layer configs, so that no TensorFlow variables are created.
+    This makes it cheap to reject architectures that would run out of memory, e.g. a
+    ``DenseProduct`` that creates ``num_nodes_in ** num_factors`` products or a ``Conv2DProduct``
+    with ``num_channels=None``.
+
+    Args:
+        layers: A (possibly unbuilt) sequential model or a list of layers from input to output.
+        input_shape: Shape of the input, including the batch axis. If ``None``, it is taken from the
+            ``input_shape`` that was passed to the first layer.
+        batch_size: Batch size to use for the estimate. Replaces an unknown batch axis.
+        dtype: DType of parameters and activations.
+
+    Returns:
+        A ``CostEstimate`` holding the estimated cost per layer.
+
+    Raises:
+        ValueError: If the input shape cannot be determined.
+    """
+    if isinstance(layers, tf.keras.Sequential):
+        layers = layers.layers
+    layers = list(layers)
+    if input_shape is None:
+        input_shape = getattr(layers[0], "_batch_input_shape", None)
+        if input_shape is None:
+            raise ValueError(
+                "Cannot determine input shape, either pass it explicitly or set input_shape on the "
+                "first layer"
+            )
+    shape = (batch_size, *input_shape[1:])
+    input_bytes = activation_bytes(shape, dtype)
+
+    layer_costs = []
+    for layer in layers:
+        out_shape = tuple(layer.compute_output_shape(shape))
+        num_params, num_trainable_params = count_params_static(layer, shape)
+        layer_costs.append(
+            LayerCost(
+                name=layer.name,
+                class_name=layer.__class__.__name__,
+                input_shape=shape,
+                output_shape=out_shape,
+                num_params=num_params,
+                num_trainable_params=num_trainable_params,
+                flops=count_flops(layer, shape, out_shape),
+                activation_bytes=activation_bytes(out_shape, dtype),
+                backward_workspace_bytes={
+                    sum_op.__name__: _backward_workspace_elements(
+                        layer, shape, out_shape, sum_op(), batch_size
+                    )
+                    * tf.as_dtype(dtype).size
+                    for sum_op in _SUM_OPS
+                },
+            )
+        )
+        shape = out_shape
+
+    return CostEstimate(
+        layers=layer_costs,
+        batch_size=batch_size,
+        input_bytes=input_bytes,
+        dtype=dtype,
+        sum_ops=[
+            layer.sum_op.__class__.__name__
+            for layer in layers
+            if isinstance(layer, DenseSum)
+        ],
+    )
+
+
+def estimate_region_graph_cost(
+    region_graph_root: RegionNode,
+    leaf_node: BaseLeaf,
+    num_sums_iterable: Iterator[int],
+    batch_size: int = 1,
+    dtype: tf.DType = tf.float32,
+    **kwargs
+) -> CostEstimate:
+    """
+    Estimate the cost of the dense SPN that ``region_graph_to_dense_spn`` would produce.
+
+    Args:
+        region_graph_root: Root of the region graph
+        leaf_node: Node to insert at the leaf of the SPN
+        num_sums_iterable: Number of sums for all but the last root sum layer from bottom to top
+        batch_size: Batch size to use for the estimate.
+        dtype: DType of parameters and activations.
+        **kwargs: Remaining keyword arguments to pass on to ``region_graph_to_dense_spn``, e.g.
+            ``return_weighted_child_logits`` or ``num_classes``.
+
+    Returns:
+        A ``CostEstimate`` holding the estimated cost per layer.
+    """
+    kwargs.setdefault("return_weighted_child_logits", False)
+    layers = region_graph_to_dense_spn_layers(
+        region_graph_root,
+        leaf_node=leaf_node,
+        num_sums_iterable=num_sums_iterable,
+        **kwargs,
+    )
+    return estimate_cost(layers, batch_size=batch_size, dtype=dtype)
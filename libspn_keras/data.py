@@ -0,0 +1,213 @@
+from typing import List, Optional, Tuple, Union
+import zipfile
+
+import numpy as np
+import tensorflow as tf
+
+# A path to a .npy file, a path to a .npz file holding a single array, a pair of a path to a
+# .npz file and the name of an array in it, or an array
+ArraySource = Union[str, Tuple[str, str], np.ndarray]
+
+# A single source, or a list of sources whose arrays are concatenated along the first axis
+ArraySources = Union[ArraySource, List[ArraySource]]
+
+
+def load_memmap(path: str, key: Optional[str] = None) -> np.ndarray:
+    """
+    Memory-map an array stored in a ``.npy`` or ``.npz`` file.
+
+    Arrays in ``.npz`` files are memory-mapped straight from the archive, which requires that
+    they are stored without compression, as done by ``np.savez``.
+
+    Args:
+        path: Path of a ``.npy`` or ``.npz`` file.
+        key: Name of the array in a ``.npz`` file. May be omitted if the file holds a single
+            array.
+
+    Returns:
+        A read-only memory-mapped array.
+
+    Raises:
+        ValueError: If ``key`` is missing or unknown, or if the array is compressed or holds
+            Python objects.
+    """
+    if not zipfile.is_zipfile(path):
+        if key is not None:
+            raise ValueError("Got key '{}' for a .npy file {}".format(key, path))
+        return np.load(path, mmap_mode="r")
+
+    with zipfile.ZipFile(path) as archive:
+        names = [name[: -len(".npy")] for name in archive.namelist()]
+        if key is None:
+            if len(names) != 1:
+                raise ValueError(
+                    "Must give the key of one of the arrays {} in {}".format(
+                        names, path
+                    )
+                )
+            key = names[0]
+        if key not in names:
+            raise ValueError("No array '{}' in {}, got {}".format(key, path, names))
+        info = archive.getinfo(key + ".npy")
+    if info.compress_type != zipfile.ZIP_STORED:
+        raise ValueError(
+            "Cannot memory-map the compressed array '{}' in {}".format(key, path)
+        )
+
+    with open(path, "rb") as f:
+        # The local file header has a fixed size of 30 bytes, followed by a file name and an
+        # extra field, whose lengths are stored at its end
+        f.seek(info.header_offset + 26)
+        name_length, extra_length = np.frombuffer(f.read(4), dtype="<u2")
+        f.seek(info.header_offset + 30 + int(name_length) + int(extra_length))
+        version = np.lib.format.read_magic(f)
+        read_header = (
+            np.lib.format.read_array_header_1_0
+            if version == (1, 0)
+            else np.lib.format.read_array_header_2_0
+        )
+        shape, fortran_order, dtype = read_header(f)
+        offset = f.tell()
+    if dtype.hasobject:
+        raise ValueError(
+            "Cannot memory-map the array '{}' of objects in {}".format(key, path)
+        )
+    return np.memmap(
+        path,
+        dtype=dtype,
+        mode="r",
+        shape=shape,
+        order="F" if fortran_order else "C",
+        offset=offset,
+    )
+
+
+def _as_arrays(sources: Optional[ArraySources]) -> Optional[List[np.ndarray]]:
+    if sources is None:
+        return None
+    if isinstance(sources, (str, tuple, np.ndarray)):
+        sources = [sources]
+    arrays = []
+    for source in sources:
+        if isinstance(source, np.ndarray):
+            arrays.append(source)
+        elif isinstance(source, str):
+            arrays.append(load_memmap(source))
+        else:
+            arrays.append(load_memmap(*source))
+    return arrays
+
+
+def numpy_dataset(  # noqa: C901
+    x: ArraySources,
+    evidence_mask: Optional[ArraySources] = None,
+    sequence_lens: Optional[ArraySources] = None,
+    labels: Optional[ArraySources] = None,
+    batch_size: int = 32,
+    shuffle_buffer_size: int = 0,
+    block_size: int = 1024,
+    num_shards: int = 1,
+    shard_index: int = 0,
+    drop_remainder: bool = False,
+    seed: Optional[int] = None,
+    num_parallel_reads: int = tf.data.experimental.AUTOTUNE,
+) -> tf.data.Dataset:
+    """
+    Create a ``tf.data`` pipeline over memory-mapped NumPy arrays.
+
+    Rows are read in blocks of ``block_size`` consecutive rows with ``num_parallel_reads``
+    parallel reads, so that only the blocks in flight and the shuffle buffer are in memory.
+    Arrays can be split over multiple files, which are treated as consecutive parts of a
+    single array. When shuffling, the order of the blocks is shuffled in every epoch, after
+    which rows are shuffled within a buffer of ``shuffle_buffer_size`` rows.
+
+    At most one of ``evidence_mask``, ``sequence_lens`` and ``labels`` can be given, which
+    becomes the second element of the batches. This matches what ``fit`` expects of a
+    ``SequentialSumProductNetwork`` with ``infer_no_evidence=True``, of a
+    ``DynamicSumProductNetwork`` and of a supervised SPN, respectively. The pipeline can also
+    be passed as ``data`` to the ``KMeans`` and ``PoonDomingosMeanOfQuantileSplit``
+    initializers, which only use the first element.
+
+    Args:
+        x: Source of the samples, i.e. a path of a ``.npy`` file, a path of a ``.npz`` file
+            with a single array, a pair of a path of a ``.npz`` file and the name of an array in
+            it, an array, or a list of these that are concatenated along the first axis.
+            Splitting arrays over multiple files allows to e.g. append data without rewriting
+            existing files.
+        evidence_mask: Source of boolean evidence masks with the same shape as the samples.
+        sequence_lens: Source of the sequence lengths of the samples.
+        labels: Source of the labels of the samples.
+        batch_size: Number of rows per batch.
+        shuffle_buffer_size: Number of rows to shuffle within. If zero, rows are not shuffled.
+        block_size: Number of consecutive rows per read.
+        num_shards: Number of shards, e.g. one per worker, that the blocks are split over.
+        shard_index: Index of the shard of this pipeline.
+        drop_remainder: Whether to drop the final batch if it is smaller than ``batch_size``.
+        seed: Seed of the shuffling.
+        num_parallel_reads: Number of blocks that are read in parallel.
+
+    Returns:
+        A dataset that yields batches of samples, or pairs of batches of samples and of the
+        evidence masks, sequence lengths or labels.
+
+    Raises:
+        ValueError: If more than one of ``evidence_mask``, ``sequence_lens`` and ``labels`` is
+            given, if their number of rows differs from that of ``x``, or if ``shard_index``
+            is out of range.
+    """
+    targets = [s for s in (evidence_mask, sequence_lens, labels) if s is not None]
+    if len(targets) > 1:
+        raise ValueError("Can only give one of evidence_mask, sequence_lens and labels")
+    if not 0 <= shard_index < num_shards:
+        raise ValueError(
+            "Shard index {} out of range for {} shards".format(shard_index, num_shards)
+        )
+    columns = [_as_arrays(x)] + [_as_arrays(t) for t in targets]
+    num_rows = [sum(len(a) for a in arrays) for arrays in columns]
+    if len(set(num_rows)) > 1:
+        raise ValueError(
+            "Got different numbers of rows for samples and targets: {}".format(num_rows)
+        )
+    # Rows are read as if all parts of a column were a single array
+    part_starts = [np.cumsum([0] + [len(a) for a in arrays]) for arrays in columns]
+
+    def read_rows(start: np.int64, stop: np.int64) -> List[np.ndarray]:
+        blocks = []
+        for arrays, starts in zip(columns, part_starts):
+            parts = []
+            for array, part_start, part_stop in zip(arrays, starts[:-1], starts[1:]):
+                if part_start < stop and start < part_stop:
+                    parts.append(
+                        array[
+                            max(start - part_start, 0) : min(stop, part_stop)
+                            - part_start
+                        ]
+                    )
+            blocks.append(np.concatenate(parts, axis=0))
+        return blocks
+
+    dtypes = [tf.as_dtype(arrays[0].dtype) for arrays in columns]
+    row_shapes = [arrays[0].shape[1:] for arrays in columns]
+
+    def read_block(start: tf.Tensor) -> Union[tf.Tensor, Tuple[tf.Tensor, ...]]:
+        stop = tf.minimum(start + block_size, num_rows[0])
+        blocks = tf.numpy_function(read_rows, [start, stop], dtypes)
+        for block, row_shape in zip(blocks, row_shapes):
+            block.set_shape((None,) + row_shape)
+        return tuple(blocks) if len(blocks) > 1 else blocks[0]
+
+    dataset = tf.data.Dataset.range(0, num_rows[0], block_size)
+    dataset = dataset.shard(num_shards, shard_index)
+    if shuffle_buffer_size:
+        num_blocks = -(-num_rows[0] // block_size)
+        dataset = dataset.shuffle(num_blocks, seed=seed, reshuffle_each_iteration=True)
+    dataset = dataset.map(
+        read_block,
+        num_parallel_calls=num_parallel_reads,
+        deterministic=not shuffle_buffer_size,
+    )
+    dataset = dataset.unbatch()
+    if shuffle_buffer_size:
+        dataset = dataset.shuffle(shuffle_buffer_size, seed=seed)
+    dataset = dataset.batch(batch_size, drop_remainder=drop_remainder)
+    return dataset.prefetch(tf.data.experimental.AUTOTUNE)
@@ -0,0 +1,380 @@
+import functools
+import os
+import tempfile
+from typing import Callable, List, Optional, Tuple
+
+import tensorflow as tf
+
+from libspn_keras import folding
+from libspn_keras.layers.base_leaf import BaseLeaf
+from libspn_keras.layers.conv2d_sum import Conv2DSum
+from libspn_keras.layers.dense_sum import DenseSum
+from libspn_keras.layers.log_dropout import LogDropout
+from libspn_keras.layers.permute_and_pad_scopes import PermuteAndPadScopes
+from libspn_keras.layers.root_sum import RootSum
+from libspn_keras.layers.sparse_dense_sum import SparseDenseSum
+from libspn_keras.models.sequential_spn import (
+    _stats_in_input_layout,
+    SequentialSumProductNetwork,
+)
+from libspn_keras.sum_ops import SumOpGradBackprop
+
+# Computes the output of a layer from its input. The second argument selects max-product
+# evaluation, in which every sum is replaced by a maximum over its weighted children.
+_InferenceFn = Callable[[tf.Tensor, bool], tf.Tensor]
+
+# Only standard ops are used to compute weighted sums of constant log weights
+_SUM_OP = SumOpGradBackprop()
+
+
+def _weighted_max(x: tf.Tensor, log_weights: tf.Tensor) -> tf.Tensor:
+    # x has shape [batch, ..., num_in] and log_weights [..., num_in, num_out]
+    return tf.reduce_max(tf.expand_dims(x, axis=-1) + log_weights, axis=-2)
+
+
+def _log_weights(layer: DenseSum) -> Callable[[], tf.Tensor]:
+    # Returns a function that computes the normalized log weights in the traced graph. Quantized
+    # log weights are kept as 8 bit constants and dequantized in the graph.
+    if layer.quantized_dtype is None:
+        log_weights = tf.constant(
+            layer.sum_op._weights_in_logspace(*layer._sum_weights()).numpy()
+        )
+        return lambda: log_weights
+    quantized = tf.constant(layer._quantized_log_weights.numpy())
+    scale = tf.constant(layer._log_weight_scale.numpy())
+    offset = tf.constant(layer._log_weight_offset.numpy())
+    return lambda: tf.cast(quantized, scale.dtype) * scale + offset
+
+
+def _root_sum_fn(layer: RootSum) -> _InferenceFn:
+    get_log_weights = _log_weights(layer)
+    num_nodes_in = layer._num_nodes_in
+
+    def root_sum(x: tf.Tensor, max_product: bool) -> tf.Tensor:
+        log_weights = get_log_weights()
+        x = tf.reshape(x, (-1, 1, 1, num_nodes_in))
+        if layer.return_weighted_child_logits:
+            out = _SUM_OP.weighted_children(x, log_weights, True, False)
+            return tf.reshape(out, [-1, num_nodes_in])
+        if max_product:
+            return tf.reshape(_weighted_max(x, log_weights), [-1, 1])
+        return tf.reshape(_SUM_OP.weighted_sum(x, log_weights, True, False), [-1, 1])
+
+    return root_sum
+
+
+def _conv2d_sum_fn(layer: Conv2DSum) -> _InferenceFn:
+    get_log_weights = _log_weights(layer)
+
+    def conv2d_sum(x: tf.Tensor, max_product: bool) -> tf.Tensor:
+        log_weights = get_log_weights()
+        if max_product:
+            return _weighted_max(x, log_weights)
+        return _SUM_OP.weighted_conv(x, log_weights, True, False)
+
+    return conv2d_sum
+
+
+def _dense_sum_fn(layer: DenseSum) -> _InferenceFn:
+    # Also covers Local2DSum, whose weights are indexed by spatial cells instead of scopes
+    get_log_weights = _log_weights(layer)
+
+    def dense_sum(x: tf.Tensor, max_product: bool) -> tf.Tensor:
+        log_weights = get_log_weights()
+        if max_product:
+            return _weighted_max(x, log_weights)
+        return _SUM_OP.weighted_sum(x, log_weights, True, False)
+
+    return dense_sum
+
+
+def _sparse_dense_sum_fn(layer: SparseDenseSum) -> _InferenceFn:
+    log_weights = tf.constant(layer._log_weights.numpy())
+
+    def sparse_dense_sum(x: tf.Tensor, max_product: bool) -> tf.Tensor:
+        if not max_product:
+            return layer._weighted_sum(x, log_weights)
+        x = tf.transpose(tf.reshape(x, [-1, layer._num_inputs]))
+        weighted_children = tf.gather(x, layer.child_indices) + tf.expand_dims(
+            log_weights, axis=1
+        )
+        out = tf.math.segment_max(weighted_children, layer.sum_indices)
+        return tf.reshape(
+            tf.transpose(out),
+            [-1, layer.num_scopes, layer.num_decomps, layer.num_sums],
+        )
+
+    return sparse_dense_sum
+
+
+def _leaf_fn(layer: BaseLeaf) -> _InferenceFn:
+    params = {
+        name: tf.constant(tf.convert_to_tensor(param).numpy())
+        for name, param in layer._params().items()
+    }
+
+    def leaf(x: tf.Tensor, max_product: bool) -> tf.Tensor:
+        return layer._log_prob_from_params(x, params)
+
+    return leaf
+
+
+def _permute_and_pad_scopes_fn(layer: PermuteAndPadScopes) -> _InferenceFn:
+    permutations = tf.constant(tf.convert_to_tensor(layer.permutations).numpy())
+
+    def permute_and_pad_scopes(x: tf.Tensor, max_product: bool) -> tf.Tensor:
+        return layer._permute_and_pad(x, permutations)
+
+    return permute_and_pad_scopes
+
+
+def _identity_fn(layer: LogDropout) -> _InferenceFn:
+    return lambda x, max_product: x
+
+
+def _call_fn(layer: tf.keras.layers.Layer) -> _InferenceFn:
+    return lambda x, max_product: layer.call(x)
+
+
+# Layers mapped to a function that creates the inference function of a layer, checked in order,
+# so subclasses must precede their bases. Other layers have no parameters and are called as is.
+_INFERENCE_FNS: List[Tuple[type, Callable[..., _InferenceFn]]] = [
+    (RootSum, _root_sum_fn),
+    (Conv2DSum, _conv2d_sum_fn),
+    (DenseSum, _dense_sum_fn),
+    (SparseDenseSum, _sparse_dense_sum_fn),
+    (BaseLeaf, _leaf_fn),
+    (PermuteAndPadScopes, _permute_and_pad_scopes_fn),
+    (LogDropout, _identity_fn),
+]
+
+
+def _inference_fn(layer: tf.keras.layers.Layer) -> _InferenceFn:
+    for layer_type, make_inference_fn in _INFERENCE_FNS:
+        if isinstance(layer, layer_type):
+            return make_inference_fn(layer)
+    return _call_fn(layer)
+
+
+class InferenceModule(tf.Module):
+    """
+    Inference-only graph of a trained ``SequentialSumProductNetwork``.
+
+    Normalized log weights of sums and parameters of location-scale leaves are baked in as
+    constants, where log weights of quantized sums keep their 8 bit representation, and custom
+    gradients of sum ops and EM leaf wrappers are stripped. The module exposes three functions:
+
+    - ``joint(x)``: log-likelihood of fully observed samples with shape ``[batch]``.
+    - ``marginal(x, evidence)``: log-likelihood of the evidence with all other variables
+      marginalized out, with shape ``[batch]``. ``evidence`` is a boolean mask with the same
+      shape as ``x``.
+    - ``mpe(x, evidence)``: approximate MPE assignment of the variables outside the evidence,
+      computed by backpropagating through the max-product network. Only available if the leaf
+      layer implements ``get_modes``.
+
+    If the model normalizes its inputs with fixed dataset statistics right before a
+    location-scale leaf, the normalization is folded into the parameters of the leaf, see
+    ``libspn_keras.folding.fold_normalization``.
+
+    Args:
+        model: A built ``SequentialSumProductNetwork``.
+        batch_size: Static batch size of the functions. If ``None``, the batch size is variable.
+        fold_normalization: Whether to fold the normalization of inputs into the leaf
+            parameters where possible.
+
+    Raises:
+        ValueError: If the model is not a built ``SequentialSumProductNetwork``, e.g. a
+            ``DynamicSumProductNetwork``.
+    """
+
+    def __init__(
+        self,
+        model: SequentialSumProductNetwork,
+        batch_size: Optional[int] = None,
+        fold_normalization: bool = True,
+    ):
+        super(InferenceModule, self).__init__()
+        if not isinstance(model, SequentialSumProductNetwork) or not model.built:
+            raise ValueError("Can only export a built SequentialSumProductNetwork")
+        if fold_normalization and folding.can_fold_normalization(model):
+            model = folding.fold_normalization(model)
+        model._locate_leaf()
+        self._leaf_index = model._leaf_index
+        self._flat_to_regions_index = model._flat_to_regions_index
+        self._normalize_index = model._normalize_index
+        normalize_layer = model._normalize_layer
+        # Only the call of the layer is kept, so that the module does not track the layer
+        self._normalize = (
+            functools.partial(normalize_layer.call, return_stats=True)
+            if normalize_layer is not None
+            else None
+        )
+        self._normalization_epsilon = (
+            normalize_layer.normalization_epsilon
+            if normalize_layer is not None
+            else None
+        )
+        self._layer_fns = [_inference_fn(layer) for layer in model.layers]
+        # Variables of layers that are called as is, e.g. the kernels of Conv2DProduct layers
+        self._structural_variables = [
+            variable
+            for layer in model.layers
+            if not any(isinstance(layer, t) for t, _ in _INFERENCE_FNS)
+            for variable in layer.weights
+        ]
+
+        input_shape = model.layers[0].input_shape
+        if isinstance(input_shape, list):
+            input_shape = input_shape[0]
+        x_spec = tf.TensorSpec(
+            [batch_size] + list(input_shape[1:]), model.layers[0].dtype, name="x"
+        )
+        evidence_spec = tf.TensorSpec(x_spec.shape, tf.bool, name="evidence")
+        self.joint = tf.function(self._joint, input_signature=[x_spec])
+        self.marginal = tf.function(
+            self._marginal, input_signature=[x_spec, evidence_spec]
+        )
+        self.mpe: Optional[tf.types.experimental.GenericFunction] = None
+        leaf = model._leaf_layer
+        try:
+            self._modes = tf.constant(tf.convert_to_tensor(leaf.get_modes()).numpy())
+        except NotImplementedError:
+            pass
+        else:
+            self.mpe = tf.function(self._mpe, input_signature=[x_spec, evidence_spec])
+
+    @property
+    def signatures(self) -> dict:
+        """
+        Obtain the concrete functions to export as serving signatures.
+
+        Returns:
+            A dict mapping signature keys to concrete functions.
+        """
+        signatures = dict(
+            joint=self.joint.get_concrete_function(),
+            marginal=self.marginal.get_concrete_function(),
+        )
+        if self.mpe is not None:
+            signatures["mpe"] = self.mpe.get_concrete_function()
+        return signatures
+
+    def _forward(
+        self,
+        x: tf.Tensor,
+        evidence: Optional[tf.Tensor] = None,
+        max_product: bool = False,
+        tape: Optional[tf.GradientTape] = None,
+    ) -> Tuple[tf.Tensor, Optional[tf.Tensor], Optional[Tuple[tf.Tensor, tf.Tensor]]]:
+        leaf_out = stats = None
+        raw_x = x
+        for i, layer_fn in enumerate(self._layer_fns):
+            if i == self._flat_to_regions_index and evidence is not None:
+                evidence = layer_fn(evidence, max_product)
+            if i == self._normalize_index:
+                normalized, mean, stddev = self._normalize(x)
+                stats = _stats_in_input_layout(
+                    (mean, stddev),
+                    x,
+                    raw_x,
+                    after_flat_to_regions=self._flat_to_regions_index is not None
+                    and self._flat_to_regions_index < i,
+                )
+                x = normalized
+            else:
+                x = layer_fn(x, max_product)
+            if i == self._leaf_index and evidence is not None:
+                leaf_mask = tf.reduce_all(evidence, axis=-1, keepdims=True)
+                x = leaf_out = tf.where(leaf_mask, x, tf.zeros_like(x))
+                if tape is not None:
+                    tape.watch(leaf_out)
+        return x, leaf_out, stats
+
+    def _joint(self, x: tf.Tensor) -> tf.Tensor:
+        root, _, _ = self._forward(x)
+        return tf.reduce_logsumexp(root, axis=-1)
+
+    def _marginal(self, x: tf.Tensor, evidence: tf.Tensor) -> tf.Tensor:
+        root, _, _ = self._forward(x, evidence)
+        return tf.reduce_logsumexp(root, axis=-1)
+
+    def _mpe(self, x: tf.Tensor, evidence: tf.Tensor) -> tf.Tensor:
+        with tf.GradientTape() as tape:
+            root, leaf_out, stats = self._forward(
+                x, evidence, max_product=True, tape=tape
+            )
+            log_likelihood = tf.reduce_max(root, axis=-1)
+        # Gradients of the max-product network select the maximizing leaf components
+        leaf_grads = tape.gradient(log_likelihood, leaf_out)
+        outputs = tf.reduce_sum(
+            tf.expand_dims(leaf_grads, axis=-1) * self._modes, axis=3
+        )
+        if self._flat_to_regions_index is not None:
+            outputs = tf.reduce_sum(outputs, axis=2)
+        outputs = tf.reshape(outputs, tf.shape(x))
+        if stats is not None:
+            mean, stddev = stats
+            outputs = outputs * (stddev + self._normalization_epsilon) + mean
+        return tf.where(evidence, tf.cast(x, outputs.dtype), outputs)
+
+
+def export_saved_model(
+    model: SequentialSumProductNetwork, export_dir: str
+) -> InferenceModule:
+    """
+    Export an inference-only SavedModel of a trained SPN.
+
+    The SavedModel has the serving signatures ``joint``, ``marginal`` and (if the leaves
+    implement modes) ``mpe``, see ``InferenceModule``.
+
+    Args:
+        model: A built ``SequentialSumProductNetwork``.
+        export_dir: Directory to write the SavedModel to.
+
+    Returns:
+        The exported module.
+    """
+    module = InferenceModule(model)
+    tf.saved_model.save(module, export_dir, signatures=module.signatures)
+    return module
+
+
+def export_tflite(
+    model: SequentialSumProductNetwork,
+    path: Optional[str] = None,
+    batch_size: Optional[int] = 1,
+    allow_select_tf_ops: bool = False,
+) -> bytes:
+    """
+    Export an inference-only TFLite flatbuffer of a trained SPN.
+
+    The flatbuffer holds the signatures of ``export_saved_model``, which can be run with
+    ``tf.lite.Interpreter.get_signature_runner``.
+
+    Args:
+        model: A built ``SequentialSumProductNetwork``.
+        path: Path to write the flatbuffer to. If ``None``, the flatbuffer is only returned.
+        batch_size: Static batch size of the signatures. With a variable batch size (``None``),
+            the backward pass of the ``mpe`` signature requires ``allow_select_tf_ops``.
+        allow_select_tf_ops: Whether to fall back to TensorFlow ops for ops that have no builtin
+            TFLite kernel. This requires the interpreter to link the Flex delegate.
+
+    Returns:
+        The flatbuffer.
+    """
+    module = InferenceModule(model, batch_size=batch_size)
+    with tempfile.TemporaryDirectory() as saved_model_dir:
+        tf.saved_model.save(module, saved_model_dir, signatures=module.signatures)
+        converter = tf.lite.TFLiteConverter.from_saved_model(
+            saved_model_dir, signature_keys=list(module.signatures)
+        )
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS]
+        if allow_select_tf_ops:
+            converter.target_spec.supported_ops.append(tf.lite.OpsSet.SELECT_TF_OPS)
+        flatbuffer = converter.convert()
+
+    if path is not None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(flatbuffer)
+    return flatbuffer
@@ -0,0 +1,137 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
+import tensorflow as tf
+
+from libspn_keras.layers.flat_to_regions import FlatToRegions
+from libspn_keras.layers.location_scale_leaf import LocationScaleLeafBase
+from libspn_keras.models.sequential_spn import SequentialSumProductNetwork
+
+
+def can_fold_normalization(model: SequentialSumProductNetwork) -> bool:
+    """
+    Check whether the normalization of the inputs of an SPN can be folded into its leaves.
+
+    This is the case if a ``NormalizeStandardScore`` layer with dataset statistics is followed
+    by a location-scale leaf layer, either directly or with only a ``FlatToRegions`` layer in
+    between.
+
+    Args:
+        model: A ``SequentialSumProductNetwork``.
+
+    Returns:
+        Whether ``fold_normalization`` applies to the model.
+    """
+    model._locate_leaf()
+    normalize_index = model._normalize_index
+    if normalize_index is None or not model._normalize_layer.dataset_statistics:
+        return False
+    if not isinstance(model._leaf_layer, LocationScaleLeafBase):
+        return False
+    between = model.layers[normalize_index + 1 : model._leaf_index]
+    return (
+        all(isinstance(layer, FlatToRegions) for layer in between) and len(between) <= 1
+    )
+
+
+def _folded_leaf_parameters(
+    model: SequentialSumProductNetwork,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Returns the location, scale and log Jacobian of the leaf for raw inputs, given that
+    # log p((x - mean) / s; loc, scale) = log p(x; mean + loc * s, scale * s) + log(s)
+    normalize_layer = model._normalize_layer
+    mean = tf.expand_dims(normalize_layer.mean, axis=0)
+    stddev = (
+        tf.expand_dims(tf.sqrt(normalize_layer.variance), axis=0)
+        + normalize_layer.normalization_epsilon
+    )
+    for layer in model.layers[model._normalize_index + 1 : model._leaf_index]:
+        # Brings the statistics to the region representation of the inputs of the leaf
+        mean, stddev = layer.call(mean), layer.call(stddev)
+    # Statistics are shared by the components of a variable
+    mean, stddev = tf.expand_dims(mean, axis=-2), tf.expand_dims(stddev, axis=-2)
+
+    leaf = model._leaf_layer
+    distribution = leaf._distribution_from_params(leaf._params())
+    loc = tf.convert_to_tensor(distribution.loc)
+    scale = tf.convert_to_tensor(distribution.scale)
+    log_jacobian = tf.reduce_sum(
+        tf.broadcast_to(tf.math.log(stddev), loc[..., :1, :].shape), axis=-1
+    )
+    if leaf.affine_log_jacobian:
+        log_jacobian += leaf.log_jacobian
+    return (
+        (mean + loc * stddev).numpy(),
+        (scale * stddev).numpy(),
+        log_jacobian.numpy(),
+    )
+
+
+def fold_normalization(
+    model: SequentialSumProductNetwork,
+) -> SequentialSumProductNetwork:
+    """
+    Create an inference copy of a trained SPN whose leaves absorb the normalization of inputs.
+
+    A ``NormalizeStandardScore`` layer with dataset statistics maps every input ``x`` to
+    ``(x - mean) / s`` with ``s = stddev + normalization_epsilon``. For the location-scale
+    leaf that follows it, this is the same as evaluating ``x`` with location
+    ``mean + loc * s`` and scale ``scale * s``, up to the log determinant of the Jacobian of
+    the normalization, ``log(s)`` per variable. The copy drops the normalization layer and
+    replaces the leaf by one with the transformed parameters, which adds the Jacobian term to
+    its log probabilities, so that it computes the same values as the original model without a
+    pass over the inputs to normalize them. Imputed values are in the space of the raw inputs,
+    so they need no denormalization either.
+
+    The leaf of the copy has fixed parameters, so the copy is meant for inference only.
+
+    Args:
+        model: A built ``SequentialSumProductNetwork``.
+
+    Returns:
+        The folded model.
+
+    Raises:
+        ValueError: If the model is not built or if its normalization cannot be folded, see
+            ``can_fold_normalization``.
+    """
+    if not model.built:
+        raise ValueError("Can only fold the normalization of a built model")
+    if not can_fold_normalization(model):
+        raise ValueError(
+            "Can only fold a NormalizeStandardScore layer with dataset statistics that is "
+            "followed by a location-scale leaf layer"
+        )
+    loc, scale, log_jacobian = _folded_leaf_parameters(model)
+    layers: List[tf.keras.layers.Layer] = []
+    weights: Dict[str, List[np.ndarray]] = {}
+    for i, layer in enumerate(model.layers):
+        if i == model._normalize_index:
+            continue
+        if i == model._leaf_index:
+            layer = layer.__class__.from_config(
+                dict(
+                    layer.get_config(),
+                    use_accumulators=False,
+                    location_trainable=False,
+                    scale_trainable=False,
+                    affine_log_jacobian=True,
+                )
+            )
+            weights[layer.name] = [loc, scale, log_jacobian]
+        else:
+            weights[layer.name] = layer.get_weights()
+            layer = layer.__class__.from_config(layer.get_config())
+        layers.append(layer)
+
+    folded_model = type(model)(
+        layers,
+        infer_no_evidence=model.infer_no_evidence,
+        unsupervised=model.unsupervised,
+        name=model.name,
+    )
+    if not folded_model.built:
+        folded_model.build(model.input_shape)
+    for layer in folded_model.layers:
+        layer.set_weights(weights[layer.name])
+    return folded_model
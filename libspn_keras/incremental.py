@@ -0,0 +1,388 @@
+import functools
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple, Type
+
+import numpy as np
+import tensorflow as tf
+from tensorflow import keras
+
+from libspn_keras.layers.base_leaf import BaseLeaf
+from libspn_keras.layers.conv2d_sum import Conv2DSum
+from libspn_keras.layers.dense_product import DenseProduct
+from libspn_keras.layers.dense_sum import DenseSum
+from libspn_keras.layers.flat_to_regions import FlatToRegions
+from libspn_keras.layers.local2d_sum import Local2DSum
+from libspn_keras.layers.log_dropout import LogDropout
+from libspn_keras.layers.permute_and_pad_scopes import PermuteAndPadScopes
+from libspn_keras.layers.reduce_product import ReduceProduct
+from libspn_keras.layers.root_sum import RootSum
+
+# Evaluates a layer for a subset of its output regions, given the layer, the inputs of those
+# regions with shape [batch, num_regions, num_children, num_nodes_in] and the flat indices of
+# the regions. Returns a Tensor with shape [batch, num_regions, num_nodes_out].
+_PartialCall = Callable[[keras.layers.Layer, tf.Tensor, np.ndarray], tf.Tensor]
+
+# Returns the flat indices of the input regions of every output region with shape
+# [num_regions_out, num_children], where -1 denotes a padded child, given the layer and the
+# shapes of its input and output.
+_RegionChildren = Callable[
+    [keras.layers.Layer, Tuple[int, ...], Tuple[int, ...]], np.ndarray
+]
+
+
+class _IncrementalStep(NamedTuple):
+    layer: keras.layers.Layer
+    children: np.ndarray
+    parent_offsets: np.ndarray
+    parents: np.ndarray
+    partial_call: _PartialCall
+
+
+def _region_indices(regions: np.ndarray, num_decomps: int) -> tf.Tensor:
+    return tf.constant(np.stack(np.divmod(regions, num_decomps), axis=1))
+
+
+def _same_region(
+    layer: keras.layers.Layer, input_shape: Tuple[int, ...], _: Tuple[int, ...]
+) -> np.ndarray:
+    return np.arange(int(np.prod(input_shape[1:-1])))[:, np.newaxis]
+
+
+def _flat_to_regions_children(
+    layer: FlatToRegions, input_shape: Tuple[int, ...], _: Tuple[int, ...]
+) -> np.ndarray:
+    # The raw input holds a region per variable, which is shared by all decompositions
+    return np.repeat(np.arange(input_shape[1]), layer.num_decomps)[:, np.newaxis]
+
+
+def _permute_and_pad_scopes_children(
+    layer: PermuteAndPadScopes, input_shape: Tuple[int, ...], _: Tuple[int, ...]
+) -> np.ndarray:
+    permutations = np.asarray(layer.permutations)
+    num_decomps = input_shape[2]
+    children = np.where(
+        permutations >= 0,
+        permutations * num_decomps + np.arange(num_decomps)[:, np.newaxis],
+        -1,
+    )
+    return np.transpose(children).reshape(-1, 1)
+
+
+def _product_children(
+    layer: keras.layers.Layer, input_shape: Tuple[int, ...], _: Tuple[int, ...]
+) -> np.ndarray:
+    _, num_scopes_in, num_decomps, _ = input_shape
+    scopes = np.arange(num_scopes_in).reshape(-1, 1, layer.num_factors)
+    decomps = np.arange(num_decomps).reshape(1, -1, 1)
+    return (scopes * num_decomps + decomps).reshape(-1, layer.num_factors)
+
+
+def _root_sum_children(
+    layer: RootSum, input_shape: Tuple[int, ...], _: Tuple[int, ...]
+) -> np.ndarray:
+    return np.arange(input_shape[2])[np.newaxis]
+
+
+def _call_identity(
+    layer: keras.layers.Layer, x: tf.Tensor, regions: np.ndarray
+) -> tf.Tensor:
+    return x[:, :, 0]
+
+
+def _call_leaf(layer: BaseLeaf, x: tf.Tensor, regions: np.ndarray) -> tf.Tensor:
+    return layer.partial_call(x[:, :, 0], _region_indices(regions, layer._num_decomps))
+
+
+def _call_dense_product(
+    layer: DenseProduct, x: tf.Tensor, regions: np.ndarray
+) -> tf.Tensor:
+    # Outer sum of the factors, where the first factor varies slowest as in DenseProduct
+    out = x[:, :, 0]
+    for i in range(1, layer.num_factors):
+        out = tf.expand_dims(out, axis=-1) + tf.expand_dims(x[:, :, i], axis=-2)
+        out = tf.reshape(out, [-1, len(regions), out.shape[-2] * out.shape[-1]])
+    return out
+
+
+def _call_reduce_product(
+    layer: ReduceProduct, x: tf.Tensor, regions: np.ndarray
+) -> tf.Tensor:
+    return tf.reduce_sum(x, axis=2)
+
+
+def _call_dense_sum(layer: DenseSum, x: tf.Tensor, regions: np.ndarray) -> tf.Tensor:
+    accumulators, logspace_accumulators, normalize = layer._sum_weights()
+    region_indices = _region_indices(regions, layer._num_decomps)
+    # Regions take the place of scopes, with a single decomposition
+    accumulators = tf.expand_dims(tf.gather_nd(accumulators, region_indices), axis=1)
+    out = layer.sum_op.weighted_sum(x, accumulators, logspace_accumulators, normalize)
+    return out[:, :, 0]
+
+
+def _call_root_sum(layer: RootSum, x: tf.Tensor, regions: np.ndarray) -> tf.Tensor:
+    return tf.expand_dims(layer.call(x), axis=1)
+
+
+# Layers that can be evaluated for a subset of their output regions, mapped to the children of
+# the regions and to the partial evaluation, or to None for layers that pass their input
+# through in inference. Checked in order, so subclasses must precede their bases.
+_INCREMENTAL_STEPS: List[
+    Tuple[Type[keras.layers.Layer], Optional[Tuple[_RegionChildren, _PartialCall]]]
+] = [
+    (LogDropout, None),
+    (FlatToRegions, (_flat_to_regions_children, _call_identity)),
+    (BaseLeaf, (_same_region, _call_leaf)),
+    (PermuteAndPadScopes, (_permute_and_pad_scopes_children, _call_identity)),
+    (DenseProduct, (_product_children, _call_dense_product)),
+    (ReduceProduct, (_product_children, _call_reduce_product)),
+    (RootSum, (_root_sum_children, _call_root_sum)),
+    (DenseSum, (_same_region, _call_dense_sum)),
+]
+
+
+def _is_supported(layer: keras.layers.Layer) -> bool:
+    if isinstance(layer, DenseProduct) and layer.product_indices is not None:
+        return False
+    # Spatial sums subclass DenseSum, but have no regions
+    if isinstance(layer, (Conv2DSum, Local2DSum)):
+        return False
+    return any(isinstance(layer, layer_type) for layer_type, _ in _INCREMENTAL_STEPS)
+
+
+def _incremental_step(
+    layer: keras.layers.Layer,
+    input_shape: Tuple[int, ...],
+    output_shape: Tuple[int, ...],
+) -> Optional[_IncrementalStep]:
+    for layer_type, step in _INCREMENTAL_STEPS:
+        if not isinstance(layer, layer_type):
+            continue
+        if step is None:
+            return None
+        region_children, partial_call = step
+        children = region_children(layer, input_shape, output_shape)
+        # Parents of every input region in compressed sparse row format
+        parent_regions, _ = np.nonzero(children >= 0)
+        child_regions = children[children >= 0]
+        order = np.argsort(child_regions, kind="stable")
+        parent_offsets = np.searchsorted(
+            child_regions[order], np.arange(int(np.prod(input_shape[1:-1])) + 1)
+        )
+        return _IncrementalStep(
+            layer, children, parent_offsets, parent_regions[order], partial_call
+        )
+    raise ValueError(
+        "Cannot evaluate a {} incrementally".format(layer.__class__.__name__)
+    )
+
+
+class IncrementalEvaluator:
+    """
+    Re-evaluates an SPN after a few input variables of a base input have changed.
+
+    The evaluator caches the output of every layer for a base input. When only a few variables
+    change, only the regions whose scope contains one of those variables have a different
+    output, which follows from the region structure and the scope permutations of the SPN. The
+    evaluator recomputes only those regions, layer by layer, and takes the outputs of all other
+    regions from the cache. The regions to recompute are determined once per set of changed
+    variables. This makes the cost of re-scoring proportional to the depth of the
+    SPN and the number of decompositions, rather than to its size, which suits interactive
+    what-if analysis.
+
+    Results equal those of the model in inference mode. Supported are region SPNs built from
+    ``FlatToRegions``, leaf, ``PermuteAndPadScopes``, ``DenseProduct``, ``ReduceProduct``,
+    ``DenseSum``, ``RootSum`` and ``LogDropout`` layers. Leaves must implement
+    ``BaseLeaf.partial_call``, which ``IndicatorLeaf`` and the location-scale leaves do.
+
+    Args:
+        model: A built sequential region SPN.
+        x: Base input with shape ``[batch, num_vars]`` or
+            ``[batch, num_vars, var_dimensionality]``.
+        use_tf_function: If ``True``, the re-evaluation for a set of changed variables is
+            traced to a ``tf.function`` the first time that set changes, which pays off when the
+            same variables are changed repeatedly. If ``False``, re-evaluation runs eagerly.
+
+    Raises:
+        ValueError: If the model contains layers that cannot be evaluated incrementally.
+    """
+
+    def __init__(
+        self, model: keras.Sequential, x: tf.Tensor, use_tf_function: bool = True
+    ):
+        unsupported = [
+            layer.__class__.__name__
+            for layer in model.layers
+            if not _is_supported(layer)
+        ]
+        if unsupported:
+            raise ValueError(
+                "Cannot evaluate layers incrementally: {}".format(
+                    ", ".join(unsupported)
+                )
+            )
+        self.model = model
+        self.use_tf_function = use_tf_function
+        self._compiled: Dict[
+            Tuple[int, ...], Tuple[List[np.ndarray], Callable[..., List[tf.Tensor]]],
+        ] = {}
+        self.set_base(x)
+        self._steps = [
+            _incremental_step(layer, tuple(input_.shape), tuple(output.shape))
+            for layer, input_, output in zip(
+                model.layers, self._base_outputs, self._base_outputs[1:]
+            )
+        ]
+
+    def set_base(self, x: tf.Tensor) -> tf.Tensor:
+        """
+        Evaluate the model for a new base input and cache the outputs of all layers.
+
+        Args:
+            x: Base input with the same shape as the base input of the constructor.
+
+        Returns:
+            The output of the model for the base input.
+        """
+        x = tf.convert_to_tensor(x)
+        if len(x.shape) == 2:
+            x = tf.expand_dims(x, axis=-1)
+        self._base_outputs = [x]
+        for layer in self.model.layers:
+            self._base_outputs.append(layer(self._base_outputs[-1], training=False))
+        # Regions are the outer axis of the cache, so that they are gathered and updated as
+        # contiguous rows
+        self._cache = [self._to_regions(output) for output in self._base_outputs]
+        return self._base_outputs[-1]
+
+    @staticmethod
+    def _to_regions(x: tf.Tensor) -> tf.Tensor:
+        x = tf.reshape(x, [x.shape[0], -1, x.shape[-1]])
+        return tf.transpose(x, [1, 0, 2])
+
+    def _compile(
+        self, variables: Sequence[int]
+    ) -> Tuple[
+        List[np.ndarray], Callable[[tf.Tensor, List[tf.Tensor]], List[tf.Tensor]]
+    ]:
+        # Returns the changed regions of the input and of the output of every layer, and a
+        # function that computes their values with shape [num_regions, batch, num_nodes] from the
+        # new values of the variables and the cache. Both only depend on the changed variables,
+        # so that they are reused when the same variables change again.
+        key = tuple(int(v) for v in variables)
+        if key not in self._compiled:
+            variables = np.asarray(key, dtype=np.int64)
+            order = np.argsort(variables)
+            regions = [variables[order]]
+            gathers: List[Optional[Tuple[np.ndarray, ...]]] = []
+            for step in self._steps:
+                if step is None or len(regions[-1]) == 0:
+                    gathers.append(None)
+                    regions.append(regions[-1])
+                    continue
+                parent_regions, *gather = self._step_indices(step, regions[-1])
+                gathers.append(tuple(gather))
+                regions.append(parent_regions)
+            propagate = functools.partial(self._propagate, order, regions, gathers)
+            if self.use_tf_function:
+                propagate = tf.function(propagate)
+            self._compiled[key] = regions, propagate
+        return self._compiled[key]
+
+    @staticmethod
+    def _step_indices(
+        step: _IncrementalStep, regions: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        # Returns the changed output regions of a step, and for all of their children the
+        # position among the changed input regions, whether they changed and their index
+        parent_regions = np.unique(
+            np.concatenate(
+                [
+                    step.parents[step.parent_offsets[r] : step.parent_offsets[r + 1]]
+                    for r in regions
+                ]
+            )
+        ).astype(np.int64)
+        children = step.children[parent_regions]
+        position = np.minimum(np.searchsorted(regions, children), len(regions) - 1)
+        is_changed = regions[position] == children
+        # Children of changed regions are never padded, so clipping only affects unchanged ones
+        return parent_regions, position, is_changed, np.maximum(children, 0)
+
+    def _propagate(
+        self,
+        order: np.ndarray,
+        regions: List[np.ndarray],
+        gathers: List[Optional[Tuple[np.ndarray, ...]]],
+        values: tf.Tensor,
+        cache: List[tf.Tensor],
+    ) -> List[tf.Tensor]:
+        values = tf.reshape(
+            tf.cast(values, cache[0].dtype), [-1, len(order), cache[0].shape[-1]]
+        )
+        values = tf.gather(tf.transpose(values, [1, 0, 2]), order)
+        changes = [values]
+        for step, gather, step_regions, step_cache in zip(
+            self._steps, gathers, regions[1:], cache
+        ):
+            if gather is not None:
+                position, is_changed, children = gather
+                children_out = tf.where(
+                    is_changed[..., np.newaxis, np.newaxis],
+                    tf.gather(values, position),
+                    tf.gather(step_cache, children),
+                )
+                out = step.partial_call(
+                    step.layer, tf.transpose(children_out, [2, 0, 1, 3]), step_regions
+                )
+                values = tf.transpose(out, [1, 0, 2])
+            changes.append(values)
+        return changes
+
+    def evaluate(self, variables: Sequence[int], values: tf.Tensor) -> tf.Tensor:
+        """
+        Evaluate the model for the base input with some of its variables changed.
+
+        The cached base input is left untouched.
+
+        Args:
+            variables: Indices of the changed variables.
+            values: New values of the changed variables with shape ``[batch, len(variables)]``
+                or ``[batch, len(variables), var_dimensionality]``.
+
+        Returns:
+            The output of the model for the changed input.
+        """
+        regions, propagate = self._compile(variables)
+        values = propagate(values, self._cache)
+        return self._updated_output(len(self._cache) - 1, regions[-1], values[-1])
+
+    def update(self, variables: Sequence[int], values: tf.Tensor) -> tf.Tensor:
+        """
+        Change some variables of the base input and update the cache accordingly.
+
+        Args:
+            variables: Indices of the changed variables.
+            values: New values of the changed variables with shape ``[batch, len(variables)]``
+                or ``[batch, len(variables), var_dimensionality]``.
+
+        Returns:
+            The output of the model for the new base input.
+        """
+        regions, propagate = self._compile(variables)
+        changes = zip(regions, propagate(values, self._cache))
+        for i, (regions, values) in enumerate(changes):
+            self._base_outputs[i] = self._updated_output(i, regions, values)
+            self._cache[i] = self._to_regions(self._base_outputs[i])
+        return self._base_outputs[-1]
+
+    def _updated_output(
+        self, index: int, regions: np.ndarray, values: tf.Tensor
+    ) -> tf.Tensor:
+        if len(regions) == 0:
+            # Changed regions can be padded away by a permutation
+            return self._base_outputs[index]
+        cache = tf.tensor_scatter_nd_update(
+            self._cache[index], regions[:, np.newaxis], values
+        )
+        return tf.reshape(
+            tf.transpose(cache, [1, 0, 2]), tf.shape(self._base_outputs[index])
+        )
@@ -1,8 +1,14 @@
-from libspn_keras.initializers.dirichlet import Dirichlet
-from libspn_keras.initializers.epsilon_inverse_fan_in import EpsilonInverseFanIn
-from libspn_keras.initializers.equidistant import Equidistant
-from libspn_keras.initializers.kmeans import KMeans
-from libspn_keras.initializers.poon_domingos import PoonDomingosMeanOfQuantileSplit
+from libspn_keras.lazy_loader import lazy_attributes
+
+_LAZY_ATTRIBUTES = {
+    "Dirichlet": "libspn_keras.initializers.dirichlet",
+    "EpsilonInverseFanIn": "libspn_keras.initializers.epsilon_inverse_fan_in",
+    "Equidistant": "libspn_keras.initializers.equidistant",
+    "KMeans": "libspn_keras.initializers.kmeans",
+    "PoonDomingosMeanOfQuantileSplit": "libspn_keras.initializers.poon_domingos",
+}
+
+__getattr__, __dir__ = lazy_attributes(__name__, _LAZY_ATTRIBUTES)
 
 __all__ = [
     "Dirichlet",
@@ -0,0 +1,36 @@
+from typing import Iterable, Iterator, Union
+
+import numpy as np
+import tensorflow as tf
+
+
+DataSource = Union[np.ndarray, tf.Tensor, tf.data.Dataset, Iterable[np.ndarray]]
+
+
+def iterate_data_chunks(
+    data: DataSource, chunk_size: int = 2048
+) -> Iterator[np.ndarray]:
+    """
+    Iterate over a data source in chunks of samples, so that it never has to be in memory at once.
+
+    Args:
+        data: Either an array or ``Tensor`` with samples on the first axis, a ``tf.data.Dataset``
+            that yields batches of samples or an iterable of arrays with samples on the first axis.
+            If the elements of a dataset are tuples (e.g. data and labels), only the first element
+            is used. Iterables are iterated over once per call, so use e.g. a list of arrays rather
+            than a generator if the data needs to be visited more than once.
+        chunk_size: Number of samples per chunk. Only used for arrays and ``Tensor``s, datasets
+            and iterables are consumed in the chunks that they yield.
+
+    Yields:
+        Chunks of samples as NumPy arrays.
+    """
+    if isinstance(data, (np.ndarray, tf.Tensor)):
+        for start in range(0, len(data), chunk_size):
+            yield np.asarray(data[start : start + chunk_size])
+        return
+
+    for chunk in data:
+        if isinstance(chunk, (tuple, list)):
+            chunk = chunk[0]
+        yield np.asarray(chunk)
@@ -2,7 +2,6 @@ from typing import Optional, Tuple
 
 import tensorflow as tf
 from tensorflow.keras import initializers
-from tensorflow_probability import distributions
 
 
 class Dirichlet(initializers.Initializer):
@@ -42,8 +41,12 @@ class Dirichlet(initializers.Initializer):
             if tf.size(alpha_as_tensor) == 1
             else alpha_as_tensor
         )
-        dirichlet_sample = distributions.Dirichlet(concentration=alpha).sample(
-            [dim for i, dim in enumerate(shape) if i != axis]
+        # A Dirichlet sample is obtained by normalizing independent Gamma samples
+        gamma_sample = tf.random.gamma(
+            [dim for i, dim in enumerate(shape) if i != axis], alpha=alpha
+        )
+        dirichlet_sample = gamma_sample / tf.reduce_sum(
+            gamma_sample, axis=-1, keepdims=True
         )
 
         perm = [
@@ -1,8 +1,12 @@
 from typing import Optional, Tuple
 
+import numpy as np
 import tensorflow as tf
 from tensorflow.keras import initializers
 
+from libspn_keras.initializers.data_utils import DataSource, iterate_data_chunks
+from libspn_keras.math.quantile_sketch import QuantileSketch
+
 
 class Equidistant(initializers.Initializer):
     """
@@ -13,11 +17,31 @@ class Equidistant(initializers.Initializer):
         of random values to generate.
       maxval: A python scalar or a scalar tensor. Upper bound of the range
         of random values to generate.  Defaults to 1 for float types.
+      data: If provided, ``minval`` and ``maxval`` are ignored and the range is
+        determined from the data instead. Either an array, a ``tf.data.Dataset``
+        that yields batches or an iterable of arrays. See ``iterate_data_chunks``
+        for details. The data is visited once and does not need to fit in memory.
+        The computed range replaces ``minval`` and ``maxval``, so that it is kept by
+        ``get_config``.
+      data_quantiles: Quantiles of all values in ``data`` to use as the bounds of
+        the range. Use e.g. ``(0.01, 0.99)`` to ignore outliers.
+      sketch_size: Maximum number of centroids in the quantile sketch used to
+        estimate ``data_quantiles``.
     """
 
-    def __init__(self, minval: float = 0.0, maxval: float = 1.0):
+    def __init__(
+        self,
+        minval: float = 0.0,
+        maxval: float = 1.0,
+        data: Optional[DataSource] = None,
+        data_quantiles: Tuple[float, float] = (0.0, 1.0),
+        sketch_size: int = 1024,
+    ):
         self.minval = minval
         self.maxval = maxval
+        self._data = data
+        self.data_quantiles = data_quantiles
+        self.sketch_size = sketch_size
 
     def __call__(
         self, shape: Tuple[Optional[int], ...], dtype: Optional[tf.DType] = None
@@ -33,15 +57,15 @@ class Equidistant(initializers.Initializer):
             Initial value.
 
         Raises:
-            ValueError: If shape cannot be determined.
+            ValueError: If shape cannot be determined or if ``data`` is empty.
         """
         rank = len(shape)
         last_dim = shape[-1]
         if last_dim is None:
             raise ValueError("Cannot compute Equidistant with unknown last dimension")
+        minval, maxval = self._range()
         linspace = tf.reshape(
-            tf.linspace(self.minval, self.maxval, num=last_dim),
-            [1] * (rank - 1) + [last_dim],
+            tf.linspace(minval, maxval, num=last_dim), [1] * (rank - 1) + [last_dim],
         )
         return tf.cast(
             tf.tile(linspace, tf.concat([shape[:-1], [1]], axis=0)), dtype=dtype
@@ -54,4 +78,25 @@ class Equidistant(initializers.Initializer):
         Returns:
             Key-value mapping of the configuration.
         """
-        return {"minval": self.minval, "maxval": self.maxval}
+        return {
+            "minval": self.minval,
+            "maxval": self.maxval,
+            "data_quantiles": self.data_quantiles,
+            "sketch_size": self.sketch_size,
+        }
+
+    def _range(self) -> Tuple[float, float]:
+        if self._data is None:
+            return self.minval, self.maxval
+        sketch = QuantileSketch(max_centroids=self.sketch_size)
+        num_values = 0
+        for chunk in iterate_data_chunks(self._data):
+            sketch.update(np.reshape(chunk, (-1, 1)))
+            num_values += np.size(chunk)
+        if num_values == 0:
+            raise ValueError("Cannot compute Equidistant range from empty data")
+        minval, maxval = sketch.quantiles(self.data_quantiles)[:, 0]
+        # The data is not visited again, which also supports one-shot iterators
+        self.minval, self.maxval = float(minval), float(maxval)
+        self._data = None
+        return self.minval, self.maxval
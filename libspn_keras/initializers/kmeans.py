@@ -1,10 +1,12 @@
-import itertools
-from typing import Any, List, Optional, Tuple
+from typing import Callable, Iterator, Optional, Tuple
 
 import numpy as np
 import tensorflow as tf
 from tensorflow.keras import initializers
 
+from libspn_keras.initializers.data_utils import DataSource, iterate_data_chunks
+from libspn_keras.math.assignment import batched_linear_assignment
+
 
 class KMeans(initializers.Initializer):
     """
@@ -14,20 +16,29 @@ class KMeans(initializers.Initializer):
     leaf, such as a ``NormalLeaf``. This is particularly useful for variables with dimensionality of
     greater than 1.
 
+    Data is processed in chunks, so that it does not need to fit in memory. Every iteration of
+    K-means streams over the (subsampled) data once, accumulating per-cluster sums and counts
+    for all scopes at once. Alternatively, mini-batch K-means can be used, which updates the
+    centroids after every mini-batch and needs only a single pass over a part of the data.
 
     Notes:
         Currently only works for spatial SPNs.
 
     Args:
-        data (numpy.ndarray): Data on which to perform K-means.
+        data: Data on which to perform K-means. Either an array, a ``tf.data.Dataset`` that yields
+            batches or an iterable of arrays that can be iterated over multiple times, such as a
+            list. One-shot iterators and generators are not supported, since K-means passes over
+            the data more than once. See ``iterate_data_chunks`` for details.
         samplewise_normalization (bool): Whether to normalize data before learning centroids.
         data_fraction (float): Fraction of the data to use for K-means (chosen randomly)
         normalization_epsilon (float): Normalization constant (only used when
             ``sample_normalization`` is ``True``.
         stop_epsilon: Non-zero constant for difference in MSE on which to stop K-means fitting.
-        num_iters (int): Maximum number of iterations.
+        num_iters (int): Maximum number of iterations. When using mini-batch K-means, this is the
+            number of mini-batches.
         group_centroids (bool): If ``True``, performs another round of K-means to group the
-            centroids along the scope axes.
+            centroids along the scope axes. Centroids are matched one-to-one to the group
+            centroids by solving a linear assignment problem for every scope.
         max_num_clusters (int): Maximum number of clusters (use this to limit the memory needed)
         jitter_factor (float): If the number of clusters is larger than allowed according to
             ``max_num_clusters``, the learned ``max_num_clusters`` centroids are repeated and
@@ -35,12 +46,19 @@ class KMeans(initializers.Initializer):
             standard deviation of ``jitter_factor``
         centroid_initialization (str): Centroid initialization algorithm. If ``"kmeans++"``, will
             iteratively initialize clusters far apart from each other. Otherwise, the centroids
-            will be initialized from the data randomly.
+            will be initialized from the data randomly. Centroids are initialized from the first
+            ``chunk_size`` samples of the data.
+        chunk_size (int): Number of samples per chunk when ``data`` is an array. Bounds the memory
+            needed for computing distances to centroids.
+        mini_batch_size (int): If given, runs mini-batch K-means with mini-batches of this size
+            instead of full-batch K-means. Every centroid is moved towards the mean of its
+            assigned samples with a learning rate of one over the number of samples assigned to
+            it so far.
     """
 
     def __init__(
         self,
-        data: Optional[np.ndarray] = None,
+        data: Optional[DataSource] = None,
         samplewise_normalization: bool = True,
         data_fraction: float = 0.2,
         normalization_epsilon: float = 1e-2,
@@ -52,6 +70,8 @@ class KMeans(initializers.Initializer):
         centroid_initialization: str = "kmeans++",
         downsample: Optional[int] = None,
         use_groups: bool = False,
+        chunk_size: int = 2048,
+        mini_batch_size: Optional[int] = None,
     ):
         self._data = data
         self.samplewise_normalization = samplewise_normalization
@@ -65,6 +85,8 @@ class KMeans(initializers.Initializer):
         self.centroid_initialization = centroid_initialization
         self.downsample = downsample
         self.use_groups = use_groups
+        self.chunk_size = chunk_size
+        self.mini_batch_size = mini_batch_size
 
     def __call__(  # noqa: C901
         self, shape: Tuple[Optional[int], ...], dtype: Optional[tf.dtypes.DType] = None
@@ -82,8 +104,7 @@ class KMeans(initializers.Initializer):
         Raises:
             ValueError: If shape cannot be determined.
         """
-        data = self._data
-        if data is None:
+        if self._data is None:
             raise ValueError(
                 "Cannot compute KMeans initialization without provided data"
             )
@@ -92,10 +113,6 @@ class KMeans(initializers.Initializer):
             raise ValueError("Unknown height")
         if width is None:
             raise ValueError("Unknown width")
-        if self.downsample is not None:
-            data = tf.image.resize(
-                data, size=(height // self.downsample, width // self.downsample)
-            ).numpy()
 
         num_components = shape[-2]
         if num_components is None:
@@ -108,28 +125,25 @@ class KMeans(initializers.Initializer):
                 "Number of components must be multiple of max number of clusters"
             )
 
-        if self.samplewise_normalization:
-            axes = tuple(range(1, len(data.shape)))
-            data = (data - tf.reduce_mean(data, axis=axes, keepdims=True)) / (
-                tf.math.reduce_std(data, axis=axes, keepdims=True)
-                + self.normalization_epsilon
-            )
-            data = data.numpy()
-
-        batch_size, *middle_dims, dimensionality = data.shape
-
-        fraction_size = int(len(data) * self.data_fraction)
-        indices = np.random.choice(np.arange(len(data)), size=fraction_size)
+        num_clusters = min(self.max_num_clusters, num_components)
+        # Every pass over the data draws the same subsample when the data is visited in the
+        # same order
+        subsample_seed = np.random.randint(2 ** 31 - 1)
 
-        data_by_kmeans_problem = (
-            data[indices]
-            .reshape([fraction_size, -1, dimensionality])
-            .transpose((1, 0, 2))
-            .astype(np.float32)
-        )
+        def data_by_kmeans_problem() -> Iterator[np.ndarray]:
+            return self._iterate_kmeans_problems(
+                height, width, np.random.RandomState(subsample_seed)
+            )
 
-        num_clusters = min(self.max_num_clusters, num_components)
-        centroids = self._kmeans_tf(data_by_kmeans_problem, num_clusters=num_clusters)
+        centroids = self._initialize_centroids(data_by_kmeans_problem(), num_clusters)
+        if self.mini_batch_size is None:
+            centroids = self._kmeans_full_batch(
+                data_by_kmeans_problem, centroids, num_clusters
+            )
+        else:
+            centroids = self._kmeans_mini_batch(
+                data_by_kmeans_problem, centroids, num_clusters
+            )
 
         if self.group_centroids:
             centroids = self._group_centroids(centroids, num_clusters)
@@ -187,9 +201,50 @@ class KMeans(initializers.Initializer):
             "num_iters": self.num_iters,
             "stop_epsilon": self.stop_epsilon,
             "group_centroids": self.group_centroids,
+            "chunk_size": self.chunk_size,
+            "mini_batch_size": self.mini_batch_size,
         }
 
-    def _kmeans_tf(self, data: np.ndarray, num_clusters: int) -> tf.Tensor:
+    def _iterate_kmeans_problems(
+        self, height: int, width: int, random_state: np.random.RandomState
+    ) -> Iterator[np.ndarray]:
+        # Yields chunks of shape [num_problems, num_samples, num_dims], where every spatial
+        # location is a separate K-means problem
+        for chunk in iterate_data_chunks(self._data, chunk_size=self.chunk_size):
+            if self.data_fraction < 1.0:
+                chunk = chunk[
+                    random_state.uniform(size=len(chunk)) < self.data_fraction
+                ]
+                if len(chunk) == 0:
+                    continue
+            if self.downsample is not None:
+                chunk = tf.image.resize(
+                    chunk, size=(height // self.downsample, width // self.downsample)
+                ).numpy()
+            if self.samplewise_normalization:
+                axes = tuple(range(1, len(chunk.shape)))
+                chunk = (chunk - tf.reduce_mean(chunk, axis=axes, keepdims=True)) / (
+                    tf.math.reduce_std(chunk, axis=axes, keepdims=True)
+                    + self.normalization_epsilon
+                )
+                chunk = chunk.numpy()
+            num_samples, *middle_dims, dimensionality = chunk.shape
+            yield chunk.reshape([num_samples, -1, dimensionality]).transpose(
+                (1, 0, 2)
+            ).astype(np.float32)
+
+    def _initialize_centroids(
+        self, data_by_kmeans_problem: Iterator[np.ndarray], num_clusters: int
+    ) -> tf.Tensor:
+        chunks, num_samples = [], 0
+        for chunk in data_by_kmeans_problem:
+            chunks.append(chunk)
+            num_samples += chunk.shape[1]
+            if num_samples >= max(self.chunk_size, num_clusters):
+                break
+        if not chunks:
+            raise ValueError("Cannot compute KMeans initialization from empty data")
+        data = tf.constant(np.concatenate(chunks, axis=1))
 
         num_problems, num_batch, num_dims = data.shape
         if self.centroid_initialization == "kmeans++":
@@ -201,13 +256,9 @@ class KMeans(initializers.Initializer):
             )
 
             for _ in tf.range(num_clusters - 1):
-                distances = tf.reduce_sum(
-                    tf.math.squared_difference(
-                        tf.expand_dims(centroids, axis=2), tf.expand_dims(data, axis=1)
-                    ),
-                    axis=-1,
+                min_distances = tf.reduce_min(
+                    _squared_distances(data, centroids), axis=2
                 )
-                min_distances = tf.reduce_min(distances, axis=1)
                 logits = tf.math.log(min_distances)
                 indices = tf.random.categorical(logits=logits, num_samples=1)
                 new_centroids = tf.gather(data, indices, axis=1, batch_dims=1)
@@ -221,15 +272,65 @@ class KMeans(initializers.Initializer):
             centroids += tf.random.normal(
                 centroids.shape, stddev=0.05, dtype=centroids.dtype
             )
+        return centroids
 
+    def _kmeans_full_batch(
+        self,
+        data_by_kmeans_problem: Callable[[], Iterator[np.ndarray]],
+        centroids: tf.Tensor,
+        num_clusters: int,
+    ) -> tf.Tensor:
         mse = None
         for _ in range(self.num_iters):
-            centroids, mse_new = self._kmeans_step(data, centroids, num_clusters)
-            if mse is not None and tf.abs(mse - mse_new) < self.stop_epsilon:
+            sums = tf.zeros_like(centroids)
+            counts = tf.zeros_like(centroids[..., :1])
+            sum_of_min_distances, num_samples = 0.0, 0
+            for chunk in data_by_kmeans_problem():
+                chunk_sums, chunk_counts, chunk_min_distances = _cluster_statistics(
+                    chunk, centroids, num_clusters
+                )
+                sums += chunk_sums
+                counts += chunk_counts
+                sum_of_min_distances += float(chunk_min_distances)
+                num_samples += chunk.shape[0] * chunk.shape[1]
+            if num_samples == 0:
+                raise _one_shot_data_error()
+            # Empty clusters keep their centroid
+            centroids = tf.where(counts > 0, sums / tf.maximum(counts, 1.0), centroids)
+            mse_new = sum_of_min_distances / num_samples
+            if mse is not None and abs(mse - mse_new) < self.stop_epsilon:
                 break
             mse = mse_new
         return centroids
 
+    def _kmeans_mini_batch(
+        self,
+        data_by_kmeans_problem: Callable[[], Iterator[np.ndarray]],
+        centroids: tf.Tensor,
+        num_clusters: int,
+    ) -> tf.Tensor:
+        counts = tf.zeros_like(centroids[..., :1])
+        num_steps = 0
+        while num_steps < self.num_iters:
+            num_steps_before_pass = num_steps
+            for chunk in data_by_kmeans_problem():
+                for start in range(0, chunk.shape[1], self.mini_batch_size):
+                    batch = chunk[:, start : start + self.mini_batch_size]
+                    batch_sums, batch_counts, _ = _cluster_statistics(
+                        batch, centroids, num_clusters
+                    )
+                    counts += batch_counts
+                    # Equivalent to per-sample updates with a learning rate of 1 / count
+                    centroids += (batch_sums - batch_counts * centroids) / tf.maximum(
+                        counts, 1.0
+                    )
+                    num_steps += 1
+                    if num_steps == self.num_iters:
+                        return centroids
+            if num_steps == num_steps_before_pass:
+                raise _one_shot_data_error()
+        return centroids
+
     def _group_centroids(self, centroids: tf.Tensor, num_clusters: int) -> tf.Tensor:
         flat_centroids = tf.reshape(centroids, (-1, centroids.shape[-1]))
 
@@ -268,11 +369,6 @@ class KMeans(initializers.Initializer):
             )
             super_centroids = tf.gather(flat_centroids, indices, axis=0)
 
-        def generate_permutations(n: int) -> List[Tuple[Any]]:
-            return list(*itertools.permutations(range(n)))
-
-        permutations = generate_permutations(num_clusters)
-
         mse = tf.reduce_mean(
             tf.reduce_sum(
                 tf.math.squared_difference(centroids, super_centroids), axis=-1
@@ -280,7 +376,7 @@ class KMeans(initializers.Initializer):
         )
         for _ in range(self.num_iters):
             super_centroids, centroids, new_mse = self._assign_to_supercentroid(
-                centroids, super_centroids, permutations
+                centroids, super_centroids
             )
             if mse is not None and tf.abs(new_mse - mse) < self.stop_epsilon:
                 break
@@ -294,23 +390,17 @@ class KMeans(initializers.Initializer):
         return centroids
 
     def _assign_to_supercentroid(
-        self, centroids: tf.Tensor, super_centroids: tf.Tensor, permutations: tf.Tensor
+        self, centroids: tf.Tensor, super_centroids: tf.Tensor
     ) -> Tuple[tf.Tensor, tf.Tensor, tf.Tensor]:
-        num_clusters = centroids.shape[1]
-        distances = tf.reduce_sum(
-            tf.math.squared_difference(
-                tf.expand_dims(tf.expand_dims(super_centroids, axis=0), axis=2),
-                tf.expand_dims(centroids, axis=1),
+        # Matches the centroids of every problem one-to-one with the super centroids, such that
+        # the total squared distance is minimal
+        distances = _squared_distances(
+            tf.tile(
+                tf.expand_dims(super_centroids, axis=0), [tf.shape(centroids)[0], 1, 1]
             ),
-            axis=-1,
+            centroids,
         )
-        distances_flat = tf.reshape(distances, (-1, num_clusters * num_clusters))
-        indices = permutations + tf.range(num_clusters) * num_clusters
-        assignment_distances = tf.reduce_mean(
-            tf.gather(distances_flat, indices, axis=1), axis=-1
-        )
-        assignment_argmin = tf.argmin(assignment_distances, axis=-1)
-        assignments = tf.gather(permutations, assignment_argmin, axis=0)
+        assignments = batched_linear_assignment(distances.numpy())
         centroids = tf.gather(centroids, assignments, axis=1, batch_dims=1)
         super_centroids_new = tf.reduce_mean(centroids, axis=0)
         mse = tf.reduce_mean(
@@ -320,29 +410,51 @@ class KMeans(initializers.Initializer):
         )
         return super_centroids_new, centroids, mse
 
-    def _assign_to_centroid(
-        self, data: tf.Tensor, centroids: tf.Tensor
-    ) -> Tuple[tf.Tensor, tf.Tensor]:
-        distances = tf.reduce_sum(
-            tf.math.squared_difference(
-                tf.expand_dims(centroids, axis=1), tf.expand_dims(data, axis=2)
-            ),
-            axis=-1,
-        )
-        mse = tf.reduce_mean(tf.reduce_min(distances, axis=2))
-        return tf.argmin(distances, axis=2), mse
-
-    @tf.function
-    def _kmeans_step(
-        self, data: tf.Tensor, centroids: tf.Tensor, num_clusters: int
-    ) -> Tuple[tf.Tensor, tf.Tensor]:
-        assignment, mse = self._assign_to_centroid(data, centroids)
-
-        def _compute_mean(x: tf.Tensor) -> tf.Tensor:
-            return tf.cast(
-                tf.math.unsorted_segment_mean(x[0], x[1], num_segments=num_clusters),
-                tf.float32,
-            )
 
-        new_centroids = tf.map_fn(_compute_mean, (data, assignment), dtype=tf.float32)
-        return new_centroids, mse
+def _squared_distances(data: tf.Tensor, centroids: tf.Tensor) -> tf.Tensor:
+    # Uses ||x||^2 - 2 x.c + ||c||^2 so that no [problems, batch, clusters, dims] tensor is
+    # materialized. Results are clipped at zero to absorb rounding errors.
+    data_sq_norms = tf.reduce_sum(tf.square(data), axis=-1, keepdims=True)
+    centroid_sq_norms = tf.expand_dims(
+        tf.reduce_sum(tf.square(centroids), axis=-1), axis=1
+    )
+    cross_terms = tf.matmul(data, centroids, transpose_b=True)
+    return tf.maximum(data_sq_norms - 2.0 * cross_terms + centroid_sq_norms, 0.0)
+
+
+def _one_shot_data_error() -> ValueError:
+    # Centroids are initialized from the first pass over the data, so an empty later pass means
+    # that the data was exhausted rather than empty
+    return ValueError(
+        "KMeans passes over the data more than once, but a pass yielded no samples. Use data "
+        "that can be iterated over multiple times, e.g. an array, a tf.data.Dataset or a list "
+        "of arrays, instead of a one-shot iterator or generator"
+    )
+
+
+@tf.function(experimental_relax_shapes=True)
+def _cluster_statistics(
+    data: tf.Tensor, centroids: tf.Tensor, num_clusters: int
+) -> Tuple[tf.Tensor, tf.Tensor, tf.Tensor]:
+    # Computes per-cluster sums and counts of the samples assigned to each centroid, along with
+    # the sum of squared distances to the nearest centroid. A single segment sum handles all
+    # K-means problems at once by offsetting the cluster ids of each problem.
+    distances = _squared_distances(data, centroids)
+    assignment = tf.argmin(distances, axis=2, output_type=tf.int32)
+    num_problems, num_dims = tf.shape(data)[0], tf.shape(data)[2]
+    segment_ids = assignment + tf.expand_dims(tf.range(num_problems), 1) * num_clusters
+    segment_ids = tf.reshape(segment_ids, [-1])
+    num_segments = num_problems * num_clusters
+    sums = tf.math.unsorted_segment_sum(
+        tf.reshape(data, [-1, num_dims]), segment_ids, num_segments=num_segments
+    )
+    counts = tf.math.unsorted_segment_sum(
+        tf.ones_like(segment_ids, dtype=data.dtype),
+        segment_ids,
+        num_segments=num_segments,
+    )
+    return (
+        tf.reshape(sums, [num_problems, num_clusters, num_dims]),
+        tf.reshape(counts, [num_problems, num_clusters, 1]),
+        tf.reduce_sum(tf.reduce_min(distances, axis=2)),
+    )
@@ -4,6 +4,9 @@ import numpy as np
 import tensorflow as tf
 from tensorflow.keras import initializers
 
+from libspn_keras.initializers.data_utils import DataSource, iterate_data_chunks
+from libspn_keras.math.quantile_sketch import QuantileSketch
+
 
 class PoonDomingosMeanOfQuantileSplit(initializers.Initializer):
     """
@@ -14,12 +17,19 @@ class PoonDomingosMeanOfQuantileSplit(initializers.Initializer):
     in the provided ``data``. Then, the mean per quantile is taken as the value for
     initialization.
 
+    The data is summarized in a single pass by a ``QuantileSketch``, so that it does not need to
+    fit in memory. Quantile means are exact as long as the number of samples does not exceed
+    ``sketch_size``.
+
     Args:
-        data (numpy.ndarray): Data to compute quantiles over
+        data: Data to compute quantiles over. Either an array, a ``tf.data.Dataset`` that yields
+            batches or an iterable of arrays. See ``iterate_data_chunks`` for details.
         samplewise_normalization: Whether to 'Z-score normalize' the data sample-wise before
             computing the quantiles and means.
         normalization_epsilon: Non-zero constant to account for near-zero standard deviations in
             normalizations.
+        sketch_size: Maximum number of centroids per variable in the quantile sketch.
+        chunk_size: Number of samples per chunk when ``data`` is an array.
 
     References:
         Sum-Product Networks, a New Deep Architecture
@@ -28,13 +38,17 @@ class PoonDomingosMeanOfQuantileSplit(initializers.Initializer):
 
     def __init__(
         self,
-        data: Optional[np.ndarray] = None,
+        data: Optional[DataSource] = None,
         samplewise_normalization: bool = True,
         normalization_epsilon: float = 1e-2,
+        sketch_size: int = 1024,
+        chunk_size: int = 2048,
     ):
         self._data = data
         self.samplewise_normalization = samplewise_normalization
         self.normalization_epsilon = normalization_epsilon
+        self.sketch_size = sketch_size
+        self.chunk_size = chunk_size
 
     def __call__(
         self, shape: Tuple[Optional[int], ...], dtype: tf.dtypes.DType = None
@@ -59,30 +73,18 @@ class PoonDomingosMeanOfQuantileSplit(initializers.Initializer):
 
         num_quantiles = shape[-2]
 
-        if self.samplewise_normalization:
-            axes = tuple(range(1, len(self._data.shape)))
-            data = (self._data - np.mean(self._data, axis=axes, keepdims=True)) / (
-                np.std(self._data, axis=axes, keepdims=True)
-                + self.normalization_epsilon
-            )
-        else:
-            data = self._data
-
-        batch_size = data.shape[0]
-        quantile_sections = np.arange(
-            batch_size // num_quantiles,
-            batch_size,
-            int(np.ceil(batch_size / num_quantiles)),
-        )
-        sorted_features = np.sort(data, axis=0)
-        values_per_quantile = np.split(
-            sorted_features, indices_or_sections=quantile_sections, axis=0
-        )
-        means_per_quantile = [
-            np.mean(v, axis=0, keepdims=True) for v in values_per_quantile
-        ]
+        sketch = QuantileSketch(max_centroids=self.sketch_size)
+        for chunk in iterate_data_chunks(self._data, chunk_size=self.chunk_size):
+            if self.samplewise_normalization:
+                axes = tuple(range(1, len(chunk.shape)))
+                chunk = (chunk - np.mean(chunk, axis=axes, keepdims=True)) / (
+                    np.std(chunk, axis=axes, keepdims=True) + self.normalization_epsilon
+                )
+            sketch.update(chunk)
+
+        means_per_quantile = np.expand_dims(sketch.quantile_means(num_quantiles), 1)
         return tf.expand_dims(
-            tf.cast(np.stack(means_per_quantile, axis=-1), dtype=dtype), axis=-1
+            tf.cast(np.moveaxis(means_per_quantile, 0, -1), dtype=dtype), axis=-1
         )
 
     def get_config(self) -> dict:
@@ -95,4 +97,6 @@ class PoonDomingosMeanOfQuantileSplit(initializers.Initializer):
         return {
             "samplewise_normalization": self.samplewise_normalization,
             "normalization_epsilon": self.normalization_epsilon,
+            "sketch_size": self.sketch_size,
+            "chunk_size": self.chunk_size,
         }
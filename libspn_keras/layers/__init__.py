@@ -1,31 +1,37 @@
-from libspn_keras.layers.base_leaf import BaseLeaf
-from libspn_keras.layers.conv2d_product import Conv2DProduct
-from libspn_keras.layers.conv2d_sum import Conv2DSum
-from libspn_keras.layers.dense_product import DenseProduct
-from libspn_keras.layers.dense_sum import DenseSum
-from libspn_keras.layers.flat_to_regions import FlatToRegions
-from libspn_keras.layers.indicator_leaf import IndicatorLeaf
-from libspn_keras.layers.local2d_sum import Local2DSum
-from libspn_keras.layers.location_scale_leaf import (
-    CauchyLeaf,
-    LaplaceLeaf,
-    LocationScaleLeafBase,
-    NormalLeaf,
-)
-from libspn_keras.layers.log_dropout import LogDropout
-from libspn_keras.layers.normalize_standard_score import NormalizeStandardScore
-from libspn_keras.layers.permute_and_pad_scopes import PermuteAndPadScopes
-from libspn_keras.layers.permute_and_pad_scopes_random import PermuteAndPadScopesRandom
-from libspn_keras.layers.reduce_product import ReduceProduct
-from libspn_keras.layers.root_sum import RootSum
-from libspn_keras.layers.spatial_to_regions import SpatialToRegions
-from libspn_keras.layers.temporal_dense_product import TemporalDenseProduct
-from libspn_keras.layers.undecompose import Undecompose
+from libspn_keras.lazy_loader import lazy_attributes
+
+_LAZY_ATTRIBUTES = {
+    "BaseLeaf": "libspn_keras.layers.base_leaf",
+    "Conv2DProduct": "libspn_keras.layers.conv2d_product",
+    "Conv2DSum": "libspn_keras.layers.conv2d_sum",
+    "DenseProduct": "libspn_keras.layers.dense_product",
+    "DenseSum": "libspn_keras.layers.dense_sum",
+    "FlatToRegions": "libspn_keras.layers.flat_to_regions",
+    "IndicatorLeaf": "libspn_keras.layers.indicator_leaf",
+    "Local2DSum": "libspn_keras.layers.local2d_sum",
+    "CauchyLeaf": "libspn_keras.layers.location_scale_leaf",
+    "LaplaceLeaf": "libspn_keras.layers.location_scale_leaf",
+    "LocationScaleLeafBase": "libspn_keras.layers.location_scale_leaf",
+    "NormalLeaf": "libspn_keras.layers.location_scale_leaf",
+    "LogDropout": "libspn_keras.layers.log_dropout",
+    "NormalizeStandardScore": "libspn_keras.layers.normalize_standard_score",
+    "PermuteAndPadScopes": "libspn_keras.layers.permute_and_pad_scopes",
+    "PermuteAndPadScopesRandom": "libspn_keras.layers.permute_and_pad_scopes_random",
+    "ReduceProduct": "libspn_keras.layers.reduce_product",
+    "RootSum": "libspn_keras.layers.root_sum",
+    "SparseDenseSum": "libspn_keras.layers.sparse_dense_sum",
+    "SpatialToRegions": "libspn_keras.layers.spatial_to_regions",
+    "TemporalDenseProduct": "libspn_keras.layers.temporal_dense_product",
+    "Undecompose": "libspn_keras.layers.undecompose",
+}
+
+__getattr__, __dir__ = lazy_attributes(__name__, _LAZY_ATTRIBUTES)
 
 __all__ = [
     "Conv2DProduct",
     "DenseProduct",
     "DenseSum",
+    "SparseDenseSum",
     "IndicatorLeaf",
     "NormalLeaf",
     "LaplaceLeaf",
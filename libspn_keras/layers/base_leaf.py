@@ -1,5 +1,5 @@
 import abc
-from typing import Optional, Tuple
+from typing import Dict, Optional, Tuple
 
 import tensorflow as tf
 from tensorflow import keras
@@ -18,6 +18,8 @@ class BaseLeaf(keras.layers.Layer, abc.ABC):
     def __init__(self, num_components: int, dtype: tf.DType = tf.float32, **kwargs):
         super(BaseLeaf, self).__init__(dtype=dtype, **kwargs)
         self.num_components = num_components
+        # Set by libspn_keras.leaf_cache.LeafLogProbCache
+        self.log_prob_cache = None
 
     def build(self, input_shape: Tuple[Optional[int], ...]) -> None:
         """
@@ -29,6 +31,7 @@ class BaseLeaf(keras.layers.Layer, abc.ABC):
         _, *scope_dims, multivariate_size = input_shape
         distribution_shape = 1, *scope_dims, self.num_components, multivariate_size
         self._num_scopes, self._num_decomps = scope_dims
+        self._multivariate_size = multivariate_size
         self._build_distribution(distribution_shape)
         super(BaseLeaf, self).build(input_shape)
 
@@ -40,20 +43,76 @@ class BaseLeaf(keras.layers.Layer, abc.ABC):
     def _get_distribution(self) -> tfp.distributions.Distribution:
         pass
 
-    def call(self, x: tf.Tensor, **kwargs) -> tf.Tensor:
+    def call(
+        self, x: tf.Tensor, training: Optional[bool] = None, **kwargs
+    ) -> tf.Tensor:
         """
         Compute the probability of the leaf nodes.
 
+        If a ``LeafLogProbCache`` is attached as ``log_prob_cache``, the probabilities are
+        looked up in its table when called with ``training=False``. Table lookups pass no
+        gradients to the parameters of the leaf, so calls with ``training=None``, e.g. in a
+        custom training loop, evaluate the leaf itself.
+
         Args:
             x: Spatial or region Tensor with raw input values.
+            training: Whether the leaf is training or not.
             kwargs: Remaining keyword arguments.
 
         Returns:
             A Tensor with the probabilities per component.
         """
-        x = tf.expand_dims(x, axis=-2)
-        distribution = self._get_distribution()
-        return tf.reduce_sum(distribution.log_prob(x), axis=-1)
+        if self.log_prob_cache is not None and training is False:
+            return self.log_prob_cache(x)
+        return self._log_prob(x)
+
+    def _log_prob(self, x: tf.Tensor) -> tf.Tensor:
+        return self._distribution_log_prob(self._get_distribution(), x)
+
+    def _distribution_log_prob(
+        self, distribution: tfp.distributions.Distribution, x: tf.Tensor
+    ) -> tf.Tensor:
+        # Components are on the second last axis of the distribution, the dimensions of a
+        # variable on its last axis
+        return tf.reduce_sum(distribution.log_prob(tf.expand_dims(x, axis=-2)), axis=-1)
+
+    def _params(self) -> Dict[str, tf.Tensor]:
+        # Tensors of shape [1, *scope_dims, ...] that determine the log-probabilities of the
+        # leaf, which can be sliced along the scope axes or replaced by constants
+        return {}
+
+    def _log_prob_from_params(
+        self, x: tf.Tensor, params: Dict[str, tf.Tensor]
+    ) -> tf.Tensor:
+        # Computes the log-probabilities of the leaf for inference, where params holds slices or
+        # constant copies of the tensors returned by _params that match the scope axes of x
+        raise NotImplementedError(
+            "A {} does not implement evaluation from parameters.".format(
+                self.__class__.__name__
+            )
+        )
+
+    def partial_call(self, x: tf.Tensor, region_indices: tf.Tensor) -> tf.Tensor:
+        """
+        Compute the probability of the leaf nodes of a subset of regions.
+
+        Args:
+            x: Raw input values with shape ``[batch, num_regions, multivariate_size]``.
+            region_indices: Scope and decomposition index of every region, with shape
+                ``[num_regions, 2]``.
+
+        Returns:
+            A Tensor with the probabilities per component with shape
+            ``[batch, num_regions, num_components]``.
+        """
+        # Regions take the place of scopes, with a single decomposition
+        params = {
+            name: tf.gather_nd(param[0], region_indices)[tf.newaxis, :, tf.newaxis]
+            for name, param in self._params().items()
+        }
+        return tf.squeeze(
+            self._log_prob_from_params(x[:, :, tf.newaxis], params), axis=2
+        )
 
     def compute_output_shape(
         self, input_shape: Tuple[Optional[int], ...]
@@ -1,5 +1,5 @@
 import logging
-from typing import List, Optional, Tuple
+from typing import List, Optional, Tuple, Union
 
 import numpy as np
 import tensorflow as tf
@@ -67,17 +67,11 @@ class Conv2DProduct(keras.layers.Layer):
         super(Conv2DProduct, self).build(input_shape)
 
     def _build_onehot_kernels(self, input_shape: Tuple[Optional[int], ...]) -> None:
-        _, num_scopes_vertical, num_scopes_horizontal, num_channels_in = input_shape
-
-        if num_scopes_vertical is None:
-            raise ValueError("Cannot build Conv2DProduct: unknown vertical dimension")
-        if num_scopes_horizontal is None:
-            raise ValueError("Cannot build Conv2DProduct: unknown horizontal dimension")
+        # Spatial sizes are left to the input, so that the layer applies to inputs of any size
+        num_channels_in = input_shape[-1]
         if num_channels_in is None:
             raise ValueError("Cannot build Conv2DProduct: unknown channel dimension")
 
-        self._spatial_dim_sizes = num_scopes_vertical, num_scopes_horizontal
-
         sparse_kernels = self._create_sparse_kernels(num_channels_in, self.num_channels)
 
         onehot_kernels = self._sparse_kernels_to_onehot(sparse_kernels, num_channels_in)
@@ -90,16 +84,10 @@ class Conv2DProduct(keras.layers.Layer):
         )
 
     def _build_depthwise(self, input_shape: Tuple[Optional[int], ...]) -> None:
-        _, num_scopes_vertical, num_scopes_horizontal, num_channels_in = input_shape
-
-        if num_scopes_vertical is None:
-            raise ValueError("Cannot build Conv2DProduct: unknown vertical dimension")
-        if num_scopes_horizontal is None:
-            raise ValueError("Cannot build Conv2DProduct: unknown horizontal dimension")
+        # Spatial sizes are left to the input, so that the layer applies to inputs of any size
+        num_channels_in = input_shape[-1]
         if num_channels_in is None:
             raise ValueError("Cannot build Conv2DProduct: unknown channel dimension")
-
-        self._spatial_dim_sizes = num_scopes_vertical, num_scopes_horizontal
         self.num_channels = num_channels_in
 
         sparse_kernels = self._create_sparse_kernels(1, 1)
@@ -132,7 +120,9 @@ class Conv2DProduct(keras.layers.Layer):
     def _call_onehot_kernels(self, x: tf.Tensor) -> tf.Tensor:
         # Split in list of tensors which will be added up using outer products
         with tf.name_scope("OneHotConv"):
-            pad_left, pad_right, pad_top, pad_bottom = self._pad_sizes()
+            pad_left, pad_right, pad_top, pad_bottom = self._pad_sizes(
+                self._spatial_dim_sizes_of(x)
+            )
 
             x_padded = tf.pad(
                 x, [[0, 0], [pad_top, pad_bottom], [pad_left, pad_right], [0, 0]]
@@ -149,9 +139,13 @@ class Conv2DProduct(keras.layers.Layer):
     def _call_depthwise(self, x: tf.Tensor) -> tf.Tensor:
         # Split in list of tensors which will be added up using outer products
         with tf.name_scope("DepthwiseConv"):
-            pad_left, pad_right, pad_top, pad_bottom = self._pad_sizes()
+            spatial_dim_sizes = self._spatial_dim_sizes_of(x)
+            pad_left, pad_right, pad_top, pad_bottom = self._pad_sizes(
+                spatial_dim_sizes
+            )
             channels_first = tf.reshape(
-                tf.transpose(x, (0, 3, 1, 2)), (-1,) + self._spatial_dim_sizes + (1,)
+                tf.transpose(x, (0, 3, 1, 2)),
+                tf.stack([-1, spatial_dim_sizes[0], spatial_dim_sizes[1], 1]),
             )
             x_padded = tf.pad(
                 channels_first,
@@ -165,15 +159,28 @@ class Conv2DProduct(keras.layers.Layer):
                 dilations=self.dilations,
             )
 
-            spatial_dim_sizes_out = self._compute_out_size_spatial(
-                *self._spatial_dim_sizes
-            )
+            spatial_dim_sizes_out = self._spatial_dim_sizes_of(out)
 
             return tf.transpose(
-                tf.reshape(out, (-1, self.num_channels) + spatial_dim_sizes_out),
+                tf.reshape(
+                    out,
+                    tf.stack(
+                        [-1, self.num_channels]
+                        + [spatial_dim_sizes_out[0], spatial_dim_sizes_out[1]]
+                    ),
+                ),
                 (0, 2, 3, 1),
             )
 
+    @staticmethod
+    def _spatial_dim_sizes_of(x: tf.Tensor) -> Tuple[Union[int, tf.Tensor], ...]:
+        # Static sizes where known, so that e.g. 'final' padding is computed in Python
+        dynamic_shape = tf.shape(x)
+        return tuple(
+            dynamic_shape[axis] if x.shape[axis] is None else x.shape[axis]
+            for axis in (1, 2)
+        )
+
     def compute_output_shape(
         self, input_shape: Tuple[Optional[int], ...]
     ) -> Tuple[Optional[int], ...]:
@@ -184,27 +191,32 @@ class Conv2DProduct(keras.layers.Layer):
             input_shape: Input shape of the layer.
 
         Returns:
-            Tuple of ints holding the output shape of the layer.
-
-        Raises:
-            ValueError: In case shape could not be determined.
+            Tuple of ints holding the output shape of the layer. Spatial sizes are ``None`` if
+            they are unknown in the input.
         """
-        num_batch, num_scopes_vertical_in, num_scopes_horizontal_in, _ = input_shape
-        if num_scopes_vertical_in is None:
-            raise ValueError("Cannot build Conv2DProduct: unknown vertical dimension")
-        if num_scopes_horizontal_in is None:
-            raise ValueError("Cannot build Conv2DProduct: unknown horizontal dimension")
         (
-            num_scopes_vertical_out,
-            num_scopes_horizontal_out,
-        ) = self._compute_out_size_spatial(
-            num_scopes_vertical_in, num_scopes_horizontal_in
-        )
+            num_batch,
+            num_scopes_vertical_in,
+            num_scopes_horizontal_in,
+            num_channels_in,
+        ) = input_shape
+        if num_scopes_vertical_in is None or num_scopes_horizontal_in is None:
+            # Inputs of any size are supported
+            num_scopes_vertical_out = num_scopes_horizontal_out = None
+        else:
+            (
+                num_scopes_vertical_out,
+                num_scopes_horizontal_out,
+            ) = self._compute_out_size_spatial(
+                num_scopes_vertical_in, num_scopes_horizontal_in
+            )
         return (
             num_batch,
             num_scopes_vertical_out,
             num_scopes_horizontal_out,
-            self.num_channels,
+            self.num_channels
+            if num_channels_in is None
+            else self._compute_num_channels_out(num_channels_in),
         )
 
     def _sparse_kernels_to_onehot(
@@ -290,6 +302,23 @@ class Conv2DProduct(keras.layers.Layer):
         size = int(np.prod(sparse_shape))
         return np.random.randint(num_channels_in, size=size).reshape(sparse_shape)
 
+    def _compute_num_channels_out(self, num_channels_in: int) -> int:
+        """
+        Compute the number of output channels without building the layer.
+
+        Args:
+            num_channels_in: Number of input channels.
+
+        Returns:
+            The number of output channels.
+        """
+        if self.depthwise:
+            return num_channels_in
+        total_possibilities = int(num_channels_in ** np.prod(self.kernel_size))
+        if self.num_channels is None:
+            return total_possibilities
+        return min(self.num_channels, total_possibilities)
+
     def _effective_kernel_size(self) -> List[int]:
         """
         Compute the 'effective' kernel size by also taking into account the dilation rate.
@@ -302,10 +331,16 @@ class Conv2DProduct(keras.layers.Layer):
         ]
         return kernel_sizes
 
-    def _pad_sizes(self) -> Tuple[int, ...]:
+    def _pad_sizes(
+        self, spatial_dim_sizes: Tuple[Union[int, tf.Tensor], ...]
+    ) -> Tuple[Union[int, tf.Tensor], ...]:
         """
         Determine the pad sizes.
 
+        Args:
+            spatial_dim_sizes: Number of scopes on the vertical and horizontal axes of the input.
+                Only needed for 'final' padding.
+
         Returns:
             A tuple of left, right, top and bottom padding sizes.
 
@@ -322,12 +357,12 @@ class Conv2DProduct(keras.layers.Layer):
         if self.padding == "final":
             kernel_height, kernel_width = self._effective_kernel_size()
             pad_top = (
-                (kernel_height - 1) * 2 - self._spatial_dim_sizes[0]
+                (kernel_height - 1) * 2 - spatial_dim_sizes[0]
                 if self.kernel_size[0] > 1
                 else 0
             )
             pad_left = (
-                (kernel_width - 1) * 2 - self._spatial_dim_sizes[1]
+                (kernel_width - 1) * 2 - spatial_dim_sizes[1]
                 if self.kernel_size[1] > 1
                 else 0
             )
@@ -353,7 +388,9 @@ class Conv2DProduct(keras.layers.Layer):
         """
         kernel_size0, kernel_size1 = self._effective_kernel_size()
 
-        pad_left, pad_right, pad_top, pad_bottom = self._pad_sizes()
+        pad_left, pad_right, pad_top, pad_bottom = self._pad_sizes(
+            (num_scopes_vertical_in, num_scopes_horizontal_in)
+        )
 
         rows_post_pad = pad_top + pad_bottom + num_scopes_vertical_in - kernel_size0 + 1
         cols_post_pad = (
@@ -3,7 +3,6 @@ from typing import Optional, Tuple
 import tensorflow as tf
 
 from libspn_keras.layers.dense_sum import DenseSum
-from libspn_keras.logspace import logspace_wrapper_initializer
 
 
 class Conv2DSum(DenseSum):
@@ -38,20 +37,7 @@ class Conv2DSum(DenseSum):
         _, num_scopes_vertical, num_scopes_horizontal, num_channels_in = input_shape
 
         weights_shape = (1, 1, num_channels_in, self.num_sums)
-
-        initializer = self.accumulator_initializer
-        accumulator_contraint = self.linear_accumulator_constraint
-        if self.logspace_accumulators:
-            initializer = logspace_wrapper_initializer(initializer)
-            accumulator_contraint = self.logspace_accumulator_constraint
-
-        self._accumulators = self.add_weight(
-            name="sum_weights",
-            shape=weights_shape,
-            initializer=initializer,
-            regularizer=self.accumulator_regularizer,
-            constraint=accumulator_contraint,
-        )
+        self._build_accumulators(weights_shape)
         super(DenseSum, self).build(input_shape)
 
     def call(self, x: tf.Tensor, **kwargs) -> tf.Tensor:
@@ -66,9 +52,4 @@ class Conv2DSum(DenseSum):
             A Tensor with the same spatial dimensions and a number of channels determined
             by the number of channels set at the layer's instantiation.
         """
-        return self.sum_op.weighted_conv(
-            x,
-            accumulators=self._accumulators,
-            logspace_accumulators=self.logspace_accumulators,
-            normalize_in_forward_pass=self._forward_normalize,
-        )
+        return self.sum_op.weighted_conv(x, *self._sum_weights())
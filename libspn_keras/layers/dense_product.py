@@ -1,7 +1,8 @@
 import functools
 import operator
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 
+import numpy as np
 import tensorflow as tf
 from tensorflow import keras
 
@@ -17,12 +18,23 @@ class DenseProduct(keras.layers.Layer):
 
     Args:
         num_factors (int): Number of factors per product
+        product_indices: If given, only the products at these indices of the flattened output
+            ``[num_scopes_out, num_decomps, num_products]`` are computed, which gives an output of
+            shape ``[num_batch, len(product_indices)]``. This is used for pruned SPNs, in which
+            many products have no remaining parents.
         **kwargs: kwargs to pass on to the keras.Layer super class
     """
 
-    def __init__(self, num_factors: int, **kwargs):
+    def __init__(
+        self, num_factors: int, product_indices: Optional[List[int]] = None, **kwargs
+    ):
         super(DenseProduct, self).__init__(**kwargs)
         self.num_factors = num_factors
+        self.product_indices = (
+            np.asarray(product_indices, dtype=np.int32)
+            if product_indices is not None
+            else None
+        )
 
     def build(self, input_shape: Tuple[Optional[int], ...]) -> None:
         """
@@ -43,8 +55,40 @@ class DenseProduct(keras.layers.Layer):
             raise ValueError("Number of input scopes is not divisible by factor")
         self._num_scopes_out = self._num_scopes_in // self.num_factors
         self._num_products = self._num_nodes_in ** self.num_factors
+        if self.product_indices is not None:
+            self._factor_indices = self._compute_factor_indices()
         super(DenseProduct, self).build(input_shape)
 
+    def _compute_factor_indices(self) -> List[np.ndarray]:
+        # Index of every factor of the selected products in the flattened input. The node index
+        # of factor i is the i-th digit of the product index in base num_nodes_in.
+        scope, decomp, product = np.unravel_index(
+            self.product_indices,
+            (self._num_scopes_out, self._num_decomps, self._num_products),
+        )
+        nodes = np.unravel_index(product, (self._num_nodes_in,) * self.num_factors)
+        return [
+            np.ravel_multi_index(
+                (scope * self.num_factors + i, decomp, node),
+                (self._num_scopes_in, self._num_decomps, self._num_nodes_in),
+            ).astype(np.int32)
+            for i, node in enumerate(nodes)
+        ]
+
+    def _call_selected_products(self, x: tf.Tensor) -> tf.Tensor:
+        # Gathering rows is much faster than gathering columns, so the batch axis is moved last
+        x = tf.transpose(
+            tf.reshape(
+                x, [-1, self._num_scopes_in * self._num_decomps * self._num_nodes_in]
+            )
+        )
+        return tf.transpose(
+            functools.reduce(
+                operator.add,
+                [tf.gather(x, indices) for indices in self._factor_indices],
+            )
+        )
+
     def call(self, x: tf.Tensor, **kwargs) -> tf.Tensor:
         """
         Compute a dense product layer by using all possible combinations of children.
@@ -56,12 +100,16 @@ class DenseProduct(keras.layers.Layer):
         Returns:
             A Tensor with dense products.
         """
+        if self.product_indices is not None:
+            return self._call_selected_products(x)
+        # Decompositions are independent, so the layer also applies to a subset of them
+        num_decomps = x.shape[2] if x.shape[2] is not None else self._num_decomps
         # Split in list of tensors which will be added up using outer products
         shape = [
             -1,
             self._num_scopes_out,
             self.num_factors,
-            self._num_decomps,
+            num_decomps,
             self._num_nodes_in,
         ]
         with tf.name_scope("LogProbPerFactor"):
@@ -76,7 +124,7 @@ class DenseProduct(keras.layers.Layer):
             log_prob_per_factor_broadcastable = [
                 tf.reshape(
                     log_prob,
-                    [-1, self._num_scopes_out, self._num_decomps]
+                    [-1, self._num_scopes_out, num_decomps]
                     + [
                         1 if j != i else self._num_nodes_in
                         for j in range(self.num_factors)
@@ -92,7 +140,7 @@ class DenseProduct(keras.layers.Layer):
             )
             return tf.reshape(
                 outer_product,
-                [-1, self._num_scopes_out, self._num_decomps, self._num_products],
+                [-1, self._num_scopes_out, num_decomps, self._num_products],
             )
 
     def compute_output_shape(
@@ -111,6 +159,8 @@ class DenseProduct(keras.layers.Layer):
             ValueError: When shape cannot be determined.
         """
         num_batch, num_scopes_in, num_decomps, num_nodes_in = input_shape
+        if self.product_indices is not None:
+            return num_batch, len(self.product_indices)
         if num_scopes_in is None:
             raise ValueError(
                 "Cannot compute output shape with unknown number of input scopes"
@@ -122,7 +172,7 @@ class DenseProduct(keras.layers.Layer):
         return (
             num_batch,
             num_scopes_in // self.num_factors,
-            self._num_decomps,
+            num_decomps,
             int(num_nodes_in ** self.num_factors),
         )
 
@@ -133,6 +183,13 @@ class DenseProduct(keras.layers.Layer):
         Returns:
             A dict holding the configuration of the layer.
         """
-        config = dict(num_factors=self.num_factors,)
+        config = dict(
+            num_factors=self.num_factors,
+            product_indices=(
+                self.product_indices.tolist()
+                if self.product_indices is not None
+                else None
+            ),
+        )
         base_config = super(DenseProduct, self).get_config()
         return dict(list(base_config.items()) + list(config.items()))
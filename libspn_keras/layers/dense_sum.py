@@ -1,4 +1,4 @@
-from typing import Optional, Tuple
+from typing import Callable, Optional, Tuple, Type
 
 import tensorflow as tf
 from tensorflow import keras
@@ -6,6 +6,7 @@ from tensorflow.keras import constraints
 from tensorflow.keras import initializers
 from tensorflow.keras import regularizers
 
+from libspn_keras import sum_ops
 from libspn_keras.config.accumulator_initializer import (
     get_default_accumulator_initializer,
 )
@@ -21,6 +22,7 @@ from libspn_keras.constraints.greater_equal_epsilon_normalized import (
     GreaterEqualEpsilonNormalized,
 )
 from libspn_keras.logspace import logspace_wrapper_initializer
+from libspn_keras.serialization import get_custom_objects
 from libspn_keras.sum_ops import SumOpBase
 
 
@@ -46,6 +48,10 @@ class DenseSum(keras.layers.Layer):
             is set to True.
         sum_op (SumOpBase): SumOpBase instance which determines how to compute the forward and
             backward pass of the weighted sums
+        quantized_dtype: If ``'int8'`` or ``'uint8'``, the layer stores normalized log weights
+            quantized to 8 bits with a scale and offset per sum instead of accumulators. Such
+            layers are not trainable and are created from trained layers with
+            ``libspn_keras.quantization.quantize_model``.
         **kwargs: kwargs to pass on to keras.Layer super class
     """
 
@@ -58,10 +64,12 @@ class DenseSum(keras.layers.Layer):
         accumulator_regularizer: Optional[keras.regularizers.Regularizer] = None,
         logspace_accumulator_constraint: Optional[keras.constraints.Constraint] = None,
         linear_accumulator_constraint: Optional[keras.constraints.Constraint] = None,
+        quantized_dtype: Optional[str] = None,
         **kwargs
     ):
         super(DenseSum, self).__init__(**kwargs)
         self.num_sums = num_sums
+        self.quantized_dtype = quantized_dtype
         self.sum_op = sum_op or get_default_sum_op()
         self.logspace_accumulators = (
             self.sum_op.default_logspace_accumulators()
@@ -97,13 +105,32 @@ class DenseSum(keras.layers.Layer):
             self._num_nodes_in,
             self.num_sums,
         )
+        self._build_accumulators(weights_shape)
+        super(DenseSum, self).build(input_shape)
 
+    def _build_accumulators(self, weights_shape: Tuple[int, ...]) -> None:
+        if getattr(self.sum_op, "sparse_counts", False) and (
+            self.accumulator_regularizer is not None
+        ):
+            # The dense gradient of the regularizer cannot be added to the sparse counts, which
+            # index a reshaped view of the accumulators
+            raise ValueError(
+                "Cannot use sparse counts of {} with an accumulator regularizer".format(
+                    self.sum_op.__class__.__name__
+                )
+            )
+        if self.quantized_dtype is not None:
+            self._build_quantized_log_weights(weights_shape)
+            return
         initializer = self.accumulator_initializer
         accumulator_constraint = self.linear_accumulator_constraint
         if self.logspace_accumulators:
             initializer = logspace_wrapper_initializer(self.accumulator_initializer)
             accumulator_constraint = self.logspace_accumulator_constraint
 
+        if accumulator_constraint is not None:
+            # Constrain the initial value rather than projecting the variable once created
+            initializer = _constrained_initializer(initializer, accumulator_constraint)
         self._accumulators = self.add_weight(
             name="sum_weights",
             shape=weights_shape,
@@ -111,12 +138,53 @@ class DenseSum(keras.layers.Layer):
             regularizer=self.accumulator_regularizer,
             constraint=accumulator_constraint,
         )
-        if accumulator_constraint is not None:
-            self._accumulators.assign(accumulator_constraint(self._accumulators))
         self._forward_normalize = not isinstance(
             accumulator_constraint, (GreaterEqualEpsilonNormalized, LogNormalized)
         )
-        super(DenseSum, self).build(input_shape)
+
+    def _build_quantized_log_weights(self, weights_shape: Tuple[int, ...]) -> None:
+        self._quantized_log_weights = self.add_weight(
+            name="quantized_log_weights",
+            shape=weights_shape,
+            dtype=self.quantized_dtype,
+            initializer=initializers.Zeros(),
+            trainable=False,
+        )
+        # Quantization parameters are shared by all children of a sum
+        quantization_params_shape = (*weights_shape[:-2], 1, weights_shape[-1])
+        self._log_weight_scale = self.add_weight(
+            name="log_weight_scale",
+            shape=quantization_params_shape,
+            initializer=initializers.Zeros(),
+            trainable=False,
+        )
+        self._log_weight_offset = self.add_weight(
+            name="log_weight_offset",
+            shape=quantization_params_shape,
+            initializer=initializers.Zeros(),
+            trainable=False,
+        )
+        self._accumulators = None
+        self._forward_normalize = False
+
+    def _sum_weights(self) -> Tuple[tf.Tensor, bool, bool]:
+        # Returns the accumulators to pass to the sum op, whether they are in log-space and
+        # whether they must be normalized. Quantized log weights are dequantized on the fly.
+        if self.quantized_dtype is None:
+            return (
+                self._accumulators,
+                self.logspace_accumulators,
+                self._forward_normalize,
+            )
+        log_weights = (
+            tf.cast(self._quantized_log_weights, self._log_weight_scale.dtype)
+            * self._log_weight_scale
+            + self._log_weight_offset
+        )
+        if self.sum_op.default_logspace_accumulators():
+            return log_weights, True, False
+        # EM sum ops only take linear accumulators
+        return tf.exp(log_weights), False, False
 
     def call(self, x: tf.Tensor, **kwargs) -> tf.Tensor:
         """
@@ -129,9 +197,7 @@ class DenseSum(keras.layers.Layer):
         Returns:
             A Tensor with the probabilities per component.
         """
-        return self.sum_op.weighted_sum(
-            x, self._accumulators, self.logspace_accumulators, self._forward_normalize
-        )
+        return self.sum_op.weighted_sum(x, *self._sum_weights())
 
     def compute_output_shape(
         self, input_shape: Tuple[Optional[int], ...]
@@ -145,8 +211,8 @@ class DenseSum(keras.layers.Layer):
         Returns:
             Tuple of ints holding the output shape of the layer.
         """
-        num_scopes, num_decomps, num_batch, _ = input_shape
-        return num_batch, num_scopes, num_decomps, self.num_sums
+        *outer_dims, _ = input_shape
+        return (*outer_dims, self.num_sums)
 
     def get_config(self) -> dict:
         """
@@ -167,6 +233,47 @@ class DenseSum(keras.layers.Layer):
             linear_accumulator_constraint=constraints.serialize(
                 self.linear_accumulator_constraint
             ),
+            logspace_accumulator_constraint=constraints.serialize(
+                self.logspace_accumulator_constraint
+            ),
+            sum_op=sum_ops.serialize(self.sum_op),
+            quantized_dtype=self.quantized_dtype,
         )
         base_config = super(DenseSum, self).get_config()
         return dict(list(base_config.items()) + list(config.items()))
+
+    @classmethod
+    def from_config(cls: Type["DenseSum"], config: dict) -> "DenseSum":
+        """
+        Create a layer from its config.
+
+        Args:
+            config: A dict as returned by ``get_config``.
+
+        Returns:
+            The layer.
+        """
+        config = dict(config)
+        with keras.utils.custom_object_scope(get_custom_objects()):
+            for key, module in [
+                ("accumulator_initializer", initializers),
+                ("accumulator_regularizer", regularizers),
+                ("linear_accumulator_constraint", constraints),
+                ("logspace_accumulator_constraint", constraints),
+            ]:
+                if isinstance(config.get(key), dict):
+                    config[key] = module.deserialize(config[key])
+        if config.get("sum_op") is not None:
+            config["sum_op"] = sum_ops.deserialize(config["sum_op"])
+        return cls(**config)
+
+
+def _constrained_initializer(
+    initializer: Callable[..., tf.Tensor], constraint: keras.constraints.Constraint
+) -> Callable[[Tuple[Optional[int], ...], tf.dtypes.DType], tf.Tensor]:
+    def _wrap_fn(
+        shape: Tuple[Optional[int], ...], dtype: tf.dtypes.DType = None
+    ) -> tf.Tensor:
+        return constraint(initializer(shape=shape, dtype=dtype))
+
+    return _wrap_fn
@@ -51,6 +51,8 @@ class FlatToRegions(keras.layers.Layer):
         Returns:
             Tuple of ints holding the output shape of the layer.
         """
+        if len(input_shape) == 2:
+            input_shape = (*input_shape, 1)
         num_batch, num_vars, var_dimensionality = input_shape
         return num_batch, num_vars, self.num_decomps, var_dimensionality
 
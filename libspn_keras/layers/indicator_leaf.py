@@ -1,4 +1,4 @@
-from typing import Optional, Tuple
+from typing import Dict, Optional, Tuple
 
 import tensorflow as tf
 from tensorflow_probability import distributions
@@ -30,6 +30,12 @@ class IndicatorLeaf(BaseLeaf):
     def _get_distribution(self) -> distributions.Distribution:
         return self._indicator
 
+    def _log_prob_from_params(
+        self, x: tf.Tensor, params: Dict[str, tf.Tensor]
+    ) -> tf.Tensor:
+        # Indicators have no parameters per region
+        return self._log_prob(x)
+
 
 class _Indicator(distributions.Distribution):
     def __init__(
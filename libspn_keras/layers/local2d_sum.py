@@ -1,7 +1,6 @@
 from typing import Optional, Tuple
 
 from libspn_keras.layers.dense_sum import DenseSum
-from libspn_keras.logspace import logspace_wrapper_initializer
 
 
 class Local2DSum(DenseSum):
@@ -44,17 +43,5 @@ class Local2DSum(DenseSum):
             self.num_sums,
         )
 
-        initializer = self.accumulator_initializer
-        accumulator_contraint = self.linear_accumulator_constraint
-        if self.logspace_accumulators:
-            initializer = logspace_wrapper_initializer(initializer)
-            accumulator_contraint = self.logspace_accumulator_constraint
-
-        self._accumulators = self.add_weight(
-            name="sum_weights",
-            shape=weights_shape,
-            initializer=initializer,
-            regularizer=self.accumulator_regularizer,
-            constraint=accumulator_contraint,
-        )
-        super(Local2DSum, self).build(input_shape)
+        self._build_accumulators(weights_shape)
+        super(DenseSum, self).build(input_shape)
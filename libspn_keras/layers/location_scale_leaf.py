@@ -1,5 +1,5 @@
 import abc
-from typing import Optional, Tuple, Union
+from typing import Dict, Optional, Tuple, Type, Union
 
 import tensorflow as tf
 from tensorflow import initializers
@@ -12,6 +12,7 @@ from libspn_keras.math.soft_em_grads import (
     LocationEMGradWrapper,
     LocationScaleEMGradWrapper,
 )
+from libspn_keras.serialization import get_custom_objects
 
 
 class LocationScaleLeafBase(BaseLeaf, abc.ABC):
@@ -23,6 +24,10 @@ class LocationScaleLeafBase(BaseLeaf, abc.ABC):
         location_initializer: Initializer for location variable
         location_trainable: Boolean that indicates whether location is trainable
         scale_initializer: Initializer for scale variable
+        affine_log_jacobian: Whether the leaf adds the log determinant of the Jacobian of an
+            affine change of variables to its log probabilities, as held by the non-trainable
+            ``log_jacobian`` weight. This is used by leaves that absorb the normalization of
+            their inputs, see ``libspn_keras.folding.fold_normalization``.
         **kwargs: kwar
 
         gs to pass on to the keras.Layer super class
@@ -37,6 +42,7 @@ class LocationScaleLeafBase(BaseLeaf, abc.ABC):
         scale_trainable: bool = False,
         accumulator_initializer: Optional[tf.keras.initializers.Initializer] = None,
         use_accumulators: bool = False,
+        affine_log_jacobian: bool = False,
         **kwargs
     ):
         super(LocationScaleLeafBase, self).__init__(
@@ -50,6 +56,7 @@ class LocationScaleLeafBase(BaseLeaf, abc.ABC):
         self.scale_trainable = scale_trainable
         self.accumulator_initializer = accumulator_initializer or initializers.Ones()
         self.use_accumulators = use_accumulators
+        self.affine_log_jacobian = affine_log_jacobian
         self._num_scopes = self._num_decomps = None
 
     def _build_distribution(self, shape: Tuple[Optional[int], ...]) -> None:
@@ -57,6 +64,42 @@ class LocationScaleLeafBase(BaseLeaf, abc.ABC):
             self._create_loc_scale_accumulators(shape)
         else:
             self._create_loc_scale_vars(shape)
+        if self.affine_log_jacobian:
+            # Summed over the dimensions of a variable and shared by its components
+            self.log_jacobian = self.add_weight(
+                name="log_jacobian",
+                shape=(*shape[:-2], 1),
+                initializer=initializers.Zeros(),
+                trainable=False,
+            )
+
+    def _params(self) -> Dict[str, tf.Tensor]:
+        if self.use_accumulators:
+            names = ["first_order_moment_denom_accum", "first_order_moment_num_accum"]
+            if self.scale_trainable:
+                names += [
+                    "second_order_moment_denom_accum",
+                    "second_order_moment_num_accum",
+                ]
+            else:
+                names.append("scale")
+        else:
+            names = ["loc", "scale"]
+        if self.affine_log_jacobian:
+            names.append("log_jacobian")
+        return {name: getattr(self, name) for name in names}
+
+    def _log_prob(self, x: tf.Tensor) -> tf.Tensor:
+        return self._log_prob_from_params(x, self._params(), em_gradients=True)
+
+    def _log_prob_from_params(
+        self, x: tf.Tensor, params: Dict[str, tf.Tensor], em_gradients: bool = False
+    ) -> tf.Tensor:
+        distribution = self._distribution_from_params(params, em_gradients)
+        log_prob = self._distribution_log_prob(distribution, x)
+        if self.affine_log_jacobian:
+            return log_prob + params["log_jacobian"]
+        return log_prob
 
     def _get_distribution(
         self,
@@ -65,46 +108,52 @@ class LocationScaleLeafBase(BaseLeaf, abc.ABC):
         LocationEMGradWrapper,
         LocationScaleEMGradWrapper,
     ]:
-        if self.use_accumulators:
-            return self._get_distribution_from_accumulators()
-        return self._get_distribution_from_vars()
+        return self._distribution_from_params(self._params(), em_gradients=True)
 
-    def _get_distribution_from_vars(self) -> tfp.distributions.Distribution:
-        if self.scale_trainable and not self.use_accumulators:
+    def _distribution_from_params(
+        self, params: Dict[str, tf.Tensor], em_gradients: bool = False
+    ) -> Union[
+        tfp.distributions.Distribution,
+        LocationEMGradWrapper,
+        LocationScaleEMGradWrapper,
+    ]:
+        # With em_gradients, distributions of accumulators are wrapped so that their gradients
+        # result in EM updates, which only affects training
+        if not self.use_accumulators:
+            scale = params["scale"]
+            if self.scale_trainable:
+                scale = tf.nn.softplus(scale)
             return self._build_distribution_from_loc_and_scale(
-                loc=self.loc, scale=tf.nn.softplus(self.scale)
+                loc=params["loc"], scale=scale
             )
-        return self._build_distribution_from_loc_and_scale(
-            loc=self.loc, scale=self.scale
+        loc = (
+            params["first_order_moment_num_accum"]
+            / params["first_order_moment_denom_accum"]
         )
-
-    def _get_distribution_from_accumulators(
-        self,
-    ) -> Union[LocationScaleEMGradWrapper, LocationEMGradWrapper]:
-        loc = self.first_order_moment_num_accum / self.first_order_moment_denom_accum
         if self.scale_trainable:
             scale = tf.sqrt(
-                self.second_order_moment_num_accum
-                / self.second_order_moment_denom_accum
+                params["second_order_moment_num_accum"]
+                / params["second_order_moment_denom_accum"]
                 - tf.square(loc)
             )
-            dist = self._build_distribution_from_loc_and_scale(loc=loc, scale=scale)
-            return LocationScaleEMGradWrapper(
-                dist,
-                self.first_order_moment_denom_accum,
-                self.first_order_moment_num_accum,
-                self.second_order_moment_denom_accum,
-                self.second_order_moment_num_accum,
-            )
         else:
-            dist = self._build_distribution_from_loc_and_scale(
-                loc=loc, scale=self.scale
-            )
-            return LocationEMGradWrapper(
+            scale = params["scale"]
+        dist = self._build_distribution_from_loc_and_scale(loc=loc, scale=scale)
+        if not em_gradients:
+            return dist
+        if self.scale_trainable:
+            return LocationScaleEMGradWrapper(
                 dist,
-                self.first_order_moment_denom_accum,
-                self.first_order_moment_num_accum,
+                params["first_order_moment_denom_accum"],
+                params["first_order_moment_num_accum"],
+                params["second_order_moment_denom_accum"],
+                params["second_order_moment_num_accum"],
             )
+        return LocationEMGradWrapper(
+            dist,
+            params["first_order_moment_denom_accum"],
+            params["first_order_moment_num_accum"],
+        )
 
     def _create_loc_scale_accumulators(self, shape: Tuple[Optional[int], ...]) -> None:
         self.first_order_moment_denom_accum = self.add_weight(
@@ -198,10 +247,35 @@ class LocationScaleLeafBase(BaseLeaf, abc.ABC):
             scale_trainable=self.scale_trainable,
             use_accumulators=self.use_accumulators,
             location_trainable=self.location_trainable,
+            affine_log_jacobian=self.affine_log_jacobian,
         )
         base_config = super(LocationScaleLeafBase, self).get_config()
         return dict(list(base_config.items()) + list(config.items()))
 
+    @classmethod
+    def from_config(
+        cls: Type["LocationScaleLeafBase"], config: dict
+    ) -> "LocationScaleLeafBase":
+        """
+        Create a layer from its config.
+
+        Args:
+            config: A dict as returned by ``get_config``.
+
+        Returns:
+            The layer.
+        """
+        config = dict(config)
+        with tf.keras.utils.custom_object_scope(get_custom_objects()):
+            for key in [
+                "scale_initializer",
+                "location_initializer",
+                "accumulator_initializer",
+            ]:
+                if isinstance(config.get(key), dict):
+                    config[key] = initializers.deserialize(config[key])
+        return cls(**config)
+
     def get_modes(self) -> tf.Tensor:
         """
         Obtain the distribution modes.
@@ -301,6 +375,8 @@ class LaplaceLeaf(LocationScaleLeafBase):
         use_accumulators: bool = False,
         **kwargs
     ):
+        # The scale is never trainable, but it is part of the config of the base class
+        kwargs.pop("scale_trainable", None)
         super().__init__(
             num_components=num_components,
             location_initializer=location_initializer,
@@ -1,8 +1,14 @@
-from typing import Optional, Tuple, Union
+from typing import Optional, Sequence, Tuple, Union
 
+import numpy as np
 import tensorflow as tf
 from tensorflow import keras
 
+from libspn_keras.initializers.data_utils import DataSource, iterate_data_chunks
+
+# Count, mean and sum of squared deviations from the mean of a set of samples
+_Moments = Tuple[float, np.ndarray, np.ndarray]
+
 
 class NormalizeStandardScore(keras.layers.Layer):
     """
@@ -11,9 +17,21 @@ class NormalizeStandardScore(keras.layers.Layer):
     In other words, the output is the input minus its mean and divided by the standard deviation.
     This can be used to achieve the same kind of normalization as used in (Poon and Domingos, 2011).
 
+    By default, the mean and standard deviation are computed per sample over all of its
+    elements on every call. With ``dataset_statistics=True``, they are instead computed once
+    over a dataset with ``adapt`` and stored as non-trainable weights, so that every element of
+    the axes in ``axis`` has its own statistics. Statistics are streamed over the dataset in
+    chunks, and statistics of layers adapted to different parts of a dataset, e.g. on different
+    workers, can be combined with ``merge_state``.
+
     Args:
         normalization_epsilon (float): Small positive constant to prevent division by zero,
             but could also be used a 'smoothing' factor.
+        dataset_statistics: Whether to normalize with statistics of a dataset rather than of
+            each sample.
+        axis: Axis or axes that have separate dataset statistics, all other non-batch axes
+            share them. E.g. use ``-1`` for the variables of flat samples or for the channels of
+            images, and ``1`` for the variables of samples in a region representation.
         **kwargs: kwargs to pass on to the keras.Layer super class
 
     References:
@@ -21,15 +39,64 @@ class NormalizeStandardScore(keras.layers.Layer):
         `Poon and Domingos, 2011 <https://arxiv.org/abs/1202.3732>`_
     """
 
-    def __init__(self, normalization_epsilon: float = 1e-8, **kwargs):
+    def __init__(
+        self,
+        normalization_epsilon: float = 1e-8,
+        dataset_statistics: bool = False,
+        axis: Union[int, Sequence[int]] = -1,
+        **kwargs
+    ):
         super(NormalizeStandardScore, self).__init__(**kwargs)
         self.normalization_epsilon = normalization_epsilon
+        self.dataset_statistics = dataset_statistics
+        self.axis = axis
+
+    def build(self, input_shape: Tuple[Optional[int], ...]) -> None:
+        """
+        Build the internal components for this layer.
+
+        Args:
+            input_shape: Shape of the input Tensor.
+
+        Raises:
+            ValueError: If dataset statistics are used for axes of unknown size.
+        """
+        if self.dataset_statistics:
+            axes = self._statistics_axes(len(input_shape))
+            stats_shape = tuple(
+                input_shape[i] if i in axes else 1 for i in range(1, len(input_shape))
+            )
+            if None in stats_shape:
+                raise ValueError(
+                    "Dataset statistics need known sizes of axes {}, got an input shape of "
+                    "{}".format(self.axis, input_shape)
+                )
+            self.count = self.add_weight(
+                name="count",
+                shape=(),
+                dtype=tf.float64,
+                initializer=keras.initializers.Zeros(),
+                trainable=False,
+            )
+            self.mean = self.add_weight(
+                name="mean",
+                shape=stats_shape,
+                initializer=keras.initializers.Zeros(),
+                trainable=False,
+            )
+            self.variance = self.add_weight(
+                name="variance",
+                shape=stats_shape,
+                initializer=keras.initializers.Ones(),
+                trainable=False,
+            )
+        super(NormalizeStandardScore, self).build(input_shape)
 
     def call(
         self, x: tf.Tensor, return_stats: bool = False, **kwargs
     ) -> Union[Tuple[tf.Tensor, ...], tf.Tensor]:
         """
-        Normalize raw input by subtracting mean and dividing by the standard deviation per sample.
+        Normalize raw input by subtracting mean and dividing by the standard deviation.
 
         Args:
             x: Raw input tensor.
@@ -40,18 +107,92 @@ class NormalizeStandardScore(keras.layers.Layer):
             A normalized tensor or a tuple of the normalized tensor, the mean and the standard deviation.
         """
         data_input = x
-        normalization_axes_indices = tf.range(1, tf.rank(data_input))
-        mean = tf.reduce_mean(
-            data_input, axis=normalization_axes_indices, keepdims=True
-        )
-        stddev = tf.math.reduce_std(
-            data_input, axis=normalization_axes_indices, keepdims=True
-        )
+        if self.dataset_statistics:
+            mean = tf.expand_dims(self.mean, axis=0)
+            stddev = tf.expand_dims(tf.sqrt(self.variance), axis=0)
+        else:
+            normalization_axes_indices = tf.range(1, tf.rank(data_input))
+            mean = tf.reduce_mean(
+                data_input, axis=normalization_axes_indices, keepdims=True
+            )
+            stddev = tf.math.reduce_std(
+                data_input, axis=normalization_axes_indices, keepdims=True
+            )
         normalized_input = (data_input - mean) / (stddev + self.normalization_epsilon)
         if return_stats:
             return normalized_input, mean, stddev
         return normalized_input
 
+    def adapt(
+        self, data: DataSource, chunk_size: int = 2048, reset_state: bool = True
+    ) -> None:
+        """
+        Compute the dataset statistics in a single pass over the data.
+
+        Args:
+            data: Samples as received by this layer, i.e. an array, ``Tensor``,
+                ``tf.data.Dataset`` or iterable of arrays, see ``iterate_data_chunks``.
+            chunk_size: Number of samples per chunk of arrays and ``Tensor``s.
+            reset_state: Whether to discard statistics of earlier calls. If ``False``, the
+                statistics of ``data`` are merged with them.
+
+        Raises:
+            ValueError: If the layer does not use dataset statistics.
+        """
+        if not self.dataset_statistics:
+            raise ValueError("Can only adapt a layer with dataset_statistics=True")
+        moments = None if reset_state or not self.built else self._moments()
+        for chunk in iterate_data_chunks(data, chunk_size=chunk_size):
+            if not self.built:
+                self.build((None,) + chunk.shape[1:])
+            chunk = chunk.astype(np.float64)
+            reduce_axes = self._reduce_axes(chunk.ndim)
+            count = float(chunk.size // self.mean.shape.num_elements())
+            mean = np.mean(chunk, axis=reduce_axes, keepdims=True)
+            m2 = np.sum(np.square(chunk - mean), axis=reduce_axes, keepdims=True)
+            moments = _merge_moments(moments, (count, mean[0], m2[0]))
+        if moments is not None:
+            self._assign_moments(moments)
+
+    def merge_state(self, layers: Sequence["NormalizeStandardScore"]) -> None:
+        """
+        Merge the dataset statistics of other layers into those of this layer.
+
+        Args:
+            layers: Adapted layers with statistics of the same shape.
+
+        Raises:
+            ValueError: If this layer is not built or does not use dataset statistics.
+        """
+        if not self.dataset_statistics or not self.built:
+            raise ValueError(
+                "Can only merge into a built layer with dataset statistics"
+            )
+        moments = self._moments()
+        for layer in layers:
+            moments = _merge_moments(moments, layer._moments())
+        self._assign_moments(moments)
+
+    def _statistics_axes(self, rank: int) -> Tuple[int, ...]:
+        axes = [self.axis] if isinstance(self.axis, int) else self.axis
+        return tuple(axis % rank for axis in axes)
+
+    def _reduce_axes(self, rank: int) -> Tuple[int, ...]:
+        # The batch axis is reduced, while axes shared by the statistics keep size 1
+        axes = self._statistics_axes(rank)
+        return (0,) + tuple(i for i in range(1, rank) if i not in axes)
+
+    def _moments(self) -> _Moments:
+        count = float(self.count.numpy())
+        mean = self.mean.numpy().astype(np.float64)
+        return count, mean, self.variance.numpy().astype(np.float64) * count
+
+    def _assign_moments(self, moments: _Moments) -> None:
+        count, mean, m2 = moments
+        self.count.assign(count)
+        self.mean.assign(mean.astype(self.dtype))
+        self.variance.assign((m2 / max(count, 1.0)).astype(self.dtype))
+
     def compute_output_shape(
         self, input_shape: Tuple[Optional[int], ...]
     ) -> Tuple[Optional[int], ...]:
@@ -73,6 +214,25 @@ class NormalizeStandardScore(keras.layers.Layer):
         Returns:
             A dict holding the configuration of the layer.
         """
-        config = dict(normalization_epsilon=self.normalization_epsilon)
+        config = dict(
+            normalization_epsilon=self.normalization_epsilon,
+            dataset_statistics=self.dataset_statistics,
+            axis=self.axis,
+        )
         base_config = super(NormalizeStandardScore, self).get_config()
         return dict(list(base_config.items()) + list(config.items()))
+
+
+def _merge_moments(a: Optional[_Moments], b: _Moments) -> _Moments:
+    # Combines the moments of two disjoint sets of samples (Chan et al., 1979)
+    if a is None or a[0] == 0:
+        return b
+    if b[0] == 0:
+        return a
+    count_a, mean_a, m2_a = a
+    count_b, mean_b, m2_b = b
+    count = count_a + count_b
+    delta = mean_b - mean_a
+    mean = mean_a + delta * count_b / count
+    m2 = m2_a + m2_b + np.square(delta) * count_a * count_b / count
+    return count, mean, m2
@@ -26,12 +26,28 @@ class PermuteAndPadScopes(keras.layers.Layer):
         super(PermuteAndPadScopes, self).__init__(**kwargs)
         self.permutations = permutations
 
+    def build(self, input_shape: Tuple[Optional[int], ...]) -> None:
+        """
+        Build the internal components for this layer.
+
+        Args:
+            input_shape: Shape of the input Tensor.
+        """
+        self._requires_padding = self.permutations is None or bool(
+            numpy.any(numpy.asarray(self.permutations) < 0)
+        )
+        super(PermuteAndPadScopes, self).build(input_shape)
+
     def call(self, x: tf.Tensor, **kwargs) -> tf.Tensor:
         """
         Permute and pad scopes.
 
         Padding is achieved by using ``-1`` for scope indices in ``permutations``/.
 
+        The scope and decomposition axes are flattened, so that all decompositions are permuted
+        with a single gather. Padded scopes gather from a zero log-probability sentinel, which
+        is only appended if any scope is padded.
+
         Args:
             x: A Region input tensor
             kwargs: Remaining keyword arguments.
@@ -39,11 +55,27 @@ class PermuteAndPadScopes(keras.layers.Layer):
         Returns:
             Tensor with scopes permuted and padded.
         """
-        decomps_first = tf.transpose(x, (2, 1, 0, 3))
-        decomps_first_padded = tf.pad(decomps_first, [[0, 0], [1, 0], [0, 0], [0, 0]])
-        gather_indices = tf.convert_to_tensor(self.permutations) + 1
-        permuted = tf.gather(decomps_first_padded, gather_indices, axis=1, batch_dims=1)
-        return tf.transpose(permuted, (2, 1, 0, 3))
+        return self._permute_and_pad(x, tf.convert_to_tensor(self.permutations))
+
+    def _permute_and_pad(self, x: tf.Tensor, permutations: tf.Tensor) -> tf.Tensor:
+        # Permutes with the given permutations per decomposition, which may be a subset of the
+        # permutations of the layer
+        _, num_scopes_in, num_decomps, num_nodes = x.shape
+        num_scopes_out = permutations.shape[1]
+        x_flat = tf.reshape(x, [-1, num_scopes_in * num_decomps, num_nodes])
+        if self._requires_padding:
+            x_flat = tf.pad(x_flat, [[0, 0], [0, 1], [0, 0]])
+        gather_indices = tf.where(
+            permutations >= 0,
+            permutations * num_decomps
+            + tf.range(num_decomps, dtype=permutations.dtype)[:, tf.newaxis],
+            num_scopes_in * num_decomps,
+        )
+        # Scopes are the outer axis of the flattened output
+        permuted = tf.gather(
+            x_flat, tf.reshape(tf.transpose(gather_indices), [-1]), axis=1
+        )
+        return tf.reshape(permuted, [-1, num_scopes_out, num_decomps, num_nodes])
 
     def compute_output_shape(
         self, input_shape: Tuple[Optional[int], ...]
@@ -57,7 +89,10 @@ class PermuteAndPadScopes(keras.layers.Layer):
         Returns:
             Tuple of ints holding the output shape of the layer.
         """
-        return input_shape
+        if self.permutations is None:
+            return input_shape
+        num_batch, _, num_decomps, num_nodes = input_shape
+        return num_batch, numpy.shape(self.permutations)[1], num_decomps, num_nodes
 
     def get_config(self) -> dict:
         """
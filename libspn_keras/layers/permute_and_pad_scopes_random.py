@@ -11,6 +11,43 @@ from libspn_keras.layers.permute_and_pad_scopes import PermuteAndPadScopes
 logger = logging.getLogger("libspn-keras")
 
 
+def random_padded_permutations(
+    num_scopes: int, num_decomps: int, num_slots: int, seed: Optional[int] = None
+) -> np.ndarray:
+    """
+    Generate random permutations of scopes for all decompositions at once, padded with ``-1``.
+
+    The padding slots are spread evenly, so that every product in the layers above covers at
+    most one padded slot more than any other product.
+
+    Args:
+        num_scopes: Number of scopes to permute.
+        num_decomps: Number of decompositions, each with its own permutation.
+        num_slots: Length of each permutation including padding. Must be at least
+            ``num_scopes``.
+        seed: Seed for the permutations. If ``None``, uses NumPy's global random state.
+
+    Returns:
+        An integer array of shape ``[num_decomps, num_slots]``.
+    """
+    random_state = np.random if seed is None else np.random.RandomState(seed)
+    permutations = np.argsort(
+        random_state.random_sample((num_decomps, num_scopes)), axis=1
+    )
+
+    num_m1 = num_slots - num_scopes
+    if num_m1 == 0:
+        return permutations
+    # e.g. num_m1 == 2 and num_slots = 32. Then rate_m1 is 16, so once every 16 values we should
+    # leave a variable slot empty
+    rate_m1 = num_slots // num_m1
+    is_scope_slot = np.ones(num_slots, dtype=bool)
+    is_scope_slot[np.arange(num_m1) * rate_m1] = False
+    padded = np.full((num_decomps, num_slots), -1, dtype=permutations.dtype)
+    padded[:, is_scope_slot] = permutations
+    return padded
+
+
 class PermuteAndPadScopesRandom(PermuteAndPadScopes):
     """
     Permutes scopes, usually applied after a ``FlatToRegions`` and a ``BaseLeaf`` layer.
@@ -19,12 +56,16 @@ class PermuteAndPadScopesRandom(PermuteAndPadScopes):
         factors: Number of factors in preceding product layers. Needed to compute
             the effective number of scopes, including padded nodes. Can be applied at later stage
             through ``generate_factors``.
+        seed: Seed for the random permutations. If ``None``, uses NumPy's global random state.
         **kwargs: kwargs to pass on to the ``keras.Layer`` superclass.
     """
 
-    def __init__(self, factors: Optional[List[int]] = None, **kwargs):
+    def __init__(
+        self, factors: Optional[List[int]] = None, seed: Optional[int] = None, **kwargs
+    ):
         super(PermuteAndPadScopesRandom, self).__init__(None, **kwargs)
         self.factors = factors
+        self.seed = seed
 
     def set_factors(self, factors: List[int]) -> None:
         """
@@ -82,29 +123,57 @@ class PermuteAndPadScopesRandom(PermuteAndPadScopes):
                     )
                 )
 
-        # Now we generate the random index permutations
-        perms: List[List[int]] = [
-            list(np.random.permutation(num_scopes).astype(int))
-            for _ in range(num_decomps)
-        ]
-
-        num_m1 = factor_prod - num_scopes
-        if num_m1 > 0:
-            # e.g. num_m1 == 2 and factor_prod = 32. Then rate_m1 is 16, so once every 16 values
-            # we should leave a variable slot empty
-            rate_m1 = int(np.floor(factor_prod / num_m1))
-
-            for p in perms:
-                for i in range(num_m1):
-                    p.insert(i * rate_m1, -1)
+        self._num_scopes = num_scopes
+        self._requires_padding = factor_prod > num_scopes
         self.permutations = self.add_weight(
             name="permutations",
-            initializer=initializers.Constant(perms),
+            initializer=initializers.Constant(
+                random_padded_permutations(
+                    num_scopes, num_decomps, factor_prod, seed=self.seed
+                )
+            ),
             trainable=False,
             shape=[num_decomps, factor_prod],
             dtype=tf.int32,
         )
 
+    def resample(self, seed: Optional[int] = None) -> None:
+        """
+        Draw new random permutations in place, without rebuilding the layer or its model.
+
+        This makes it cheap to e.g. train an ensemble of RAT-SPNs with different random region
+        graphs using a single model.
+
+        Args:
+            seed: Seed for the new permutations. If ``None``, uses NumPy's global random state.
+
+        Raises:
+            ValueError: If the layer has not been built yet.
+        """
+        if not self.built:
+            raise ValueError("Cannot resample permutations before building the layer")
+        num_decomps, num_slots = self.permutations.shape
+        self.permutations.assign(
+            random_padded_permutations(self._num_scopes, num_decomps, num_slots, seed)
+        )
+
+    def compute_output_shape(
+        self, input_shape: Tuple[Optional[int], ...]
+    ) -> Tuple[Optional[int], ...]:
+        """
+        Compute output shape of the layer.
+
+        Args:
+            input_shape: Input shape of the layer.
+
+        Returns:
+            Tuple of ints holding the output shape of the layer.
+        """
+        if not self.factors:
+            return input_shape
+        num_batch, _, num_decomps, num_nodes = input_shape
+        return num_batch, int(np.prod(self.factors)), num_decomps, num_nodes
+
     def get_config(self) -> dict:
         """
         Obtain a key-value representation of the layer config.
@@ -112,6 +181,7 @@ class PermuteAndPadScopesRandom(PermuteAndPadScopes):
         Returns:
             A dict holding the configuration of the layer.
         """
-        config = dict(num_vars_input=self.num_vars_spn_input, factors=self.factors)
-        base_config = super(PermuteAndPadScopesRandom, self).get_config()
+        config = dict(factors=self.factors, seed=self.seed)
+        # Permutations are generated when building, so they are not part of the config
+        base_config = super(PermuteAndPadScopes, self).get_config()
         return dict(list(base_config.items()) + list(config.items()))
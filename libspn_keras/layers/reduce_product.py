@@ -75,13 +75,13 @@ class ReduceProduct(keras.layers.Layer):
         Raises:
             ValueError: If shape cannot be determined.
         """
-        num_scopes_in, num_decomps, num_batch, num_nodes_in = input_shape
+        num_batch, num_scopes_in, num_decomps, num_nodes_in = input_shape
         if num_scopes_in is None:
             raise ValueError("Cannot compute shape with unknown number of input scopes")
         return (
             num_batch,
             num_scopes_in // self.num_factors,
-            self._num_decomps,
+            num_decomps,
             num_nodes_in,
         )
 
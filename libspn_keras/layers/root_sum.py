@@ -75,13 +75,8 @@ class RootSum(DenseSum):
         x_reshaped = tf.reshape(x, (-1, 1, 1, self._num_nodes_in))
 
         if self.return_weighted_child_logits:
-            out = self.sum_op.weighted_children(
-                x_reshaped,
-                accumulators=self._accumulators,
-                logspace_accumulators=self.logspace_accumulators,
-                normalize_in_forward_pass=self._forward_normalize,
-            )
-            num_out = self._accumulators.shape[2]
+            out = self.sum_op.weighted_children(x_reshaped, *self._sum_weights())
+            num_out = self._num_nodes_in
         else:
             out = super(RootSum, self).call(x_reshaped, **kwargs)
             num_out = 1
@@ -133,9 +128,7 @@ class RootSum(DenseSum):
             raise ValueError("Must have known number of nodes")
         return (
             num_batch,
-            num_decomps * num_nodes_in
-            if self.return_weighted_child_logits
-            else num_batch,
+            num_decomps * num_nodes_in if self.return_weighted_child_logits else 1,
         )
 
     def get_config(self) -> dict:
@@ -147,4 +140,6 @@ class RootSum(DenseSum):
         """
         config = dict(return_weighted_child_logits=self.return_weighted_child_logits)
         base_config = super(RootSum, self).get_config()
+        # The number of sums of a root is fixed
+        base_config.pop("num_sums")
         return dict(list(base_config.items()) + list(config.items()))
@@ -0,0 +1,160 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
+import tensorflow as tf
+from tensorflow import keras
+from tensorflow.keras import initializers
+
+
+class SparseDenseSum(keras.layers.Layer):
+    """
+    Computes sums per scope and decomposition over a sparse set of weighted children.
+
+    The sparse counterpart of a ``DenseSum`` for inference with pruned SPNs, as created by
+    ``libspn_keras.pruning.prune_model``. Like ``DenseSum``, the layer exponentiates its inputs
+    relative to the maximum of their scope and decomposition, but then multiplies them with a
+    sparse matrix that only holds the remaining edges. Its cost is therefore proportional to the
+    number of edges.
+
+    The input is flattened apart from the batch axis, so that it can either be the output of a
+    layer with shape ``[batch, num_scopes, num_decomps, num_nodes]``, or the compact output of a
+    ``DenseProduct`` that only computes the products at ``product_indices``.
+
+    Args:
+        num_sums: Number of sums per scope and decomposition.
+        num_scopes: Number of scopes of the output.
+        num_decomps: Number of decompositions of the output.
+        child_indices: Index of the child of every edge in the flattened input.
+        sum_indices: Index of the sum of every edge in the flattened output of shape
+            ``[num_scopes, num_decomps, num_sums]``. Must be sorted in ascending order and
+            cover every sum.
+        **kwargs: kwargs to pass on to the keras.Layer super class
+
+    Raises:
+        ValueError: If the edges are inconsistent.
+    """
+
+    def __init__(
+        self,
+        num_sums: int,
+        num_scopes: int,
+        num_decomps: int,
+        child_indices: List[int],
+        sum_indices: List[int],
+        **kwargs
+    ):
+        super(SparseDenseSum, self).__init__(**kwargs)
+        self.num_sums = num_sums
+        self.num_scopes = num_scopes
+        self.num_decomps = num_decomps
+        self.child_indices = np.asarray(child_indices, dtype=np.int32)
+        self.sum_indices = np.asarray(sum_indices, dtype=np.int32)
+        if self.child_indices.shape != self.sum_indices.shape:
+            raise ValueError("Expected a child index and a sum index for every edge")
+        self._num_segments = num_scopes * num_decomps * num_sums
+        if not np.array_equal(
+            np.unique(self.sum_indices), np.arange(self._num_segments)
+        ) or np.any(np.diff(self.sum_indices) < 0):
+            raise ValueError(
+                "Sum indices must be sorted and cover all {} sums".format(
+                    self._num_segments
+                )
+            )
+
+    def build(self, input_shape: Tuple[Optional[int], ...]) -> None:
+        """
+        Build the internal components for this layer.
+
+        Args:
+            input_shape: Shape of the input Tensor.
+        """
+        self._num_inputs = int(np.prod(input_shape[1:]))
+        self._log_weights = self.add_weight(
+            name="log_weights",
+            shape=self.child_indices.shape,
+            initializer=initializers.Zeros(),
+            trainable=False,
+        )
+        # Inputs are grouped by the scope and decomposition of their parents, so that they can
+        # be exponentiated relative to the maximum of their group. Inputs without parents form
+        # an extra group.
+        num_groups = self.num_scopes * self.num_decomps
+        self._input_groups = np.full(self._num_inputs, num_groups, dtype=np.int32)
+        self._input_groups[self.child_indices] = self.sum_indices // self.num_sums
+        self._sum_groups = (
+            np.arange(self._num_segments, dtype=np.int32) // self.num_sums
+        )
+        self._edge_indices = np.stack(
+            [self.sum_indices, self.child_indices], axis=1
+        ).astype(np.int64)
+        super(SparseDenseSum, self).build(input_shape)
+
+    def call(self, x: tf.Tensor, **kwargs) -> tf.Tensor:
+        """
+        Compute the sums over the weighted children of the remaining edges.
+
+        Args:
+            x: Input Tensor.
+            kwargs: Remaining keyword arguments.
+
+        Returns:
+            A Tensor with shape ``[batch, num_scopes, num_decomps, num_sums]``.
+        """
+        return self._weighted_sum(x, self._log_weights)
+
+    def _weighted_sum(self, x: tf.Tensor, log_weights: tf.Tensor) -> tf.Tensor:
+        # Inputs are on the leading axis, as required by segment reductions and sparse matrix
+        # products
+        x = tf.transpose(tf.reshape(x, [-1, self._num_inputs]))
+        group_max = tf.stop_gradient(
+            tf.math.unsorted_segment_max(
+                x, self._input_groups, self.num_scopes * self.num_decomps + 1
+            )
+        )
+        # Groups of which all inputs are -inf also evaluate to -inf
+        group_max = tf.where(
+            tf.math.is_finite(group_max), group_max, tf.zeros_like(group_max)
+        )
+        weights = tf.sparse.SparseTensor(
+            self._edge_indices,
+            tf.exp(log_weights),
+            dense_shape=[self._num_segments, self._num_inputs],
+        )
+        out = tf.sparse.sparse_dense_matmul(
+            weights, tf.exp(x - tf.gather(group_max, self._input_groups))
+        )
+        out = tf.math.log(out) + tf.gather(group_max, self._sum_groups)
+        return tf.reshape(
+            tf.transpose(out), [-1, self.num_scopes, self.num_decomps, self.num_sums],
+        )
+
+    def compute_output_shape(
+        self, input_shape: Tuple[Optional[int], ...]
+    ) -> Tuple[Optional[int], ...]:
+        """
+        Compute output shape of the layer.
+
+        Args:
+            input_shape: Input shape of the layer.
+
+        Returns:
+            Tuple of ints holding the output shape of the layer.
+        """
+        return input_shape[0], self.num_scopes, self.num_decomps, self.num_sums
+
+    def get_config(self) -> dict:
+        """
+        Obtain a key-value representation of the layer config.
+
+        Returns:
+            A dict holding the configuration of the layer.
+        """
+        config = dict(
+            num_sums=self.num_sums,
+            num_scopes=self.num_scopes,
+            num_decomps=self.num_decomps,
+            child_indices=self.child_indices.tolist(),
+            sum_indices=self.sum_indices.tolist(),
+        )
+        base_config = super(SparseDenseSum, self).get_config()
+        return dict(list(base_config.items()) + list(config.items()))
@@ -0,0 +1,48 @@
+import importlib
+import sys
+from typing import Any, Callable, List, Mapping, Tuple
+
+
+def lazy_attributes(
+    module_name: str, attribute_modules: Mapping[str, str]
+) -> Tuple[Callable[[str], Any], Callable[[], List[str]]]:
+    """
+    Create a module level ``__getattr__`` and ``__dir__`` that import attributes on first access.
+
+    This makes e.g. ``import libspn_keras`` cheap, since modules with heavy dependencies (such
+    as ``plotly`` for visualization) are only imported once one of their attributes is used. On
+    Python versions that do not support module level ``__getattr__`` (< 3.7), all attributes are
+    imported right away.
+
+    Args:
+        module_name: Name of the module to attach attributes to, typically ``__name__``.
+        attribute_modules: Mapping of attribute names to the modules that define them. If the
+            attribute name equals the last part of the module name, the module itself is the
+            attribute, e.g. ``{"layers": "libspn_keras.layers"}``.
+
+    Returns:
+        A tuple of ``__getattr__`` and ``__dir__`` functions to assign in the module.
+    """
+
+    def __getattr__(name: str) -> Any:  # noqa: N807, ANN401
+        if name not in attribute_modules:
+            raise AttributeError(
+                "module {!r} has no attribute {!r}".format(module_name, name)
+            )
+        module_path = attribute_modules[name]
+        module = importlib.import_module(module_path)
+        value = (
+            module if module_path.rsplit(".", 1)[-1] == name else getattr(module, name)
+        )
+        # Cache the attribute so that __getattr__ is not called again
+        setattr(sys.modules[module_name], name, value)
+        return value
+
+    def __dir__() -> List[str]:  # noqa: N807
+        return sorted(set(sys.modules[module_name].__dict__) | set(attribute_modules))
+
+    if sys.version_info < (3, 7):  # pragma: no cover
+        for name in attribute_modules:
+            __getattr__(name)
+
+    return __getattr__, __dir__
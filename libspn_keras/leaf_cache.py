@@ -0,0 +1,217 @@
+from typing import Sequence, Union
+
+import numpy as np
+import tensorflow as tf
+
+from libspn_keras.layers.base_leaf import BaseLeaf
+
+
+class LeafLogProbCache:
+    """
+    Cache of the log-probabilities of a leaf layer for a fixed set of input values.
+
+    The log-probabilities of every value in ``values`` are precomputed for all variables and
+    components of the leaf. Once attached, the leaf looks its outputs up in this table instead of
+    evaluating its distribution when it is called with ``training=False``, as done by the
+    inference functions of an SPN. Calls with ``training=None`` evaluate the leaf itself, so that
+    custom training loops get gradients for its parameters. Inputs that are not covered by the
+    table are computed by the leaf itself.
+
+    With ``interpolate=False``, the table is keyed by exact values, which suits discrete inputs
+    and quantized continuous inputs. With ``interpolate=True``, ``values`` is a grid over which
+    log-probabilities of continuous inputs are interpolated linearly, and only inputs outside
+    of the grid are computed by the leaf.
+
+    The table is recomputed on the first call after any of the weights of the leaf change, e.g.
+    after training or loading weights. Hits and lookups are counted per input value, see
+    ``hit_rate`` and ``to_dict``.
+
+    Args:
+        leaf: A built leaf layer with univariate inputs. The cache attaches itself to the leaf.
+        values: Input values to precompute the log-probabilities of.
+        interpolate: Whether to interpolate between ``values`` rather than matching them
+            exactly.
+        max_size: Maximum number of log-probabilities in the table, i.e. the number of values
+            times the number of variables and components of the leaf.
+
+    Raises:
+        ValueError: If the leaf is not built or has multivariate inputs, if ``values`` has too
+            few elements or leads to a table larger than ``max_size``, or if interpolating
+            integer inputs.
+    """
+
+    def __init__(
+        self,
+        leaf: BaseLeaf,
+        values: Union[Sequence[float], np.ndarray],
+        interpolate: bool = False,
+        max_size: int = 2 ** 24,
+    ):
+        if not leaf.built:
+            raise ValueError("Can only cache log-probabilities of a built leaf")
+        if leaf._multivariate_size != 1:
+            raise ValueError("Can only cache log-probabilities of univariate leaves")
+        dtype = tf.as_dtype(leaf.dtype)
+        if interpolate and not dtype.is_floating:
+            raise ValueError("Can only interpolate log-probabilities of real inputs")
+        values = np.unique(np.asarray(values))
+        if len(values) < (2 if interpolate else 1):
+            raise ValueError("Not enough values to cache log-probabilities of")
+        self.num_regions = leaf._num_scopes * leaf._num_decomps
+        self.size = len(values) * self.num_regions * leaf.num_components
+        if self.size > max_size:
+            raise ValueError(
+                "A table with {} log-probabilities exceeds the maximum size of {}".format(
+                    self.size, max_size
+                )
+            )
+        self.leaf = leaf
+        self.interpolate = interpolate
+        self.values = tf.constant(values, dtype=dtype)
+        spacing = np.diff(values)
+        self._spacing = (
+            tf.constant(spacing[0], dtype=dtype)
+            if len(spacing) and np.allclose(spacing, spacing[0], rtol=1e-6, atol=0.0)
+            else None
+        )
+        self._table = tf.Variable(self._compute_table(), trainable=False)
+        self._weights = [tf.Variable(w, trainable=False) for w in leaf.weights]
+        self._num_lookups = tf.Variable(0, dtype=tf.int64, trainable=False)
+        self._num_hits = tf.Variable(0, dtype=tf.int64, trainable=False)
+        self._num_refreshes = tf.Variable(0, dtype=tf.int64, trainable=False)
+        leaf.log_prob_cache = self
+
+    def detach(self) -> None:
+        """Stop the leaf from using this cache."""
+        if self.leaf.log_prob_cache is self:
+            self.leaf.log_prob_cache = None
+
+    def __call__(self, x: tf.Tensor) -> tf.Tensor:
+        """
+        Compute the log-probabilities of the leaf from the table.
+
+        Args:
+            x: Spatial or region Tensor with raw input values.
+
+        Returns:
+            A Tensor with the log-probabilities per component, as returned by the leaf.
+        """
+        table = self._refreshed_table()
+        num_values = self.values.shape[0]
+        # Samples are the outer axis, followed by the regions of a sample
+        x_flat = tf.reshape(x, [-1, self.num_regions])
+        index = self._lower_index(x_flat)
+        if self.interpolate:
+            index = tf.clip_by_value(index, 0, num_values - 2)
+            lower = tf.gather(self.values, index)
+            upper = tf.gather(self.values, index + 1)
+            weight = tf.clip_by_value((x_flat - lower) / (upper - lower), 0.0, 1.0)
+            weight = weight[..., tf.newaxis]
+            log_prob = (
+                tf.gather(table, self._table_index(index)) * (1.0 - weight)
+                + tf.gather(table, self._table_index(index + 1)) * weight
+            )
+            hit = tf.logical_and(x_flat >= self.values[0], x_flat <= self.values[-1])
+        else:
+            index = tf.clip_by_value(index, 0, num_values - 1)
+            log_prob = tf.gather(table, self._table_index(index))
+            hit = tf.equal(tf.gather(self.values, index), x_flat)
+        num_hits = tf.reduce_sum(tf.cast(hit, tf.int64))
+        num_lookups = tf.size(x_flat, out_type=tf.int64)
+        self._num_lookups.assign_add(num_lookups)
+        self._num_hits.assign_add(num_hits)
+
+        log_prob = tf.reshape(
+            log_prob, tf.concat([tf.shape(x)[:-1], [self.leaf.num_components]], axis=0)
+        )
+        hit = tf.reshape(hit, tf.shape(x))
+        return tf.cond(
+            tf.equal(num_hits, num_lookups),
+            lambda: log_prob,
+            lambda: tf.where(hit, log_prob, self.leaf._log_prob(x)),
+        )
+
+    def _lower_index(self, x: tf.Tensor) -> tf.Tensor:
+        # Index of the largest value that is at most x, or of the nearest value for exact
+        # matches. Evenly spaced values, such as integers or quantization levels, are indexed
+        # arithmetically, which is much cheaper than a binary search.
+        if self._spacing is None:
+            lower_index = tf.searchsorted(
+                self.values, tf.reshape(x, [-1]), side="right"
+            )
+            return tf.reshape(lower_index, tf.shape(x)) - 1
+        position = (x - self.values[0]) / self._spacing
+        position = tf.floor(position) if self.interpolate else tf.round(position)
+        return tf.cast(position, tf.int32)
+
+    def _table_index(self, index: tf.Tensor) -> tf.Tensor:
+        return index * self.num_regions + tf.range(self.num_regions)
+
+    def _compute_table(self) -> tf.Tensor:
+        # Every value is evaluated for every region, which gives rows of [num_values, *scope_dims]
+        x = tf.broadcast_to(
+            tf.reshape(self.values, [-1, 1, 1, 1]),
+            [self.values.shape[0], self.leaf._num_scopes, self.leaf._num_decomps, 1],
+        )
+        return tf.reshape(self.leaf._log_prob(x), [-1, self.leaf.num_components])
+
+    def _refreshed_table(self) -> tf.Tensor:
+        if not self._weights:
+            return tf.identity(self._table)
+        stale = tf.reduce_any(
+            [
+                tf.reduce_any(tf.not_equal(weight, snapshot))
+                for weight, snapshot in zip(self.leaf.weights, self._weights)
+            ]
+        )
+
+        def refresh() -> tf.Tensor:
+            table = self._compute_table()
+            updates = [self._table.assign(table), self._num_refreshes.assign_add(1)]
+            updates.extend(
+                snapshot.assign(weight)
+                for weight, snapshot in zip(self.leaf.weights, self._weights)
+            )
+            with tf.control_dependencies(updates):
+                return tf.identity(table)
+
+        return tf.cond(stale, refresh, lambda: tf.identity(self._table))
+
+    def invalidate(self) -> None:
+        """Recompute the table now, e.g. after changing the leaf in a way that keeps its weights."""
+        self._table.assign(self._compute_table())
+        for weight, snapshot in zip(self.leaf.weights, self._weights):
+            snapshot.assign(weight)
+        self._num_refreshes.assign_add(1)
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        Obtain the fraction of input values that were found in the table.
+
+        Returns:
+            The hit rate, or zero if there were no lookups yet.
+        """
+        num_lookups = int(self._num_lookups.numpy())
+        return int(self._num_hits.numpy()) / num_lookups if num_lookups else 0.0
+
+    def reset_stats(self) -> None:
+        """Reset the counts of lookups, hits and refreshes."""
+        for count in (self._num_lookups, self._num_hits, self._num_refreshes):
+            count.assign(0)
+
+    def to_dict(self) -> dict:
+        """
+        Summarize the statistics of the cache.
+
+        Returns:
+            A dict holding the size of the table, the number of lookups and hits of input
+            values, the hit rate and the number of times the table was recomputed.
+        """
+        return dict(
+            size=self.size,
+            num_lookups=int(self._num_lookups.numpy()),
+            num_hits=int(self._num_hits.numpy()),
+            hit_rate=self.hit_rate,
+            num_refreshes=int(self._num_refreshes.numpy()),
+        )
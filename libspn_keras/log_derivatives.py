@@ -0,0 +1,274 @@
+from typing import Callable, List, Optional, Sequence, Tuple, Type
+
+import tensorflow as tf
+from tensorflow import keras
+
+from libspn_keras.layers.dense_product import DenseProduct
+from libspn_keras.layers.dense_sum import DenseSum
+from libspn_keras.layers.log_dropout import LogDropout
+from libspn_keras.layers.permute_and_pad_scopes import PermuteAndPadScopes
+from libspn_keras.layers.reduce_product import ReduceProduct
+from libspn_keras.layers.root_sum import RootSum
+from libspn_keras.math.logmatmul import logmatmul
+from libspn_keras.math.logutils import replace_infs_with_zeros
+
+# Computes the log-derivatives of the root w.r.t. the input of a layer from those w.r.t. its
+# output, given the layer, its input, its output and the log-derivatives w.r.t. its output
+_LogDerivative = Callable[
+    [keras.layers.Layer, tf.Tensor, tf.Tensor, tf.Tensor], tf.Tensor
+]
+
+
+def _log_weights(layer: DenseSum) -> tf.Tensor:
+    return layer.sum_op._weights_in_logspace(*layer._sum_weights())
+
+
+def _root_sum_log_derivative(
+    layer: RootSum, x: tf.Tensor, out: tf.Tensor, log_derivative: tf.Tensor
+) -> tf.Tensor:
+    # Weighted children are outputs themselves, so they have their own derivative
+    log_weights = _log_weights(layer)[0, 0, :, 0]
+    return tf.reshape(log_derivative + log_weights, tf.shape(x))
+
+
+def _dense_sum_log_derivative(
+    layer: DenseSum, x: tf.Tensor, out: tf.Tensor, log_derivative: tf.Tensor
+) -> tf.Tensor:
+    # The derivative w.r.t. a child sums the derivatives w.r.t. its parents times the weights
+    log_weights = tf.transpose(_log_weights(layer), (0, 1, 3, 2))
+    log_derivative = logmatmul(tf.transpose(log_derivative, (1, 2, 0, 3)), log_weights)
+    return tf.transpose(log_derivative, (2, 0, 1, 3))
+
+
+def _dense_product_log_derivative(
+    layer: DenseProduct, x: tf.Tensor, out: tf.Tensor, log_derivative: tf.Tensor
+) -> tf.Tensor:
+    # The derivative w.r.t. a child sums the derivatives w.r.t. its parents times the other
+    # children of those parents. The child itself is left out rather than divided out, so that
+    # children with a probability of zero get a finite derivative.
+    _, num_scopes_in, num_decomps, num_nodes_in = x.shape
+    num_factors = layer.num_factors
+    num_scopes_out = num_scopes_in // num_factors
+    factors = tf.unstack(
+        tf.reshape(x, [-1, num_scopes_out, num_factors, num_decomps, num_nodes_in]),
+        axis=2,
+    )
+    log_derivative = tf.reshape(
+        log_derivative, [-1, num_scopes_out, num_decomps] + [num_nodes_in] * num_factors
+    )
+    factor_axes = [3 + i for i in range(num_factors)]
+    log_derivative_per_factor = []
+    for i in range(num_factors):
+        weighted = log_derivative
+        for j, factor in enumerate(factors):
+            if j != i:
+                shape = [-1, num_scopes_out, num_decomps] + [
+                    num_nodes_in if k == j else 1 for k in range(num_factors)
+                ]
+                weighted = weighted + tf.reshape(factor, shape)
+        log_derivative_per_factor.append(
+            tf.reduce_logsumexp(
+                weighted, axis=[axis for axis in factor_axes if axis != 3 + i]
+            )
+            if num_factors > 1
+            else weighted
+        )
+    return tf.reshape(
+        tf.stack(log_derivative_per_factor, axis=2),
+        [-1, num_scopes_in, num_decomps, num_nodes_in],
+    )
+
+
+def _sum_over_pairwise_product_log_derivative(
+    layer: DenseSum, x: tf.Tensor, log_derivative: tf.Tensor
+) -> tf.Tensor:
+    # Propagates from a sum to the factors of the pairwise products below it in one step. The
+    # derivatives w.r.t. the products stay in linear space, shifted by their maximum per sample,
+    # so that only the factors and the derivatives w.r.t. the sums are exponentiated.
+    _, num_scopes_in, num_decomps, num_nodes_in = x.shape
+    num_scopes_out = num_scopes_in // 2
+    log_derivative = tf.transpose(log_derivative, (1, 2, 0, 3))
+    max_log_derivative = replace_infs_with_zeros(
+        tf.reduce_max(log_derivative, axis=-1, keepdims=True)
+    )
+    derivative = tf.matmul(
+        tf.exp(log_derivative - max_log_derivative),
+        tf.exp(tf.transpose(_log_weights(layer), (0, 1, 3, 2))),
+    )
+    derivative = tf.reshape(
+        derivative, [num_scopes_out, num_decomps, -1, num_nodes_in, num_nodes_in],
+    )
+    left, right = tf.unstack(
+        tf.transpose(
+            tf.reshape(x, [-1, num_scopes_out, 2, num_decomps, num_nodes_in]),
+            (2, 1, 3, 0, 4),
+        )
+    )
+    max_left, max_right = [
+        replace_infs_with_zeros(tf.reduce_max(factor, axis=-1, keepdims=True))
+        for factor in (left, right)
+    ]
+    log_derivative_left = (
+        tf.math.log(
+            tf.reduce_sum(
+                derivative * tf.exp(right - max_right)[..., tf.newaxis, :], axis=-1
+            )
+        )
+        + max_right
+    )
+    log_derivative_right = (
+        tf.math.log(
+            tf.reduce_sum(
+                derivative * tf.exp(left - max_left)[..., tf.newaxis], axis=-2
+            )
+        )
+        + max_left
+    )
+    log_derivative = (
+        tf.stack([log_derivative_left, log_derivative_right], axis=1)
+        + max_log_derivative[:, tf.newaxis]
+    )
+    return tf.reshape(
+        tf.transpose(log_derivative, (3, 0, 1, 2, 4)),
+        [-1, num_scopes_in, num_decomps, num_nodes_in],
+    )
+
+
+def _is_sum_over_pairwise_product(
+    layer: keras.layers.Layer, child: keras.layers.Layer
+) -> bool:
+    return (
+        type(layer) is DenseSum
+        and isinstance(child, DenseProduct)
+        and child.num_factors == 2
+        and child.product_indices is None
+    )
+
+
+def _reduce_product_log_derivative(
+    layer: ReduceProduct, x: tf.Tensor, out: tf.Tensor, log_derivative: tf.Tensor
+) -> tf.Tensor:
+    _, num_scopes_in, num_decomps, num_nodes = x.shape
+    factors = tf.reshape(
+        x,
+        [
+            -1,
+            num_scopes_in // layer.num_factors,
+            layer.num_factors,
+            num_decomps,
+            num_nodes,
+        ],
+    )
+    # Sums of all other factors, without subtracting a factor that might be -inf
+    other_factors = tf.cumsum(factors, axis=2, exclusive=True) + tf.cumsum(
+        factors, axis=2, exclusive=True, reverse=True
+    )
+    return tf.reshape(
+        tf.expand_dims(log_derivative, axis=2) + other_factors, tf.shape(x)
+    )
+
+
+def _permute_and_pad_scopes_log_derivative(
+    layer: PermuteAndPadScopes, x: tf.Tensor, out: tf.Tensor, log_derivative: tf.Tensor
+) -> tf.Tensor:
+    # Every input scope appears at most once per decomposition, so the derivatives are scattered
+    # back to the permuted scopes. Scopes that are left out have no parents.
+    _, num_scopes_in, num_decomps, num_nodes = x.shape
+    permutations = tf.convert_to_tensor(layer.permutations)
+    decomps_and_scopes_out = tf.where(permutations >= 0)
+    decomps, scopes_out = tf.unstack(decomps_and_scopes_out, axis=1)
+    scopes_in = tf.cast(tf.gather_nd(permutations, decomps_and_scopes_out), tf.int64)
+    # Regions are the outer axis, with the scope and decomposition axes flattened
+    log_derivative = tf.transpose(
+        tf.reshape(log_derivative, [-1, out.shape[1] * num_decomps, num_nodes]),
+        (1, 0, 2),
+    )
+    log_derivative = tf.tensor_scatter_nd_update(
+        tf.fill(
+            [num_scopes_in * num_decomps, tf.shape(x)[0], num_nodes], float("-inf")
+        ),
+        tf.expand_dims(scopes_in * num_decomps + decomps, axis=1),
+        tf.gather(log_derivative, scopes_out * num_decomps + decomps),
+    )
+    return tf.reshape(
+        tf.transpose(log_derivative, (1, 0, 2)),
+        [-1, num_scopes_in, num_decomps, num_nodes],
+    )
+
+
+def _identity_log_derivative(
+    layer: keras.layers.Layer, x: tf.Tensor, out: tf.Tensor, log_derivative: tf.Tensor
+) -> tf.Tensor:
+    return log_derivative
+
+
+# Layers between the leaves and the root of which the derivatives are propagated in log-space.
+# Checked in order, so subclasses must precede their bases.
+_LOG_DERIVATIVES: List[Tuple[Type[keras.layers.Layer], _LogDerivative]] = [
+    (RootSum, _root_sum_log_derivative),
+    (DenseSum, _dense_sum_log_derivative),
+    (DenseProduct, _dense_product_log_derivative),
+    (ReduceProduct, _reduce_product_log_derivative),
+    (PermuteAndPadScopes, _permute_and_pad_scopes_log_derivative),
+    (LogDropout, _identity_log_derivative),
+]
+
+
+def _log_derivative_fn(layer: keras.layers.Layer) -> Optional[_LogDerivative]:
+    if isinstance(layer, DenseProduct) and layer.product_indices is not None:
+        return None
+    if type(layer) not in (DenseSum, RootSum) and isinstance(layer, DenseSum):
+        # Spatial sums have no regions
+        return None
+    for layer_type, log_derivative_fn in _LOG_DERIVATIVES:
+        if isinstance(layer, layer_type):
+            return log_derivative_fn
+    return None
+
+
+def log_derivatives(
+    layers: Sequence[keras.layers.Layer],
+    inputs: Sequence[tf.Tensor],
+    outputs: Sequence[tf.Tensor],
+) -> tf.Tensor:
+    """
+    Compute the log-derivatives of the root of an SPN w.r.t. the input of a stack of layers.
+
+    The derivatives are those of the probability of the root w.r.t. the probabilities of the
+    nodes, rather than of their log-probabilities. They are propagated downward in log-space,
+    where a child of a product gets the sum of its siblings instead of dividing the product by
+    the child. Unlike backpropagating through the log-probabilities, this does not underflow
+    for nodes with a low probability.
+
+    Args:
+        layers: Region layers from the input to the root, i.e. ``DenseSum``, ``DenseProduct``,
+            ``ReduceProduct``, ``PermuteAndPadScopes``, ``LogDropout`` and ``RootSum`` layers.
+        inputs: Inputs of the layers.
+        outputs: Outputs of the layers. The final output is the root.
+
+    Returns:
+        The log-derivatives w.r.t. the input of the first layer.
+
+    Raises:
+        ValueError: If a layer does not support log-derivatives.
+    """
+    log_derivative = tf.zeros_like(outputs[-1])
+    i = len(layers) - 1
+    while i >= 0:
+        layer, x, out = layers[i], inputs[i], outputs[i]
+        if i > 0 and _is_sum_over_pairwise_product(layer, layers[i - 1]):
+            log_derivative = _sum_over_pairwise_product_log_derivative(
+                layer, inputs[i - 1], log_derivative
+            )
+            i -= 2
+            continue
+        log_derivative_fn = _log_derivative_fn(layer)
+        if log_derivative_fn is None:
+            raise ValueError(
+                "Cannot compute log-derivatives of a {}".format(
+                    layer.__class__.__name__
+                )
+            )
+        log_derivative = log_derivative_fn(layer, x, out, log_derivative)
+        i -= 1
+    return log_derivative
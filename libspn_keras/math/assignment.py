@@ -0,0 +1,127 @@
+from typing import Optional
+
+import numpy as np
+
+
+def batched_linear_assignment(
+    costs: np.ndarray,
+    relative_tolerance: float = 1e-9,
+    epsilon_scaling: float = 5.0,
+    max_iterations: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Solve a batch of square linear assignment problems with the auction algorithm.
+
+    Finds for every problem the permutation ``p`` that minimizes ``sum_i costs[i, p[i]]``. All
+    problems are solved simultaneously with Jacobi-style bidding and epsilon scaling, so that the
+    cost per round is linear in the batch size and the total cost is polynomial in the number of
+    rows, as opposed to enumerating all permutations.
+
+    The auction algorithm finds an assignment whose total cost is within ``n * epsilon`` of the
+    optimum, where ``epsilon`` is the final bid increment. It is set to ``relative_tolerance``
+    times the range of the costs of each problem divided by ``n``.
+
+    Args:
+        costs: Cost matrices of shape ``[batch, n, n]`` or a single matrix of shape ``[n, n]``.
+        relative_tolerance: Tolerance on the total cost relative to the range of the costs.
+        epsilon_scaling: Factor by which the bid increment is reduced in between phases.
+        max_iterations: Maximum number of bidding rounds per phase. Defaults to a generous
+            bound that is only hit for degenerate inputs.
+
+    Returns:
+        An integer array of shape ``[batch, n]`` (or ``[n]`` for a single matrix) holding for
+        every row the column assigned to it.
+
+    Raises:
+        ValueError: If the cost matrices are not square or contain non-finite values.
+        RuntimeError: If an auction does not converge within ``max_iterations`` rounds.
+    """
+    costs = np.asarray(costs, dtype=np.float64)
+    single_problem = costs.ndim == 2
+    if single_problem:
+        costs = costs[np.newaxis]
+    if costs.ndim != 3 or costs.shape[1] != costs.shape[2]:
+        raise ValueError(
+            "Expected square cost matrices, got shape {}".format(costs.shape)
+        )
+    if not np.all(np.isfinite(costs)):
+        raise ValueError("Costs must be finite")
+
+    batch_size, n, _ = costs.shape
+    if n <= 1 or batch_size == 0:
+        assignment = np.zeros((batch_size, n), dtype=np.int64)
+        return assignment[0] if single_problem else assignment
+
+    benefits = -costs
+    cost_range = benefits.max(axis=(1, 2)) - benefits.min(axis=(1, 2))
+    cost_range = np.where(cost_range > 0, cost_range, 1.0)
+    final_epsilon = cost_range * relative_tolerance / n
+    epsilon = cost_range / epsilon_scaling
+    max_iterations = max_iterations or 100 * n * n + 1000
+
+    prices = np.zeros((batch_size, n))
+    while True:
+        epsilon = np.maximum(epsilon, final_epsilon)
+        assignment = _auction_phase(benefits, prices, epsilon, max_iterations)
+        if assignment is None:
+            raise RuntimeError(
+                "Auction did not converge within {} iterations".format(max_iterations)
+            )
+        if np.all(epsilon <= final_epsilon):
+            break
+        epsilon = epsilon / epsilon_scaling
+
+    return assignment[0] if single_problem else assignment
+
+
+def _auction_phase(
+    benefits: np.ndarray, prices: np.ndarray, epsilon: np.ndarray, max_iterations: int
+) -> Optional[np.ndarray]:
+    # Runs a single auction with a fixed bid increment. Prices are updated in place so that
+    # they carry over to the next phase. Returns None if the auction did not converge.
+    batch_size, n, _ = benefits.shape
+    person_to_object = np.full((batch_size, n), -1, dtype=np.int64)
+    object_to_person = np.full((batch_size, n), -1, dtype=np.int64)
+
+    for _ in range(max_iterations):
+        batch_index, person_index = np.nonzero(person_to_object < 0)
+        if batch_index.size == 0:
+            return person_to_object
+
+        # Every unassigned person bids on their most valuable object, raising its price by
+        # the difference with the second most valuable object plus epsilon
+        values = benefits[batch_index, person_index] - prices[batch_index]
+        top_two = np.argpartition(-values, 1, axis=1)[:, :2]
+        top_two_values = np.take_along_axis(values, top_two, axis=1)
+        first_is_best = top_two_values[:, 0] >= top_two_values[:, 1]
+        best_object = np.where(first_is_best, top_two[:, 0], top_two[:, 1])
+        best_value = top_two_values.max(axis=1)
+        second_value = top_two_values.min(axis=1)
+        bids = (
+            prices[batch_index, best_object]
+            + best_value
+            - second_value
+            + epsilon[batch_index]
+        )
+
+        # Each object goes to its highest bidder, ties are broken by the lowest person index
+        flat_object = batch_index * n + best_object
+        highest_bid = np.full(batch_size * n, -np.inf)
+        np.maximum.at(highest_bid, flat_object, bids)
+        is_highest = bids >= highest_bid[flat_object]
+        winner = np.full(batch_size * n, n, dtype=np.int64)
+        np.minimum.at(winner, flat_object[is_highest], person_index[is_highest])
+
+        won_objects = np.unique(flat_object)
+        won_batch, won_object = np.divmod(won_objects, n)
+        previous_owner = object_to_person[won_batch, won_object]
+        has_previous_owner = previous_owner >= 0
+        person_to_object[
+            won_batch[has_previous_owner], previous_owner[has_previous_owner]
+        ] = -1
+        new_owner = winner[won_objects]
+        person_to_object[won_batch, new_owner] = won_object
+        object_to_person[won_batch, won_object] = new_owner
+        prices[won_batch, won_object] = highest_bid[won_objects]
+
+    return None
@@ -25,8 +25,8 @@ def logconv1x1_2d(input: tf.Tensor, filter: tf.Tensor) -> tf.Tensor:
             tf.stop_gradient(tf.reduce_max(input, axis=-1, keepdims=True))
         )
 
-        filter -= filter_max
-        input -= input_max
+        filter = filter - filter_max
+        input = input - input_max
 
         out = tf.math.log(
             tf.nn.convolution(
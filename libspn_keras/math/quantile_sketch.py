@@ -0,0 +1,256 @@
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class QuantileSketch:
+    """
+    Mergeable streaming sketch of the distribution of many variables at once.
+
+    Every variable is summarized by at most ``max_centroids`` weighted centroids, in the spirit of
+    a merging t-digest. New values are merged into the sorted centroids, after which
+    neighbouring centroids are combined into buckets of (roughly) equal weight. Memory is
+    therefore bounded by the number of variables times ``max_centroids``, regardless of the
+    number of samples. As long as at most ``max_centroids`` samples were added, the centroids
+    are the samples themselves, so that e.g. quantile means are exact.
+
+    Two sketches of variables with the same shape can be merged, so that sketches can be built
+    on shards of the data independently.
+
+    Args:
+        max_centroids: Maximum number of centroids per variable. Quantile errors are in the order
+            of ``1 / max_centroids``.
+    """
+
+    def __init__(self, max_centroids: int = 256):
+        self.max_centroids = max_centroids
+        self._means: Optional[np.ndarray] = None
+        self._weights: Optional[np.ndarray] = None
+        self._min: Optional[np.ndarray] = None
+        self._max: Optional[np.ndarray] = None
+        self._variable_shape: Tuple[int, ...] = ()
+
+    @property
+    def count(self) -> float:
+        """
+        Obtain the number of samples that were added to the sketch.
+
+        Returns:
+            The number of samples.
+        """
+        if self._weights is None:
+            return 0.0
+        return float(self._weights[0].sum())
+
+    @property
+    def min(self) -> np.ndarray:
+        """
+        Obtain the exact minimum per variable.
+
+        Returns:
+            An array with the shape of the variables.
+        """
+        self._check_not_empty()
+        return self._min.reshape(self._variable_shape)
+
+    @property
+    def max(self) -> np.ndarray:
+        """
+        Obtain the exact maximum per variable.
+
+        Returns:
+            An array with the shape of the variables.
+        """
+        self._check_not_empty()
+        return self._max.reshape(self._variable_shape)
+
+    def update(self, values: np.ndarray) -> "QuantileSketch":
+        """
+        Add a chunk of samples to the sketch.
+
+        Args:
+            values: Array of shape ``[num_samples, *variable_shape]``.
+
+        Returns:
+            The sketch itself.
+
+        Raises:
+            ValueError: If the variable shape differs from that of earlier chunks.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return self
+        flat_values = values.reshape(len(values), -1).T
+        if self._means is None:
+            self._variable_shape = values.shape[1:]
+            self._means = flat_values
+            self._weights = np.ones_like(flat_values)
+            self._min = flat_values.min(axis=1)
+            self._max = flat_values.max(axis=1)
+        else:
+            if values.shape[1:] != self._variable_shape:
+                raise ValueError(
+                    "Expected values with variable shape {}, got {}".format(
+                        self._variable_shape, values.shape[1:]
+                    )
+                )
+            self._means = np.concatenate([self._means, flat_values], axis=1)
+            self._weights = np.concatenate(
+                [self._weights, np.ones_like(flat_values)], axis=1
+            )
+            self._min = np.minimum(self._min, flat_values.min(axis=1))
+            self._max = np.maximum(self._max, flat_values.max(axis=1))
+        self._compress()
+        return self
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        """
+        Merge another sketch into this sketch.
+
+        Args:
+            other: Sketch of variables with the same shape.
+
+        Returns:
+            The sketch itself.
+
+        Raises:
+            ValueError: If the variable shapes of the sketches differ.
+        """
+        if other._means is None:
+            return self
+        if self._means is None:
+            self._variable_shape = other._variable_shape
+            self._means, self._weights = other._means.copy(), other._weights.copy()
+            self._min, self._max = other._min.copy(), other._max.copy()
+            self._compress()
+            return self
+        if other._variable_shape != self._variable_shape:
+            raise ValueError(
+                "Cannot merge sketches with variable shapes {} and {}".format(
+                    self._variable_shape, other._variable_shape
+                )
+            )
+        self._means = np.concatenate([self._means, other._means], axis=1)
+        self._weights = np.concatenate([self._weights, other._weights], axis=1)
+        self._min = np.minimum(self._min, other._min)
+        self._max = np.maximum(self._max, other._max)
+        self._compress()
+        return self
+
+    def quantiles(self, q: Sequence[float]) -> np.ndarray:
+        """
+        Estimate quantiles per variable.
+
+        Args:
+            q: Quantiles in ``[0, 1]``.
+
+        Returns:
+            An array of shape ``[len(q), *variable_shape]``.
+        """
+        self._check_not_empty()
+        cumulative = np.cumsum(self._weights, axis=1)
+        total = cumulative[:, -1:]
+        # Every centroid is located at the middle of its mass, the exact minimum and maximum
+        # are located at the ends. Empty centroids are sorted to the end, so placing them at the
+        # maximum keeps positions non-decreasing.
+        is_empty = self._weights == 0
+        positions = np.concatenate(
+            [
+                np.zeros_like(total),
+                np.where(is_empty, total, cumulative - self._weights / 2),
+                total,
+            ],
+            axis=1,
+        )
+        values = np.concatenate(
+            [
+                self._min[:, np.newaxis],
+                np.where(is_empty, self._max[:, np.newaxis], self._means),
+                self._max[:, np.newaxis],
+            ],
+            axis=1,
+        )
+        rows = np.arange(len(positions))
+        estimates = []
+        for quantile in np.asarray(q, dtype=np.float64):
+            rank = quantile * total
+            right = np.clip(np.sum(positions < rank, axis=1), 1, positions.shape[1] - 1)
+            left = right - 1
+            left_position, right_position = (
+                positions[rows, left],
+                positions[rows, right],
+            )
+            span = np.where(
+                right_position > left_position, right_position - left_position, 1.0
+            )
+            fraction = np.clip((rank[:, 0] - left_position) / span, 0.0, 1.0)
+            estimates.append(
+                values[rows, left]
+                + fraction * (values[rows, right] - values[rows, left])
+            )
+        return np.stack(estimates).reshape((len(estimates),) + self._variable_shape)
+
+    def quantile_means(self, num_quantiles: int) -> np.ndarray:
+        """
+        Estimate the mean of the values within each of a number of equal-mass quantile bins.
+
+        Args:
+            num_quantiles: Number of bins.
+
+        Returns:
+            An array of shape ``[num_quantiles, *variable_shape]``.
+        """
+        self._check_not_empty()
+        ends = np.cumsum(self._weights, axis=1)
+        starts = ends - self._weights
+        total = ends[:, -1:]
+        means = []
+        for k in range(num_quantiles):
+            lower, upper = total * k / num_quantiles, total * (k + 1) / num_quantiles
+            overlap = np.clip(
+                np.minimum(upper, ends) - np.maximum(lower, starts), 0.0, None
+            )
+            means.append(
+                np.sum(overlap * self._means, axis=1)
+                / np.maximum(np.sum(overlap, axis=1), 1e-12)
+            )
+        return np.stack(means).reshape((num_quantiles,) + self._variable_shape)
+
+    def _compress(self) -> None:
+        # Sorts the centroids of every variable and combines them into at most max_centroids
+        # buckets of roughly equal weight with a single weighted bincount. Empty centroids are
+        # sorted to the end.
+        order = np.argsort(
+            np.where(self._weights > 0, self._means, np.inf), axis=1, kind="stable"
+        )
+        means = np.take_along_axis(self._means, order, axis=1)
+        weights = np.take_along_axis(self._weights, order, axis=1)
+        num_variables, num_centroids = means.shape
+        if num_centroids <= self.max_centroids:
+            self._means, self._weights = means, weights
+            return
+
+        cumulative = np.cumsum(weights, axis=1)
+        mid_quantiles = (cumulative - weights / 2) / cumulative[:, -1:]
+        buckets = np.minimum(
+            (mid_quantiles * self.max_centroids).astype(np.int64),
+            self.max_centroids - 1,
+        )
+        segment_ids = (
+            buckets + np.arange(num_variables)[:, np.newaxis] * self.max_centroids
+        ).ravel()
+        num_segments = num_variables * self.max_centroids
+        bucket_weights = np.bincount(
+            segment_ids, weights=weights.ravel(), minlength=num_segments
+        ).reshape(num_variables, self.max_centroids)
+        bucket_sums = np.bincount(
+            segment_ids, weights=(weights * means).ravel(), minlength=num_segments
+        ).reshape(num_variables, self.max_centroids)
+        self._weights = bucket_weights
+        self._means = np.where(
+            bucket_weights > 0, bucket_sums / np.maximum(bucket_weights, 1e-12), 0.0
+        )
+
+    def _check_not_empty(self) -> None:
+        if self._means is None:
+            raise ValueError("Sketch is empty, add values with update() first")
@@ -1,4 +1,5 @@
-from typing import Dict, List, Optional, Tuple, Union
+import inspect
+from typing import Dict, List, Optional, Tuple, Type, Union
 
 import tensorflow as tf
 from tensorflow import keras
@@ -21,6 +22,13 @@ from libspn_keras.layers.permute_and_pad_scopes_random import PermuteAndPadScope
 from libspn_keras.layers.reduce_product import ReduceProduct
 from libspn_keras.layers.root_sum import RootSum
 from libspn_keras.layers.undecompose import Undecompose
+from libspn_keras.log_derivatives import log_derivatives
+from libspn_keras.serialization import get_custom_objects
+
+# Keras distinguishes the legacy serialization format of layer configs as of TF 2.13
+_HAS_LEGACY_FORMAT = (
+    "use_legacy_format" in inspect.signature(keras.layers.deserialize).parameters
+)
 
 
 class SequentialSumProductNetwork(keras.Sequential):
@@ -57,20 +65,32 @@ class SequentialSumProductNetwork(keras.Sequential):
                 "Model cannot be unsupervised when evidence should be inferred"
             )
         self.infer_no_evidence = infer_no_evidence
+        self._leaf_index: Optional[int] = None
         if infer_no_evidence:
-            self._normalize_index = self._normalize_layer = None
-            for i, layer in enumerate(self.layers):
-                if isinstance(layer, NormalizeStandardScore):
-                    self._normalize_index = i
-                    self._normalize_layer = layer
-
-                if isinstance(layer, LocationScaleLeafBase):
-                    self._leaf_index = i
-                    self._leaf_layer = layer
-                    break
-            else:
+            self._locate_leaf()
+            if not isinstance(self._leaf_layer, LocationScaleLeafBase):
                 raise ValueError("No LocationScaleLeafBase leaf layer found")
 
+    def _locate_leaf(self) -> None:
+        if self._leaf_index is not None:
+            return
+        self._normalize_index = self._normalize_layer = None
+        self._flat_to_regions_index = None
+        for i, layer in enumerate(self.layers):
+            if isinstance(layer, NormalizeStandardScore):
+                self._normalize_index = i
+                self._normalize_layer = layer
+
+            if isinstance(layer, FlatToRegions):
+                self._flat_to_regions_index = i
+
+            if isinstance(layer, BaseLeaf):
+                self._leaf_index = i
+                self._leaf_layer = layer
+                break
+        else:
+            raise ValueError("No leaf layer found")
+
     def call(
         self,
         inputs: Union[Tuple[tf.Tensor, ...], tf.Tensor],
@@ -124,55 +144,250 @@ class SequentialSumProductNetwork(keras.Sequential):
         )
         return {m.name: m.result() for m in self.metrics}
 
-    def _call_backprop_to_leaves(
-        self, inputs: Tuple[tf.Tensor, ...], training: Optional[bool] = None
+    def marginal(
+        self, x: tf.Tensor, evidence_mask: tf.Tensor, training: Optional[bool] = None,
     ) -> tf.Tensor:
-        inputs, evidence_mask = inputs[0], inputs[1]
-        if self._build_input_shape is None:  # type: ignore
-            input_shapes = nest.map_structure(_get_shape_tuple, inputs)
-            self._build_input_shape = input_shapes
+        """
+        Compute the log-probability of the evidence with all other variables marginalized out.
 
-        outputs = inputs  # handle the corner case where self.layers is empty
-        with tf.GradientTape() as tape:
-            for i, layer in enumerate(self.layers):
-                # During each iteration, `inputs` are the inputs to `layer`, and `outputs`
-                # are the outputs of `layer` applied to `inputs`. At the end of each
-                # iteration `inputs` is set to `outputs` to prepare for the next layer.
-                kwargs = {}
-                argspec = self._layer_call_argspecs[layer].args
-                if "training" in argspec:
-                    kwargs["training"] = training
-
-                if i == self._leaf_index:
-                    leaf_inputs = inputs
-
-                if i == self._normalize_index:
-                    kwargs["return_stats"] = True
-                    outputs, mean, stddev = layer(inputs, **kwargs)
-                else:
-                    outputs = layer(inputs, **kwargs)
-
-                if i == self._leaf_index:
-                    outputs = leaf_out = tf.where(
-                        evidence_mask, outputs, tf.zeros_like(outputs)
-                    )
-                    tape.watch(leaf_out)
+        Variables outside the evidence get a log-probability of zero at the leaves, which
+        integrates them out of the SPN in a single forward pass.
+
+        Args:
+            x: Raw input. Values of variables outside the evidence are ignored.
+            evidence_mask: Boolean tensor with the same shape as ``x`` that is ``True`` for
+                variables that are part of the evidence.
+            training: Whether the SPN is training or not.
+
+        Returns:
+            The log-probability of the root.
+        """
+        root, _, _ = self._call_with_masked_leaves(x, evidence_mask, training)
+        return root
+
+    def marginal_queries(
+        self,
+        x: tf.Tensor,
+        evidence_masks: tf.Tensor,
+        training: Optional[bool] = None,
+        max_batch_size: Optional[int] = None,
+    ) -> tf.Tensor:
+        """
+        Compute the log-probability of the evidence for many evidence masks of the same samples.
 
-                if len(nest.flatten(outputs)) != 1:
-                    raise ValueError(SINGLE_LAYER_OUTPUT_ERROR_MSG)
-                # `outputs` will be the inputs to the next layer.
-                inputs = outputs
+        Equivalent to calling ``marginal`` once per mask, but the layers up to and including the
+        leaf, as well as any ``PermuteAndPadScopes`` layers right after it, only run once for
+        the samples and once for the masks. The masked leaf outputs of all queries are then
+        evaluated by the remaining layers with the queries and samples in a single batch axis.
 
-        leaf_grads = tape.gradient(outputs, leaf_out)
+        Args:
+            x: Raw input with shape ``[batch, ...]``.
+            evidence_masks: Boolean tensor with shape ``[num_queries, ...]`` that is ``True``
+                for variables that are part of the evidence of a query. The remaining axes are
+                those of a single sample of ``x``.
+            training: Whether the SPN is training or not.
+            max_batch_size: If given, at most this many pairs of queries and samples are
+                evaluated at once, so that memory is bounded for many queries. Queries are
+                split in chunks of ``max(1, max_batch_size // batch)``, which requires a static
+                batch size.
+
+        Returns:
+            The log-probability of the root with shape ``[num_queries, batch, ...]``.
+        """
+        self._locate_leaf()
+        evidence_masks = tf.convert_to_tensor(evidence_masks, dtype=tf.bool)
+        for i, layer in enumerate(self.layers[: self._leaf_index + 1]):
+            x = layer(x, **self._layer_kwargs(layer, training))
+            if i == self._flat_to_regions_index:
+                evidence_masks = layer.call(evidence_masks)
+        # A variable is part of the evidence if all of its dimensions are
+        leaf_masks = tf.cast(
+            tf.reduce_all(evidence_masks, axis=-1, keepdims=True), x.dtype
+        )
+
+        # Permuting and padding commutes with masking, as padded scopes are zero either way
+        first_index = self._leaf_index + 1
+        while first_index < len(self.layers) and isinstance(
+            self.layers[first_index], PermuteAndPadScopes
+        ):
+            layer = self.layers[first_index]
+            x = layer(x)
+            leaf_masks = layer.call(leaf_masks)
+            first_index += 1
+
+        num_queries = leaf_masks.shape[0]
+        queries_per_chunk = num_queries
+        if max_batch_size is not None and num_queries is not None:
+            queries_per_chunk = max(1, max_batch_size // x.shape[0])
+
+        outputs = []
+        for start in range(0, num_queries or 1, queries_per_chunk or 1):
+            masks = leaf_masks[start : start + queries_per_chunk, tf.newaxis]
+            num_chunk_queries = tf.shape(masks)[0]
+            out = tf.where(masks > 0.5, x[tf.newaxis], tf.zeros_like(x[tf.newaxis]))
+            out = tf.reshape(out, tf.concat([[-1], tf.shape(x)[1:]], axis=0))
+            for layer in self.layers[first_index:]:
+                out = layer(out, **self._layer_kwargs(layer, training))
+            outputs.append(
+                tf.reshape(
+                    out,
+                    tf.concat([[num_chunk_queries, -1], tf.shape(out)[1:]], axis=0),
+                )
+            )
+        return tf.concat(outputs, axis=0) if len(outputs) > 1 else outputs[0]
+
+    def _layer_kwargs(
+        self, layer: keras.layers.Layer, training: Optional[bool]
+    ) -> Dict[str, Optional[bool]]:
+        if "training" in self._layer_call_argspecs[layer].args:
+            return dict(training=training)
+        return {}
+
+    def all_conditionals(
+        self, x: tf.Tensor, training: Optional[bool] = None
+    ) -> tf.Tensor:
+        """
+        Compute the log-probability of every variable given all other variables.
+
+        The probability of the root is linear in the leaves of any single variable, so the
+        marginal probability without that variable is the sum of the derivatives of the root
+        w.r.t. those leaves. A single downward pass gives these derivatives for the leaves of
+        all variables at once, see ``libspn_keras.log_derivatives.log_derivatives``. This
+        costs about twice a single forward pass, instead of a marginalization pass per
+        variable. Results equal the joint log-probability minus the log-probability of
+        ``marginal`` with one variable left out of the evidence.
+
+        Args:
+            x: Raw input of a region SPN with a ``FlatToRegions`` layer.
+            training: Whether the SPN is training or not.
+
+        Returns:
+            A tensor with shape ``[batch, num_vars]`` holding ``log p(x_i | x_{-i})``. For
+            multivariate leaves, all dimensions of a variable are left out together.
+
+        Raises:
+            ValueError: If the SPN has no ``FlatToRegions`` layer.
+        """
+        self._locate_leaf()
+        if self._flat_to_regions_index is None:
+            raise ValueError("Can only compute conditionals of region SPNs")
+        outputs = [x]
+        for layer in self.layers:
+            outputs.append(layer(outputs[-1], **self._layer_kwargs(layer, training)))
+
+        first_index = self._leaf_index + 1
+        leaf_log_derivatives = log_derivatives(
+            self.layers[first_index:],
+            outputs[first_index:-1],
+            outputs[first_index + 1 :],
+        )
+        # Derivatives w.r.t. all decompositions and components of a variable are summed
+        log_marginals = tf.reduce_logsumexp(leaf_log_derivatives, axis=[2, 3])
+        log_likelihood = tf.reduce_logsumexp(outputs[-1], axis=-1, keepdims=True)
+        return log_likelihood - log_marginals
+
+    def impute(
+        self, x: tf.Tensor, evidence_mask: tf.Tensor, training: Optional[bool] = None,
+    ) -> tf.Tensor:
+        """
+        Impute variables outside the evidence by backpropagating from the root to the leaves.
+
+        The gradients of the root with respect to the leaves weigh the modes of the leaf
+        components. Depending on the backward pass of the sum ops, this gives e.g. expected
+        modes (``SumOpGradBackprop``) or MPE estimates (``SumOpHardEMBackprop``).
+
+        Args:
+            x: Raw input. Values of variables outside the evidence are ignored.
+            evidence_mask: Boolean tensor with the same shape as ``x`` that is ``True`` for
+                variables that are part of the evidence.
+            training: Whether the SPN is training or not.
+
+        Returns:
+            A tensor with the same shape as ``x`` where variables outside the evidence are
+            imputed.
+        """
+        with tf.GradientTape() as tape:
+            root, leaf_out, stats = self._call_with_masked_leaves(
+                x, evidence_mask, training, tape=tape
+            )
+            log_likelihood = tf.reduce_logsumexp(root, axis=-1)
+        leaf_grads = tape.gradient(log_likelihood, leaf_out)
         modes = self._leaf_layer.get_modes()
         outputs = tf.reduce_sum(tf.expand_dims(leaf_grads, axis=-1) * modes, axis=3)
-        outputs = tf.where(evidence_mask, leaf_inputs, outputs)
-        if self._normalize_layer is not None and self._normalize_index is not None:
+
+        if self._flat_to_regions_index is not None:
+            # Decompositions partition the posterior, so their contributions are summed
+            outputs = tf.reduce_sum(outputs, axis=2)
+        outputs = tf.reshape(outputs, tf.shape(x))
+        if stats is not None:
+            mean, stddev = stats
             outputs = (
                 outputs * (stddev + self._normalize_layer.normalization_epsilon) + mean
             )
+        return tf.where(evidence_mask, tf.cast(x, outputs.dtype), outputs)
+
+    def _call_with_masked_leaves(
+        self,
+        inputs: tf.Tensor,
+        evidence_mask: tf.Tensor,
+        training: Optional[bool] = None,
+        tape: Optional[tf.GradientTape] = None,
+    ) -> Tuple[tf.Tensor, tf.Tensor, Optional[Tuple[tf.Tensor, tf.Tensor]]]:
+        self._locate_leaf()
+        if self._build_input_shape is None:  # type: ignore
+            input_shapes = nest.map_structure(_get_shape_tuple, inputs)
+            self._build_input_shape = input_shapes
+
+        evidence_mask = tf.convert_to_tensor(evidence_mask, dtype=tf.bool)
+        outputs = inputs  # handle the corner case where self.layers is empty
+        raw_inputs = inputs
+        stats = leaf_out = None
+        for i, layer in enumerate(self.layers):
+            # During each iteration, `inputs` are the inputs to `layer`, and `outputs`
+            # are the outputs of `layer` applied to `inputs`. At the end of each
+            # iteration `inputs` is set to `outputs` to prepare for the next layer.
+            kwargs = {}
+            argspec = self._layer_call_argspecs[layer].args
+            if "training" in argspec:
+                kwargs["training"] = training
+
+            if i == self._normalize_index:
+                kwargs["return_stats"] = True
+                outputs, mean, stddev = layer(inputs, **kwargs)
+                stats = _stats_in_input_layout(
+                    (mean, stddev),
+                    inputs,
+                    raw_inputs,
+                    after_flat_to_regions=self._flat_to_regions_index is not None
+                    and self._flat_to_regions_index < i,
+                )
+            else:
+                outputs = layer(inputs, **kwargs)
+
+            if i == self._flat_to_regions_index:
+                # The mask follows the inputs to the region representation
+                evidence_mask = layer.call(evidence_mask)
+
+            if i == self._leaf_index:
+                # A variable is part of the evidence if all of its dimensions are
+                leaf_mask = tf.reduce_all(evidence_mask, axis=-1, keepdims=True)
+                outputs = leaf_out = tf.where(
+                    leaf_mask, outputs, tf.zeros_like(outputs)
+                )
+                if tape is not None:
+                    tape.watch(leaf_out)
+
+            if len(nest.flatten(outputs)) != 1:
+                raise ValueError(SINGLE_LAYER_OUTPUT_ERROR_MSG)
+            # `outputs` will be the inputs to the next layer.
+            inputs = outputs
+
+        return outputs, leaf_out, stats
 
-        return outputs
+    def _call_backprop_to_leaves(
+        self, inputs: Tuple[tf.Tensor, ...], training: Optional[bool] = None
+    ) -> tf.Tensor:
+        return self.impute(inputs[0], inputs[1], training=training)
 
     def _train_step_unsupervised(self, data: tf.Tensor) -> Dict[str, tf.Tensor]:
         x, sample_weight, _ = data_adapter.unpack_x_y_sample_weight(data)
@@ -234,6 +449,59 @@ class SequentialSumProductNetwork(keras.Sequential):
         else:
             return super(SequentialSumProductNetwork, self).test_step(data)
 
+    def get_config(self) -> dict:
+        """
+        Obtain a key-value representation of the model config.
+
+        Returns:
+            A dict holding the configuration of the model and its layers.
+        """
+        config = super(SequentialSumProductNetwork, self).get_config()
+        config.update(
+            infer_no_evidence=self.infer_no_evidence, unsupervised=self.unsupervised
+        )
+        return config
+
+    @classmethod
+    def from_config(
+        cls: Type["SequentialSumProductNetwork"],
+        config: dict,
+        custom_objects: Optional[dict] = None,
+    ) -> "SequentialSumProductNetwork":
+        """
+        Create a model from its config.
+
+        Args:
+            config: Config as returned by ``get_config``.
+            custom_objects: Optional mapping of names to custom classes used in the config.
+
+        Returns:
+            A new model.
+        """
+        custom_objects = dict(get_custom_objects(), **(custom_objects or {}))
+        layers = [
+            keras.layers.deserialize(
+                layer_config,
+                custom_objects=custom_objects,
+                **(
+                    dict(use_legacy_format="module" not in layer_config)
+                    if _HAS_LEGACY_FORMAT
+                    else {}
+                )
+            )
+            for layer_config in config["layers"]
+        ]
+        model = cls(
+            layers,
+            infer_no_evidence=config.get("infer_no_evidence", False),
+            unsupervised=config.get("unsupervised"),
+            name=config.get("name"),
+        )
+        build_input_shape = config.get("build_input_shape")
+        if not model.inputs and build_input_shape:
+            model.build(build_input_shape)
+        return model
+
     @staticmethod
     def _is_region_spn(layers: List[tf.keras.layers.Layer]) -> bool:
         for layer in layers:
@@ -270,3 +538,23 @@ class SequentialSumProductNetwork(keras.Sequential):
                                 if isinstance(layer, (DenseProduct, ReduceProduct))
                             ]
                         )
+
+
+def _stats_in_input_layout(
+    stats: Tuple[tf.Tensor, tf.Tensor],
+    layer_inputs: tf.Tensor,
+    x: tf.Tensor,
+    after_flat_to_regions: bool,
+) -> Tuple[tf.Tensor, tf.Tensor]:
+    # Statistics of NormalizeStandardScore broadcast against the inputs of the layer, which are
+    # either per sample or per element of the dataset. They are brought to the layout of the
+    # raw input x so that imputed values can be denormalized.
+    def to_input_layout(stat: tf.Tensor) -> tf.Tensor:
+        stat = tf.broadcast_to(stat, tf.shape(layer_inputs))
+        if after_flat_to_regions:
+            # Decompositions hold copies of the same variables
+            stat = stat[:, :, 0]
+        return tf.reshape(stat, tf.shape(x))
+
+    mean, stddev = stats
+    return to_input_layout(mean), to_input_layout(stddev)
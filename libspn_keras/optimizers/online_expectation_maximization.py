@@ -1,16 +1,191 @@
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import tensorflow as tf
 from tensorflow import keras
+from tensorflow.keras.constraints import Constraint
+
+from libspn_keras.constraints import (
+    GreaterEqualEpsilon,
+    GreaterEqualEpsilonNormalized,
+    LogNormalized,
+)
+
+# Fusing requires the update_step of Keras optimizers as of TF 2.11
+_HAS_UPDATE_STEP = hasattr(keras.optimizers.SGD, "update_step")
+# Constraints that can be applied to the updated value of a variable before assigning it
+_FUSABLE_CONSTRAINTS = (
+    GreaterEqualEpsilon,
+    GreaterEqualEpsilonNormalized,
+    LogNormalized,
+)
 
 
 class OnlineExpectationMaximization(keras.optimizers.SGD):
     """
     Online expectation maximization which requires sum layers to use any of the EM-based SumOpBase instances.
 
-    Internally, this is just an SGD optimizer with unit learning rate.
+    Internally, this is an SGD optimizer with a learning rate that turns the update of normalized
+    accumulators into a gliding average.
+
+    With ``fused=True``, variables constrained by ``GreaterEqualEpsilon``,
+    ``GreaterEqualEpsilonNormalized`` or ``LogNormalized`` are updated and constrained in a
+    single assignment, rather than having Keras project them in a separate pass after the
+    update. Sparse gradients, i.e. ``tf.IndexedSlices`` holding the counts of only some slices of
+    the accumulators as passed on by hard EM sum ops with ``sparse_counts=True``, only update
+    and renormalize those slices. Such counts index a reshaped view of the accumulators, which
+    only ``update_step`` maps back to them, so they need the Keras optimizers of TF 2.11 or
+    later.
+
+    Args:
+        learning_rate: Weight of the counts of a batch in the gliding average.
+        gliding_average: Whether to compute a gliding average of accumulators. If ``False``,
+            counts are added to the accumulators scaled by ``learning_rate``.
+        fused: Whether to apply fusable constraints as part of the update.
+        **kwargs: Keyword arguments passed on to ``keras.optimizers.SGD``.
     """
 
     def __init__(
-        self, learning_rate: float = 0.05, gliding_average: bool = True, **kwargs
+        self,
+        learning_rate: float = 0.05,
+        gliding_average: bool = True,
+        fused: bool = True,
+        **kwargs
     ):
         if gliding_average:
             learning_rate = -learning_rate / (learning_rate - 1.0)
         super().__init__(learning_rate, **kwargs)
+        self.fused = fused
+        self._fused_constraints: Dict[str, Constraint] = {}
+
+    def apply_gradients(
+        self, grads_and_vars: Iterable[Tuple[tf.Tensor, tf.Variable]], *args, **kwargs
+    ) -> tf.Tensor:
+        """
+        Apply gradients to variables.
+
+        Args:
+            grads_and_vars: Pairs of gradients and variables.
+            *args: Positional arguments passed on to ``keras.optimizers.SGD.apply_gradients``.
+            **kwargs: Keyword arguments passed on to ``keras.optimizers.SGD.apply_gradients``.
+
+        Returns:
+            The number of iterations after applying the gradients.
+
+        Raises:
+            ValueError: If sparse gradients index a reshaped view of their variable, while the
+                optimizer has no ``update_step`` to apply them.
+        """
+        grads_and_vars = list(grads_and_vars)
+        if not _HAS_UPDATE_STEP and any(
+            isinstance(grad, tf.IndexedSlices)
+            and grad.values.shape.rank != var.shape.rank
+            for grad, var in grads_and_vars
+        ):
+            # The sparse apply of legacy optimizers would scatter the slices into the first
+            # axis of the variable
+            raise ValueError(
+                "Sparse counts of sum ops with sparse_counts=True need the Keras optimizers "
+                "of TF 2.11 or later, use dense counts instead"
+            )
+        fused_variables = []
+        if self.fused and self.momentum == 0.0 and _HAS_UPDATE_STEP:
+            fused_variables = [
+                var
+                for _, var in grads_and_vars
+                if isinstance(var.constraint, _FUSABLE_CONSTRAINTS)
+                and getattr(var, "_constraint", None) is var.constraint
+            ]
+        self._fused_constraints = {
+            self._var_key(var): var.constraint for var in fused_variables
+        }
+        with _hidden_constraints(fused_variables):
+            return super().apply_gradients(grads_and_vars, *args, **kwargs)
+
+    def update_step(
+        self, gradient: Union[tf.Tensor, tf.IndexedSlices], variable: tf.Variable
+    ) -> None:
+        """
+        Update a variable given its gradient, applying its constraint if it is fusable.
+
+        Sparse gradients may index slices of the variable reshaped to
+        ``[-1, *gradient.values.shape[1:]]``, such as the sparse counts of hard EM sum ops. These
+        are scattered into the variable, so that the cost of the update scales with the number
+        of counts, unless the constraint normalizes across slices. In that case, or with
+        momentum, they are converted to a dense gradient.
+
+        Args:
+            gradient: Dense or sparse gradient of the variable.
+            variable: Variable to update.
+        """
+        constraint = self._fused_constraints.get(self._var_key(variable))
+        lr = tf.cast(self.learning_rate, variable.dtype)
+        if isinstance(gradient, tf.IndexedSlices):
+            num_index_dims = variable.shape.rank - gradient.values.shape.rank + 1
+            indices = _slice_indices(gradient.indices, variable.shape, num_index_dims)
+            if self.momentum == 0.0 and _constrains_slices_independently(
+                constraint, num_index_dims, variable.shape.rank
+            ):
+                if constraint is None:
+                    variable.scatter_nd_add(indices, -gradient.values * lr)
+                else:
+                    slices = tf.gather_nd(variable, indices) - gradient.values * lr
+                    variable.scatter_nd_update(indices, constraint(slices))
+                return
+            if num_index_dims != 1:
+                gradient = tf.scatter_nd(indices, gradient.values, variable.shape)
+        if constraint is None:
+            super().update_step(gradient, variable)
+            return
+        variable.assign(constraint(variable - tf.convert_to_tensor(gradient) * lr))
+
+    def get_config(self) -> dict:
+        """
+        Obtain config.
+
+        Returns:
+            Key-value mapping with configuration of this optimizer.
+        """
+        config = super().get_config()
+        config.update(fused=self.fused)
+        return config
+
+
+def _constrains_slices_independently(
+    constraint: Optional[Constraint], num_index_dims: int, rank: int
+) -> bool:
+    # Slices indexed by the first num_index_dims axes are independent unless the constraint
+    # normalizes across them. Normalizing constraints are only applied per slice along the
+    # first axis, since their axis refers to the shape of the variable.
+    if constraint is None or isinstance(constraint, GreaterEqualEpsilon):
+        return True
+    axis: Optional[int] = constraint.axis
+    return (
+        num_index_dims == 1 and rank > 1 and (-1 if axis is None else axis) % rank != 0
+    )
+
+
+def _slice_indices(
+    indices: tf.Tensor, shape: tf.TensorShape, num_index_dims: int
+) -> tf.Tensor:
+    # Turns indices of slices of a variable reshaped to [-1, *shape[num_index_dims:]] into
+    # indices of its first num_index_dims axes
+    indices = tf.cast(indices, tf.int64)
+    if num_index_dims == 1:
+        return tf.expand_dims(indices, axis=-1)
+    dims = tf.constant(shape[:num_index_dims].as_list(), dtype=tf.int64)
+    return tf.transpose(tf.unravel_index(indices, dims))
+
+
+@contextmanager
+def _hidden_constraints(variables: List[tf.Variable]) -> Iterator[None]:
+    # Keras projects every variable with a constraint after the update, which is skipped for
+    # variables whose constraint is applied in update_step
+    constraints = [var.constraint for var in variables]
+    for var in variables:
+        var._constraint = None
+    try:
+        yield
+    finally:
+        for var, constraint in zip(variables, constraints):
+            var._constraint = constraint
@@ -0,0 +1,230 @@
+from concurrent.futures import ThreadPoolExecutor
+import os
+from typing import Callable, Dict, List, Optional, Tuple, Type
+
+import numpy as np
+import tensorflow as tf
+from tensorflow import keras
+
+from libspn_keras.layers.base_leaf import BaseLeaf
+from libspn_keras.layers.conv2d_sum import Conv2DSum
+from libspn_keras.layers.dense_product import DenseProduct
+from libspn_keras.layers.dense_sum import DenseSum
+from libspn_keras.layers.flat_to_regions import FlatToRegions
+from libspn_keras.layers.local2d_sum import Local2DSum
+from libspn_keras.layers.log_dropout import LogDropout
+from libspn_keras.layers.normalize_standard_score import NormalizeStandardScore
+from libspn_keras.layers.permute_and_pad_scopes import PermuteAndPadScopes
+from libspn_keras.layers.root_sum import RootSum
+
+_ShardCall = Callable[[keras.layers.Layer, tf.Tensor, int, int], tf.Tensor]
+
+
+def _call_flat_to_regions(
+    layer: FlatToRegions, x: tf.Tensor, start: int, stop: int
+) -> tf.Tensor:
+    if len(x.shape) == 2:
+        x = tf.expand_dims(x, axis=-1)
+    return tf.tile(tf.expand_dims(x, axis=2), multiples=(1, 1, stop - start, 1))
+
+
+def _call_leaf(layer: BaseLeaf, x: tf.Tensor, start: int, stop: int) -> tf.Tensor:
+    params = {name: param[:, :, start:stop] for name, param in layer._params().items()}
+    return layer._log_prob_from_params(x, params)
+
+
+def _call_permute_and_pad_scopes(
+    layer: PermuteAndPadScopes, x: tf.Tensor, start: int, stop: int
+) -> tf.Tensor:
+    permutations = tf.convert_to_tensor(layer.permutations)[start:stop]
+    return layer._permute_and_pad(x, permutations)
+
+
+def _call_dense_sum(layer: DenseSum, x: tf.Tensor, start: int, stop: int) -> tf.Tensor:
+    accumulators, logspace_accumulators, normalize = layer._sum_weights()
+    return layer.sum_op.weighted_sum(
+        x, accumulators[:, start:stop], logspace_accumulators, normalize
+    )
+
+
+def _call_decomposition_independent(
+    layer: keras.layers.Layer, x: tf.Tensor, start: int, stop: int
+) -> tf.Tensor:
+    return layer.call(x, training=False)
+
+
+# Layers that are evaluated per decomposition, mapped to a function that evaluates the layer for
+# the decompositions in [start, stop), or to None for layers that cannot be sharded. Checked in
+# order, so subclasses must precede their bases.
+_SHARDED_CALLS: List[Tuple[Type[keras.layers.Layer], Optional[_ShardCall]]] = [
+    (RootSum, None),
+    (Conv2DSum, None),
+    (Local2DSum, None),
+    (FlatToRegions, _call_flat_to_regions),
+    (NormalizeStandardScore, _call_decomposition_independent),
+    (LogDropout, _call_decomposition_independent),
+    (BaseLeaf, _call_leaf),
+    (PermuteAndPadScopes, _call_permute_and_pad_scopes),
+    (DenseProduct, _call_decomposition_independent),
+    (DenseSum, _call_dense_sum),
+]
+
+
+def _sharded_call(layer: keras.layers.Layer) -> Optional[_ShardCall]:
+    if isinstance(layer, DenseProduct) and layer.product_indices is not None:
+        # Selected products are not laid out per decomposition
+        return None
+    for layer_type, sharded_call in _SHARDED_CALLS:
+        if isinstance(layer, layer_type):
+            return sharded_call
+    return None
+
+
+class DecompositionShardedExecutor:
+    """
+    Evaluates the decompositions of a region SPN in parallel on a thread pool.
+
+    The decompositions of a region SPN, e.g. a RAT-SPN, are independent from the leaves up to the
+    first layer that combines them, usually a ``RootSum`` or ``Undecompose`` layer. The executor
+    splits the decompositions into shards, evaluates the layers up to that point for every shard
+    in a separate thread, concatenates the shards along the decomposition axis, and evaluates the
+    remaining layers on the result. The shards and the remaining layers are compiled once to
+    ``tf.function`` graphs, so that threads only dispatch the graphs and TensorFlow executes them
+    concurrently.
+
+    This gives parallelism that intra-op parallelism does not achieve for small batches, such as
+    single-row latency-bound inference on many-core CPUs. Results equal those of the model in
+    inference mode.
+
+    Args:
+        model: A built sequential region SPN whose layers up to the first layer that combines
+            decompositions are a ``FlatToRegions``, ``NormalizeStandardScore``, ``LogDropout``,
+            leaf, ``PermuteAndPadScopes``, ``DenseProduct`` or ``DenseSum`` layer.
+        num_workers: Number of threads. Defaults to the number of CPUs, but at most the number
+            of decompositions.
+        num_shards: Number of shards of the decomposition axis. Defaults to ``num_workers``.
+
+    Raises:
+        ValueError: If the model does not start with layers that can be sharded, or if the number
+            of shards exceeds the number of decompositions.
+    """
+
+    def __init__(
+        self,
+        model: keras.Sequential,
+        num_workers: Optional[int] = None,
+        num_shards: Optional[int] = None,
+    ):
+        self.model = model
+        sharded_calls = []
+        for layer in model.layers:
+            sharded_call = _sharded_call(layer)
+            if sharded_call is None:
+                break
+            sharded_calls.append(sharded_call)
+        if not any(
+            isinstance(layer, FlatToRegions)
+            for layer in model.layers[: len(sharded_calls)]
+        ):
+            raise ValueError(
+                "Can only shard region SPNs that start with a FlatToRegions layer"
+            )
+        self._sharded_layers = list(
+            zip(model.layers[: len(sharded_calls)], sharded_calls)
+        )
+        self._remaining_layers = model.layers[len(sharded_calls) :]
+
+        self.num_decomps = int(model.layers[len(sharded_calls) - 1].output_shape[2])
+        self.num_workers = num_workers or min(os.cpu_count() or 1, self.num_decomps)
+        self.num_shards = num_shards or self.num_workers
+        if self.num_shards > self.num_decomps:
+            raise ValueError(
+                "Cannot split {} decompositions into {} shards".format(
+                    self.num_decomps, self.num_shards
+                )
+            )
+        bounds = np.linspace(0, self.num_decomps, self.num_shards + 1).astype(int)
+        self.shards = list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+        input_shape = model.layers[0].input_shape
+        if isinstance(input_shape, list):
+            input_shape = input_shape[0]
+        self._input_spec = tf.TensorSpec(
+            [None] + list(input_shape[1:]), model.layers[0].dtype
+        )
+        self._shard_functions = [
+            self._trace_shard(start, stop) for start, stop in self.shards
+        ]
+        merged_shape = model.layers[len(sharded_calls) - 1].output_shape
+        self._merge_function = tf.function(
+            self._merge,
+            input_signature=[tf.TensorSpec([None] + list(merged_shape[1:]))],
+        ).get_concrete_function()
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def __call__(self, x: tf.Tensor) -> tf.Tensor:
+        """
+        Compute the output of the model.
+
+        Args:
+            x: Raw input of the model.
+
+        Returns:
+            The output of the model in inference mode.
+        """
+        x = tf.convert_to_tensor(x, dtype=self._input_spec.dtype)
+        if self.num_workers == 1:
+            shards = [shard_function(x) for shard_function in self._shard_functions]
+        else:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    self.num_workers, thread_name_prefix="spn-decomposition-shard"
+                )
+            shards = list(
+                self._pool.map(
+                    lambda shard_function: shard_function(x), self._shard_functions
+                )
+            )
+        return self._merge_function(tf.concat(shards, axis=2))
+
+    def close(self) -> None:
+        """Shut down the thread pool."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self) -> "DecompositionShardedExecutor":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def shard_info(self) -> Dict[str, object]:
+        """
+        Describe how the model is sharded.
+
+        Returns:
+            A dict holding the names of the sharded and remaining layers, the number of workers
+            and the decomposition bounds of the shards.
+        """
+        return dict(
+            sharded_layers=[layer.name for layer, _ in self._sharded_layers],
+            remaining_layers=[layer.name for layer in self._remaining_layers],
+            num_workers=self.num_workers,
+            shards=self.shards,
+        )
+
+    def _trace_shard(self, start: int, stop: int) -> Callable[[tf.Tensor], tf.Tensor]:
+        def shard(x: tf.Tensor) -> tf.Tensor:
+            for layer, sharded_call in self._sharded_layers:
+                x = sharded_call(layer, x, start, stop)
+            return x
+
+        return tf.function(
+            shard, input_signature=[self._input_spec]
+        ).get_concrete_function()
+
+    def _merge(self, x: tf.Tensor) -> tf.Tensor:
+        for layer in self._remaining_layers:
+            x = layer(x, training=False)
+        return x
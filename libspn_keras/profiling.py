@@ -0,0 +1,324 @@
+import functools
+import inspect
+import time
+from typing import Callable, List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+import tensorflow as tf
+
+from libspn_keras.cost_model import activation_bytes, count_flops, count_params
+
+
+class LayerProfile(NamedTuple):
+    """
+    Profile of a single layer of an SPN.
+
+    Args:
+        name: Name of the layer.
+        class_name: Class name of the layer.
+        input_shape: Shape of the input of the layer.
+        output_shape: Shape of the output of the layer.
+        forward_time: Median wall time in seconds of the forward pass.
+        backward_time: Median wall time in seconds of the backward pass (excluding the forward
+            pass), or ``None`` if the backward pass was not profiled.
+        flops: Analytic number of floating point operations of the forward pass.
+        activation_bytes: Number of bytes of the output of the layer.
+        num_params: Number of parameters of the layer.
+    """
+
+    name: str
+    class_name: str
+    input_shape: Tuple[int, ...]
+    output_shape: Tuple[int, ...]
+    forward_time: float
+    backward_time: Optional[float]
+    flops: int
+    activation_bytes: int
+    num_params: int
+
+
+class ProfileReport:
+    """
+    Per-layer profile of an SPN.
+
+    Args:
+        layers: Profiles of the individual layers, from input to output.
+        batch_size: Batch size used for profiling.
+        peak_memory_bytes: Peak memory of a full step. Obtained from the TensorFlow allocator if
+            the device tracks memory statistics. Otherwise, it is estimated as the total size of
+            all activations that are kept in memory for the backward pass.
+        peak_memory_source: Either ``"allocator"`` or ``"estimate"``.
+    """
+
+    def __init__(
+        self,
+        layers: List[LayerProfile],
+        batch_size: int,
+        peak_memory_bytes: int,
+        peak_memory_source: str,
+    ):
+        self.layers = layers
+        self.batch_size = batch_size
+        self.peak_memory_bytes = peak_memory_bytes
+        self.peak_memory_source = peak_memory_source
+
+    @property
+    def forward_time(self) -> float:
+        """
+        Obtain the total forward time of all layers.
+
+        Returns:
+            Total forward time in seconds.
+        """
+        return sum(layer.forward_time for layer in self.layers)
+
+    @property
+    def backward_time(self) -> Optional[float]:
+        """
+        Obtain the total backward time of all layers.
+
+        Returns:
+            Total backward time in seconds or ``None`` if the backward pass was not profiled.
+        """
+        if any(layer.backward_time is None for layer in self.layers):
+            return None
+        return sum(layer.backward_time for layer in self.layers)  # type: ignore
+
+    @property
+    def flops(self) -> int:
+        """
+        Obtain the total number of floating point operations of the forward pass.
+
+        Returns:
+            Number of floating point operations.
+        """
+        return sum(layer.flops for layer in self.layers)
+
+    def to_dict(self) -> dict:
+        """
+        Obtain a key-value representation of the report, e.g. for serializing it to JSON.
+
+        Returns:
+            A dict holding the report.
+        """
+        return dict(
+            batch_size=self.batch_size,
+            peak_memory_bytes=self.peak_memory_bytes,
+            peak_memory_source=self.peak_memory_source,
+            forward_time=self.forward_time,
+            backward_time=self.backward_time,
+            flops=self.flops,
+            layers=[layer._asdict() for layer in self.layers],
+        )
+
+    def summary(self) -> str:
+        """
+        Format the report as a table with a row per layer.
+
+        Returns:
+            A string holding the table.
+        """
+        header = "{:<28}{:<24}{:>12}{:>12}{:>14}{:>14}".format(
+            "Layer (type)",
+            "Output shape",
+            "Fwd (ms)",
+            "Bwd (ms)",
+            "MFLOPs",
+            "Act. (MB)",
+        )
+        lines = [header, "=" * len(header)]
+        for layer in self.layers:
+            lines.append(
+                "{:<28}{:<24}{:>12.3f}{:>12}{:>14.3f}{:>14.3f}".format(
+                    "{} ({})".format(layer.name, layer.class_name)[:27],
+                    str(layer.output_shape)[:23],
+                    layer.forward_time * 1e3,
+                    "-"
+                    if layer.backward_time is None
+                    else "{:.3f}".format(layer.backward_time * 1e3),
+                    layer.flops / 1e6,
+                    layer.activation_bytes / 2 ** 20,
+                )
+            )
+        lines.append("=" * len(header))
+        lines.append(
+            "Total forward: {:.3f} ms, total MFLOPs: {:.3f}, peak memory ({}): {:.3f} MB".format(
+                self.forward_time * 1e3,
+                self.flops / 1e6,
+                self.peak_memory_source,
+                self.peak_memory_bytes / 2 ** 20,
+            )
+        )
+        return "\n".join(lines)
+
+    def __repr__(self):
+        return self.summary()
+
+
+def profile(
+    model: tf.keras.Sequential,
+    batch: Union[tf.Tensor, np.ndarray, Tuple[tf.Tensor, ...]],
+    num_runs: int = 5,
+    num_warmup_runs: int = 1,
+    backward: bool = True,
+    training: bool = False,
+    device: Optional[str] = None,
+) -> ProfileReport:
+    """
+    Profile the layers of a sequential SPN on a single batch.
+
+    Each layer is run eagerly in isolation on the output of the layer before it, so that wall times
+    can be attributed to individual layers. The backward time of a layer is the time needed to
+    compute the gradients (or EM signals, depending on the ``SumOpBase`` of a sum layer) with
+    respect to its input and its trainable weights, given the output of its forward pass.
+
+    Args:
+        model: A sequential SPN, e.g. a ``SequentialSumProductNetwork``.
+        batch: Batch of inputs. If a tuple is given (e.g. data and an evidence mask), only its
+            first element is used.
+        num_runs: Number of timed runs per layer. The median wall time is reported.
+        num_warmup_runs: Number of untimed runs per layer before timing.
+        backward: Whether to profile the backward pass.
+        training: Value of the ``training`` flag to pass on to layers.
+        device: Name of the device on which memory statistics are tracked, e.g. ``"GPU:0"``.
+            If ``None``, the first GPU is used if available, otherwise the CPU.
+
+    Returns:
+        A ``ProfileReport`` holding the profile of each layer.
+
+    Raises:
+        ValueError: If the model is not a sequential model.
+    """
+    if not isinstance(model, tf.keras.Sequential):
+        raise ValueError(
+            "Can only profile sequential models, got {}".format(
+                model.__class__.__name__
+            )
+        )
+    if isinstance(batch, (tuple, list)):
+        batch = batch[0]
+    x = tf.convert_to_tensor(batch)
+    if not model.built:
+        model.build(x.shape)
+    batch_size = int(x.shape[0])
+    device = device or _default_device()
+    _reset_peak_memory(device)
+
+    layer_profiles = []
+    for layer in model.layers:
+        kwargs = dict(training=training) if _accepts_training(layer) else dict()
+
+        forward_time, out = _median_wall_time(
+            functools.partial(layer, x, **kwargs), num_runs, num_warmup_runs
+        )
+
+        backward_time = None
+        if backward:
+            backward_time = max(
+                0.0,
+                _median_wall_time(
+                    _forward_and_backward_fn(layer, x, kwargs),
+                    num_runs,
+                    num_warmup_runs,
+                )[0]
+                - forward_time,
+            )
+
+        input_shape = tuple(x.shape.as_list())
+        output_shape = tuple(out.shape.as_list())
+        layer_profiles.append(
+            LayerProfile(
+                name=layer.name,
+                class_name=layer.__class__.__name__,
+                input_shape=input_shape,
+                output_shape=output_shape,
+                forward_time=forward_time,
+                backward_time=backward_time,
+                flops=count_flops(layer, input_shape, output_shape),
+                activation_bytes=activation_bytes(output_shape, out.dtype),
+                num_params=count_params(layer),
+            )
+        )
+        x = out
+
+    peak_memory_bytes = _peak_memory(device)
+    peak_memory_source = "allocator"
+    if not peak_memory_bytes:
+        # Without allocator statistics, the peak is estimated by the activations that are kept
+        # in memory for the backward pass
+        peak_memory_bytes = sum(p.activation_bytes for p in layer_profiles)
+        peak_memory_source = "estimate"
+
+    return ProfileReport(
+        layers=layer_profiles,
+        batch_size=batch_size,
+        peak_memory_bytes=peak_memory_bytes,
+        peak_memory_source=peak_memory_source,
+    )
+
+
+def _forward_and_backward_fn(
+    layer: tf.keras.layers.Layer, x: tf.Tensor, kwargs: dict
+) -> Callable[[], tf.Tensor]:
+    watch_input = x.dtype.is_floating
+    sources = ([x] if watch_input else []) + list(layer.trainable_variables)
+
+    def forward_and_backward() -> tf.Tensor:
+        with tf.GradientTape() as tape:
+            if watch_input:
+                tape.watch(x)
+            out = layer(x, **kwargs)
+        if sources:
+            grads = tape.gradient(
+                out,
+                sources,
+                output_gradients=tf.ones_like(out),
+                unconnected_gradients=tf.UnconnectedGradients.ZERO,
+            )
+            return grads[0]
+        return out
+
+    return forward_and_backward
+
+
+def _median_wall_time(
+    fn: Callable[[], tf.Tensor], num_runs: int, num_warmup_runs: int
+) -> Tuple[float, tf.Tensor]:
+    out = None
+    for _ in range(num_warmup_runs):
+        out = fn()
+        _sync(out)
+    wall_times = []
+    for _ in range(num_runs):
+        start = time.perf_counter()
+        out = fn()
+        _sync(out)
+        wall_times.append(time.perf_counter() - start)
+    return float(np.median(wall_times)), out
+
+
+def _sync(tensor: tf.Tensor) -> None:
+    # Fetching a single element forces the device to finish the kernels producing the tensor
+    tf.reshape(tf.convert_to_tensor(tensor), [-1])[:1].numpy()
+
+
+def _accepts_training(layer: tf.keras.layers.Layer) -> bool:
+    return "training" in inspect.signature(layer.call).parameters
+
+
+def _default_device() -> str:
+    return "GPU:0" if tf.config.list_physical_devices("GPU") else "CPU:0"
+
+
+def _reset_peak_memory(device: str) -> None:
+    try:
+        tf.config.experimental.reset_memory_stats(device)
+    except (AttributeError, ValueError):
+        pass
+
+
+def _peak_memory(device: str) -> int:
+    try:
+        return int(tf.config.experimental.get_memory_info(device)["peak"])
+    except (AttributeError, ValueError):
+        return 0
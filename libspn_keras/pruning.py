@@ -0,0 +1,192 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import tensorflow as tf
+
+from libspn_keras.layers.dense_product import DenseProduct
+from libspn_keras.layers.dense_sum import DenseSum
+from libspn_keras.layers.sparse_dense_sum import SparseDenseSum
+from libspn_keras.models.sequential_spn import SequentialSumProductNetwork
+
+
+def prune_log_weights(log_weights: np.ndarray, threshold: float) -> np.ndarray:
+    """
+    Remove edges with a weight below a threshold and re-normalize the remaining ones.
+
+    The edge with the largest weight of every sum is always kept.
+
+    Args:
+        log_weights: Normalized log weights with children along the second to last axis and
+            sums along the last axis.
+        threshold: Edges with a (linear) weight below this value are removed.
+
+    Returns:
+        Normalized log weights of the same shape, where removed edges are ``-inf``.
+    """
+    log_weights = np.asarray(log_weights)
+    keep = log_weights >= np.log(threshold)
+    keep |= log_weights == np.max(log_weights, axis=-2, keepdims=True)
+    pruned = np.where(keep, log_weights, -np.inf)
+    return pruned - np.logaddexp.reduce(pruned, axis=-2, keepdims=True)
+
+
+def _sparse_edges(log_weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Returns the flat child index, flat sum index and log weight of every remaining edge of
+    # log weights with shape [num_scopes, num_decomps, num_nodes_in, num_sums], sorted by sum
+    num_scopes, num_decomps, num_nodes_in, num_sums = log_weights.shape
+    scope, decomp, child, sum_ = np.nonzero(np.isfinite(log_weights))
+    sum_indices = np.ravel_multi_index(
+        (scope, decomp, sum_), (num_scopes, num_decomps, num_sums)
+    )
+    child_indices = np.ravel_multi_index(
+        (scope, decomp, child), (num_scopes, num_decomps, num_nodes_in)
+    )
+    order = np.argsort(sum_indices, kind="stable")
+    return (
+        child_indices[order],
+        sum_indices[order],
+        log_weights[scope, decomp, child, sum_][order],
+    )
+
+
+def _prune_dense_sum(
+    layer: DenseSum,
+    previous: Optional[tf.keras.layers.Layer],
+    threshold: float,
+    max_product_fraction: float,
+) -> Tuple[Optional[DenseProduct], tf.keras.layers.Layer, List[np.ndarray]]:
+    # Returns the replacement of the previous layer if it selects products, and the
+    # replacement of the sum layer with its weights
+    log_weights = prune_log_weights(
+        layer.sum_op._weights_in_logspace(*layer._sum_weights()).numpy(), threshold
+    )
+    child_indices, sum_indices, edge_log_weights = _sparse_edges(log_weights)
+    product_indices, product_child_indices = np.unique(
+        child_indices, return_inverse=True
+    )
+    if (
+        not isinstance(previous, DenseProduct)
+        or previous.product_indices is not None
+        or len(product_indices) > max_product_fraction * log_weights[..., 0].size
+    ):
+        # Without skipping products, a dense matrix product over the batch-first input beats
+        # gathering the children of the remaining edges
+        dense_sum = layer.__class__.from_config(
+            dict(layer.get_config(), quantized_dtype=None)
+        )
+        return (
+            None,
+            dense_sum,
+            [log_weights if layer.logspace_accumulators else np.exp(log_weights)],
+        )
+
+    # Only products with remaining parents are computed, so children are indexed by their
+    # position among those products
+    dense_product = DenseProduct.from_config(
+        dict(previous.get_config(), product_indices=product_indices.tolist())
+    )
+    num_scopes, num_decomps, _, num_sums = log_weights.shape
+    sparse_dense_sum = SparseDenseSum(
+        num_sums=num_sums,
+        num_scopes=num_scopes,
+        num_decomps=num_decomps,
+        child_indices=product_child_indices.tolist(),
+        sum_indices=sum_indices.tolist(),
+        name=layer.name,
+    )
+    return dense_product, sparse_dense_sum, [edge_log_weights]
+
+
+def prune_model(
+    model: SequentialSumProductNetwork,
+    threshold: float,
+    max_product_fraction: float = 0.5,
+) -> SequentialSumProductNetwork:
+    """
+    Create an inference copy of a trained SPN with pruned sum weights.
+
+    Edges of ``DenseSum`` layers with weights below ``threshold`` are removed and the remaining
+    weights are re-normalized, see ``prune_log_weights``. If a ``DenseSum`` layer directly
+    follows a ``DenseProduct`` layer and few enough products have remaining parents, the product
+    layer only computes those products and the sum layer is replaced by a ``SparseDenseSum``
+    layer that only evaluates the remaining edges. Other ``DenseSum`` layers keep their dense
+    layout with pruned weights, since gathering nearly all children costs more than a dense
+    matrix product. Other layers, including ``RootSum``, ``Local2DSum`` and ``Conv2DSum``
+    layers, are copied as is.
+
+    Args:
+        model: A built ``SequentialSumProductNetwork``.
+        threshold: Edges with a weight below this value are removed.
+        max_product_fraction: Products are only selected if at most this fraction of the
+            products of a ``DenseProduct`` layer have remaining parents.
+
+    Returns:
+        The pruned model.
+
+    Raises:
+        ValueError: If the model is not built.
+    """
+    if not model.built:
+        raise ValueError("Can only prune a built model")
+    layers: List[tf.keras.layers.Layer] = []
+    weights: Dict[str, List[np.ndarray]] = {}
+    for i, layer in enumerate(model.layers):
+        if type(layer) is not DenseSum:
+            layers.append(layer.__class__.from_config(layer.get_config()))
+            weights[layer.name] = layer.get_weights()
+            continue
+        dense_product, sum_layer, weights[layer.name] = _prune_dense_sum(
+            layer,
+            model.layers[i - 1] if i > 0 else None,
+            threshold,
+            max_product_fraction,
+        )
+        if dense_product is not None:
+            layers[-1] = dense_product
+        layers.append(sum_layer)
+
+    pruned_model = type(model)(
+        layers,
+        infer_no_evidence=model.infer_no_evidence,
+        unsupervised=model.unsupervised,
+        name=model.name,
+    )
+    if not pruned_model.built:
+        pruned_model.build(model.input_shape)
+    for layer in pruned_model.layers:
+        layer.set_weights(weights[layer.name])
+    return pruned_model
+
+
+def _num_edges(layer: tf.keras.layers.Layer) -> int:
+    if isinstance(layer, SparseDenseSum):
+        return len(layer.child_indices)
+    log_weights = layer.sum_op._weights_in_logspace(*layer._sum_weights())
+    return int(np.count_nonzero(np.isfinite(log_weights.numpy())))
+
+
+def sparsity(
+    model: SequentialSumProductNetwork, pruned_model: SequentialSumProductNetwork
+) -> float:
+    """
+    Compute the fraction of edges of ``DenseSum`` layers that were removed by pruning.
+
+    Args:
+        model: The original model.
+        pruned_model: The model returned by ``prune_model``.
+
+    Returns:
+        The number of removed edges divided by the number of edges of the ``DenseSum`` layers
+        of the original model.
+    """
+    num_dense_edges = sum(
+        int(np.prod(layer._sum_weights()[0].shape))
+        for layer in model.layers
+        if type(layer) is DenseSum
+    )
+    num_edges = sum(
+        _num_edges(layer)
+        for layer in pruned_model.layers
+        if type(layer) in (DenseSum, SparseDenseSum)
+    )
+    return 1.0 - num_edges / max(num_dense_edges, 1)
@@ -0,0 +1,162 @@
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import tensorflow as tf
+
+from libspn_keras.layers.dense_sum import DenseSum
+from libspn_keras.models.sequential_spn import SequentialSumProductNetwork
+
+_QUANTIZED_DTYPES = ("int8", "uint8")
+
+
+def quantize_log_weights(
+    log_weights: np.ndarray,
+    dtype: str = "int8",
+    min_relative_log_weight: float = -16.0,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Quantize normalized log weights to 8 bits with an affine mapping per sum.
+
+    The children of a sum (the second to last axis) share a scale and offset, so that
+    ``log_weights ≈ scale * quantized + offset``. The range of a sum spans from its smallest to
+    its largest log weight, where log weights further than ``min_relative_log_weight`` below the
+    largest one are clipped, since they barely contribute to the sum but would otherwise
+    coarsen the quantization of all other children.
+
+    Args:
+        log_weights: Normalized log weights with children along the second to last axis and
+            sums along the last axis.
+        dtype: Either ``'int8'`` or ``'uint8'``.
+        min_relative_log_weight: Lower bound of the log weights relative to the largest log
+            weight of the sum.
+
+    Returns:
+        The quantized log weights, and the scale and offset per sum with a size of 1 along the
+        children axis.
+
+    Raises:
+        ValueError: If ``dtype`` is not an 8 bit integer type.
+    """
+    if dtype not in _QUANTIZED_DTYPES:
+        raise ValueError(
+            "Expected dtype to be one of {}, got {}".format(_QUANTIZED_DTYPES, dtype)
+        )
+    info = np.iinfo(dtype)
+    log_weights = np.asarray(log_weights, dtype=np.float32)
+    high = np.max(log_weights, axis=-2, keepdims=True)
+    log_weights = np.maximum(log_weights, high + min_relative_log_weight)
+    low = np.min(log_weights, axis=-2, keepdims=True)
+    scale = (high - low) / (int(info.max) - int(info.min))
+    # Sums with uniform weights are represented exactly by their offset
+    scale = np.where(scale > 0, scale, 1.0).astype(np.float32)
+    offset = (low - info.min * scale).astype(np.float32)
+    quantized = np.clip(np.round((log_weights - offset) / scale), info.min, info.max)
+    return quantized.astype(dtype), scale, offset
+
+
+def quantize_model(
+    model: SequentialSumProductNetwork,
+    dtype: str = "int8",
+    min_relative_log_weight: float = -16.0,
+) -> SequentialSumProductNetwork:
+    """
+    Create an inference copy of a trained SPN with 8 bit quantized sum weights.
+
+    All ``DenseSum`` layers, including ``Local2DSum``, ``Conv2DSum`` and ``RootSum`` layers,
+    store their normalized log weights quantized with ``quantize_log_weights`` instead of
+    float32 accumulators, which shrinks them by almost a factor of 4 for sums with many
+    children. The weights are dequantized on the fly. Other layers share the weights of
+    ``model``.
+
+    Args:
+        model: A built ``SequentialSumProductNetwork``.
+        dtype: Either ``'int8'`` or ``'uint8'``.
+        min_relative_log_weight: Lower bound of the log weights relative to the largest log
+            weight of each sum, see ``quantize_log_weights``.
+
+    Returns:
+        The quantized model. It is not trainable, but can be saved, served and exported.
+
+    Raises:
+        ValueError: If the model is not built.
+    """
+    if not model.built:
+        raise ValueError("Can only quantize a built model")
+    config = model.get_config()
+    sum_layer_names = {
+        layer.name for layer in model.layers if isinstance(layer, DenseSum)
+    }
+    for layer_config in config["layers"]:
+        if layer_config["config"].get("name") in sum_layer_names:
+            layer_config["config"]["quantized_dtype"] = dtype
+    quantized_model = type(model).from_config(config)
+    if not quantized_model.built:
+        quantized_model.build(model.input_shape)
+
+    for layer, quantized_layer in zip(model.layers, quantized_model.layers):
+        if not isinstance(layer, DenseSum):
+            quantized_layer.set_weights(layer.get_weights())
+            continue
+        log_weights = layer.sum_op._weights_in_logspace(*layer._sum_weights())
+        quantized, scale, offset = quantize_log_weights(
+            log_weights.numpy(), dtype, min_relative_log_weight
+        )
+        quantized_layer._quantized_log_weights.assign(quantized)
+        quantized_layer._log_weight_scale.assign(scale)
+        quantized_layer._log_weight_offset.assign(offset)
+    return quantized_model
+
+
+def _weight_bytes(layers: list) -> int:
+    return sum(
+        int(np.prod(weight.shape)) * weight.dtype.size
+        for layer in layers
+        for weight in layer.weights
+    )
+
+
+def quantization_report(
+    model: SequentialSumProductNetwork,
+    quantized_model: SequentialSumProductNetwork,
+    x: np.ndarray,
+    batch_size: Optional[int] = None,
+) -> Dict[str, float]:
+    """
+    Compare the log-likelihood and size of a model before and after quantization.
+
+    Args:
+        model: The original model.
+        quantized_model: The model returned by ``quantize_model``.
+        x: Samples to evaluate the log-likelihood of.
+        batch_size: Batch size for evaluating the models. Defaults to that of ``predict``.
+
+    Returns:
+        A dict holding the mean log-likelihood of both models, the mean and maximum absolute
+        error of the per-sample log-likelihood, the bytes of the sum weights and of all weights
+        of both models, and the compression of the sum weights.
+    """
+    log_likelihood = tf.reduce_logsumexp(
+        model.predict(x, batch_size=batch_size, verbose=0), axis=-1
+    ).numpy()
+    quantized_log_likelihood = tf.reduce_logsumexp(
+        quantized_model.predict(x, batch_size=batch_size, verbose=0), axis=-1
+    ).numpy()
+    errors = np.abs(quantized_log_likelihood - log_likelihood)
+
+    sum_weight_bytes = _weight_bytes(
+        [layer for layer in model.layers if isinstance(layer, DenseSum)]
+    )
+    quantized_sum_weight_bytes = _weight_bytes(
+        [layer for layer in quantized_model.layers if isinstance(layer, DenseSum)]
+    )
+    return dict(
+        log_likelihood=float(np.mean(log_likelihood)),
+        quantized_log_likelihood=float(np.mean(quantized_log_likelihood)),
+        mean_abs_error=float(np.mean(errors)),
+        max_abs_error=float(np.max(errors)),
+        sum_weight_bytes=sum_weight_bytes,
+        quantized_sum_weight_bytes=quantized_sum_weight_bytes,
+        model_bytes=_weight_bytes(model.layers),
+        quantized_model_bytes=_weight_bytes(quantized_model.layers),
+        compression=sum_weight_bytes / max(quantized_sum_weight_bytes, 1),
+    )
@@ -1,9 +1,5 @@
 import abc
-from collections import deque, OrderedDict
-import functools
-import itertools
-import operator
-from typing import Callable, Dict, Iterator, List, Mapping, Optional, Tuple
+from typing import Iterator, List, Optional, Tuple
 
 import numpy as np
 import tensorflow as tf
@@ -38,22 +34,37 @@ class Region(abc.ABC):
     def children(self):  # noqa: ANN201
         """Obtain children as a list of nodes."""
 
+    @property
+    @abc.abstractmethod
+    def scope_indices(self) -> np.ndarray:
+        """Obtain scope as a sorted array of variable indices."""
+
     @staticmethod
     def _assert_no_scope_overlap(children) -> None:  # noqa: ANN001
         """
         Ensure validity of the SPN represented by asserting none of the children overlap in their scopes.
 
+        Runs in ``O(n log n)`` for a total scope size of ``n``, by checking the concatenated
+        scopes for duplicate indices.
+
         Args:
             children: List of Regions.
 
         Raises:
             OverlappingScopesException: the scopes of two children overlap.
         """
-        for c0, c1 in itertools.combinations(children, 2):
-            if set(c0.scope) & set(c1.scope):
-                raise OverlappingScopesException(
-                    "Children {} and {} have overlapping scopes".format(c0, c1)
-                )
+        if len(children) < 2:
+            return
+        scopes = [c.scope_indices for c in children]
+        indices = np.concatenate(scopes)
+        unique_indices, counts = np.unique(indices, return_counts=True)
+        if len(unique_indices) == len(indices):
+            return
+        overlap = unique_indices[np.argmax(counts > 1)]
+        c0, c1 = [c for c, scope in zip(children, scopes) if overlap in scope][:2]
+        raise OverlappingScopesException(
+            "Children {} and {} have overlapping scopes".format(c0, c1)
+        )
 
 
 class RegionNode(Region):
@@ -72,11 +83,13 @@ class RegionNode(Region):
     """
 
     def __init__(self, children: List[Region]):
-        self._assert_no_scope_overlap(children)
         self._children = children
-        self._scope = list(
-            functools.reduce(operator.concat, [c.scope for c in children])  # type: ignore
+        self._scope_indices = np.sort(
+            np.concatenate([c.scope_indices for c in children])
         )
+        if np.any(self._scope_indices[1:] == self._scope_indices[:-1]):
+            self._assert_no_scope_overlap(children)
+        self._scope: Optional[List[Region]] = None
 
     def __repr__(self):
         return "{" + ", ".join(str(s) for s in self._children) + "}"
@@ -99,8 +112,20 @@ class RegionNode(Region):
         Returns:
             A list of Regions
         """
+        if self._scope is None:
+            self._scope = _collect_variable_nodes(self)
         return self._scope
 
+    @property
+    def scope_indices(self) -> np.ndarray:
+        """
+        Obtain scope as a sorted array of variable indices.
+
+        Returns:
+            An integer array
+        """
+        return self._scope_indices
+
 
 class RegionVariable(Region):
     """
@@ -118,6 +143,7 @@ class RegionVariable(Region):
 
     def __init__(self, index: int):
         self.index = index
+        self._scope_indices = np.array([index])
 
     def __repr__(self):
         return "x{}".format(self.index)
@@ -142,6 +168,16 @@ class RegionVariable(Region):
         """
         return [self]
 
+    @property
+    def scope_indices(self) -> np.ndarray:
+        """
+        Obtain scope as a sorted array of variable indices.
+
+        Returns:
+            An integer array
+        """
+        return self._scope_indices
+
 
 def region_graph_to_dense_spn(
     region_graph_root: RegionNode,
@@ -178,6 +214,61 @@ def region_graph_to_dense_spn(
     Returns:
         A Sum-Product Network as a tf.keras.Sequential model.
     """
+    return tf.keras.Sequential(
+        region_graph_to_dense_spn_layers(
+            region_graph_root,
+            leaf_node=leaf_node,
+            num_sums_iterable=num_sums_iterable,
+            return_weighted_child_logits=return_weighted_child_logits,
+            logspace_accumulators=logspace_accumulators,
+            accumulator_initializer=accumulator_initializer,
+            linear_accumulator_constraint=linear_accumulator_constraint,
+            product_first=product_first,
+            num_classes=num_classes,
+            with_root=with_root,
+        )
+    )
+
+
+def region_graph_to_dense_spn_layers(
+    region_graph_root: RegionNode,
+    leaf_node: BaseLeaf,
+    num_sums_iterable: Iterator[int],
+    return_weighted_child_logits: bool,
+    logspace_accumulators: bool = False,
+    accumulator_initializer: Optional[Initializer] = None,
+    linear_accumulator_constraint: Optional[Constraint] = None,
+    product_first: bool = True,
+    num_classes: Optional[int] = None,
+    with_root: bool = True,
+) -> List[tf.keras.layers.Layer]:
+    """
+    Convert a region graph to the (unbuilt) layers of a dense SPN.
+
+    Takes the same arguments as :func:`region_graph_to_dense_spn`, but returns the list of layers
+    instead of a model. Since the layers are not built yet, no variables are created, which makes
+    this useful for e.g. estimating the cost of the SPN.
+
+    Args:
+        region_graph_root: Root of the region graph
+        leaf_node: Node to insert at the leaf of the SPN
+        num_sums_iterable: Number of sums for all but the last root sum
+            layer from bottom to top
+        logspace_accumulators: Whether to represent accumulators of weights in logspace
+            or not
+        accumulator_initializer: Initializer for accumulators
+        linear_accumulator_constraint: Constraint for linear
+            accumulator, default: GreaterThanEpsilon
+        product_first: Whether to start with a product layer
+        num_classes: Number of classes at output. If ``None``, will not use 'latent' sums
+            at the end but will instead directly connect the root to the final layer of the dense
+            stack.
+        with_root: If ``True``, sets a ``RootSum`` as the final layer.
+        return_weighted_child_logits: Whether to return weighted child logits.
+
+    Returns:
+        A list of layers from the input to the root.
+    """
     (
         permutation,
         num_factors_leaf_to_root,
@@ -215,140 +306,77 @@ def region_graph_to_dense_spn(
 
     pre_stack: List[tf.keras.layers.Layer] = [
         FlatToRegions(
-            num_decomps=1, input_shape=[len(_collect_variable_nodes(region_graph_root))]
+            num_decomps=1, input_shape=[len(region_graph_root.scope_indices)]
         ),
         leaf_node,
         PermuteAndPadScopes(permutations=np.asarray([permutation])),
     ]
 
-    return tf.keras.Sequential(pre_stack + sum_product_stack)
-
-
-def _get_nodes_to_depth_mapping(root: Region) -> Dict[Region, int]:
-    node_to_depth = dict()
-    node_to_depth[root] = 0
-
-    def _node_fn(node: Region) -> None:
-        # Add to Parents dict
-        for child in node.children:
-            node_to_depth[child] = node_to_depth[node] + 1
-
-    _traverse_region_graph(root, _node_fn)
-    return node_to_depth
-
-
-def _get_depth_to_nodes_mapping(
-    root: Region, node_to_depth_mapping: Optional[Mapping[Region, int]] = None,
-) -> Dict[int, List[Region]]:
-
-    node_to_depth_mapping = node_to_depth_mapping or _get_nodes_to_depth_mapping(root)
-    depth_to_nodes = OrderedDict()
-
-    for node, depth in sorted(
-        node_to_depth_mapping.items(), key=operator.itemgetter(1)
-    ):
-        if depth not in depth_to_nodes:
-            depth_to_nodes[depth] = [node]
-        else:
-            depth_to_nodes[depth].append(node)
+    return pre_stack + sum_product_stack
 
-    return depth_to_nodes
 
-
-def _compute_max_num_children_by_depth(
-    root: Region, depth_to_nodes_mapping: Mapping[int, List[Region]] = None,
-) -> Dict[int, int]:
-    depth_to_nodes_mapping = depth_to_nodes_mapping or _get_depth_to_nodes_mapping(root)
-    max_num_children_by_depth = OrderedDict()
-    for depth, nodes in depth_to_nodes_mapping.items():
-        if any(isinstance(n, RegionNode) for n in nodes):
-            max_num_children_by_depth[depth] = max(
-                len(node.children) for node in nodes if isinstance(node, RegionNode)
-            )
-    return max_num_children_by_depth
-
-
-def _collect_variable_nodes(root: RegionNode) -> List[Region]:
+def _collect_variable_nodes(root: Region) -> List[Region]:
+    # Depth-first from left to right, with an explicit stack so that deep graphs do not hit the
+    # recursion limit
     variable_nodes: List[Region] = []
-
-    def _gather(node: Region) -> None:
+    stack = [root]
+    while stack:
+        node = stack.pop()
         if isinstance(node, RegionVariable):
             variable_nodes.append(node)
         else:
-            for child in node.children:
-                _gather(child)
-
-    _gather(root)
+            stack.extend(reversed(node.children))
     return variable_nodes
 
 
+def _region_graph_levels(root: Region) -> List[List[Region]]:
+    levels = [[root]]
+    while True:
+        next_level = [child for node in levels[-1] for child in node.children]
+        if not next_level:
+            return levels
+        levels.append(next_level)
+
+
 def _region_graph_to_permutations_and_prods_per_depth(
     root: RegionNode,
-) -> Tuple[list, List[int]]:
-    node_to_depth_mapping = _get_nodes_to_depth_mapping(root)
-    depth_to_nodes_mapping = _get_depth_to_nodes_mapping(
-        root, node_to_depth_mapping=node_to_depth_mapping
-    )
-    max_num_children_by_depth = _compute_max_num_children_by_depth(
-        root, depth_to_nodes_mapping=depth_to_nodes_mapping
-    )
-    max_num_children_by_depth_cum_prod = np.cumprod(
-        [1] + list(reversed(list(max_num_children_by_depth.values())))
-    )
-    max_depth = max(node_to_depth_mapping.values())
-
-    permutations = []
-
-    def recurse_permutation(node: Region) -> None:
-        depth = node_to_depth_mapping[node]
-        if isinstance(node, RegionVariable) and depth < max_depth:
-            permutations.append(node.index)
-            for _ in range(
-                max_num_children_by_depth_cum_prod[max_depth]
-                // max_num_children_by_depth_cum_prod[depth + 1]
-            ):
-                permutations.append(-1)
-        elif isinstance(node, RegionVariable) and depth == max_depth:
-            permutations.append(node.index)
-        elif isinstance(node, RegionNode):
-            for child in node.children:
-                recurse_permutation(child)
-            for _ in range(
-                max_num_children_by_depth_cum_prod[depth]
-                // max_num_children_by_depth_cum_prod[depth + 1]
-                - len(node.children)
-            ):
-                children_beneath = (
-                    max_num_children_by_depth_cum_prod[max_depth]
-                    // max_num_children_by_depth_cum_prod[depth + 1]
-                )
-                permutations.extend([-1] * children_beneath)
-
-    recurse_permutation(root)
-
-    return permutations, list(reversed(list(max_num_children_by_depth.values())))
-
-
-def _traverse_region_graph(root: Region, fun: Callable[[Region], None]) -> None:
+) -> Tuple[np.ndarray, List[int]]:
     """
-    Run ``fun`` on descendants of ``root`` (including ``root``) breadth-first.
+    Compile a region graph to the permutation of variables for a dense SPN and its product sizes.
 
-    Args:
-        root (Region): The root of the SPN graph.
-        fun (function): A function ``fun(node)`` executed once for every node of
-                        the graph. It should return ``True`` if traversing
-                        should be stopped.
-    """
-    visited_nodes = set()  # Set of visited nodes
-    queue: deque = deque()
-    queue.append(root)
+    Every node at depth :math:`d` is assigned a contiguous block of slots, whose size is the
+    product of the maximum number of children at depths :math:`d` and beyond. Children occupy
+    consecutive sub-blocks of their parent's block, variables occupy the first slot of their
+    block and all other slots are padded with ``-1``. The graph is traversed iteratively, so this
+    runs in time linear in the size of the graph plus the number of slots.
 
-    while queue:
-        next_node = queue.popleft()
-        if next_node not in visited_nodes:
-            fun(next_node)
+    Args:
+        root: Root of the region graph.
 
-            visited_nodes.add(next_node)
+    Returns:
+        A tuple of the permutation (as an integer array) and the number of factors of the
+        products from leaf to root.
+    """
+    levels = _region_graph_levels(root)
+    max_num_children_by_depth = [
+        max(len(node.children) for node in nodes) for nodes in levels[:-1]
+    ]
+    # Python integers do not overflow for deep graphs
+    block_sizes = [1]
+    for num_children in reversed(max_num_children_by_depth):
+        block_sizes.insert(0, block_sizes[0] * num_children)
+
+    permutation = np.full(block_sizes[0], -1, dtype=np.int64)
+    stack = [(root, 0, 0)]
+    while stack:
+        node, depth, offset = stack.pop()
+        if isinstance(node, RegionVariable):
+            permutation[offset] = node.index
+            continue
+        child_block_size = block_sizes[depth + 1]
+        stack.extend(
+            (child, depth + 1, offset + i * child_block_size)
+            for i, child in enumerate(node.children)
+        )
 
-            for child in next_node.children:
-                queue.append(child)
+    return permutation, max_num_children_by_depth[::-1]
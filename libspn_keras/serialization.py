@@ -0,0 +1,28 @@
+from typing import Any, Dict
+
+
+def get_custom_objects() -> Dict[str, Any]:
+    """
+    Obtain the serializable classes of ``libspn_keras`` by name.
+
+    Pass these as ``custom_objects`` to e.g. ``keras.models.load_model`` to load saved SPNs.
+
+    Returns:
+        A dict mapping class names to layers, models, initializers, constraints, losses, metrics
+        and optimizers.
+    """
+    import libspn_keras as spnk
+
+    return {
+        name: getattr(module, name)
+        for module in (
+            spnk.layers,
+            spnk.models,
+            spnk.initializers,
+            spnk.constraints,
+            spnk.losses,
+            spnk.metrics,
+            spnk.optimizers,
+        )
+        for name in module.__all__
+    }
@@ -0,0 +1,15 @@
+from libspn_keras.serving.batcher import DynamicBatcher
+from libspn_keras.serving.load_generator import generate_load
+from libspn_keras.serving.metrics import LatencyHistogram, ServingMetrics
+from libspn_keras.serving.queries import QueryFunctions
+from libspn_keras.serving.server import InferenceServer, load_model
+
+__all__ = [
+    "DynamicBatcher",
+    "generate_load",
+    "InferenceServer",
+    "LatencyHistogram",
+    "load_model",
+    "QueryFunctions",
+    "ServingMetrics",
+]
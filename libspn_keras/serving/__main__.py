@@ -0,0 +1,49 @@
+import argparse
+import sys
+from typing import Optional, Sequence
+
+from libspn_keras.serving.server import InferenceServer, load_model
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    Serve a saved SPN from the command line.
+
+    Args:
+        argv: Command line arguments. If ``None``, uses ``sys.argv``.
+
+    Returns:
+        Exit status.
+    """
+    parser = argparse.ArgumentParser(
+        description="Serve joint, marginal and MPE queries of a saved SPN over HTTP."
+    )
+    parser.add_argument("model", help="Path of the saved model")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8501)
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument(
+        "--max-latency",
+        type=float,
+        default=0.005,
+        help="Maximum time in seconds a request waits for its batch to fill up",
+    )
+    args = parser.parse_args(argv)
+
+    server = InferenceServer(
+        load_model(args.model),
+        host=args.host,
+        port=args.port,
+        max_batch_size=args.max_batch_size,
+        max_latency=args.max_latency,
+    )
+    print("Serving {} at {}".format(", ".join(server.queries.query_types), server.url))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+import collections
+from concurrent.futures import Future
+import threading
+import time
+from typing import Callable, Deque, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from libspn_keras.serving.metrics import ServingMetrics
+
+_Request = collections.namedtuple(
+    "_Request", ["inputs", "num_rows", "future", "submit_time"]
+)
+
+
+class DynamicBatcher:
+    """
+    Combines concurrent requests into batches that are evaluated with a single call.
+
+    Requests are queued per query type. A single worker thread takes the query type whose oldest
+    request has waited longest and evaluates all of its queued requests at once, as soon as either
+    ``max_batch_size`` rows are queued or the oldest request has waited for ``max_latency``
+    seconds. Under low load requests are therefore evaluated almost immediately, while under high
+    load the cost of a call is amortized over up to ``max_batch_size`` rows.
+
+    Args:
+        fn: Function that takes the query type and inputs batched along the first axis, and
+            returns outputs batched along the first axis, e.g. a ``QueryFunctions`` instance.
+        max_batch_size: Maximum number of rows in a batch. A single request with more rows is
+            evaluated on its own.
+        max_latency: Maximum time in seconds that a request waits for other requests to join its
+            batch.
+        metrics: Metrics to record latencies and batch sizes to. If ``None``, a new instance is
+            created.
+    """
+
+    def __init__(
+        self,
+        fn: Callable[..., Sequence],
+        max_batch_size: int = 64,
+        max_latency: float = 0.005,
+        metrics: Optional[ServingMetrics] = None,
+    ):
+        self.fn = fn
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self.metrics = metrics or ServingMetrics()
+        self._queues: Dict[str, Deque[_Request]] = collections.defaultdict(
+            collections.deque
+        )
+        self._num_queued_rows: Dict[str, int] = collections.defaultdict(int)
+        self._condition = threading.Condition()
+        self._running = False
+        self._worker: Optional[threading.Thread] = None
+
+    def start(self) -> "DynamicBatcher":
+        """
+        Start the worker thread.
+
+        Returns:
+            The batcher itself.
+        """
+        with self._condition:
+            if self._running:
+                return self
+            self._running = True
+        self._worker = threading.Thread(
+            target=self._run, name="spn-dynamic-batcher", daemon=True
+        )
+        self._worker.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the worker thread after evaluating all queued requests."""
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._worker is not None:
+            self._worker.join()
+            self._worker = None
+
+    def __enter__(self) -> "DynamicBatcher":
+        return self.start()
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+    def submit(self, query_type: str, *inputs: np.ndarray) -> Future:
+        """
+        Queue a request.
+
+        Args:
+            query_type: Name of the query.
+            *inputs: Inputs of the request, batched along the first axis. All inputs must have the
+                same number of rows.
+
+        Returns:
+            A future that resolves to the outputs for the rows of the request.
+
+        Raises:
+            RuntimeError: If the batcher is not running.
+            ValueError: If the inputs have different numbers of rows.
+        """
+        num_rows = {len(x) for x in inputs}
+        if len(num_rows) != 1:
+            raise ValueError(
+                "All inputs must have the same number of rows, got {}".format(
+                    [len(x) for x in inputs]
+                )
+            )
+        future: Future = Future()
+        request = _Request(inputs, num_rows.pop(), future, time.perf_counter())
+        with self._condition:
+            if not self._running:
+                raise RuntimeError("Batcher is not running, call start() first")
+            self._queues[query_type].append(request)
+            self._num_queued_rows[query_type] += request.num_rows
+            self._condition.notify()
+        return future
+
+    def __call__(self, query_type: str, *inputs: np.ndarray) -> np.ndarray:
+        """
+        Queue a request and wait for its result.
+
+        Args:
+            query_type: Name of the query.
+            *inputs: Inputs of the request, batched along the first axis.
+
+        Returns:
+            The outputs for the rows of the request.
+        """
+        return self.submit(query_type, *inputs).result()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                query_type = self._wait_for_batch()
+                if query_type is None:
+                    return
+                requests = self._pop_batch(query_type)
+            self._evaluate(query_type, requests)
+
+    def _wait_for_batch(self) -> Optional[str]:
+        # Blocks until a batch is due and returns its query type, or None once stopped and
+        # drained. Must be called while holding the condition.
+        while True:
+            pending = [q for q, queue in self._queues.items() if queue]
+            if not pending:
+                if not self._running:
+                    return None
+                self._condition.wait()
+                continue
+
+            query_type = min(pending, key=lambda q: self._queues[q][0].submit_time)
+            deadline = self._queues[query_type][0].submit_time + self.max_latency
+            remaining = deadline - time.perf_counter()
+            if (
+                remaining <= 0
+                or not self._running
+                or self._num_queued_rows[query_type] >= self.max_batch_size
+            ):
+                return query_type
+            self._condition.wait(remaining)
+
+    def _pop_batch(self, query_type: str) -> List[_Request]:
+        # Must be called while holding the condition. Always takes at least one request.
+        queue = self._queues[query_type]
+        requests = [queue.popleft()]
+        num_rows = requests[0].num_rows
+        while queue and num_rows + queue[0].num_rows <= self.max_batch_size:
+            num_rows += queue[0].num_rows
+            requests.append(queue.popleft())
+        self._num_queued_rows[query_type] -= num_rows
+        return requests
+
+    def _evaluate(self, query_type: str, requests: List[_Request]) -> None:
+        num_rows = sum(request.num_rows for request in requests)
+        error = None
+        try:
+            inputs = [
+                np.concatenate(batch_input, axis=0)
+                for batch_input in zip(*(request.inputs for request in requests))
+            ]
+            outputs = np.asarray(self.fn(query_type, *inputs))
+            splits = np.cumsum([request.num_rows for request in requests])[:-1]
+            for request, output in zip(requests, np.split(outputs, splits)):
+                request.future.set_result(output)
+        except Exception as e:  # noqa: B902
+            error = e
+            for request in requests:
+                if not request.future.done():
+                    request.future.set_exception(e)
+
+        done_time = time.perf_counter()
+        self.metrics.record_batch(
+            query_type,
+            [done_time - request.submit_time for request in requests],
+            num_rows,
+            error=error,
+        )
@@ -0,0 +1,91 @@
+import json
+import threading
+import time
+from typing import Optional
+import urllib.request
+
+import numpy as np
+
+
+def generate_load(
+    url: str,
+    query_type: str,
+    instances: np.ndarray,
+    evidence: Optional[np.ndarray] = None,
+    num_clients: int = 8,
+    num_requests: int = 200,
+    rows_per_request: int = 1,
+    timeout: float = 30.0,
+) -> dict:
+    """
+    Send concurrent requests to an ``InferenceServer`` and measure client-side statistics.
+
+    Every client sends its requests one after another, cycling through ``instances``, so that at
+    most ``num_clients`` requests are in flight at any time.
+
+    Args:
+        url: Base URL of the server.
+        query_type: Name of the query.
+        instances: Instances to query, batched along the first axis.
+        evidence: Evidence masks for marginal and MPE queries, with the same shape as
+            ``instances``.
+        num_clients: Number of concurrent clients.
+        num_requests: Total number of requests.
+        rows_per_request: Number of instances per request.
+        timeout: Timeout per request in seconds.
+
+    Returns:
+        A dict holding the number of requests and errors, the throughput in requests per second
+        and the median, 90th and 99th percentile latency in seconds.
+    """
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    counter = iter(range(num_requests))
+
+    def client() -> None:
+        while True:
+            with lock:
+                index = next(counter, None)
+            if index is None:
+                return
+            rows = np.arange(index * rows_per_request, (index + 1) * rows_per_request)
+            rows %= len(instances)
+            body = dict(instances=instances[rows].tolist())
+            if evidence is not None:
+                body["evidence"] = evidence[rows].tolist()
+            request = urllib.request.Request(
+                url + "/" + query_type,
+                data=json.dumps(body).encode(),
+                headers={"Content-Type": "application/json"},
+            )
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=timeout) as response:
+                    json.loads(response.read())
+            except Exception as e:  # noqa: B902
+                with lock:
+                    errors.append(e)
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client) for _ in range(num_clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    p50, p90, p99 = (
+        np.quantile(latencies, [0.5, 0.9, 0.99]) if latencies else (0.0, 0.0, 0.0)
+    )
+    return dict(
+        num_requests=num_requests,
+        num_errors=len(errors),
+        throughput=len(latencies) / elapsed,
+        latency_p50=float(p50),
+        latency_p90=float(p90),
+        latency_p99=float(p99),
+    )
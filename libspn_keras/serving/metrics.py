@@ -0,0 +1,179 @@
+import threading
+import time
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+
+class LatencyHistogram:
+    """
+    Histogram with logarithmically spaced buckets for e.g. latencies or batch sizes.
+
+    Recording a value is constant time and memory does not grow with the number of values, so
+    that histograms can be kept for the lifetime of a server.
+
+    Args:
+        min_value: Upper bound of the first bucket. Smaller values are counted in the first bucket.
+        max_value: Lower bound of the overflow bucket.
+        buckets_per_decade: Number of buckets per factor 10, which sets the relative resolution of
+            quantile estimates.
+    """
+
+    def __init__(
+        self,
+        min_value: float = 1e-5,
+        max_value: float = 1e2,
+        buckets_per_decade: int = 20,
+    ):
+        num_buckets = int(np.ceil(np.log10(max_value / min_value) * buckets_per_decade))
+        self.bounds = min_value * np.power(
+            10.0, np.arange(num_buckets + 1) / buckets_per_decade
+        )
+        self.counts = np.zeros(len(self.bounds) + 1, dtype=np.int64)
+        self.total = 0.0
+        self.max = 0.0
+
+    @property
+    def count(self) -> int:
+        """
+        Obtain the number of recorded values.
+
+        Returns:
+            The number of values.
+        """
+        return int(self.counts.sum())
+
+    def record(self, value: float, count: int = 1) -> None:
+        """
+        Record a value.
+
+        Args:
+            value: The value to record.
+            count: Number of times to record the value.
+        """
+        self.counts[np.searchsorted(self.bounds, value)] += count
+        self.total += value * count
+        self.max = max(self.max, value)
+
+    def quantiles(self, q: Sequence[float]) -> np.ndarray:
+        """
+        Estimate quantiles by interpolating within buckets.
+
+        Args:
+            q: Quantiles in ``[0, 1]``.
+
+        Returns:
+            An array with an estimate per quantile, which is zero if no values were recorded.
+        """
+        if self.count == 0:
+            return np.zeros(len(q))
+        cumulative = np.cumsum(self.counts)
+        lower_bounds = np.concatenate([[0.0], self.bounds])
+        upper_bounds = np.concatenate([self.bounds, [max(self.max, self.bounds[-1])]])
+        estimates = []
+        for quantile in q:
+            rank = quantile * cumulative[-1]
+            bucket = min(int(np.searchsorted(cumulative, rank)), len(cumulative) - 1)
+            below = cumulative[bucket - 1] if bucket > 0 else 0
+            fraction = (rank - below) / max(self.counts[bucket], 1)
+            estimate = lower_bounds[bucket] + fraction * (
+                upper_bounds[bucket] - lower_bounds[bucket]
+            )
+            estimates.append(min(estimate, self.max))
+        return np.asarray(estimates)
+
+    def to_dict(self, quantiles: Sequence[float] = (0.5, 0.9, 0.99)) -> dict:
+        """
+        Summarize the histogram.
+
+        Args:
+            quantiles: Quantiles to include in the summary.
+
+        Returns:
+            A dict holding the count, mean, max and quantile estimates.
+        """
+        count = self.count
+        summary = dict(
+            count=count, mean=self.total / count if count else 0.0, max=self.max
+        )
+        for quantile, estimate in zip(quantiles, self.quantiles(quantiles)):
+            summary["p{:g}".format(quantile * 100)] = float(estimate)
+        return summary
+
+
+class ServingMetrics:
+    """
+    Thread-safe throughput, latency and batch size statistics per query type.
+
+    Latencies are measured from the moment a request is submitted until its result is available,
+    so that they include the time spent waiting for a batch to fill up.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._start_time = time.perf_counter()
+        self._latencies: Dict[str, LatencyHistogram] = {}
+        self._batch_sizes: Dict[str, LatencyHistogram] = {}
+        self._num_requests: Dict[str, int] = {}
+        self._num_errors: Dict[str, int] = {}
+
+    def record_batch(
+        self,
+        query_type: str,
+        latencies: Sequence[float],
+        batch_size: int,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        """
+        Record the requests in a single batch.
+
+        Args:
+            query_type: Name of the query.
+            latencies: Latency of every request in the batch in seconds.
+            batch_size: Total number of rows in the batch.
+            error: Exception raised while computing the batch, if any.
+        """
+        with self._lock:
+            if query_type not in self._latencies:
+                self._latencies[query_type] = LatencyHistogram()
+                self._batch_sizes[query_type] = LatencyHistogram(
+                    min_value=1.0, max_value=1e6, buckets_per_decade=10
+                )
+                self._num_requests[query_type] = 0
+                self._num_errors[query_type] = 0
+            for latency in latencies:
+                self._latencies[query_type].record(latency)
+            self._batch_sizes[query_type].record(batch_size)
+            self._num_requests[query_type] += len(latencies)
+            if error is not None:
+                self._num_errors[query_type] += len(latencies)
+
+    def reset(self) -> None:
+        """Clear all statistics and restart the throughput clock."""
+        with self._lock:
+            self._start_time = time.perf_counter()
+            self._latencies.clear()
+            self._batch_sizes.clear()
+            self._num_requests.clear()
+            self._num_errors.clear()
+
+    def to_dict(self) -> dict:
+        """
+        Summarize the statistics.
+
+        Returns:
+            A dict holding per query type the number of requests and errors, the throughput in
+            requests per second, and summaries of the latency and batch size histograms.
+        """
+        with self._lock:
+            elapsed = time.perf_counter() - self._start_time
+            return {
+                query_type: dict(
+                    num_requests=self._num_requests[query_type],
+                    num_errors=self._num_errors[query_type],
+                    throughput=self._num_requests[query_type] / elapsed,
+                    latency=self._latencies[query_type].to_dict(),
+                    batch_size=self._batch_sizes[query_type].to_dict(),
+                )
+                for query_type in self._latencies
+            }
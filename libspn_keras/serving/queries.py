@@ -0,0 +1,164 @@
+from typing import Callable, Dict, List, Union
+
+import numpy as np
+import tensorflow as tf
+from tensorflow import keras
+
+from libspn_keras.models.dynamic_spn import DynamicSumProductNetwork
+from libspn_keras.models.sequential_spn import SequentialSumProductNetwork
+
+JOINT = "joint"
+MARGINAL = "marginal"
+MPE = "mpe"
+
+
+class QueryFunctions:
+    """
+    Pre-traced inference functions of a trained SPN, keyed by query type.
+
+    Every function is traced once for a variable batch size when the queries are created, so that
+    serving requests of any batch size never retraces. The following queries are supported:
+
+    - ``joint``: log-probability of fully observed samples. Takes ``x`` and returns a Tensor of
+      shape ``[batch]``. For dynamic SPNs, it takes ``x`` and the sequence lengths.
+    - ``marginal``: log-probability of the evidence with all other variables marginalized out.
+      Takes ``x`` and a boolean evidence mask of the same shape and returns a Tensor of shape
+      ``[batch]``.
+    - ``mpe``: imputation of the variables outside the evidence. Takes ``x`` and an evidence mask
+      and returns a Tensor with the same shape as ``x``. Only available if the leaf layer
+      implements ``get_modes``.
+
+    Marginal and MPE queries are only available for ``SequentialSumProductNetwork`` models.
+
+    Args:
+        model: A built ``SequentialSumProductNetwork`` or ``DynamicSumProductNetwork``.
+
+    Raises:
+        ValueError: If the model is not an SPN.
+    """
+
+    def __init__(self, model: keras.Model):
+        self.model = model
+        self._functions: Dict[str, Callable[..., tf.Tensor]] = {}
+        if isinstance(model, DynamicSumProductNetwork):
+            self._trace_dynamic_queries(model)
+        elif isinstance(model, SequentialSumProductNetwork):
+            self._trace_sequential_queries(model)
+        else:
+            raise ValueError(
+                "Can only serve SequentialSumProductNetwork and DynamicSumProductNetwork "
+                "models, got {}".format(model.__class__.__name__)
+            )
+
+    @property
+    def query_types(self) -> List[str]:
+        """
+        Obtain the names of the available queries.
+
+        Returns:
+            A list of query types.
+        """
+        return list(self._functions)
+
+    @property
+    def input_specs(self) -> Dict[str, List[tf.TensorSpec]]:
+        """
+        Obtain the specs of the inputs of each query.
+
+        Returns:
+            A dict mapping query types to the specs of their inputs.
+        """
+        return {
+            query_type: list(function.structured_input_signature[0])
+            for query_type, function in self._functions.items()
+        }
+
+    def __contains__(self, query_type: str) -> bool:
+        return query_type in self._functions
+
+    def __call__(
+        self, query_type: str, *inputs: Union[tf.Tensor, np.ndarray]
+    ) -> tf.Tensor:
+        """
+        Run a query.
+
+        Args:
+            query_type: Name of the query.
+            *inputs: Inputs to the query, batched along the first axis.
+
+        Returns:
+            The result of the query, batched along the first axis.
+
+        Raises:
+            KeyError: If the query type is not available for the model.
+        """
+        if query_type not in self._functions:
+            raise KeyError(
+                "Unknown query '{}', available queries are {}".format(
+                    query_type, self.query_types
+                )
+            )
+        return self._functions[query_type](*inputs)
+
+    def _trace_sequential_queries(self, model: SequentialSumProductNetwork) -> None:
+        input_shape = model.layers[0].input_shape
+        if isinstance(input_shape, list):
+            input_shape = input_shape[0]
+        x_spec = tf.TensorSpec([None] + list(input_shape[1:]), model.layers[0].dtype)
+        mask_spec = tf.TensorSpec(x_spec.shape, tf.bool)
+
+        def marginal(x: tf.Tensor, evidence_mask: tf.Tensor) -> tf.Tensor:
+            root = model.marginal(x, evidence_mask, training=False)
+            return tf.reduce_logsumexp(root, axis=-1)
+
+        if model.infer_no_evidence:
+            # Calling the model would impute, so joint queries marginalize nothing instead
+            def joint(x: tf.Tensor) -> tf.Tensor:
+                return marginal(x, tf.ones_like(x, dtype=tf.bool))
+
+        else:
+
+            def joint(x: tf.Tensor) -> tf.Tensor:
+                return tf.reduce_logsumexp(model(x, training=False), axis=-1)
+
+        self._functions[JOINT] = tf.function(joint, input_signature=[x_spec])
+        self._functions[MARGINAL] = tf.function(
+            marginal, input_signature=[x_spec, mask_spec]
+        )
+        model._locate_leaf()
+        try:
+            model._leaf_layer.get_modes()
+        except NotImplementedError:
+            pass
+        else:
+
+            def mpe(x: tf.Tensor, evidence_mask: tf.Tensor) -> tf.Tensor:
+                return model.impute(x, evidence_mask, training=False)
+
+            self._functions[MPE] = tf.function(mpe, input_signature=[x_spec, mask_spec])
+        self._trace()
+
+    def _trace_dynamic_queries(self, model: DynamicSumProductNetwork) -> None:
+        first_layer = model.template_network.layers[0]
+        input_shape = first_layer.input_shape
+        if isinstance(input_shape, list):
+            input_shape = input_shape[0]
+
+        def joint(x: tf.Tensor, sequence_lens: tf.Tensor) -> tf.Tensor:
+            root = model([x, sequence_lens], training=False)
+            return tf.reduce_logsumexp(root, axis=-1)
+
+        self._functions[JOINT] = tf.function(
+            joint,
+            input_signature=[
+                tf.TensorSpec([None, None, input_shape[-1]], first_layer.dtype),
+                tf.TensorSpec([None], tf.int32),
+            ],
+        )
+        self._trace()
+
+    def _trace(self) -> None:
+        self._functions = {
+            query_type: function.get_concrete_function()
+            for query_type, function in self._functions.items()
+        }
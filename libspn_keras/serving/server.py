@@ -0,0 +1,241 @@
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import json
+from socketserver import ThreadingMixIn
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from tensorflow import keras
+
+from libspn_keras.layers.base_leaf import BaseLeaf
+from libspn_keras.serialization import get_custom_objects
+from libspn_keras.serving.batcher import DynamicBatcher
+from libspn_keras.serving.metrics import ServingMetrics
+from libspn_keras.serving.queries import JOINT, QueryFunctions
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 drops connections of concurrent clients, which then retry
+    # after a second
+    request_queue_size = 128
+    inference_server: "InferenceServer"
+
+
+class InferenceServer:
+    """
+    Local HTTP server that answers SPN queries with dynamic batching.
+
+    Every query type is exposed as a POST endpoint, e.g. ``/joint``, ``/marginal`` and ``/mpe``,
+    that takes a JSON body ``{"instances": [...]}``. Marginal and MPE queries additionally take a
+    boolean ``"evidence"`` mask with the same shape as the instances, and joint queries of dynamic
+    SPNs take the ``"sequence_lens"`` of the instances, which must be padded to the same length.
+    The response is ``{"predictions": [...]}``, holding log-probabilities for joint and marginal
+    queries and imputed instances for MPE queries.
+
+    Concurrent requests are combined into batches by a ``DynamicBatcher``. ``GET /stats`` returns
+    the throughput, latency and batch size statistics of the server, see ``stats``, and
+    ``GET /health`` the available queries. A ``LeafLogProbCache`` must be attached to the leaf
+    before creating the server, since the queries are traced right away.
+
+    Args:
+        model: A trained ``SequentialSumProductNetwork`` or ``DynamicSumProductNetwork``.
+        host: Host to bind to.
+        port: Port to bind to. If ``0``, a free port is picked, see ``url``.
+        max_batch_size: Maximum number of rows in a batch.
+        max_latency: Maximum time in seconds that a request waits for other requests to join its
+            batch.
+    """
+
+    def __init__(
+        self,
+        model: keras.Model,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        max_batch_size: int = 64,
+        max_latency: float = 0.005,
+    ):
+        self.queries = QueryFunctions(model)
+        self.metrics = ServingMetrics()
+        self.batcher = DynamicBatcher(
+            self.queries,
+            max_batch_size=max_batch_size,
+            max_latency=max_latency,
+            metrics=self.metrics,
+        )
+        self._input_specs = self.queries.input_specs
+        self._httpd = _ThreadingHTTPServer((host, port), _QueryHandler)
+        self._httpd.inference_server = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """
+        Obtain the base URL of the server.
+
+        Returns:
+            The URL, including the port that was bound to.
+        """
+        host, port = self._httpd.server_address[:2]
+        return "http://{}:{}".format(host, port)
+
+    def start(self) -> "InferenceServer":
+        """
+        Start serving in a background thread.
+
+        Returns:
+            The server itself.
+        """
+        self.batcher.start()
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, name="spn-inference-server", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        """Serve in the current thread until interrupted."""
+        self.batcher.start()
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self.batcher.stop()
+            self._httpd.server_close()
+
+    def stop(self) -> None:
+        """Stop serving and release the port."""
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self.batcher.stop()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "InferenceServer":
+        return self.start()
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+    def stats(self) -> dict:
+        """
+        Obtain the statistics of the server.
+
+        Returns:
+            A dict holding the statistics per query type, see ``ServingMetrics.to_dict``. If
+            any leaf of the model has a ``LeafLogProbCache``, the statistics of the caches are
+            under ``"leaf_log_prob_cache"`` by the name of their leaf.
+        """
+        stats = self.metrics.to_dict()
+        leaf_caches = {
+            layer.name: layer.log_prob_cache.to_dict()
+            for layer in self.queries.model.layers
+            if isinstance(layer, BaseLeaf) and layer.log_prob_cache is not None
+        }
+        if leaf_caches:
+            stats["leaf_log_prob_cache"] = leaf_caches
+        return stats
+
+    def handle_query(self, query_type: str, body: dict) -> List:
+        """
+        Answer a single query request.
+
+        Args:
+            query_type: Name of the query.
+            body: Decoded JSON body of the request.
+
+        Returns:
+            The predictions for the instances in the request.
+
+        Raises:
+            KeyError: If the query type is unknown.
+            ValueError: If the request is malformed.
+        """
+        if query_type not in self.queries:
+            raise KeyError(query_type)
+        if "instances" not in body:
+            raise ValueError("Request must hold 'instances'")
+        if query_type == JOINT:
+            extra_inputs = (
+                ["sequence_lens"] if len(self._input_specs[JOINT]) > 1 else []
+            )
+        else:
+            extra_inputs = ["evidence"]
+        missing = [name for name in extra_inputs if name not in body]
+        if missing:
+            raise ValueError(
+                "Query '{}' requires {}".format(query_type, ", ".join(missing))
+            )
+        inputs = []
+        for name, spec in zip(
+            ["instances"] + extra_inputs, self._input_specs[query_type]
+        ):
+            value = np.asarray(body[name], dtype=spec.dtype.as_numpy_dtype)
+            # Checked per request, so that a malformed request does not fail its whole batch
+            if not spec.shape.is_compatible_with(value.shape):
+                raise ValueError(
+                    "Expected '{}' with shape {}, got {}".format(
+                        name, spec.shape, value.shape
+                    )
+                )
+            inputs.append(value)
+        return self.batcher(query_type, *inputs).tolist()
+
+
+class _QueryHandler(BaseHTTPRequestHandler):
+    server: _ThreadingHTTPServer
+
+    def do_GET(self) -> None:  # noqa: N802
+        inference_server = self.server.inference_server
+        if self.path == "/stats":
+            self._send_json(200, inference_server.stats())
+        elif self.path == "/health":
+            self._send_json(200, dict(queries=inference_server.queries.query_types))
+        else:
+            self._send_json(404, dict(error="Unknown path {}".format(self.path)))
+
+    def do_POST(self) -> None:  # noqa: N802
+        status, response = self._answer()
+        self._send_json(status, response)
+
+    def _answer(self) -> Tuple[int, Dict]:
+        inference_server = self.server.inference_server
+        query_type = self.path.strip("/")
+        if query_type not in inference_server.queries:
+            return 404, dict(error="Unknown query '{}'".format(query_type))
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length))
+            predictions = inference_server.handle_query(query_type, body)
+        except (ValueError, TypeError) as e:
+            return 400, dict(error=str(e))
+        except Exception as e:  # noqa: B902
+            return 500, dict(error=str(e))
+        return 200, dict(predictions=predictions)
+
+    def _send_json(self, status: int, response: Dict) -> None:
+        payload = json.dumps(response).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        # Per-request logging to stderr would dominate the latency of small requests
+        pass
+
+
+def load_model(path: str) -> keras.Model:
+    """
+    Load a saved SPN with all layers and models of ``libspn_keras`` as custom objects.
+
+    Args:
+        path: Path of a model saved with ``model.save``.
+
+    Returns:
+        The loaded model.
+    """
+    return keras.models.load_model(
+        path, custom_objects=get_custom_objects(), compile=False
+    )
@@ -85,6 +85,15 @@ class SumOpBase(abc.ABC):
     def default_logspace_accumulators(self) -> bool:
         """Whether default config is to have accumulators in logspace."""
 
+    def get_config(self) -> dict:
+        """
+        Obtain a key-value representation of the sum op config.
+
+        Returns:
+            A dict holding the keyword arguments to recreate the sum op with.
+        """
+        return {}
+
     @staticmethod
     def _to_log_weights(x: tf.Tensor) -> tf.Tensor:
         with tf.name_scope("ToLogWeights"):
@@ -243,6 +252,15 @@ class SumOpGradBackprop(SumOpBase):
             else True
         )
 
+    def get_config(self) -> dict:
+        """
+        Obtain a key-value representation of the sum op config.
+
+        Returns:
+            A dict holding the keyword arguments to recreate the sum op with.
+        """
+        return dict(logspace_accumulators=self._logspace_accumulators)
+
 
 class SumOpEMBackprop(SumOpBase):
     """
@@ -361,10 +379,36 @@ class SumOpHardEMBackprop(SumOpBase):
     Args:
         sample_prob: Sampling probability in the range of [0, 1]. Sampling logits are taken from
             the normalized log probability of the children of each sum.
+        sparse_counts: If ``True``, the counts of dense sums are passed to their accumulators as
+            ``tf.IndexedSlices`` holding only the counts of the winning children, which index
+            the accumulators reshaped to ``[-1, num_sums]`` or ``[-1]``. Such counts can only be
+            applied by ``OnlineExpectationMaximization`` based on the Keras optimizers of TF 2.11
+            or later, which raises an error otherwise. They cannot be combined with other
+            gradients of the accumulators, so layers with an ``accumulator_regularizer`` reject
+            them.
     """
 
-    def __init__(self, sample_prob: Optional[Union[float, tf.Tensor]] = None):
+    def __init__(
+        self,
+        sample_prob: Optional[Union[float, tf.Tensor]] = None,
+        sparse_counts: bool = False,
+    ):
         self.sample_prob = sample_prob
+        self.sparse_counts = sparse_counts
+
+    def get_config(self) -> dict:
+        """
+        Obtain a key-value representation of the sum op config.
+
+        Returns:
+            A dict holding the keyword arguments to recreate the sum op with.
+        """
+        return dict(
+            sample_prob=None
+            if self.sample_prob is None
+            else float(tf.keras.backend.get_value(self.sample_prob)),
+            sparse_counts=self.sparse_counts,
+        )
 
     @_batch_scope_tranpose
     def weighted_sum(
@@ -447,9 +491,7 @@ class SumOpHardEMBackprop(SumOpBase):
 
                 # Holds the index of the winning child per sum
                 winning_child_per_sum = tf.reshape(
-                    tf.random.categorical(
-                        tf.math.log(equal_to_max_flat_outer), num_samples=1
-                    ),
+                    tf.random.categorical(equal_to_max_flat_outer, num_samples=1),
                     tf.shape(out),
                 )
 
@@ -459,6 +501,11 @@ class SumOpHardEMBackprop(SumOpBase):
                 )
 
                 child_counts = tf.reduce_sum(per_sample_weight_counts, axis=3)
+                if self.sparse_counts:
+                    return (
+                        child_counts,
+                        _sparse_weight_counts(winning_child_per_sum, dy, accumulators),
+                    )
                 weight_counts = tf.reduce_sum(per_sample_weight_counts, axis=2)
 
                 return child_counts, tf.transpose(weight_counts, (0, 1, 3, 2))
@@ -537,7 +584,7 @@ class SumOpHardEMBackprop(SumOpBase):
                 w = (
                     self._to_log_weights(accumulators)
                     if normalize_in_forward_pass
-                    else tf.math.log(normalize_in_forward_pass)
+                    else tf.math.log(accumulators)
                 )
                 # Pairwise product in forward pass
                 x = tf.expand_dims(x, axis=3)
@@ -581,9 +628,7 @@ class SumOpHardEMBackprop(SumOpBase):
 
                 # Holds the index of the winning child per sum
                 winning_child_per_sum = tf.reshape(
-                    tf.random.categorical(
-                        tf.math.log(equal_to_max_flat_outer), num_samples=1
-                    ),
+                    tf.random.categorical(equal_to_max_flat_outer, num_samples=1),
                     tf.shape(out),
                 )
 
@@ -625,10 +670,36 @@ class SumOpUnweightedHardEMBackprop(SumOpBase):
     Args:
         sample_prob: Sampling probability in the range of [0, 1]. Sampling logits are taken from
             the normalized log probability of the children of each sum.
+        sparse_counts: If ``True``, the counts of dense sums are passed to their accumulators as
+            ``tf.IndexedSlices`` holding only the counts of the winning children, which index
+            the accumulators reshaped to ``[-1, num_sums]`` or ``[-1]``. Such counts can only be
+            applied by ``OnlineExpectationMaximization`` based on the Keras optimizers of TF 2.11
+            or later, which raises an error otherwise. They cannot be combined with other
+            gradients of the accumulators, so layers with an ``accumulator_regularizer`` reject
+            them.
     """
 
-    def __init__(self, sample_prob: Optional[Union[float, tf.Tensor]] = None):
+    def __init__(
+        self,
+        sample_prob: Optional[Union[float, tf.Tensor]] = None,
+        sparse_counts: bool = False,
+    ):
         self.sample_prob = sample_prob
+        self.sparse_counts = sparse_counts
+
+    def get_config(self) -> dict:
+        """
+        Obtain a key-value representation of the sum op config.
+
+        Returns:
+            A dict holding the keyword arguments to recreate the sum op with.
+        """
+        return dict(
+            sample_prob=None
+            if self.sample_prob is None
+            else float(tf.keras.backend.get_value(self.sample_prob)),
+            sparse_counts=self.sparse_counts,
+        )
 
     @_batch_scope_tranpose
     def weighted_sum(
@@ -704,6 +775,13 @@ class SumOpUnweightedHardEMBackprop(SumOpBase):
                     winning_child_per_scope, depth=num_in, axis=-1
                 )
                 child_counts = winning_child_per_scope_one_hot * sum_parent_counts
+                if self.sparse_counts:
+                    return (
+                        child_counts,
+                        _sparse_weight_counts(
+                            winning_child_per_scope, parent_counts, accumulators
+                        ),
+                    )
 
                 weight_counts = tf.matmul(
                     winning_child_per_scope_one_hot, parent_counts, transpose_a=True
@@ -840,3 +918,75 @@ class SumOpUnweightedHardEMBackprop(SumOpBase):
             True if the default representation is in logspace and False otherwise.
         """
         return False
+
+
+def _sparse_weight_counts(
+    winning_child: tf.Tensor, counts: tf.Tensor, accumulators: tf.Tensor
+) -> tf.IndexedSlices:
+    # Counts of the winning children of dense sums with accumulators of shape
+    # [scopes, decomps, num_in, num_sums]. If all sums of a region share their winning child,
+    # i.e. winning_child is [scopes, decomps, batch], the counts index rows of the accumulators
+    # reshaped to [-1, num_sums]. Otherwise, winning_child is [scopes, decomps, batch, num_sums]
+    # and the counts index the flattened accumulators.
+    num_scopes, num_decomps, num_in, num_sums = tf.unstack(
+        tf.shape(accumulators, out_type=tf.int64)
+    )
+    region = tf.reshape(
+        tf.range(num_scopes * num_decomps), [num_scopes, num_decomps, 1]
+    )
+    if winning_child.shape.rank == 3:
+        return tf.IndexedSlices(
+            values=tf.reshape(counts, tf.stack([-1, num_sums])),
+            indices=tf.reshape(region * num_in + winning_child, [-1]),
+            dense_shape=tf.stack([num_scopes * num_decomps * num_in, num_sums]),
+        )
+    rows = tf.expand_dims(region, axis=-1) * num_in + winning_child
+    return tf.IndexedSlices(
+        values=tf.reshape(counts, [-1]),
+        indices=tf.reshape(rows * num_sums + tf.range(num_sums), [-1]),
+        dense_shape=tf.reshape(tf.size(accumulators, out_type=tf.int64), [1]),
+    )
+
+
+_SUM_OPS = {
+    sum_op.__name__: sum_op
+    for sum_op in (
+        SumOpGradBackprop,
+        SumOpEMBackprop,
+        SumOpHardEMBackprop,
+        SumOpUnweightedHardEMBackprop,
+    )
+}
+
+
+def serialize(sum_op: SumOpBase) -> dict:
+    """
+    Serialize a sum op to a JSON-compatible dict.
+
+    Args:
+        sum_op: The sum op to serialize.
+
+    Returns:
+        A dict holding the class name and config of the sum op.
+    """
+    return dict(class_name=sum_op.__class__.__name__, config=sum_op.get_config())
+
+
+def deserialize(config: Union[dict, SumOpBase]) -> SumOpBase:
+    """
+    Recreate a sum op from its serialized form.
+
+    Args:
+        config: A dict as returned by ``serialize``. Sum op instances are returned as is.
+
+    Returns:
+        The sum op.
+
+    Raises:
+        ValueError: If the class name is not a sum op of ``libspn_keras``.
+    """
+    if isinstance(config, SumOpBase):
+        return config
+    if config["class_name"] not in _SUM_OPS:
+        raise ValueError("Unknown sum op {}".format(config["class_name"]))
+    return _SUM_OPS[config["class_name"]](**config.get("config", {}))
@@ -0,0 +1,201 @@
+from typing import Callable, Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+import tensorflow as tf
+
+from libspn_keras.models.sequential_spn import SequentialSumProductNetwork
+
+
+def tile_offsets(size: int, tile_size: int, stride: int) -> np.ndarray:
+    """
+    Compute the offsets of sliding windows along a single axis.
+
+    Windows start every ``stride`` elements. If that leaves elements at the end uncovered, a
+    final window is aligned with the end. Axes shorter than a tile get a single window at zero.
+
+    Args:
+        size: Number of elements along the axis.
+        tile_size: Number of elements per window.
+        stride: Number of elements between the starts of consecutive windows.
+
+    Returns:
+        The sorted, unique offsets of the windows.
+    """
+    last_offset = max(size - tile_size, 0)
+    offsets = np.arange(0, last_offset + 1, stride)
+    if offsets[-1] != last_offset:
+        offsets = np.append(offsets, last_offset)
+    return offsets
+
+
+class TiledEvaluator:
+    """
+    Evaluate a spatial SPN on images of any size by sliding a window of its input size.
+
+    Images are cut into overlapping tiles with the height and width the SPN was built for,
+    which are evaluated in batches of at most ``max_tiles_per_batch``. Tiles are cut from the
+    image as they are needed, so images may be e.g. memory-mapped arrays that do not fit in
+    memory. Tiles that stick out of an image smaller than the SPN are padded with pixels that
+    are left out of the evidence, which marginalizes them.
+
+    Per-pixel results of overlapping tiles are averaged:
+
+    - ``log_density_map`` assigns every pixel the log-probability of a tile divided by the
+      number of pixels of the tile in the evidence, which gives a map of log-densities per pixel
+      for e.g. anomaly detection.
+    - ``complete`` imputes the pixels outside of the evidence with ``impute``.
+
+    Args:
+        model: A spatial ``SequentialSumProductNetwork`` that takes images of shape
+            ``[batch, height, width, channels]``.
+        strides: Vertical and horizontal distance between tiles. Defaults to half of the tile
+            size.
+        max_tiles_per_batch: Maximum number of tiles that are evaluated at once, which bounds
+            the memory of the evaluation.
+
+    Raises:
+        ValueError: If the input of the model is not an image with a known height and width.
+    """
+
+    def __init__(
+        self,
+        model: SequentialSumProductNetwork,
+        strides: Optional[Sequence[int]] = None,
+        max_tiles_per_batch: int = 64,
+    ):
+        input_shape = model.layers[0].input_shape
+        if len(input_shape) != 4 or None in input_shape[1:3]:
+            raise ValueError(
+                "Can only tile images of a known size, got an input shape of {}".format(
+                    input_shape
+                )
+            )
+        self.model = model
+        self.tile_size = tuple(input_shape[1:3])
+        self.num_channels = input_shape[3]
+        self.strides = tuple(
+            strides or [max(1, tile_size // 2) for tile_size in self.tile_size]
+        )
+        self.max_tiles_per_batch = max_tiles_per_batch
+        self._dtype = tf.as_dtype(model.dtype).as_numpy_dtype
+        tile_spec = tf.TensorSpec((None,) + tuple(input_shape[1:]), model.dtype)
+        mask_spec = tf.TensorSpec((None,) + tuple(input_shape[1:]), tf.bool)
+        self._marginal = tf.function(
+            lambda x, evidence_mask: tf.reduce_logsumexp(
+                model.marginal(x, evidence_mask, training=False), axis=-1
+            ),
+            input_signature=[tile_spec, mask_spec],
+        )
+        self._impute = tf.function(
+            lambda x, evidence_mask: model.impute(x, evidence_mask, training=False),
+            input_signature=[tile_spec, mask_spec],
+        )
+
+    def offsets(self, height: int, width: int) -> np.ndarray:
+        """
+        Compute the offsets of the tiles of an image.
+
+        Args:
+            height: Height of the image.
+            width: Width of the image.
+
+        Returns:
+            An array with shape ``[num_tiles, 2]`` holding the row and column of the top left
+            pixel of every tile.
+        """
+        rows, cols = [
+            tile_offsets(size, tile_size, stride)
+            for size, tile_size, stride in zip(
+                (height, width), self.tile_size, self.strides
+            )
+        ]
+        return np.stack(np.meshgrid(rows, cols, indexing="ij"), axis=-1).reshape(-1, 2)
+
+    def log_density_map(
+        self, image: np.ndarray, evidence_mask: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Compute the log-density per pixel of an image.
+
+        Args:
+            image: Image with shape ``[height, width, channels]``.
+            evidence_mask: Boolean array with the shape of ``image`` that is ``True`` for
+                pixels that are part of the evidence. Defaults to all pixels.
+
+        Returns:
+            An array with shape ``[height, width]`` holding the average over the tiles covering
+            a pixel of their log-probability per pixel in the evidence.
+        """
+
+        def log_density_per_pixel(x: np.ndarray, mask: np.ndarray) -> np.ndarray:
+            log_prob = self._marginal(x, mask).numpy()
+            num_pixels = np.maximum(np.sum(np.all(mask, axis=-1), axis=(1, 2)), 1)
+            return np.broadcast_to(
+                (log_prob / num_pixels)[:, np.newaxis, np.newaxis, np.newaxis],
+                x.shape[:3] + (1,),
+            )
+
+        return self._merge(image, evidence_mask, log_density_per_pixel)[..., 0]
+
+    def complete(self, image: np.ndarray, evidence_mask: np.ndarray) -> np.ndarray:
+        """
+        Impute the pixels of an image that are not part of the evidence.
+
+        Args:
+            image: Image with shape ``[height, width, channels]``.
+            evidence_mask: Boolean array with the shape of ``image`` that is ``True`` for
+                pixels that are part of the evidence.
+
+        Returns:
+            The image where pixels outside of the evidence hold the average imputation of the
+            tiles covering them.
+        """
+        completed = self._merge(
+            image, evidence_mask, lambda x, mask: self._impute(x, mask).numpy()
+        )
+        return np.where(evidence_mask, image, completed.astype(image.dtype))
+
+    def _merge(
+        self,
+        image: np.ndarray,
+        evidence_mask: Optional[np.ndarray],
+        fn: Callable[[np.ndarray, np.ndarray], np.ndarray],
+    ) -> np.ndarray:
+        height, width = image.shape[:2]
+        total: Optional[np.ndarray] = None
+        counts = np.zeros((height, width, 1), dtype=np.float32)
+        for offsets, tiles, masks in self._batches(image, evidence_mask):
+            outputs = fn(tiles, masks)
+            if total is None:
+                total = np.zeros((height, width, outputs.shape[-1]), dtype=np.float32)
+            for (row, col), output in zip(offsets, outputs):
+                tile_height = min(self.tile_size[0], height - row)
+                tile_width = min(self.tile_size[1], width - col)
+                total[row : row + tile_height, col : col + tile_width] += output[
+                    :tile_height, :tile_width
+                ]
+                counts[row : row + tile_height, col : col + tile_width] += 1.0
+        return total / counts
+
+    def _batches(
+        self, image: np.ndarray, evidence_mask: Optional[np.ndarray]
+    ) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        # Yields offsets, tiles and evidence masks of at most max_tiles_per_batch tiles
+        height, width = image.shape[:2]
+        offsets = self.offsets(height, width)
+        tile_shape = self.tile_size + (self.num_channels,)
+        for start in range(0, len(offsets), self.max_tiles_per_batch):
+            batch_offsets = offsets[start : start + self.max_tiles_per_batch]
+            tiles = np.zeros((len(batch_offsets),) + tile_shape, dtype=self._dtype)
+            masks = np.zeros((len(batch_offsets),) + tile_shape, dtype=bool)
+            for i, (row, col) in enumerate(batch_offsets):
+                window = (
+                    slice(row, row + self.tile_size[0]),
+                    slice(col, col + self.tile_size[1]),
+                )
+                tile = image[window]
+                tiles[i, : tile.shape[0], : tile.shape[1]] = tile
+                masks[i, : tile.shape[0], : tile.shape[1]] = (
+                    True if evidence_mask is None else evidence_mask[window]
+                )
+            yield batch_offsets, tiles, masks
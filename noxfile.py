@@ -4,7 +4,7 @@ import nox
 
 nox.options.sessions = "lint", "tests", "mypy", "pytype"
 
-_LOCATIONS = ["libspn_keras", "tests", "noxfile.py"]
+_LOCATIONS = ["libspn_keras", "tests", "benchmarks", "noxfile.py"]
 
 
 def install_with_constraints(session, *args, **kwargs):
@@ -77,6 +77,14 @@ def typeguard(session):
     session.run("pytest", "--typeguard-packages=libspn_keras", *args)
 
 
+@nox.session(python="3.8")
+def benchmarks(session):
+    """Run the benchmarks and compare them against the stored baseline."""
+    args = session.posargs or ["--quick", "--baseline", "benchmarks/baseline.json"]
+    session.run("poetry", "install", "--no-dev", external=True)
+    session.run("python", "-m", "benchmarks.run", *args)
+
+
 @nox.session(python="3.8")
 def docs(session) -> None:
     """Build the documentation."""
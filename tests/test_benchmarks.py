@@ -0,0 +1,127 @@
+import tensorflow as tf
+from tensorflow import test as tftest
+
+from benchmarks.conditionals import benchmark_conditionals
+from benchmarks.em_optimizer import benchmark_em_optimizer
+from benchmarks.fold_normalization import benchmark_fold_normalization
+from benchmarks.incremental import benchmark_incremental
+from benchmarks.marginal_queries import benchmark_marginal_queries
+from benchmarks.pruning import benchmark_pruning
+from benchmarks.quantization import benchmark_quantization
+from benchmarks.region_graph import benchmark_region_graph
+from benchmarks.run import (
+    benchmark_matrix,
+    BenchmarkConfig,
+    compare_to_baseline,
+    run_benchmark,
+)
+from benchmarks.serving import benchmark_serving
+from benchmarks.sharded_inference import benchmark_sharded_inference
+from benchmarks.sparse_counts import benchmark_sparse_counts
+
+
+class TestBenchmarks(tftest.TestCase):
+    def tearDown(self):
+        tf.keras.backend.clear_session()
+
+    def test_matrix(self):
+        configs = benchmark_matrix(
+            models=["rat", "dgc"],
+            sum_ops=["grad", "hard_em"],
+            modes=["forward", "train"],
+            batch_sizes=[8],
+            num_sums=[2],
+            num_decomps=[1, 2],
+        )
+        # Decompositions are only varied for RAT-SPNs
+        self.assertEqual(len(configs), 2 * 2 * 2 + 2 * 2)
+        self.assertEqual(len({config.id for config in configs}), len(configs))
+
+    def test_run_and_compare(self):
+        for mode in ["forward", "train"]:
+            config = BenchmarkConfig("rat", "em", mode, 8, 2, 1)
+            result = run_benchmark(config, num_steps=1, num_warmup_steps=1)
+            self.assertGreater(result["throughput"], 0.0)
+            self.assertGreater(result["peak_memory_bytes"], 0)
+
+            slower = dict(result, throughput=result["throughput"] / 2)
+            self.assertEqual(compare_to_baseline([result], [result]), [])
+            (regression,) = compare_to_baseline([slower], [result], threshold=0.2)
+            self.assertEqual(regression.metric, "throughput")
+            self.assertAlmostEqual(regression.relative_change, -0.5)
+
+    def test_region_graph(self):
+        for graph in ["binary", "quaternary"]:
+            result = benchmark_region_graph(graph, num_vars=100)
+            self.assertGreaterEqual(result["num_slots"], 100)
+            self.assertGreater(result["depth"], 1)
+
+    def test_serving(self):
+        result = benchmark_serving(
+            "marginal", max_batch_size=16, max_latency=0.01, num_requests=32
+        )
+        self.assertEqual(result["num_errors"], 0)
+        self.assertGreater(result["throughput"], 0.0)
+        self.assertGreater(result["mean_batch_size"], 1.0)
+
+    def test_sharded_inference(self):
+        results = benchmark_sharded_inference(
+            [1, 2], num_decomps=4, num_sums=2, num_steps=2
+        )
+        self.assertEqual([result["num_workers"] for result in results], [0, 1, 2])
+        for result in results:
+            self.assertGreater(result["latency"], 0.0)
+
+    def test_quantization(self):
+        (result,) = benchmark_quantization([4], batch_size=4, num_steps=2)
+        self.assertGreater(result["compression"], 1.0)
+        self.assertLess(result["mean_abs_error"], 0.1)
+        self.assertGreater(result["quantized_latency"], 0.0)
+
+    def test_incremental(self):
+        (result,) = benchmark_incremental([4], num_decomps=2, num_steps=2)
+        self.assertGreater(result["incremental_latency"], 0.0)
+        self.assertGreater(result["latency"], 0.0)
+
+    def test_conditionals(self):
+        (result,) = benchmark_conditionals(
+            [4], num_decomps=2, batch_size=4, num_steps=2
+        )
+        self.assertGreater(result["conditionals_latency"], 0.0)
+        self.assertGreater(result["latency"], 0.0)
+
+    def test_em_optimizer(self):
+        (result,) = benchmark_em_optimizer([4], num_decomps=2, num_steps=2)
+        self.assertGreater(result["num_accumulators"], 0)
+        self.assertGreater(result["fused_latency"], 0.0)
+        self.assertGreater(result["latency"], 0.0)
+
+    def test_marginal_queries(self):
+        (result,) = benchmark_marginal_queries(
+            [3], num_sums=4, num_decomps=2, num_steps=2
+        )
+        self.assertEqual(result["num_queries"], 3)
+        self.assertGreater(result["fused_latency"], 0.0)
+        self.assertGreater(result["latency"], 0.0)
+
+    def test_pruning(self):
+        (result,) = benchmark_pruning([4], num_decomps=2, batch_size=4, num_steps=2)
+        self.assertGreater(result["sparsity"], 0.5)
+        self.assertLess(result["max_abs_error"], 1e-3)
+        self.assertGreater(result["pruned_latency"], 0.0)
+
+    def test_sparse_counts(self):
+        for sum_op in ["hard_em", "unweighted_hard_em"]:
+            (result,) = benchmark_sparse_counts(
+                [8], sum_op=sum_op, num_sums=2, num_scopes=2, batch_size=4, num_steps=2
+            )
+            self.assertEqual(result["num_accumulators"], 32)
+            self.assertGreater(result["sparse_latency"], 0.0)
+            self.assertGreater(result["latency"], 0.0)
+
+    def test_fold_normalization(self):
+        (result,) = benchmark_fold_normalization(
+            [2], num_decomps=2, batch_size=8, num_steps=2
+        )
+        self.assertLess(result["max_abs_error"], 1e-4)
+        self.assertGreater(result["folded_latency"], 0.0)
@@ -0,0 +1,85 @@
+import numpy as np
+import tensorflow as tf
+from tensorflow import test as tftest
+
+import libspn_keras as spnk
+from tests.utils import (
+    get_continuous_data,
+    get_continuous_model,
+    get_discrete_data,
+    get_discrete_model,
+)
+
+
+def _leave_one_out_conditionals(spn, x):
+    log_likelihood = tf.reduce_logsumexp(spn(x), axis=-1)
+    conditionals = []
+    for i in range(x.shape[1]):
+        evidence = np.ones(x.shape, dtype=bool)
+        evidence[:, i] = False
+        log_marginal = tf.reduce_logsumexp(spn.marginal(x, evidence), axis=-1)
+        conditionals.append(log_likelihood - log_marginal)
+    return tf.stack(conditionals, axis=1)
+
+
+class TestConditionals(tftest.TestCase):
+    def tearDown(self) -> None:
+        tf.keras.backend.clear_session()
+
+    def test_continuous(self):
+        spn = get_continuous_model()
+        x = get_continuous_data()
+        self.assertAllClose(
+            spn.all_conditionals(x), _leave_one_out_conditionals(spn, x), atol=1e-5
+        )
+
+    def test_discrete(self):
+        spn = get_discrete_model()
+        x = get_discrete_data()
+        self.assertAllClose(
+            spn.all_conditionals(x), _leave_one_out_conditionals(spn, x), atol=1e-5
+        )
+
+    def test_rat_spn(self):
+        spn = spnk.models.SequentialSumProductNetwork(
+            [
+                spnk.layers.FlatToRegions(num_decomps=3, input_shape=(6,)),
+                spnk.layers.NormalizeStandardScore(),
+                spnk.layers.NormalLeaf(num_components=3),
+                spnk.layers.PermuteAndPadScopesRandom(seed=0),
+                spnk.layers.DenseProduct(num_factors=2),
+                spnk.layers.DenseSum(num_sums=3),
+                spnk.layers.DenseProduct(num_factors=2),
+                spnk.layers.DenseSum(num_sums=3),
+                spnk.layers.ReduceProduct(num_factors=2),
+                spnk.layers.RootSum(return_weighted_child_logits=True),
+            ]
+        )
+        spn.build((None, 6))
+        x = np.random.RandomState(0).randn(8, 6).astype(np.float32)
+        # An outlier makes the leaves of its variable differ by orders of magnitude
+        x[0, 2] = 50.0
+        self.assertAllClose(
+            spn.all_conditionals(x), _leave_one_out_conditionals(spn, x), atol=1e-3
+        )
+        self.assertTrue(np.all(np.isfinite(spn.all_conditionals(x))))
+
+    def test_tf_function(self):
+        spn = spnk.models.SequentialSumProductNetwork(
+            [
+                spnk.layers.FlatToRegions(num_decomps=2, input_shape=(8,)),
+                spnk.layers.NormalLeaf(num_components=2),
+                spnk.layers.PermuteAndPadScopesRandom(seed=0),
+                spnk.layers.DenseProduct(num_factors=4),
+                spnk.layers.DenseSum(num_sums=2),
+                spnk.layers.DenseProduct(num_factors=2),
+                spnk.layers.RootSum(return_weighted_child_logits=False),
+            ]
+        )
+        spn.build((None, 8))
+        x = np.random.RandomState(0).randn(4, 8).astype(np.float32)
+        self.assertAllClose(
+            tf.function(spn.all_conditionals)(x),
+            _leave_one_out_conditionals(spn, x),
+            atol=1e-5,
+        )
@@ -0,0 +1,81 @@
+import itertools
+
+import numpy as np
+import tensorflow as tf
+from tensorflow import test as tftest
+
+import libspn_keras as spnk
+from libspn_keras.cost_model import count_params
+from tests.utils import get_continuous_model, get_discrete_model
+
+
+class TestCostModel(tftest.TestCase):
+    def tearDown(self) -> None:
+        # Other tests look up layers by their default names
+        tf.keras.backend.clear_session()
+
+    def test_matches_built_model(self):
+        for spn in [get_discrete_model(), get_continuous_model()]:
+            estimate = spnk.estimate_cost(spn.layers, batch_size=8)
+            self.assertEqual(
+                [c.output_shape[1:] for c in estimate.layers],
+                [tuple(layer.output_shape[1:]) for layer in spn.layers],
+            )
+            self.assertEqual(
+                [c.num_params for c in estimate.layers],
+                [count_params(layer) for layer in spn.layers],
+            )
+            self.assertEqual(estimate.layers[-1].output_shape, (8, 1))
+
+    def test_unbuilt_region_graph(self):
+        leaf = spnk.layers.NormalLeaf(num_components=4)
+        estimate = spnk.estimate_region_graph_cost(
+            _binary_region_graph(num_vars=16),
+            leaf_node=leaf,
+            num_sums_iterable=itertools.repeat(8),
+            batch_size=32,
+        )
+        # No variables have been created
+        self.assertFalse(leaf.built)
+        spn = spnk.region_graph_to_dense_spn(
+            _binary_region_graph(num_vars=16),
+            leaf_node=spnk.layers.NormalLeaf(num_components=4),
+            num_sums_iterable=itertools.repeat(8),
+            return_weighted_child_logits=False,
+        )
+        self.assertEqual(
+            estimate.num_params, sum(count_params(layer) for layer in spn.layers)
+        )
+        self.assertEqual(
+            [c.output_shape[1:] for c in estimate.layers],
+            [tuple(layer.output_shape[1:]) for layer in spn.layers],
+        )
+
+        per_sum_op = estimate.peak_training_memory_per_sum_op
+        self.assertGreater(
+            per_sum_op["SumOpHardEMBackprop"], per_sum_op["SumOpGradBackprop"]
+        )
+        self.assertTrue(estimate.fits(per_sum_op["SumOpGradBackprop"]))
+        self.assertFalse(
+            estimate.fits(estimate.peak_inference_memory - 1, training=False)
+        )
+        self.assertIn("DenseProduct", estimate.summary())
+
+    def test_conv_product_channels(self):
+        layers = [
+            spnk.layers.NormalLeaf(num_components=4),
+            spnk.layers.Conv2DProduct(
+                depthwise=False, strides=[2, 2], dilations=[1, 1], kernel_size=[2, 2]
+            ),
+        ]
+        estimate = spnk.estimate_cost(layers, input_shape=(None, 28, 28, 1))
+        # With num_channels=None, all 4 ** 4 combinations are created
+        self.assertEqual(estimate.layers[-1].output_shape, (1, 14, 14, 256))
+        self.assertEqual(estimate.layers[-1].num_params, 2 * 2 * 4 * 256)
+
+
+def _binary_region_graph(num_vars):
+    nodes = [spnk.RegionVariable(i) for i in range(num_vars)]
+    while len(nodes) > 1:
+        nodes = [spnk.RegionNode(nodes[i : i + 2]) for i in np.arange(0, len(nodes), 2)]
+    return nodes[0]
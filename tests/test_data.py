@@ -0,0 +1,135 @@
+import os
+import tempfile
+
+import numpy as np
+import tensorflow as tf
+from tensorflow import test as tftest
+
+import libspn_keras as spnk
+from libspn_keras.data import load_memmap, numpy_dataset
+from libspn_keras.initializers import KMeans
+from tests.utils import get_continuous_model, NUM_VARS
+
+
+def _collect(dataset):
+    batches = list(dataset.as_numpy_iterator())
+    if isinstance(batches[0], tuple):
+        return tuple(np.concatenate(column) for column in zip(*batches))
+    return np.concatenate(batches)
+
+
+class TestNumpyDataset(tftest.TestCase):
+    def setUp(self) -> None:
+        self.dir = tempfile.TemporaryDirectory()
+        self.x = np.random.RandomState(1234).normal(size=(50, NUM_VARS))
+        self.x = self.x.astype(np.float32)
+        self.evidence_mask = self.x > 0.0
+        self.npy_path = os.path.join(self.dir.name, "x.npy")
+        self.npz_path = os.path.join(self.dir.name, "x.npz")
+        np.save(self.npy_path, self.x[:20])
+        np.savez(self.npz_path, x=self.x[20:], evidence_mask=self.evidence_mask[20:])
+
+    def tearDown(self) -> None:
+        tf.keras.backend.clear_session()
+        self.dir.cleanup()
+
+    def test_load_memmap(self):
+        x = load_memmap(self.npy_path)
+        self.assertIsInstance(x, np.memmap)
+        self.assertAllEqual(x, self.x[:20])
+        evidence_mask = load_memmap(self.npz_path, "evidence_mask")
+        self.assertIsInstance(evidence_mask, np.memmap)
+        self.assertAllEqual(evidence_mask, self.evidence_mask[20:])
+
+        single_path = os.path.join(self.dir.name, "single.npz")
+        np.savez(single_path, self.x)
+        self.assertAllEqual(load_memmap(single_path), self.x)
+
+    def test_load_memmap_errors(self):
+        with self.assertRaises(ValueError):
+            load_memmap(self.npz_path)
+        with self.assertRaises(ValueError):
+            load_memmap(self.npz_path, "labels")
+        with self.assertRaises(ValueError):
+            load_memmap(self.npy_path, "x")
+        compressed_path = os.path.join(self.dir.name, "compressed.npz")
+        np.savez_compressed(compressed_path, x=self.x)
+        with self.assertRaises(ValueError):
+            load_memmap(compressed_path, "x")
+
+    def test_concatenates_files(self):
+        dataset = numpy_dataset(
+            [self.npy_path, (self.npz_path, "x")], batch_size=8, block_size=7
+        )
+        self.assertEqual(dataset.element_spec.shape.as_list(), [None, NUM_VARS])
+        self.assertAllEqual(_collect(dataset), self.x)
+
+    def test_evidence_mask(self):
+        dataset = numpy_dataset(
+            [self.npy_path, (self.npz_path, "x")],
+            evidence_mask=[self.evidence_mask[:20], (self.npz_path, "evidence_mask")],
+            batch_size=8,
+            block_size=16,
+        )
+        x, evidence_mask = _collect(dataset)
+        self.assertAllEqual(x, self.x)
+        self.assertAllEqual(evidence_mask, self.evidence_mask)
+
+    def test_shuffle_keeps_rows_together(self):
+        dataset = numpy_dataset(
+            self.x,
+            labels=np.arange(len(self.x)),
+            batch_size=8,
+            block_size=8,
+            shuffle_buffer_size=16,
+            seed=1234,
+        )
+        x, labels = _collect(dataset)
+        self.assertAllEqual(np.sort(labels), np.arange(len(self.x)))
+        self.assertNotAllEqual(labels, np.arange(len(self.x)))
+        self.assertAllEqual(x, self.x[labels])
+
+    def test_shards_partition_rows(self):
+        rows = [
+            _collect(
+                numpy_dataset(
+                    self.npy_path, block_size=3, num_shards=3, shard_index=shard_index
+                )
+            )
+            for shard_index in range(3)
+        ]
+        self.assertAllEqual(
+            np.sort(np.concatenate(rows), axis=0), np.sort(self.x[:20], axis=0)
+        )
+        self.assertEqual([len(r) for r in rows], [8, 6, 6])
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            numpy_dataset(self.x, evidence_mask=self.evidence_mask, labels=self.x)
+        with self.assertRaises(ValueError):
+            numpy_dataset(self.x, evidence_mask=self.evidence_mask[:10])
+        with self.assertRaises(ValueError):
+            numpy_dataset(self.x, num_shards=2, shard_index=2)
+
+    def test_fit_and_initialize(self):
+        spn = get_continuous_model()
+        spn.compile(
+            optimizer=spnk.optimizers.OnlineExpectationMaximization(),
+            loss=spnk.losses.NegativeLogLikelihood(),
+        )
+        dataset = numpy_dataset(
+            [self.npy_path, (self.npz_path, "x")],
+            batch_size=16,
+            shuffle_buffer_size=32,
+        )
+        history = spn.fit(dataset, epochs=2, verbose=0)
+        self.assertTrue(np.all(np.isfinite(history.history["loss"])))
+
+        initializer = KMeans(
+            numpy_dataset(self.x[:, :, np.newaxis, np.newaxis], batch_size=16),
+            samplewise_normalization=False,
+            group_centroids=False,
+        )
+        self.assertAllEqual(
+            initializer([1, NUM_VARS, 1, 2, 1]).shape, [1, NUM_VARS, 1, 2, 1]
+        )
@@ -0,0 +1,153 @@
+import tempfile
+
+import numpy as np
+import tensorflow as tf
+from tensorflow import test as tftest
+
+import libspn_keras as spnk
+from libspn_keras import sum_ops
+from libspn_keras.serving import load_model
+from tests.utils import (
+    get_continuous_model,
+    get_discrete_data,
+    get_discrete_model,
+    NUM_VARS,
+)
+
+
+class TestExport(tftest.TestCase):
+    def setUp(self) -> None:
+        self.x = np.random.RandomState(0).randn(8, NUM_VARS).astype(np.float32)
+        self.evidence = np.ones_like(self.x, dtype=bool)
+        self.evidence[:, 2:] = False
+
+    def tearDown(self) -> None:
+        tf.keras.backend.clear_session()
+
+    def test_inference_module(self):
+        # Hard EM backprop imputes MPE estimates of the max-product network
+        spn = get_continuous_model()
+        module = spnk.InferenceModule(spn)
+        self.assertAllClose(
+            module.joint(self.x), tf.reduce_logsumexp(spn(self.x), axis=-1)
+        )
+        self.assertAllClose(
+            module.marginal(self.x, self.evidence),
+            tf.reduce_logsumexp(spn.marginal(self.x, self.evidence), axis=-1),
+        )
+        self.assertAllClose(
+            module.mpe(self.x, self.evidence), spn.impute(self.x, self.evidence)
+        )
+
+    def test_normalized_spatial_spn(self):
+        spn = spnk.models.SequentialSumProductNetwork(
+            [
+                spnk.layers.NormalizeStandardScore(input_shape=(4, 4, 1)),
+                spnk.layers.NormalLeaf(num_components=2),
+                spnk.layers.Conv2DProduct(
+                    depthwise=True, strides=[2, 2], dilations=[1, 1], kernel_size=[2, 2]
+                ),
+                spnk.layers.Local2DSum(num_sums=2),
+                spnk.layers.Conv2DProduct(
+                    depthwise=False,
+                    strides=[2, 2],
+                    dilations=[1, 1],
+                    kernel_size=[2, 2],
+                ),
+                spnk.layers.Conv2DSum(num_sums=2),
+                spnk.layers.SpatialToRegions(),
+                spnk.layers.RootSum(return_weighted_child_logits=False),
+            ]
+        )
+        x = np.random.RandomState(1).randn(3, 4, 4, 1).astype(np.float32)
+        evidence = np.random.RandomState(2).rand(3, 4, 4, 1) > 0.5
+        module = spnk.InferenceModule(spn)
+        self.assertAllClose(module.joint(x), tf.reduce_logsumexp(spn(x), axis=-1))
+        self.assertAllClose(
+            module.marginal(x, evidence),
+            tf.reduce_logsumexp(spn.marginal(x, evidence), axis=-1),
+        )
+        self.assertAllEqual(module.mpe(x, evidence).shape, x.shape)
+
+    def test_saved_model(self):
+        spn = get_continuous_model()
+        export_dir = tempfile.mkdtemp()
+        module = spnk.export_saved_model(spn, export_dir)
+        loaded = tf.saved_model.load(export_dir)
+        self.assertCountEqual(loaded.signatures.keys(), ["joint", "marginal", "mpe"])
+        self.assertAllClose(
+            loaded.signatures["joint"](x=tf.constant(self.x))["output_0"],
+            module.joint(self.x),
+        )
+        self.assertAllClose(
+            loaded.signatures["mpe"](
+                x=tf.constant(self.x), evidence=tf.constant(self.evidence)
+            )["output_0"],
+            module.mpe(self.x, self.evidence),
+        )
+
+    def test_tflite(self):
+        spn = get_continuous_model()
+        module = spnk.InferenceModule(spn)
+        interpreter = tf.lite.Interpreter(
+            model_content=spnk.export_tflite(spn, batch_size=len(self.x))
+        )
+        self.assertCountEqual(
+            interpreter.get_signature_list().keys(), ["joint", "marginal", "mpe"]
+        )
+        self.assertAllClose(
+            interpreter.get_signature_runner("joint")(x=self.x)["output_0"],
+            module.joint(self.x),
+        )
+        self.assertAllClose(
+            interpreter.get_signature_runner("marginal")(
+                x=self.x, evidence=self.evidence
+            )["output_0"],
+            module.marginal(self.x, self.evidence),
+        )
+        self.assertAllClose(
+            interpreter.get_signature_runner("mpe")(x=self.x, evidence=self.evidence)[
+                "output_0"
+            ],
+            module.mpe(self.x, self.evidence),
+        )
+
+    def test_discrete_spn_has_no_mpe(self):
+        spn = get_discrete_model()
+        x = get_discrete_data()
+        module = spnk.InferenceModule(spn)
+        self.assertIsNone(module.mpe)
+        self.assertCountEqual(module.signatures.keys(), ["joint", "marginal"])
+        self.assertAllClose(module.joint(x), tf.reduce_logsumexp(spn(x), axis=-1))
+
+    def test_unsupported_model(self):
+        with self.assertRaises(ValueError):
+            spnk.InferenceModule(tf.keras.Sequential([tf.keras.layers.Dense(1)]))
+
+
+class TestSerialization(tftest.TestCase):
+    def tearDown(self) -> None:
+        tf.keras.backend.clear_session()
+
+    def test_sum_op_round_trip(self):
+        sum_op = sum_ops.deserialize(
+            sum_ops.serialize(sum_ops.SumOpHardEMBackprop(sample_prob=0.5))
+        )
+        self.assertIsInstance(sum_op, sum_ops.SumOpHardEMBackprop)
+        self.assertEqual(
+            sum_op.get_config(), dict(sample_prob=0.5, sparse_counts=False)
+        )
+        with self.assertRaises(ValueError):
+            sum_ops.deserialize(dict(class_name="SumOpUnknown", config={}))
+
+    def test_model_round_trip(self):
+        spn = get_continuous_model()
+        path = tempfile.mkdtemp() + "/model.keras"
+        spn.save(path)
+        loaded = load_model(path)
+        x = np.random.RandomState(0).randn(8, NUM_VARS).astype(np.float32)
+        self.assertAllClose(loaded(x), spn(x))
+        self.assertIsInstance(loaded.layers[4].sum_op, sum_ops.SumOpHardEMBackprop)
+        self.assertEqual(loaded.layers[-1].num_sums, 1)
+        # The loaded model can be saved again
+        loaded.save(path)
@@ -0,0 +1,104 @@
+import tempfile
+
+import numpy as np
+import tensorflow as tf
+from tensorflow import test as tftest
+
+import libspn_keras as spnk
+from libspn_keras.folding import can_fold_normalization, fold_normalization
+from libspn_keras.parallel import DecompositionShardedExecutor
+from tests.utils import get_normalized_model, NUM_VARS
+
+
+class TestFoldNormalization(tftest.TestCase):
+    def setUp(self) -> None:
+        self.x = (
+            np.random.RandomState(0).randn(20, NUM_VARS) * [1.0, 2.0, 4.0, 8.0] + 3.0
+        ).astype(np.float32)
+        self.evidence = np.random.RandomState(1).rand(20, NUM_VARS) > 0.5
+
+    def tearDown(self) -> None:
+        tf.keras.backend.clear_session()
+
+    def _normalized_spn(self, normalize_after_flat_to_regions=False, **kwargs):
+        layer = spnk.layers.NormalizeStandardScore(
+            dataset_statistics=True, axis=1 if normalize_after_flat_to_regions else -1
+        )
+        layer.adapt(
+            spnk.layers.FlatToRegions(num_decomps=2)(self.x)
+            if normalize_after_flat_to_regions
+            else self.x
+        )
+        return get_normalized_model(layer, normalize_after_flat_to_regions, **kwargs)
+
+    def test_fold_normalization(self):
+        for after_flat_to_regions, kwargs in [
+            (False, dict()),
+            (True, dict()),
+            (False, dict(leaf_class=spnk.layers.CauchyLeaf, scale_trainable=True)),
+            (True, dict(leaf_class=spnk.layers.LaplaceLeaf, use_accumulators=True)),
+        ]:
+            spn = self._normalized_spn(after_flat_to_regions, **kwargs)
+            folded = fold_normalization(spn)
+            self.assertFalse(
+                any(
+                    isinstance(layer, spnk.layers.NormalizeStandardScore)
+                    for layer in folded.layers
+                )
+            )
+            self.assertAllClose(folded(self.x), spn(self.x), atol=1e-5)
+            self.assertAllClose(
+                folded.marginal(self.x, self.evidence),
+                spn.marginal(self.x, self.evidence),
+                atol=1e-5,
+            )
+            self.assertAllClose(
+                folded.impute(self.x, self.evidence),
+                spn.impute(self.x, self.evidence),
+                atol=1e-4,
+            )
+
+    def test_folded_leaf_partial_call_and_shards(self):
+        spn = self._normalized_spn()
+        folded = fold_normalization(spn)
+        leaf = folded.layers[1]
+        x = folded.layers[0](self.x)
+        region_indices = np.array([[3, 0], [1, 1]])
+
+        def gather_regions(t):
+            return tf.transpose(
+                tf.gather_nd(tf.transpose(t, [1, 2, 0, 3]), region_indices), [1, 0, 2]
+            )
+
+        self.assertAllClose(
+            leaf.partial_call(gather_regions(x), region_indices),
+            gather_regions(leaf(x)),
+        )
+        with DecompositionShardedExecutor(folded, num_workers=2) as executor:
+            self.assertAllClose(executor(self.x), spn(self.x), atol=1e-5)
+
+    def test_cannot_fold_per_sample_statistics(self):
+        spn = get_normalized_model(spnk.layers.NormalizeStandardScore())
+        self.assertFalse(can_fold_normalization(spn))
+        self.assertTrue(can_fold_normalization(self._normalized_spn()))
+        with self.assertRaises(ValueError):
+            fold_normalization(spn)
+
+    def test_export_folds_normalization(self):
+        spn = self._normalized_spn(normalize_after_flat_to_regions=True)
+        module = spnk.InferenceModule(spn)
+        self.assertIsNone(module._normalize_index)
+        self.assertIsNotNone(
+            spnk.InferenceModule(spn, fold_normalization=False)._normalize_index
+        )
+        self.assertAllClose(
+            module.marginal(self.x, self.evidence),
+            tf.reduce_logsumexp(spn.marginal(self.x, self.evidence), axis=-1),
+            atol=1e-5,
+        )
+        export_dir = tempfile.mkdtemp()
+        spnk.export_saved_model(spn, export_dir)
+        loaded = tf.saved_model.load(export_dir)
+        self.assertAllClose(
+            loaded.joint(self.x), tf.reduce_logsumexp(spn(self.x), axis=-1), atol=1e-5
+        )
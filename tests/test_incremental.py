@@ -0,0 +1,92 @@
+import numpy as np
+import tensorflow as tf
+from tensorflow import test as tftest
+
+import libspn_keras as spnk
+from tests.utils import get_discrete_data, get_discrete_model, get_rat_spn, NUM_VARS
+
+
+class TestIncremental(tftest.TestCase):
+    def setUp(self) -> None:
+        self.x = np.random.RandomState(0).randn(5, 12).astype(np.float32)
+
+    def tearDown(self) -> None:
+        tf.keras.backend.clear_session()
+
+    def _rat_spn(self):
+        return get_rat_spn(
+            num_vars=12,
+            num_decomps=3,
+            leaf=spnk.layers.NormalLeaf(num_components=3, scale_trainable=True),
+            log_dropout_rate=0.0,
+            top_layers=[spnk.layers.ReduceProduct(num_factors=4)],
+        )
+
+    def test_evaluate(self):
+        spn = self._rat_spn()
+        for use_tf_function in [True, False]:
+            evaluator = spnk.IncrementalEvaluator(
+                spn, self.x, use_tf_function=use_tf_function
+            )
+            for variables in [[3], [11, 0], list(range(12)), [3]]:
+                values = np.random.RandomState(1).randn(5, len(variables))
+                x_changed = self.x.copy()
+                x_changed[:, variables] = values
+                self.assertAllClose(
+                    evaluator.evaluate(variables, values), spn(x_changed), atol=1e-5
+                )
+            # The base input is left untouched
+            self.assertAllClose(evaluator.evaluate([], np.zeros([5, 0])), spn(self.x))
+
+    def test_update(self):
+        spn = self._rat_spn()
+        evaluator = spnk.IncrementalEvaluator(spn, self.x)
+        x_changed = self.x.copy()
+        x_changed[:, 4] = 2.0
+        self.assertAllClose(evaluator.update([4], np.full([5, 1], 2.0)), spn(x_changed))
+        x_changed[:, 7] = -1.0
+        self.assertAllClose(
+            evaluator.evaluate([7], np.full([5, 1], -1.0)), spn(x_changed), atol=1e-5
+        )
+        self.assertAllClose(evaluator.set_base(self.x), spn(self.x))
+
+    def test_discrete(self):
+        spn = get_discrete_model()
+        x = get_discrete_data()
+        evaluator = spnk.IncrementalEvaluator(spn, x)
+        x_changed = x.copy()
+        x_changed[:, NUM_VARS - 1] = 1 - x_changed[:, NUM_VARS - 1]
+        self.assertAllClose(
+            evaluator.evaluate([NUM_VARS - 1], x_changed[:, NUM_VARS - 1 :]),
+            spn(x_changed),
+        )
+
+    def test_leaf_partial_call(self):
+        spn = self._rat_spn()
+        leaf = spn.layers[1]
+        x = spn.layers[0](self.x)
+        region_indices = np.array([[3, 0], [11, 2], [0, 1]])
+
+        def gather_regions(t):
+            return tf.transpose(
+                tf.gather_nd(tf.transpose(t, [1, 2, 0, 3]), region_indices), [1, 0, 2]
+            )
+
+        self.assertAllClose(
+            leaf.partial_call(gather_regions(x), region_indices),
+            gather_regions(leaf(x)),
+        )
+
+    def test_unsupported_layer(self):
+        spn = spnk.models.SequentialSumProductNetwork(
+            [
+                spnk.layers.NormalizeStandardScore(input_shape=(4,)),
+                spnk.layers.FlatToRegions(num_decomps=1),
+                spnk.layers.NormalLeaf(num_components=2),
+                spnk.layers.ReduceProduct(num_factors=4),
+                spnk.layers.RootSum(return_weighted_child_logits=False),
+            ]
+        )
+        spn.build((None, 4))
+        with self.assertRaises(ValueError):
+            spnk.IncrementalEvaluator(spn, np.zeros([1, 4], dtype=np.float32))
@@ -0,0 +1,151 @@
+import numpy as np
+import tensorflow as tf
+from tensorflow import test as tftest
+
+from libspn_keras.initializers import (
+    Equidistant,
+    KMeans,
+    PoonDomingosMeanOfQuantileSplit,
+)
+
+
+def _clustered_images(num_samples=600, seed=0):
+    # Every pixel of a sample is drawn around one of two centers per location
+    rng = np.random.RandomState(seed)
+    centers = rng.uniform(-10.0, 10.0, size=(2, 2, 2, 3)).astype(np.float32)
+    cluster = rng.randint(2, size=num_samples)
+    data = centers[cluster] + 0.1 * rng.randn(num_samples, 2, 2, 3)
+    return data.astype(np.float32), centers
+
+
+class TestKMeans(tftest.TestCase):
+    def setUp(self):
+        np.random.seed(1234)
+        tf.random.set_seed(1234)
+
+    def assert_centers_found(self, centroids, centers):
+        # Centroids are [1, height, width, clusters, dims], centers [clusters, height, width, dims]
+        centroids = np.reshape(centroids, (4, 2, 3))
+        centers = np.reshape(np.transpose(centers, (1, 2, 0, 3)), (4, 2, 3))
+        for location_centroids, location_centers in zip(centroids, centers):
+            for center in location_centers:
+                distances = np.linalg.norm(location_centroids - center, axis=-1)
+                self.assertLess(distances.min(), 0.1)
+
+    def test_array(self):
+        data, centers = _clustered_images()
+        initializer = KMeans(
+            data,
+            samplewise_normalization=False,
+            group_centroids=False,
+            data_fraction=1.0,
+            chunk_size=128,
+        )
+        self.assert_centers_found(initializer([1, 2, 2, 2, 3]), centers)
+
+    def test_dataset(self):
+        data, centers = _clustered_images()
+        dataset = tf.data.Dataset.from_tensor_slices((data, np.zeros(len(data))))
+        initializer = KMeans(
+            dataset.batch(100),
+            samplewise_normalization=False,
+            group_centroids=False,
+            data_fraction=0.5,
+        )
+        self.assert_centers_found(initializer([1, 2, 2, 2, 3]), centers)
+
+    def test_mini_batch(self):
+        data, centers = _clustered_images()
+        initializer = KMeans(
+            [data[:300], data[300:]],
+            samplewise_normalization=False,
+            group_centroids=False,
+            data_fraction=1.0,
+            mini_batch_size=32,
+            num_iters=20,
+        )
+        self.assert_centers_found(initializer([1, 2, 2, 2, 3]), centers)
+
+    def test_one_shot_generator(self):
+        data, _ = _clustered_images()
+        for mini_batch_size in [None, 32]:
+            initializer = KMeans(
+                (chunk for chunk in [data[:300], data[300:]]),
+                data_fraction=1.0,
+                mini_batch_size=mini_batch_size,
+                num_iters=20,
+            )
+            with self.assertRaisesRegex(ValueError, "iterated over multiple times"):
+                initializer([1, 2, 2, 2, 3])
+
+    def test_more_components_than_clusters(self):
+        data, _ = _clustered_images()
+        initializer = KMeans(data, group_centroids=False, max_num_clusters=2)
+        centroids = initializer([1, 2, 2, 4, 3])
+        self.assertEqual(centroids.shape, (1, 2, 2, 4, 3))
+        self.assertTrue(np.all(np.isfinite(centroids)))
+
+    def test_group_centroids(self):
+        data, centers = _clustered_images()
+        initializer = KMeans(
+            data, samplewise_normalization=False, data_fraction=1.0, num_iters=20
+        )
+        self.assert_centers_found(initializer([1, 2, 2, 2, 3]), centers)
+
+    def test_group_many_centroids(self):
+        data = np.random.randn(200, 2, 2, 3).astype(np.float32)
+        initializer = KMeans(data, max_num_clusters=32, num_iters=5)
+        centroids = initializer([1, 2, 2, 32, 3])
+        self.assertEqual(centroids.shape, (1, 2, 2, 32, 3))
+        self.assertTrue(np.all(np.isfinite(centroids)))
+
+
+class TestPoonDomingosMeanOfQuantileSplit(tftest.TestCase):
+    def test_matches_sorted_data(self):
+        data = np.random.RandomState(0).randn(600, 3, 2).astype(np.float32)
+        sorted_data = np.sort(data, axis=0)
+        expected = np.stack(np.split(sorted_data, 4, axis=0)).mean(axis=1)
+        expected = np.moveaxis(expected, 0, -1)[np.newaxis, ..., np.newaxis]
+        initializer = PoonDomingosMeanOfQuantileSplit(
+            data, samplewise_normalization=False, sketch_size=1024, chunk_size=100
+        )
+        self.assertAllClose(initializer([1, 3, 2, 4, 1], dtype=tf.float32), expected)
+
+    def test_dataset_with_bounded_sketch(self):
+        data = np.random.RandomState(0).randn(20000, 3).astype(np.float32)
+        sorted_data = np.sort(data, axis=0)
+        expected = np.stack(np.split(sorted_data, 4, axis=0)).mean(axis=1)
+        expected = np.moveaxis(expected, 0, -1)[np.newaxis, ..., np.newaxis]
+        initializer = PoonDomingosMeanOfQuantileSplit(
+            tf.data.Dataset.from_tensor_slices(data).batch(512),
+            samplewise_normalization=False,
+            sketch_size=128,
+        )
+        self.assertAllClose(
+            initializer([1, 3, 4, 1], dtype=tf.float32), expected, atol=1e-2
+        )
+
+
+class TestEquidistant(tftest.TestCase):
+    def test_range_from_data(self):
+        data = np.linspace(-2.0, 6.0, num=101).reshape(-1, 1)
+        initializer = Equidistant(data=[data[:50], data[50:]])
+        self.assertAllClose(
+            initializer([2, 5], dtype=tf.float32), np.tile([[-2, 0, 2, 4, 6]], [2, 1])
+        )
+        initializer = Equidistant(data=data, data_quantiles=(0.25, 0.75))
+        self.assertAllClose(
+            initializer([1, 3], dtype=tf.float32), [[0, 2, 4]], atol=0.05
+        )
+
+    def test_get_config_keeps_range_from_data(self):
+        data = np.linspace(-2.0, 6.0, num=101).reshape(-1, 1)
+        initializer = Equidistant(data=(chunk for chunk in [data[:50], data[50:]]))
+        expected = initializer([2, 5], dtype=tf.float32)
+        restored = Equidistant.from_config(initializer.get_config())
+        self.assertAllClose(restored([2, 5], dtype=tf.float32), expected)
+        self.assertAllClose(initializer([2, 5], dtype=tf.float32), expected)
+
+    def test_empty_data(self):
+        with self.assertRaisesRegex(ValueError, "empty data"):
+            Equidistant(data=[])([2, 5], dtype=tf.float32)
@@ -0,0 +1,44 @@
+import subprocess  # noqa: S404
+import sys
+
+from tensorflow import test as tftest
+
+import libspn_keras as spnk
+
+
+def _loaded_modules_after(statement):
+    script = "import sys; {}; print(' '.join(sys.modules))".format(statement)
+    out = subprocess.run(  # noqa: S603
+        [sys.executable, "-c", script],
+        check=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        universal_newlines=True,
+    ).stdout
+    return set(out.split())
+
+
+class TestLazyImports(tftest.TestCase):
+    def test_import_does_not_load_heavy_modules(self):
+        loaded = _loaded_modules_after("import libspn_keras")
+        for module in ["tensorflow", "tensorflow_probability", "plotly", "colorlover"]:
+            self.assertNotIn(module, loaded)
+
+    def test_visualization_loaded_on_use(self):
+        loaded = _loaded_modules_after(
+            "import libspn_keras as spnk; spnk.layers.DenseSum"
+        )
+        self.assertNotIn("plotly", loaded)
+        loaded = _loaded_modules_after(
+            "import libspn_keras as spnk; spnk.visualize_dense_spn"
+        )
+        self.assertIn("plotly", loaded)
+
+    def test_attributes(self):
+        for name in spnk.__all__:
+            self.assertIsNotNone(getattr(spnk, name))
+        for name in spnk.layers.__all__:
+            self.assertIsNotNone(getattr(spnk.layers, name))
+        self.assertIn("KMeans", dir(spnk.initializers))
+        with self.assertRaises(AttributeError):
+            spnk.layers.NonExistentLayer
@@ -0,0 +1,95 @@
+import numpy as np
+import tensorflow as tf
+from tensorflow import test as tftest
+
+import libspn_keras as spnk
+from tests.utils import get_discrete_data, get_discrete_model, get_rat_spn
+
+
+class TestLeafLogProbCache(tftest.TestCase):
+    def setUp(self) -> None:
+        self.x = np.round(np.random.RandomState(0).randn(8, 6), 1).astype(np.float32)
+        self.levels = np.round(np.arange(-3.0, 3.05, 0.1), 1)
+
+    def tearDown(self) -> None:
+        tf.keras.backend.clear_session()
+
+    def _rat_spn(self):
+        return get_rat_spn(
+            num_vars=6, top_layers=[spnk.layers.ReduceProduct(num_factors=2)]
+        )
+
+    def test_discrete(self):
+        spn = get_discrete_model()
+        x = get_discrete_data()
+        expected = spn(x)
+        cache = spnk.LeafLogProbCache(spn.layers[1], [0, 1])
+        self.assertAllClose(spn(x, training=False), expected)
+        self.assertEqual(cache.hit_rate, 1.0)
+
+    def test_quantized_with_misses(self):
+        spn = self._rat_spn()
+        x = self.x.copy()
+        x[0, 0] = 10.0
+        x[3, 5] = 0.05
+        expected = spn(x)
+        cache = spnk.LeafLogProbCache(spn.layers[1], self.levels)
+        self.assertAllClose(spn(x, training=False), expected)
+        stats = cache.to_dict()
+        # Values are looked up once per decomposition
+        self.assertEqual(stats["num_lookups"], x.size * 2)
+        self.assertEqual(stats["num_hits"], x.size * 2 - 4)
+        self.assertEqual(stats["size"], len(self.levels) * 6 * 2 * 3)
+
+        cache.reset_stats()
+        self.assertEqual(cache.hit_rate, 0.0)
+        cache.detach()
+        self.assertIsNone(spn.layers[1].log_prob_cache)
+
+    def test_interpolation(self):
+        spn = self._rat_spn()
+        x = np.random.RandomState(1).randn(8, 6).astype(np.float32)
+        x[0, 0] = 10.0
+        spnk.LeafLogProbCache(
+            spn.layers[1], np.linspace(-5.0, 5.0, 2001), interpolate=True
+        )
+        cached = spn(x, training=False)
+        spn.layers[1].log_prob_cache = None
+        self.assertAllClose(cached, spn(x), atol=1e-4)
+
+    def test_invalidated_when_weights_change(self):
+        spn = self._rat_spn()
+        leaf = spn.layers[1]
+        cache = spnk.LeafLogProbCache(leaf, self.levels)
+        fn = tf.function(lambda x: spn(x, training=False))
+        fn(self.x)
+        leaf.loc.assign_add(tf.ones_like(leaf.loc))
+        cached = fn(self.x)
+        self.assertEqual(cache.to_dict()["num_refreshes"], 1)
+        fn(self.x)
+        self.assertEqual(cache.to_dict()["num_refreshes"], 1)
+        cache.detach()
+        self.assertAllClose(cached, spn(self.x))
+
+    def test_training_bypasses_cache(self):
+        spn = self._rat_spn()
+        cache = spnk.LeafLogProbCache(spn.layers[1], self.levels)
+        spn(self.x, training=True)
+        self.assertEqual(cache.to_dict()["num_lookups"], 0)
+
+        # Calls that do not set training, e.g. in custom training loops, pass gradients on to
+        # the leaf parameters
+        with tf.GradientTape() as tape:
+            loss = -tf.reduce_mean(spn(self.x))
+        gradient = tape.gradient(loss, spn.layers[1].loc)
+        self.assertEqual(cache.to_dict()["num_lookups"], 0)
+        self.assertGreater(np.max(np.abs(gradient)), 0.0)
+
+    def test_invalid_arguments(self):
+        spn = get_discrete_model()
+        with self.assertRaises(ValueError):
+            spnk.LeafLogProbCache(spn.layers[1], [0, 1], interpolate=True)
+        with self.assertRaises(ValueError):
+            spnk.LeafLogProbCache(spn.layers[1], np.arange(100), max_size=100)
+        with self.assertRaises(ValueError):
+            spnk.LeafLogProbCache(spnk.layers.NormalLeaf(num_components=2), [0.0])
@@ -0,0 +1,74 @@
+import numpy as np
+import tensorflow as tf
+from tensorflow import test as tftest
+
+import libspn_keras as spnk
+from tests.utils import (
+    get_continuous_data,
+    get_continuous_model,
+    get_discrete_data,
+    get_discrete_model,
+    NUM_VARS,
+)
+
+
+def _marginal_per_query(spn, x, evidence_masks):
+    return tf.stack(
+        [
+            spn.marginal(x, np.broadcast_to(evidence_mask, x.shape))
+            for evidence_mask in evidence_masks
+        ]
+    )
+
+
+class TestMarginalQueries(tftest.TestCase):
+    def setUp(self) -> None:
+        self.evidence_masks = np.random.RandomState(0).rand(5, NUM_VARS) > 0.5
+
+    def tearDown(self) -> None:
+        tf.keras.backend.clear_session()
+
+    def test_discrete(self):
+        spn = get_discrete_model()
+        x = get_discrete_data()
+        self.assertAllClose(
+            spn.marginal_queries(x, self.evidence_masks),
+            _marginal_per_query(spn, x, self.evidence_masks),
+        )
+
+    def test_continuous(self):
+        spn = get_continuous_model()
+        x = get_continuous_data()
+        self.assertAllClose(
+            spn.marginal_queries(x, self.evidence_masks),
+            _marginal_per_query(spn, x, self.evidence_masks),
+        )
+
+    def test_rat_spn_in_chunks(self):
+        spn = spnk.models.SequentialSumProductNetwork(
+            [
+                spnk.layers.NormalizeStandardScore(input_shape=(6,)),
+                spnk.layers.FlatToRegions(num_decomps=2),
+                spnk.layers.NormalLeaf(num_components=3),
+                spnk.layers.PermuteAndPadScopesRandom(seed=0),
+                spnk.layers.DenseProduct(num_factors=2),
+                spnk.layers.DenseSum(num_sums=3),
+                spnk.layers.DenseProduct(num_factors=2),
+                spnk.layers.DenseSum(num_sums=3),
+                spnk.layers.ReduceProduct(num_factors=2),
+                spnk.layers.RootSum(return_weighted_child_logits=True),
+            ]
+        )
+        spn.build((None, 6))
+        x = np.random.RandomState(0).randn(8, 6).astype(np.float32)
+        evidence_masks = np.random.RandomState(1).rand(7, 6) > 0.3
+        expected = _marginal_per_query(spn, x, evidence_masks)
+        for max_batch_size in [None, 1, 20]:
+            self.assertAllClose(
+                spn.marginal_queries(x, evidence_masks, max_batch_size=max_batch_size),
+                expected,
+                atol=1e-5,
+            )
+        self.assertAllClose(
+            tf.function(spn.marginal_queries)(x, evidence_masks), expected, atol=1e-5
+        )
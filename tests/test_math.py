@@ -0,0 +1,75 @@
+import unittest
+
+import numpy as np
+from tensorflow import test as tftest
+
+from libspn_keras.math.assignment import batched_linear_assignment
+from libspn_keras.math.quantile_sketch import QuantileSketch
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:  # pragma: no cover
+    linear_sum_assignment = None
+
+
+class TestBatchedLinearAssignment(tftest.TestCase):
+    @unittest.skipIf(linear_sum_assignment is None, "Requires scipy")
+    def test_matches_scipy(self):
+        rng = np.random.RandomState(0)
+        for n in [2, 3, 8, 33]:
+            costs = rng.rand(20, n, n)
+            assignment = batched_linear_assignment(costs)
+            for problem_costs, problem_assignment in zip(costs, assignment):
+                self.assertAllEqual(np.sort(problem_assignment), np.arange(n))
+                rows, cols = linear_sum_assignment(problem_costs)
+                self.assertAllClose(
+                    problem_costs[np.arange(n), problem_assignment].sum(),
+                    problem_costs[rows, cols].sum(),
+                )
+
+    def test_single_problem_with_ties(self):
+        costs = np.array([[0.0, 1.0, 1.0], [1.0, 1.0, 0.0], [1.0, 0.0, 1.0]])
+        self.assertAllEqual(batched_linear_assignment(costs), [0, 2, 1])
+        assignment = batched_linear_assignment(np.zeros((2, 4, 4)))
+        for problem_assignment in assignment:
+            self.assertAllEqual(np.sort(problem_assignment), np.arange(4))
+
+    def test_non_square(self):
+        with self.assertRaises(ValueError):
+            batched_linear_assignment(np.zeros((2, 3, 4)))
+
+
+class TestQuantileSketch(tftest.TestCase):
+    def setUp(self):
+        self.data = np.random.RandomState(0).randn(50000, 3, 2) * [1.0, 5.0]
+
+    def test_quantiles(self):
+        sketch = QuantileSketch(max_centroids=256)
+        for chunk in np.array_split(self.data, 17):
+            sketch.update(chunk)
+        q = [0.0, 0.1, 0.5, 0.9, 1.0]
+        self.assertAllClose(
+            sketch.quantiles(q), np.quantile(self.data, q, axis=0), atol=0.05
+        )
+        self.assertAllEqual(sketch.min, self.data.min(axis=0))
+        self.assertAllEqual(sketch.max, self.data.max(axis=0))
+        self.assertEqual(sketch.count, len(self.data))
+
+    def test_merge(self):
+        first, second = QuantileSketch(), QuantileSketch()
+        first.update(self.data[:20000])
+        second.update(self.data[20000:])
+        first.merge(second)
+        expected = np.stack(np.split(np.sort(self.data, axis=0), 5)).mean(axis=1)
+        self.assertAllClose(first.quantile_means(5), expected, atol=1e-2)
+        self.assertEqual(first.count, len(self.data))
+
+    def test_exact_for_few_samples(self):
+        sketch = QuantileSketch(max_centroids=64).update(self.data[:60])
+        expected = np.stack(np.split(np.sort(self.data[:60], axis=0), 3)).mean(axis=1)
+        self.assertAllClose(sketch.quantile_means(3), expected)
+
+    def test_variable_shape_mismatch(self):
+        sketch = QuantileSketch().update(self.data[:10])
+        with self.assertRaises(ValueError):
+            sketch.update(np.zeros((10, 2)))
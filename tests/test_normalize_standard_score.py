@@ -0,0 +1,99 @@
+import numpy as np
+import tensorflow as tf
+from tensorflow import test as tftest
+
+import libspn_keras as spnk
+from libspn_keras.data import numpy_dataset
+from tests.utils import get_normalized_model, NUM_VARS
+
+
+class TestNormalizeStandardScore(tftest.TestCase):
+    def setUp(self) -> None:
+        self.x = (
+            np.random.RandomState(0).randn(100, NUM_VARS) * [1.0, 2.0, 4.0, 8.0] + 3.0
+        ).astype(np.float32)
+        self.evidence = np.random.RandomState(1).rand(100, NUM_VARS) > 0.5
+
+    def tearDown(self) -> None:
+        tf.keras.backend.clear_session()
+
+    def _adapted_layer(self, data, **kwargs):
+        layer = spnk.layers.NormalizeStandardScore(dataset_statistics=True, **kwargs)
+        layer.adapt(data, chunk_size=16)
+        return layer
+
+    def test_adapt_matches_numpy(self):
+        for data in [
+            self.x,
+            tf.data.Dataset.from_tensor_slices(self.x).batch(7),
+            numpy_dataset(self.x, batch_size=9),
+        ]:
+            layer = self._adapted_layer(data)
+            self.assertAllClose(layer.mean, np.mean(self.x, axis=0, keepdims=True)[0])
+            self.assertAllClose(
+                layer.variance, np.var(self.x, axis=0, keepdims=True)[0], rtol=1e-5
+            )
+            self.assertAllClose(
+                layer(self.x), (self.x - np.mean(self.x, 0)) / np.std(self.x, 0)
+            )
+
+    def test_adapt_region_representation(self):
+        x = spnk.layers.FlatToRegions(num_decomps=2)(self.x)
+        layer = self._adapted_layer(x, axis=1)
+        self.assertEqual(layer.mean.shape, (NUM_VARS, 1, 1))
+        self.assertAllClose(layer.mean[:, 0, 0], np.mean(self.x, axis=0))
+
+    def test_merge_state(self):
+        layer = self._adapted_layer(self.x[:30])
+        layer.merge_state(
+            [self._adapted_layer(self.x[30:80]), self._adapted_layer(self.x[80:])]
+        )
+        expected = self._adapted_layer(self.x)
+        self.assertAllClose(layer.count, 100.0)
+        self.assertAllClose(layer.mean, expected.mean)
+        self.assertAllClose(layer.variance, expected.variance, rtol=1e-5)
+
+        layer = self._adapted_layer(self.x[:30])
+        layer.adapt(self.x[30:], reset_state=False)
+        self.assertAllClose(layer.mean, expected.mean)
+
+    def test_adapt_requires_dataset_statistics(self):
+        with self.assertRaises(ValueError):
+            spnk.layers.NormalizeStandardScore().adapt(self.x)
+
+    def test_get_config(self):
+        layer = spnk.layers.NormalizeStandardScore(dataset_statistics=True, axis=1)
+        restored = spnk.layers.NormalizeStandardScore.from_config(layer.get_config())
+        self.assertTrue(restored.dataset_statistics)
+        self.assertEqual(restored.axis, 1)
+
+    def test_impute_with_dataset_statistics(self):
+        # Normalizing inside the SPN is the same as normalizing its inputs up front
+        mean, stddev = np.mean(self.x, axis=0), np.std(self.x, axis=0)
+        normalized = (self.x - mean) / (stddev + 1e-8)
+        reference = get_normalized_model()
+        expected, expected_mpe = [
+            np.where(self.evidence, self.x, imputed * (stddev + 1e-8) + mean)
+            for imputed in [
+                reference.impute(normalized, self.evidence),
+                spnk.InferenceModule(reference).mpe(normalized, self.evidence),
+            ]
+        ]
+        for after_flat_to_regions in [False, True]:
+            region_x = spnk.layers.FlatToRegions(num_decomps=2)(self.x)
+            layer = self._adapted_layer(
+                region_x if after_flat_to_regions else self.x,
+                axis=1 if after_flat_to_regions else -1,
+            )
+            spn = get_normalized_model(
+                layer, normalize_after_flat_to_regions=after_flat_to_regions
+            )
+            spn_layers = [other for other in spn.layers if other is not layer]
+            for spn_layer, reference_layer in zip(spn_layers, reference.layers):
+                spn_layer.set_weights(reference_layer.get_weights())
+            self.assertAllClose(spn.impute(self.x, self.evidence), expected, atol=1e-4)
+            self.assertAllClose(
+                spnk.InferenceModule(spn).mpe(self.x, self.evidence),
+                expected_mpe,
+                atol=1e-4,
+            )
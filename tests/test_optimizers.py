@@ -0,0 +1,155 @@
+from unittest import mock
+
+import numpy as np
+import tensorflow as tf
+from tensorflow import test as tftest
+
+from libspn_keras.constraints import (
+    GreaterEqualEpsilon,
+    GreaterEqualEpsilonNormalized,
+    LogNormalized,
+)
+from libspn_keras.layers import DenseSum
+from libspn_keras.optimizers import online_expectation_maximization
+from libspn_keras.optimizers import OnlineExpectationMaximization
+from libspn_keras.sum_ops import SumOpHardEMBackprop, SumOpUnweightedHardEMBackprop
+
+
+ACCUMULATORS = np.random.RandomState(1234).uniform(0.1, 1.0, size=(3, 2, 4, 5))
+COUNTS = np.random.RandomState(4321).uniform(size=(3, 2, 4, 5))
+
+
+def _accumulators(constraint):
+    initial_value = constraint(tf.constant(ACCUMULATORS, dtype=tf.float32))
+    return tf.Variable(initial_value, constraint=constraint)
+
+
+class TestOnlineExpectationMaximization(tftest.TestCase):
+    def setUp(self) -> None:
+        self.counts = tf.constant(COUNTS, dtype=tf.float32)
+
+    def tearDown(self) -> None:
+        tf.keras.backend.clear_session()
+
+    def _apply(self, constraint, gradient, **kwargs):
+        variable = _accumulators(constraint)
+        optimizer = OnlineExpectationMaximization(**kwargs)
+        optimizer.apply_gradients([(gradient, variable)])
+        self.assertIs(variable.constraint, constraint)
+        return variable.numpy()
+
+    def test_fused_matches_unfused(self):
+        for constraint in [GreaterEqualEpsilonNormalized(epsilon=0.1), LogNormalized()]:
+            self.assertAllClose(
+                self._apply(constraint, -self.counts, fused=True),
+                self._apply(constraint, -self.counts, fused=False),
+            )
+        self.assertAllClose(
+            self._apply(GreaterEqualEpsilonNormalized(), -self.counts, momentum=0.5),
+            self._apply(
+                GreaterEqualEpsilonNormalized(), -self.counts, momentum=0.5, fused=False
+            ),
+        )
+
+    def test_gliding_average(self):
+        constraint = GreaterEqualEpsilonNormalized(epsilon=0.0)
+        initial_value = _accumulators(constraint).numpy()
+        counts = constraint(self.counts).numpy()
+        updated = self._apply(constraint, -counts, learning_rate=0.25)
+        self.assertAllClose(updated, 0.75 * initial_value + 0.25 * counts)
+
+    def test_sparse_counts_update_rows(self):
+        constraint = GreaterEqualEpsilonNormalized()
+        initial_value = _accumulators(constraint).numpy()
+        indices = tf.constant([2, 0])
+        sparse_counts = tf.IndexedSlices(
+            -tf.gather(self.counts, indices), indices, tf.constant(self.counts.shape)
+        )
+        dense_counts = -self.counts * tf.reshape([1.0, 0.0, 1.0], (3, 1, 1, 1))
+        sparse_updated = self._apply(constraint, sparse_counts)
+        dense_updated = self._apply(constraint, dense_counts)
+        self.assertAllClose(sparse_updated, dense_updated)
+        self.assertAllClose(sparse_updated[1], initial_value[1])
+        self.assertAllClose(np.sum(sparse_updated, axis=-2), np.ones((3, 2, 5)))
+
+    def test_get_config(self):
+        config = OnlineExpectationMaximization(fused=False).get_config()
+        self.assertFalse(config["fused"])
+
+
+class TestSparseCounts(tftest.TestCase):
+    def tearDown(self) -> None:
+        tf.keras.backend.clear_session()
+
+    def _dense_sum(self, sum_op_class, sparse_counts, constraint):
+        layer = DenseSum(
+            num_sums=5,
+            sum_op=sum_op_class(sparse_counts=sparse_counts),
+            accumulator_initializer=tf.keras.initializers.Constant(ACCUMULATORS),
+            linear_accumulator_constraint=constraint,
+        )
+        layer.build((None, 3, 2, 4))
+        return layer
+
+    def _counts_and_update(self, sum_op_class, sparse_counts, constraint):
+        layer = self._dense_sum(sum_op_class, sparse_counts, constraint)
+        x = tf.math.log(tf.constant(COUNTS.transpose((3, 0, 1, 2)), dtype=tf.float32))
+        with tf.GradientTape() as tape:
+            loss = -tf.reduce_mean(layer(x))
+        (counts,) = tape.gradient(loss, layer.trainable_variables)
+        OnlineExpectationMaximization().apply_gradients(
+            [(counts, layer.trainable_variables[0])]
+        )
+        return counts, layer.trainable_variables[0].numpy()
+
+    def test_sparse_counts_match_dense_counts(self):
+        for sum_op_class in [SumOpHardEMBackprop, SumOpUnweightedHardEMBackprop]:
+            for constraint in [GreaterEqualEpsilon(), GreaterEqualEpsilonNormalized()]:
+                sparse_counts, sparse_updated = self._counts_and_update(
+                    sum_op_class, True, constraint
+                )
+                dense_counts, dense_updated = self._counts_and_update(
+                    sum_op_class, False, constraint
+                )
+                self.assertIsInstance(sparse_counts, tf.IndexedSlices)
+                self.assertAllClose(
+                    tf.reshape(tf.convert_to_tensor(sparse_counts), dense_counts.shape),
+                    dense_counts,
+                )
+                self.assertAllClose(sparse_updated, dense_updated)
+
+    def test_sparse_counts_require_update_step(self):
+        counts, _ = self._counts_and_update(
+            SumOpHardEMBackprop, True, GreaterEqualEpsilon()
+        )
+        variable = _accumulators(GreaterEqualEpsilon())
+        with mock.patch.object(
+            online_expectation_maximization, "_HAS_UPDATE_STEP", False
+        ):
+            with self.assertRaisesRegex(ValueError, "TF 2.11"):
+                OnlineExpectationMaximization().apply_gradients([(counts, variable)])
+        self.assertAllClose(variable, ACCUMULATORS)
+
+    def test_sparse_counts_reject_accumulator_regularizer(self):
+        for sum_op_class in [SumOpHardEMBackprop, SumOpUnweightedHardEMBackprop]:
+            layer = DenseSum(
+                num_sums=5,
+                sum_op=sum_op_class(sparse_counts=True),
+                accumulator_regularizer=tf.keras.regularizers.L2(1e-3),
+            )
+            with self.assertRaisesRegex(ValueError, "accumulator regularizer"):
+                layer.build((None, 3, 2, 4))
+
+            # Dense counts can be combined with the gradient of the regularizer
+            layer = DenseSum(
+                num_sums=5,
+                sum_op=sum_op_class(),
+                accumulator_regularizer=tf.keras.regularizers.L2(1e-3),
+            )
+            x = tf.math.log(
+                tf.constant(COUNTS.transpose((3, 0, 1, 2)), dtype=tf.float32)
+            )
+            with tf.GradientTape() as tape:
+                loss = -tf.reduce_mean(layer(x)) + tf.add_n(layer.losses)
+            (counts,) = tape.gradient(loss, layer.trainable_variables)
+            self.assertEqual(counts.shape, ACCUMULATORS.shape)
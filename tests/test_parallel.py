@@ -0,0 +1,63 @@
+import numpy as np
+import tensorflow as tf
+from tensorflow import test as tftest
+
+import libspn_keras as spnk
+from libspn_keras.parallel import DecompositionShardedExecutor
+from tests.utils import get_discrete_model, get_rat_spn
+
+
+SUM_LAYER_KWARGS = (dict(), dict(logspace_accumulators=True))
+
+
+class TestDecompositionShardedExecutor(tftest.TestCase):
+    def tearDown(self):
+        tf.keras.backend.clear_session()
+
+    def test_matches_model(self):
+        spn = get_rat_spn(
+            num_decomps=6,
+            leaf=spnk.layers.NormalLeaf(
+                num_components=3,
+                location_initializer=tf.keras.initializers.RandomNormal(seed=1),
+            ),
+            sum_layer_kwargs=SUM_LAYER_KWARGS,
+        )
+        x = np.random.RandomState(0).randn(5, 8).astype(np.float32)
+        expected = spn(x)
+        for num_workers, num_shards in [(1, 1), (2, 2), (3, 6), (4, 3)]:
+            with DecompositionShardedExecutor(
+                spn, num_workers=num_workers, num_shards=num_shards
+            ) as executor:
+                self.assertAllClose(executor(x), expected)
+                self.assertAllClose(executor(x[:1]), expected[:1])
+
+    def test_undecompose_is_not_sharded(self):
+        spn = get_rat_spn(
+            num_decomps=6,
+            leaf=spnk.layers.NormalLeaf(num_components=3, use_accumulators=True),
+            sum_layer_kwargs=SUM_LAYER_KWARGS,
+            top_layers=[
+                spnk.layers.Undecompose(num_decomps=3),
+                spnk.layers.DenseSum(num_sums=3),
+                spnk.layers.DenseProduct(num_factors=2),
+            ],
+        )
+        x = np.random.RandomState(0).randn(5, 8).astype(np.float32)
+        with DecompositionShardedExecutor(spn, num_workers=2) as executor:
+            self.assertAllClose(executor(x), spn(x))
+            self.assertEqual(executor.shards, [(0, 3), (3, 6)])
+            self.assertEqual(
+                executor.shard_info()["remaining_layers"][0], spn.layers[7].name
+            )
+
+    def test_indicator_leaf(self):
+        spn = get_discrete_model()
+        x = np.random.RandomState(0).randint(2, size=(6, 4))
+        with DecompositionShardedExecutor(spn, num_workers=1) as executor:
+            self.assertAllClose(executor(x), spn(x))
+
+    def test_too_many_shards(self):
+        spn = get_rat_spn(sum_layer_kwargs=SUM_LAYER_KWARGS)
+        with self.assertRaises(ValueError):
+            DecompositionShardedExecutor(spn, num_shards=3)
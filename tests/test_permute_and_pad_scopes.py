@@ -0,0 +1,74 @@
+import numpy as np
+import tensorflow as tf
+from tensorflow import test as tftest
+
+import libspn_keras as spnk
+from libspn_keras.layers.permute_and_pad_scopes_random import random_padded_permutations
+
+
+class TestPermuteAndPadScopesRandom(tftest.TestCase):
+    def tearDown(self):
+        tf.keras.backend.clear_session()
+
+    def test_random_padded_permutations(self):
+        permutations = random_padded_permutations(
+            num_scopes=10, num_decomps=50, num_slots=16, seed=123
+        )
+        self.assertEqual(permutations.shape, (50, 16))
+        for permutation in permutations:
+            # Padding is spread evenly, once every 16 // 6 slots
+            self.assertAllEqual(np.nonzero(permutation == -1)[0], np.arange(6) * 2)
+            self.assertAllEqual(np.sort(permutation[permutation >= 0]), np.arange(10))
+        self.assertAllEqual(
+            permutations,
+            random_padded_permutations(
+                num_scopes=10, num_decomps=50, num_slots=16, seed=123
+            ),
+        )
+
+    def test_resample(self):
+        layer = spnk.layers.PermuteAndPadScopesRandom(factors=[2, 2, 4], seed=0)
+        x = tf.random.normal([3, 12, 4, 2])
+        before = layer(x)
+        permutations = layer.permutations.numpy()
+
+        layer.resample(seed=1)
+        self.assertNotAllEqual(layer.permutations.numpy(), permutations)
+        self.assertNotAllClose(layer(x), before)
+        layer.resample(seed=0)
+        self.assertAllEqual(layer.permutations.numpy(), permutations)
+        self.assertAllClose(layer(x), before)
+
+    def test_config(self):
+        layer = spnk.layers.PermuteAndPadScopesRandom(factors=[2, 4], seed=3)
+        layer.build([None, 6, 2, 1])
+        config = layer.get_config()
+        self.assertEqual(config["factors"], [2, 4])
+        self.assertEqual(config["seed"], 3)
+        clone = spnk.layers.PermuteAndPadScopesRandom.from_config(config)
+        clone.build([None, 6, 2, 1])
+        self.assertAllEqual(clone.permutations, layer.permutations)
+
+
+class TestPermuteAndPadScopes(tftest.TestCase):
+    def test_permute_and_pad(self):
+        x = np.random.RandomState(0).randn(5, 6, 3, 4).astype(np.float32)
+        permutations = np.array(
+            [
+                [5, -1, 0, 1, 2, 3, -1, 4],
+                [0, 1, 2, 3, 4, 5, -1, -1],
+                [-1, -1, 0, 1, 2, 3, 4, 5],
+            ]
+        )
+        expected = np.zeros((5, 8, 3, 4), dtype=np.float32)
+        for decomp, permutation in enumerate(permutations):
+            for scope_out, scope_in in enumerate(permutation):
+                if scope_in >= 0:
+                    expected[:, scope_out, decomp] = x[:, scope_in, decomp]
+
+        layer = spnk.layers.PermuteAndPadScopes(permutations)
+        self.assertAllEqual(layer(x), expected)
+        self.assertEqual(layer.compute_output_shape((5, 6, 3, 4)), (5, 8, 3, 4))
+
+        reverse = spnk.layers.PermuteAndPadScopes([[5, 4, 3, 2, 1, 0]] * 3)
+        self.assertAllEqual(reverse(x), x[:, ::-1])
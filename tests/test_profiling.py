@@ -0,0 +1,45 @@
+import tensorflow as tf
+from tensorflow import test as tftest
+
+import libspn_keras as spnk
+from libspn_keras.losses import NegativeLogLikelihood
+from libspn_keras.optimizers import OnlineExpectationMaximization
+from tests.utils import BATCH_SIZE, get_discrete_data, get_discrete_model, NUM_VARS
+
+tf.config.experimental_run_functions_eagerly(True)
+
+
+class TestProfiling(tftest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.spn = get_discrete_model()
+        cls.data = get_discrete_data()
+
+    def test_profile(self):
+        report = spnk.profile(self.spn, self.data, num_runs=2)
+        self.assertEqual(
+            [p.name for p in report.layers], [layer.name for layer in self.spn.layers]
+        )
+        by_class = {p.class_name: p for p in report.layers}
+        # 2 scopes of 4 products with 2 factors each
+        num_batch = self.data.shape[0]
+        self.assertEqual(
+            by_class["DenseSum"].flops, num_batch * 2 * (4 + 2 * 4 * 2 + 2)
+        )
+        self.assertEqual(by_class["PermuteAndPadScopes"].flops, 0)
+        self.assertEqual(
+            by_class["IndicatorLeaf"].activation_bytes, num_batch * NUM_VARS * 2 * 4
+        )
+        self.assertGreater(report.peak_memory_bytes, 0)
+        self.assertIsNotNone(report.backward_time)
+        self.assertIn("DenseSum", report.summary())
+
+    def test_callback(self):
+        profiler = spnk.callbacks.LayerProfiler(self.data[:BATCH_SIZE], verbose=0)
+        self.spn.compile(
+            optimizer=OnlineExpectationMaximization(), loss=NegativeLogLikelihood()
+        )
+        dataset = tf.data.Dataset.from_tensor_slices((self.data,)).batch(4)
+        self.spn.fit(dataset, epochs=2, callbacks=[profiler], verbose=0)
+        self.assertEqual(len(profiler.reports), 2)
+        self.assertEqual(len(profiler.step_stats), 2 * len(self.data) // 4)
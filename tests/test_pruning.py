@@ -0,0 +1,97 @@
+import tempfile
+
+import numpy as np
+import tensorflow as tf
+from tensorflow import test as tftest
+
+import libspn_keras as spnk
+from libspn_keras.pruning import prune_log_weights, sparsity
+from libspn_keras.serving import load_model
+from tests.utils import get_rat_spn
+
+
+def _build_spn():
+    spn = get_rat_spn(num_sums=4, permute=False)
+    rng = np.random.RandomState(0)
+    for layer in spn.layers:
+        if type(layer) is not spnk.layers.DenseSum:
+            continue
+        # Sums of a scope and decomposition share a small support of children
+        shape = layer._accumulators.shape
+        logits = np.full(shape, -20.0, dtype=np.float32)
+        support = rng.choice(shape[2], size=shape[2] // 4, replace=False)
+        logits[:, :, support] = rng.randn(*shape[:2], len(support), shape[3])
+        layer._accumulators.assign(tf.nn.log_softmax(logits, axis=2))
+    return spn
+
+
+class TestPruning(tftest.TestCase):
+    def setUp(self) -> None:
+        self.x = np.random.RandomState(1).randn(16, 8).astype(np.float32)
+
+    def tearDown(self) -> None:
+        tf.keras.backend.clear_session()
+
+    def test_prune_log_weights(self):
+        log_weights = np.log([[[0.7, 0.6], [0.25, 0.39], [0.05, 0.01]]])
+        pruned = prune_log_weights(log_weights, threshold=0.1)
+        self.assertAllClose(
+            np.exp(pruned),
+            [[[0.7 / 0.95, 0.6 / 0.99], [0.25 / 0.95, 0.39 / 0.99], [0, 0]]],
+        )
+
+        # The largest weight of a sum is kept regardless of the threshold
+        pruned = prune_log_weights(log_weights, threshold=0.9)
+        self.assertAllClose(np.exp(pruned), [[[1, 1], [0, 0], [0, 0]]])
+
+    def test_selected_products(self):
+        x = tf.random.normal([3, 4, 2, 5])
+        product = spnk.layers.DenseProduct(num_factors=2)
+        selected_product = spnk.layers.DenseProduct(
+            num_factors=2, product_indices=[0, 7, 24, 99]
+        )
+        self.assertEqual(selected_product.compute_output_shape(x.shape), (3, 4))
+        out = tf.reshape(product(x), [3, -1])
+        self.assertAllClose(selected_product(x), tf.gather(out, [0, 7, 24, 99], axis=1))
+
+    def test_prune_model(self):
+        spn = _build_spn()
+        pruned_spn = spnk.prune_model(spn, threshold=1e-4)
+        sum_layers = [
+            layer
+            for layer in pruned_spn.layers
+            if isinstance(layer, spnk.layers.SparseDenseSum)
+        ]
+        self.assertLen(sum_layers, 2)
+        self.assertEqual(pruned_spn.layers[2].product_indices.shape, (32,))
+        self.assertGreater(sparsity(spn, pruned_spn), 0.7)
+        self.assertAllClose(pruned_spn(self.x), spn(self.x), atol=1e-4)
+
+        # Without skipping products, sums keep their dense layout
+        dense_pruned_spn = spnk.prune_model(
+            spn, threshold=1e-4, max_product_fraction=0.1
+        )
+        self.assertIs(type(dense_pruned_spn.layers[3]), spnk.layers.DenseSum)
+        self.assertGreater(sparsity(spn, dense_pruned_spn), 0.7)
+        self.assertAllClose(dense_pruned_spn(self.x), spn(self.x), atol=1e-4)
+
+    def test_save_and_export(self):
+        spn = _build_spn()
+        pruned_spn = spnk.prune_model(spn, threshold=1e-4)
+        path = tempfile.mkdtemp() + "/model.keras"
+        pruned_spn.save(path)
+        loaded = load_model(path)
+        self.assertAllClose(loaded(self.x), pruned_spn(self.x))
+
+        module = spnk.InferenceModule(pruned_spn)
+        self.assertAllClose(
+            module.joint(self.x),
+            tf.reduce_logsumexp(pruned_spn(self.x), axis=-1),
+            atol=1e-4,
+        )
+        evidence = np.arange(8) % 2 == 0
+        evidence = np.tile(evidence, [16, 1])
+        self.assertAllClose(
+            module.mpe(self.x, evidence),
+            spnk.InferenceModule(spn).mpe(self.x, evidence),
+        )
@@ -0,0 +1,68 @@
+import tempfile
+
+import numpy as np
+import tensorflow as tf
+from tensorflow import test as tftest
+
+import libspn_keras as spnk
+from libspn_keras.quantization import quantize_log_weights
+from libspn_keras.serving import load_model
+from tests.utils import get_continuous_model, NUM_VARS
+
+
+class TestQuantization(tftest.TestCase):
+    def setUp(self) -> None:
+        self.x = np.random.RandomState(0).randn(16, NUM_VARS).astype(np.float32)
+
+    def tearDown(self) -> None:
+        tf.keras.backend.clear_session()
+
+    def test_quantize_log_weights(self):
+        log_weights = tf.nn.log_softmax(
+            np.random.RandomState(0).randn(2, 3, 10, 4).astype(np.float32), axis=-2
+        ).numpy()
+        for dtype in ["int8", "uint8"]:
+            quantized, scale, offset = quantize_log_weights(log_weights, dtype)
+            self.assertEqual(quantized.dtype, np.dtype(dtype))
+            self.assertEqual(scale.shape, (2, 3, 1, 4))
+            errors = np.abs(quantized * scale + offset - log_weights)
+            self.assertTrue(np.all(errors <= scale / 2 + 1e-6))
+
+        # Uniform weights are represented exactly
+        uniform = np.full([1, 1, 4, 2], np.log(0.25), dtype=np.float32)
+        quantized, scale, offset = quantize_log_weights(uniform)
+        self.assertAllClose(quantized * scale + offset, uniform, atol=1e-5)
+        with self.assertRaises(ValueError):
+            quantize_log_weights(uniform, "int16")
+
+    def test_quantize_model(self):
+        for sum_op in [spnk.SumOpGradBackprop(), spnk.SumOpHardEMBackprop()]:
+            spn = get_continuous_model(infer_no_evidence=False)
+            spn.layers[4].sum_op = spn.layers[6].sum_op = sum_op
+            quantized_spn = spnk.quantize_model(spn)
+            self.assertEqual(quantized_spn.layers[4].quantized_dtype, "int8")
+            self.assertEqual(quantized_spn.layers[4].trainable_weights, [])
+            self.assertAllClose(quantized_spn(self.x), spn(self.x), atol=1e-2)
+
+            report = spnk.quantization_report(spn, quantized_spn, self.x)
+            self.assertLess(report["max_abs_error"], 1e-2)
+            self.assertLess(
+                report["quantized_sum_weight_bytes"], report["sum_weight_bytes"]
+            )
+            tf.keras.backend.clear_session()
+
+    def test_save_and_export(self):
+        spn = get_continuous_model()
+        quantized_spn = spnk.quantize_model(spn, dtype="uint8")
+        path = tempfile.mkdtemp() + "/model.keras"
+        quantized_spn.save(path)
+        loaded = load_model(path)
+        self.assertEqual(loaded.layers[-1].quantized_dtype, "uint8")
+        self.assertAllClose(loaded(self.x), quantized_spn(self.x))
+
+        module = spnk.InferenceModule(quantized_spn)
+        self.assertAllClose(
+            module.joint(self.x),
+            tf.reduce_logsumexp(quantized_spn(self.x), axis=-1),
+            atol=1e-4,
+        )
@@ -0,0 +1,66 @@
+import itertools
+import sys
+
+import numpy as np
+import tensorflow as tf
+from tensorflow import test as tftest
+
+import libspn_keras as spnk
+from libspn_keras.region import (
+    _region_graph_to_permutations_and_prods_per_depth,
+    region_graph_to_dense_spn_layers,
+)
+
+
+def _unbalanced_region_graph():
+    x = [spnk.RegionVariable(i) for i in range(5)]
+    return spnk.RegionNode(
+        [spnk.RegionNode(x[:3]), spnk.RegionNode([x[3], spnk.RegionNode([x[4]])])]
+    )
+
+
+class TestRegionGraph(tftest.TestCase):
+    def tearDown(self):
+        tf.keras.backend.clear_session()
+
+    def test_scopes(self):
+        root = _unbalanced_region_graph()
+        self.assertAllEqual(root.scope_indices, np.arange(5))
+        self.assertEqual([v.index for v in root.scope], [0, 1, 2, 3, 4])
+        with self.assertRaises(spnk.region.OverlappingScopesException):
+            spnk.RegionNode([root.children[0], spnk.RegionVariable(2)])
+
+    def test_permutations_and_prods_per_depth(self):
+        permutation, num_factors = _region_graph_to_permutations_and_prods_per_depth(
+            _unbalanced_region_graph()
+        )
+        # Blocks are 3 slots wide per child of the root and 1 slot per variable
+        self.assertAllEqual(permutation, [0, 1, 2, 3, 4, -1])
+        self.assertEqual(num_factors, [1, 3, 2])
+
+    def test_unbalanced_partition_adds_up_to_one(self):
+        layers = region_graph_to_dense_spn_layers(
+            _unbalanced_region_graph(),
+            leaf_node=spnk.layers.IndicatorLeaf(num_components=2),
+            num_sums_iterable=iter([2, 2]),
+            return_weighted_child_logits=False,
+        )
+        layers[0] = spnk.layers.FlatToRegions(
+            num_decomps=1, input_shape=(5,), dtype=tf.int32
+        )
+        spn = tf.keras.Sequential(layers)
+        data = np.asarray(list(itertools.product([0, 1], repeat=5)), np.int32)
+        self.assertAllClose(tf.reduce_logsumexp(spn(data)), 0.0, atol=1e-5)
+
+    def test_deep_region_graph(self):
+        # A graph that is much deeper than the recursion limit
+        depth = sys.getrecursionlimit() + 100
+        root = spnk.RegionNode([spnk.RegionVariable(0), spnk.RegionVariable(1)])
+        for _ in range(depth):
+            root = spnk.RegionNode([root])
+        self.assertEqual([v.index for v in root.scope], [0, 1])
+        permutation, num_factors = _region_graph_to_permutations_and_prods_per_depth(
+            root
+        )
+        self.assertAllEqual(permutation, [0, 1])
+        self.assertEqual(num_factors, [2] + [1] * depth)
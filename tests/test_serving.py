@@ -0,0 +1,212 @@
+import json
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+
+import numpy as np
+import tensorflow as tf
+from tensorflow import test as tftest
+
+from libspn_keras.layers.base_leaf import BaseLeaf
+from libspn_keras.leaf_cache import LeafLogProbCache
+from libspn_keras.serving import (
+    DynamicBatcher,
+    generate_load,
+    InferenceServer,
+    LatencyHistogram,
+    load_model,
+    QueryFunctions,
+)
+from tests.utils import get_continuous_model, NUM_VARS
+
+
+def _post(url, body):
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(body).encode(),
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+class TestQueryFunctions(tftest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.spn = get_continuous_model(infer_no_evidence=True)
+        cls.queries = QueryFunctions(cls.spn)
+        cls.x = np.random.RandomState(0).randn(8, NUM_VARS).astype(np.float32)
+
+    def test_queries(self):
+        self.assertEqual(self.queries.query_types, ["joint", "marginal", "mpe"])
+        full_evidence = np.ones_like(self.x, dtype=bool)
+        joint = self.queries("joint", self.x)
+        self.assertAllClose(
+            joint, tf.reduce_logsumexp(self.spn.marginal(self.x, full_evidence), -1)
+        )
+        self.assertAllClose(self.queries("marginal", self.x, full_evidence), joint)
+        self.assertAllClose(
+            self.queries("marginal", self.x, ~full_evidence),
+            np.zeros(len(self.x)),
+            atol=1e-5,
+        )
+
+        evidence = full_evidence.copy()
+        evidence[:, 2:] = False
+        imputed = self.queries("mpe", self.x, evidence)
+        self.assertAllClose(imputed, self.spn.impute(self.x, evidence))
+        self.assertAllEqual(imputed[:, :2], self.x[:, :2])
+
+
+class TestDynamicBatcher(tftest.TestCase):
+    def test_batches_concurrent_requests(self):
+        def fn(query_type, x):
+            return x * 2
+
+        batcher = DynamicBatcher(fn, max_batch_size=16, max_latency=0.05)
+        with batcher:
+            futures = [batcher.submit("double", np.full([2, 3], i)) for i in range(20)]
+            for i, future in enumerate(futures):
+                self.assertAllEqual(future.result(), np.full([2, 3], 2 * i))
+
+        stats = batcher.metrics.to_dict()["double"]
+        self.assertEqual(stats["num_requests"], 20)
+        self.assertEqual(stats["num_errors"], 0)
+        self.assertGreater(stats["batch_size"]["mean"], 2)
+        self.assertLessEqual(stats["batch_size"]["max"], 16)
+
+    def test_errors_are_set_on_futures(self):
+        def fn(query_type, x):
+            raise ValueError("Invalid input")
+
+        with DynamicBatcher(fn) as batcher:
+            with self.assertRaises(ValueError):
+                batcher("query", np.zeros([1, 2]))
+        self.assertEqual(batcher.metrics.to_dict()["query"]["num_errors"], 1)
+
+
+class TestLatencyHistogram(tftest.TestCase):
+    def test_quantiles(self):
+        histogram = LatencyHistogram()
+        values = np.random.RandomState(0).uniform(0.001, 0.1, size=1000)
+        for value in values:
+            histogram.record(value)
+        self.assertEqual(histogram.count, 1000)
+        self.assertAllClose(
+            histogram.quantiles([0.5, 0.9]), np.quantile(values, [0.5, 0.9]), rtol=0.15
+        )
+
+
+class TestInferenceServer(tftest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.spn = get_continuous_model(infer_no_evidence=True)
+        cls.x = np.random.RandomState(0).randn(16, NUM_VARS).astype(np.float32)
+        cls.evidence = np.ones_like(cls.x, dtype=bool)
+        cls.evidence[:, ::2] = False
+
+    def test_queries_match_model(self):
+        with InferenceServer(self.spn, max_latency=0.001) as server:
+            joint = _post(server.url + "/joint", dict(instances=self.x.tolist()))
+            marginal = _post(
+                server.url + "/marginal",
+                dict(instances=self.x.tolist(), evidence=self.evidence.tolist()),
+            )
+            mpe = _post(
+                server.url + "/mpe",
+                dict(instances=self.x.tolist(), evidence=self.evidence.tolist()),
+            )
+            with self.assertRaises(urllib.error.HTTPError) as context:
+                _post(server.url + "/marginal", dict(instances=self.x.tolist()))
+            self.assertEqual(context.exception.code, 400)
+            with self.assertRaises(urllib.error.HTTPError) as context:
+                _post(server.url + "/unknown", dict(instances=self.x.tolist()))
+            self.assertEqual(context.exception.code, 404)
+
+        expected_joint = tf.reduce_logsumexp(
+            self.spn.marginal(self.x, np.ones_like(self.evidence)), axis=-1
+        )
+        self.assertAllClose(joint["predictions"], expected_joint)
+        self.assertAllClose(
+            marginal["predictions"],
+            tf.reduce_logsumexp(self.spn.marginal(self.x, self.evidence), axis=-1),
+        )
+        self.assertAllClose(
+            mpe["predictions"], self.spn.impute(self.x, self.evidence), atol=1e-5
+        )
+
+    def test_serve_loaded_model(self):
+        path = tempfile.mkdtemp() + "/model.keras"
+        self.spn.save(path)
+        with InferenceServer(load_model(path), max_latency=0.001) as server:
+            marginal = _post(
+                server.url + "/marginal",
+                dict(instances=self.x.tolist(), evidence=self.evidence.tolist()),
+            )
+            mpe = _post(
+                server.url + "/mpe",
+                dict(instances=self.x.tolist(), evidence=self.evidence.tolist()),
+            )
+
+        self.assertAllClose(
+            marginal["predictions"],
+            tf.reduce_logsumexp(self.spn.marginal(self.x, self.evidence), axis=-1),
+        )
+        self.assertAllClose(
+            mpe["predictions"], self.spn.impute(self.x, self.evidence), atol=1e-5
+        )
+
+    def test_load_is_batched(self):
+        with InferenceServer(self.spn, max_batch_size=32, max_latency=0.02) as server:
+            result = generate_load(
+                server.url,
+                "marginal",
+                self.x,
+                evidence=self.evidence,
+                num_clients=8,
+                num_requests=64,
+            )
+            stats = json.loads(urllib.request.urlopen(server.url + "/stats").read())
+
+        self.assertEqual(result["num_errors"], 0)
+        self.assertGreater(result["throughput"], 0.0)
+        self.assertEqual(stats["marginal"]["num_requests"], 64)
+        self.assertGreater(stats["marginal"]["batch_size"]["max"], 1)
+
+    def test_leaf_cache_stats(self):
+        spn = get_continuous_model(infer_no_evidence=True)
+        leaf = next(layer for layer in spn.layers if isinstance(layer, BaseLeaf))
+        LeafLogProbCache(leaf, np.linspace(-4.0, 4.0, 801), interpolate=True)
+        with InferenceServer(spn) as server:
+            _post(server.url + "/joint", dict(instances=self.x.tolist()))
+            stats = json.loads(urllib.request.urlopen(server.url + "/stats").read())
+
+        cache_stats = stats["leaf_log_prob_cache"][leaf.name]
+        self.assertEqual(cache_stats["num_lookups"], self.x.size)
+        self.assertGreater(cache_stats["hit_rate"], 0.5)
+
+    def test_concurrent_requests_get_their_own_results(self):
+        results = {}
+
+        def query(server, row):
+            results[row] = _post(
+                server.url + "/joint", dict(instances=self.x[row : row + 1].tolist())
+            )["predictions"]
+
+        with InferenceServer(self.spn, max_latency=0.02) as server:
+            threads = [
+                threading.Thread(target=query, args=(server, row))
+                for row in range(len(self.x))
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        expected = tf.reduce_logsumexp(
+            self.spn.marginal(self.x, np.ones_like(self.evidence)), axis=-1
+        )
+        self.assertAllClose(
+            np.concatenate([results[row] for row in range(len(self.x))]), expected
+        )
@@ -0,0 +1,70 @@
+import numpy as np
+import tensorflow as tf
+from tensorflow import test as tftest
+
+import libspn_keras as spnk
+from libspn_keras.constraints import GreaterEqualEpsilonNormalized
+from libspn_keras.math.logconv import logconv1x1_2d
+from libspn_keras.sum_ops import SumOpGradBackprop, SumOpHardEMBackprop
+
+
+def _log_conv1x1(x, log_weights):
+    # log(sum_c exp(x[..., c] + log_weights[c, k])) of a [batch, height, width, channels] input
+    return tf.reduce_logsumexp(
+        x[..., tf.newaxis] + log_weights[tf.newaxis, tf.newaxis, tf.newaxis], axis=-2
+    )
+
+
+class TestSpatialSums(tftest.TestCase):
+    def setUp(self) -> None:
+        self.x = tf.math.log(
+            tf.constant(
+                np.random.RandomState(0).uniform(0.1, 1.0, size=(3, 4, 4, 2)),
+                dtype=tf.float32,
+            )
+        )
+
+    def tearDown(self) -> None:
+        tf.keras.backend.clear_session()
+
+    def test_logconv1x1_2d_with_variable_filter(self):
+        log_weights = np.log(np.random.RandomState(1).uniform(0.1, 1.0, size=(2, 3)))
+        filter = tf.Variable(log_weights[tf.newaxis, tf.newaxis], dtype=tf.float32)
+        out = logconv1x1_2d(self.x, filter)
+        self.assertAllClose(out, _log_conv1x1(self.x, log_weights.astype(np.float32)))
+        # The filter is left untouched
+        self.assertAllClose(filter[0, 0], log_weights)
+
+    def test_conv2d_sum(self):
+        for sum_op in [SumOpGradBackprop(), SumOpHardEMBackprop()]:
+            layer = spnk.layers.Conv2DSum(num_sums=3, sum_op=sum_op)
+            out = layer(self.x)
+            self.assertEqual(len(layer.weights), 1)
+            log_weights = layer.sum_op._weights_in_logspace(*layer._sum_weights())
+            self.assertAllClose(out, _log_conv1x1(self.x, log_weights[0, 0]))
+
+    def test_conv2d_sum_hard_em_with_normalized_accumulators(self):
+        # Accumulators normalized by their constraint are not normalized in the forward pass
+        outputs = []
+        for sum_op in [SumOpGradBackprop(), SumOpHardEMBackprop()]:
+            layer = spnk.layers.Conv2DSum(
+                num_sums=3,
+                sum_op=sum_op,
+                logspace_accumulators=False,
+                linear_accumulator_constraint=GreaterEqualEpsilonNormalized(axis=-2),
+                accumulator_initializer=tf.keras.initializers.Constant(
+                    np.random.RandomState(2).uniform(0.1, 1.0, size=(1, 1, 2, 3))
+                ),
+            )
+            outputs.append(layer(self.x))
+        self.assertAllClose(outputs[0], outputs[1])
+
+    def test_local2d_sum_creates_accumulators_once(self):
+        layer = spnk.layers.Local2DSum(
+            num_sums=3, accumulator_regularizer=tf.keras.regularizers.L2(1e-3)
+        )
+        out = layer(self.x)
+        self.assertEqual(len(layer.weights), 1)
+        self.assertEqual(len(layer.losses), 1)
+        self.assertEqual(layer.weights[0].shape, (4, 4, 2, 3))
+        self.assertEqual(out.shape, (3, 4, 4, 3))
@@ -0,0 +1,114 @@
+import numpy as np
+import tensorflow as tf
+from tensorflow import test as tftest
+
+import libspn_keras as spnk
+from libspn_keras.tiling import tile_offsets, TiledEvaluator
+
+
+def _build_dgc_spn():
+    spn = spnk.models.SequentialSumProductNetwork(
+        [
+            spnk.layers.NormalLeaf(num_components=2, input_shape=(4, 4, 1)),
+            spnk.layers.Conv2DProduct(
+                depthwise=True, strides=[2, 2], dilations=[1, 1], kernel_size=[2, 2]
+            ),
+            spnk.layers.Conv2DSum(num_sums=2),
+            spnk.layers.Conv2DProduct(
+                depthwise=True, strides=[2, 2], dilations=[1, 1], kernel_size=[2, 2]
+            ),
+            spnk.layers.SpatialToRegions(),
+            spnk.layers.RootSum(return_weighted_child_logits=False),
+        ]
+    )
+    spn.build((None, 4, 4, 1))
+    return spn
+
+
+class TestTiling(tftest.TestCase):
+    def setUp(self) -> None:
+        self.spn = _build_dgc_spn()
+
+    def tearDown(self) -> None:
+        tf.keras.backend.clear_session()
+
+    def test_tile_offsets(self):
+        self.assertAllEqual(tile_offsets(10, 4, 2), [0, 2, 4, 6])
+        self.assertAllEqual(tile_offsets(9, 4, 2), [0, 2, 4, 5])
+        self.assertAllEqual(tile_offsets(3, 4, 2), [0])
+
+    def test_log_density_map_of_disjoint_tiles(self):
+        image = np.random.RandomState(0).randn(8, 12, 1).astype(np.float32)
+        evaluator = TiledEvaluator(self.spn, strides=[4, 4], max_tiles_per_batch=4)
+        self.assertEqual(len(evaluator.offsets(8, 12)), 6)
+        log_density = evaluator.log_density_map(image)
+        self.assertEqual(log_density.shape, (8, 12))
+        tile = image[4:8, 8:12][np.newaxis]
+        self.assertAllClose(
+            log_density[4:8, 8:12],
+            np.full([4, 4], self.spn(tile)[0, 0] / 16),
+            atol=1e-5,
+        )
+
+    def test_overlapping_tiles_are_averaged(self):
+        image = np.random.RandomState(0).randn(4, 6, 1).astype(np.float32)
+        evaluator = TiledEvaluator(self.spn, strides=[1, 2])
+        log_density = evaluator.log_density_map(image)
+        left, right = [
+            self.spn(image[np.newaxis, :, i : i + 4])[0, 0] / 16 for i in [0, 2]
+        ]
+        self.assertAllClose(log_density[:, 0], np.full([4], left), atol=1e-5)
+        self.assertAllClose(
+            log_density[:, 3], np.full([4], (left + right) / 2), atol=1e-5
+        )
+
+    def test_images_smaller_than_a_tile_are_marginalized(self):
+        image = np.random.RandomState(0).randn(3, 2, 1).astype(np.float32)
+        padded = np.zeros([1, 4, 4, 1], dtype=np.float32)
+        padded[0, :3, :2] = image
+        evidence = np.zeros_like(padded, dtype=bool)
+        evidence[0, :3, :2] = True
+        expected = self.spn.marginal(padded, evidence)[0, 0] / 6
+        self.assertAllClose(
+            TiledEvaluator(self.spn).log_density_map(image),
+            np.full([3, 2], expected),
+            atol=1e-5,
+        )
+
+    def test_complete(self):
+        image = np.random.RandomState(0).randn(6, 6, 1).astype(np.float32)
+        evidence = np.random.RandomState(1).rand(6, 6, 1) > 0.3
+        completed = TiledEvaluator(self.spn, strides=[2, 2]).complete(image, evidence)
+        self.assertAllEqual(completed[evidence], image[evidence])
+        self.assertTrue(np.all(np.isfinite(completed)))
+        tile_evidence = evidence[np.newaxis, :4, :4]
+        self.assertAllClose(
+            completed[:2, :2],
+            self.spn.impute(image[np.newaxis, :4, :4], tile_evidence)[0, :2, :2],
+            atol=1e-5,
+        )
+
+    def test_size_agnostic_conv2d_product(self):
+        for depthwise in [True, False]:
+            kwargs = dict(
+                depthwise=depthwise,
+                strides=[1, 1],
+                dilations=[1, 1],
+                kernel_size=[2, 2],
+                padding="full",
+            )
+            layer = spnk.layers.Conv2DProduct(**kwargs)
+            layer.build((None, None, None, 2))
+            self.assertEqual(
+                layer.compute_output_shape((None, None, None, 2))[1:3], (None, None)
+            )
+            for height, width in [(4, 4), (7, 5)]:
+                x = tf.random.normal([2, height, width, 2])
+                fixed_size_layer = spnk.layers.Conv2DProduct(**kwargs)
+                fixed_size_layer.build((None, height, width, 2))
+                fixed_size_layer.set_weights(layer.get_weights())
+                out = tf.function(layer)(x)
+                self.assertEqual(
+                    out.shape, layer.compute_output_shape((2, height, width, 2))
+                )
+                self.assertAllClose(out, fixed_size_layer(x))
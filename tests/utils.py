@@ -204,3 +204,63 @@ def get_discrete_model():
     )
     spn.summary()
     return spn
+
+
+def get_normalized_model(
+    normalize_layer=None,
+    normalize_after_flat_to_regions=False,
+    leaf_class=spnk.layers.NormalLeaf,
+    **leaf_kwargs
+):
+    layers = [
+        spnk.layers.FlatToRegions(num_decomps=2),
+        leaf_class(
+            num_components=NUM_COMPONENTS,
+            location_initializer=initializers.RandomNormal(seed=0),
+            **leaf_kwargs
+        ),
+        spnk.layers.PermuteAndPadScopes([[0, 1, 2, 3], [2, 0, 3, 1]]),
+        spnk.layers.DenseProduct(num_factors=2),
+        spnk.layers.DenseSum(num_sums=2, sum_op=SumOpHardEMBackprop()),
+        spnk.layers.DenseProduct(num_factors=2),
+        spnk.layers.RootSum(
+            sum_op=SumOpHardEMBackprop(), return_weighted_child_logits=True
+        ),
+    ]
+    if normalize_layer is not None:
+        layers.insert(1 if normalize_after_flat_to_regions else 0, normalize_layer)
+    spn = SequentialSumProductNetwork(layers)
+    spn.build((None, NUM_VARS))
+    return spn
+
+
+def get_rat_spn(
+    num_vars=8,
+    num_decomps=2,
+    num_sums=3,
+    leaf=None,
+    sum_layer_kwargs=(dict(), dict()),
+    permute=True,
+    log_dropout_rate=None,
+    top_layers=None,
+):
+    # Region SPN with a pair of product and sum layers per entry of sum_layer_kwargs, followed by
+    # top_layers, which default to a product of the remaining two scopes, and a root sum
+    layers = [
+        spnk.layers.FlatToRegions(num_decomps=num_decomps, input_shape=(num_vars,)),
+        leaf or spnk.layers.NormalLeaf(num_components=num_sums),
+    ]
+    if permute:
+        layers.append(spnk.layers.PermuteAndPadScopesRandom(seed=0))
+    for i, kwargs in enumerate(sum_layer_kwargs):
+        if i > 0 and log_dropout_rate is not None:
+            layers.append(spnk.layers.LogDropout(rate=log_dropout_rate))
+        layers.append(spnk.layers.DenseProduct(num_factors=2))
+        layers.append(spnk.layers.DenseSum(num_sums=num_sums, **kwargs))
+    if top_layers is None:
+        top_layers = [spnk.layers.DenseProduct(num_factors=2)]
+    layers.extend(top_layers)
+    layers.append(spnk.layers.RootSum(return_weighted_child_logits=False))
+    spn = SequentialSumProductNetwork(layers)
+    spn.build((None, num_vars))
+    return spn